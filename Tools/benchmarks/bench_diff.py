@@ -0,0 +1,78 @@
+#!/usr/bin/env python3
+"""
+Benchmark: `bremote diff` load and join time on large report sets.
+
+Writes two synthetic fleets (OLD as a --report-stream JSON Lines file,
+NEW as a --report JSON file) with every unit on a different port in NEW,
+then times loading and diffing with the numpy and pure-Python joins.
+
+Usage:
+    python benchmarks/bench_diff.py [--units 20000] [--tests 12]
+"""
+
+import argparse
+import json
+import os
+import random
+import sys
+import tempfile
+import time
+
+sys.path.insert(0, os.path.join(os.path.dirname(__file__), '..'))
+
+from bremote import diff
+from bremote.models import TestReport
+from bremote.reportstream import ReportStreamWriter
+
+
+def make_reports(units: int, tests: int, firmware: str, fail_rate: float, slow: float, seed: int):
+    rng = random.Random(seed)
+    for unit in range(units):
+        report = TestReport(device_type="tx" if unit % 2 == 0 else "rx",
+                            port=f"/dev/ttyUSB{rng.randrange(64)}", usb_serial=f"SN{unit:06d}",
+                            own_address=f"{unit >> 16:02X}:{(unit >> 8) & 0xFF:02X}:{unit & 0xFF:02X}",
+                            firmware_version=firmware)
+        for t in range(tests):
+            report.tests[f"test_{t:02d}"] = {
+                "result": "FAIL" if rng.random() < fail_rate else "PASS", "details": "",
+                "stats": {"wall_s": round(rng.uniform(0.1, 1.0) * (slow if t == 0 else 1.0), 3)}}
+        report.overall_result = "FAIL" if any(v["result"] == "FAIL" for v in report.tests.values()) else "PASS"
+        yield report
+
+
+def main():
+    parser = argparse.ArgumentParser(description='Report diff benchmark')
+    parser.add_argument('--units', type=int, default=20000, help='Units (reports) per side')
+    parser.add_argument('--tests', type=int, default=12, help='Tests per report')
+    args = parser.parse_args()
+
+    tmp = tempfile.mkdtemp()
+    old_path, new_path = os.path.join(tmp, "old.jsonl"), os.path.join(tmp, "new.json")
+    with ReportStreamWriter(old_path) as stream:
+        for report in make_reports(args.units, args.tests, "2", 0.01, 1.0, seed=1):
+            for name, data in report.tests.items():
+                stream.write_test(report.port, report.device_type, name, data)
+            stream.write_report(report)
+    with open(new_path, "w") as f:
+        json.dump({f"{r.port}#{i}": r.to_dict()
+                   for i, r in enumerate(make_reports(args.units, args.tests, "3", 0.02, 2.0, seed=2))}, f)
+    print(f"{args.units} units x {args.tests} tests per side "
+          f"({(os.path.getsize(old_path) + os.path.getsize(new_path)) / 1e6:.0f} MB)")
+
+    backends = ["numpy", "python"] if diff.NUMPY_AVAILABLE else ["python"]
+    for backend in backends:
+        diff.NUMPY_AVAILABLE = backend == "numpy"
+        start = time.perf_counter()
+        names = {}
+        old = diff.load_set([old_path], names)
+        new = diff.load_set([new_path], names)
+        loaded = time.perf_counter()
+        result = diff.diff_sets(old, new, names)
+        done = time.perf_counter()
+        regressions = sum(t["regressions"] for t in result["tests"])
+        print(f"  {backend:7} load {loaded - start:6.2f}s  diff {(done - loaded) * 1000:7.1f} ms  "
+              f"matched {result['matched_units']}  regressions {regressions}")
+
+
+if __name__ == "__main__":
+    main()
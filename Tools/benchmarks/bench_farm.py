@@ -0,0 +1,67 @@
+#!/usr/bin/env python3
+"""
+Benchmark: test farm scaling with workers on localhost and emulated units.
+
+Every worker serves the same number of emulated units; the farm run time
+should stay roughly flat as workers are added (near-linear throughput).
+
+Usage:
+    python benchmarks/bench_farm.py [--workers 1,2,4,8] [--units 2] [--latency 0.005]
+"""
+
+import argparse
+import os
+import sys
+import time
+
+sys.path.insert(0, os.path.join(os.path.dirname(__file__), '..'))
+
+from bremote.emulator import EmulatedDevice
+from bremote.farm import FarmCoordinator, FarmWorker
+
+
+def run_farm(n_workers: int, units: int, latency: float, selector: str):
+    workers = []
+    for w in range(n_workers):
+        devices = []
+        for u in range(units):
+            device = EmulatedDevice(f"w{w}-u{u}", "tx" if u % 2 == 0 else "rx",
+                                    latency=latency, stream=False)
+            device.connect()
+            devices.append(device)
+        workers.append(FarmWorker(devices, port=0, name=f"w{w}").start())
+    try:
+        coordinator = FarmCoordinator([w.address for w in workers], selector=selector,
+                                      log=lambda message: None)
+        start = time.perf_counter()
+        reports = coordinator.run()
+        elapsed = time.perf_counter() - start
+    finally:
+        for worker in workers:
+            worker.close()
+    passed = sum(1 for r in reports.values() if r.overall_result == "PASS")
+    return elapsed, len(reports), passed, coordinator.stats
+
+
+def main():
+    parser = argparse.ArgumentParser(description='Test farm scaling benchmark')
+    parser.add_argument('--workers', default='1,2,4,8', help='Worker counts to run')
+    parser.add_argument('--units', type=int, default=2, help='Emulated units per worker')
+    parser.add_argument('--latency', type=float, default=0.005, help='Emulated response latency (s)')
+    parser.add_argument('--test', help='Test selector (default: TX/RX + config suites)')
+    args = parser.parse_args()
+
+    baseline = None
+    print(f"{'workers':>7} {'units':>5} {'elapsed':>9} {'units/min':>10} {'speedup':>8} {'efficiency':>10}")
+    for n in (int(x) for x in args.workers.split(',')):
+        elapsed, total, passed, stats = run_farm(n, args.units, args.latency, args.test)
+        rate = total / elapsed * 60.0
+        if baseline is None:
+            baseline = rate / n
+        speedup = rate / baseline
+        print(f"{n:>7} {total:>5} {elapsed:>8.2f}s {rate:>10.1f} {speedup:>7.2f}x {speedup / n:>9.0%}"
+              + ("" if passed == total else f"  ({total - passed} failed)"))
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,316 @@
+#!/usr/bin/env python3
+"""
+Benchmark: harness hot paths fed with synthetic or recorded serial data.
+
+Runs offline (no units attached). Serial input comes from an in-memory
+replay port filled with firmware-format JSON lines, or from raw captures
+of a real TX/RX console (--tx-capture / --rx-capture).
+
+    read_line           BREmoteDevice.read_line over ?printInputs lines
+    send_json_command   BREmoteDevice.send_json_command("?state json"), no quiet gap
+    parse_tx            RadioLinkMonitor._parse_tx_buffer, 4 KiB chunks
+    parse_rx            RadioLinkMonitor._parse_rx_buffer, 4 KiB chunks
+    analyze_results     RadioLinkMonitor._analyze_results, 10 min of samples
+    decode_config       ConfigLayout.decode_b64 of a TX v3 ?conf blob
+    encode_config       ConfigLayout.encode_b64 of a TX v3 config
+
+Each benchmark reports ops/s (best of --repeat passes), per-op latency
+percentiles and the peak traced memory of a separate pass. --save writes a JSON baseline; with
+--baseline, ops/s or peak memory worse than --tolerance is flagged and
+the exit status is 1.
+
+Usage:
+    python benchmarks/bench_hot_paths.py [--quick] [--save baseline.json]
+    python benchmarks/bench_hot_paths.py --baseline baseline.json [--tolerance 0.25]
+"""
+
+import argparse
+import json
+import os
+import platform
+import random
+import sys
+import time
+import tracemalloc
+from typing import Callable, Dict, List, Optional, Tuple
+
+sys.path.insert(0, os.path.join(os.path.dirname(__file__), '..'))
+
+from bremote.confstruct import get_layout
+from bremote.device import BREmoteDevice
+from bremote.tests.link_test import RadioLinkMonitor
+
+CHUNK_SIZE = 4096
+
+
+class ReplaySerial:
+    """pyserial stand-in that serves a fixed byte stream, looping at the end.
+
+    respond maps a written command line to the bytes queued in reply;
+    with a reply table the stream is only served after a command.
+    """
+
+    def __init__(self, data: bytes = b"", respond: Optional[Dict[bytes, bytes]] = None):
+        self.data = data
+        self.pos = 0
+        self.respond = respond or {}
+        self.pending = b""
+        self.is_open = True
+
+    @property
+    def in_waiting(self) -> int:
+        if self.respond:
+            return len(self.pending)
+        return len(self.data) - self.pos or len(self.data)
+
+    def read(self, size: int = 1) -> bytes:
+        if self.respond:
+            out, self.pending = self.pending[:size], self.pending[size:]
+            return out
+        if self.pos >= len(self.data):
+            self.pos = 0
+        out = self.data[self.pos:self.pos + size]
+        self.pos += len(out)
+        return out
+
+    def write(self, data: bytes) -> int:
+        self.pending += self.respond.get(data.strip(), b"")
+        return len(data)
+
+    def reset_input_buffer(self):
+        self.pending = b""
+
+    def close(self):
+        self.is_open = False
+
+
+def synthetic_tx(lines: int, seed: int = 0) -> bytes:
+    rng = random.Random(seed)
+    out = []
+    for _ in range(lines):
+        thr = rng.randrange(0, 256)
+        steer = rng.randrange(0, 256)
+        out.append(json.dumps({
+            "throttle": thr, "steering": steer, "thr_sent": thr, "steer_sent": steer,
+            "toggle": 0, "toggle_input": 0, "locked": False, "in_menu": False,
+            "steer_enabled": True, "hall_enabled": True}, separators=(",", ":")))
+    return ("\r\n".join(out) + "\r\n").encode()
+
+
+def synthetic_rx(lines: int, seed: int = 1) -> bytes:
+    rng = random.Random(seed)
+    out = [json.dumps({"throttle": rng.randrange(0, 256), "steering": rng.randrange(0, 256),
+                       "rssi": rng.randrange(-110, -40), "snr": round(rng.uniform(-5, 12), 1)},
+                      separators=(",", ":"))
+           for _ in range(lines)]
+    return ("\r\n".join(out) + "\r\n").encode()
+
+
+def _device(port: str, serial_port: ReplaySerial) -> BREmoteDevice:
+    device = BREmoteDevice(port)
+    device.serial = serial_port
+    return device
+
+
+def _chunks(data: bytes) -> List[bytes]:
+    return [data[i:i + CHUNK_SIZE] for i in range(0, len(data), CHUNK_SIZE)]
+
+
+# Each setup returns (op, items per op, item unit); ops are timed one by one
+
+def setup_read_line(tx_data: bytes, rx_data: bytes):
+    device = _device("bench-tx", ReplaySerial(tx_data))
+    return (lambda: device.read_line(timeout=1.0)), 1, "lines"
+
+
+def setup_send_json_command(tx_data: bytes, rx_data: bytes):
+    state = json.dumps({"throttle": 0, "steering": 128, "locked": False, "gear": 3}).encode()
+    device = _device("bench-tx", ReplaySerial(respond={b"?state json": state + b"\r\n"}))
+    # The reply is complete once read; the fixed quiet gap would dominate
+    device.response_quiet_gap = 0.0
+    return (lambda: device.send_json_command("?state json")), 1, "commands"
+
+
+def _monitor() -> RadioLinkMonitor:
+    tx = BREmoteDevice("bench-tx")
+    rx = BREmoteDevice("bench-rx")
+    return RadioLinkMonitor(tx, rx, gui_callback=lambda message: None)
+
+
+def setup_parse_tx(tx_data: bytes, rx_data: bytes):
+    monitor = _monitor()
+    chunks = _chunks(tx_data)
+    lines_per_chunk = tx_data.count(b"\n") / len(chunks)
+    state = {"i": 0}
+
+    def op():
+        monitor.tx_buffer.write(chunks[state["i"] % len(chunks)])
+        monitor._parse_tx_buffer()
+        state["i"] += 1
+
+    return op, lines_per_chunk, "lines"
+
+
+def setup_parse_rx(tx_data: bytes, rx_data: bytes):
+    monitor = _monitor()
+    monitor.tx_buffer.write(tx_data[:monitor.buffer_capacity])
+    monitor._parse_tx_buffer()
+    chunks = _chunks(rx_data)
+    lines_per_chunk = rx_data.count(b"\n") / len(chunks)
+    state = {"i": 0}
+
+    def op():
+        monitor.rx_buffer.write(chunks[state["i"] % len(chunks)])
+        monitor._parse_rx_buffer()
+        state["i"] += 1
+
+    return op, lines_per_chunk, "lines"
+
+
+def setup_analyze_results(tx_data: bytes, rx_data: bytes):
+    # 10 minutes of a link test: 20Hz TX frames, 10Hz RX samples
+    monitor = _monitor()
+    for chunk in _chunks(synthetic_tx(12000)):
+        monitor.tx_buffer.write(chunk)
+        monitor._parse_tx_buffer()
+    for chunk in _chunks(synthetic_rx(6000)):
+        monitor.rx_buffer.write(chunk)
+        monitor._parse_rx_buffer()
+    return monitor._analyze_results, len(monitor.samples), "samples"
+
+
+def setup_decode_config(tx_data: bytes, rx_data: bytes):
+    layout = get_layout("tx", 3)
+    blob = layout.encode_b64(dict(layout.defaults, own_address="A1:B2:C3", rf_power=-3))
+    return (lambda: layout.decode_b64(blob)), 1, "configs"
+
+
+def setup_encode_config(tx_data: bytes, rx_data: bytes):
+    layout = get_layout("tx", 3)
+    values = dict(layout.defaults, own_address="A1:B2:C3", rf_power=-3)
+    return (lambda: layout.encode_b64(values)), 1, "configs"
+
+
+BENCHMARKS: Dict[str, Tuple[Callable, int]] = {
+    # name: (setup, ops per timed pass)
+    "read_line": (setup_read_line, 20000),
+    "send_json_command": (setup_send_json_command, 20000),
+    "parse_tx": (setup_parse_tx, 2000),
+    "parse_rx": (setup_parse_rx, 2000),
+    "analyze_results": (setup_analyze_results, 50),
+    "decode_config": (setup_decode_config, 20000),
+    "encode_config": (setup_encode_config, 20000),
+}
+
+
+def _percentile(sorted_values: List[float], q: float) -> float:
+    idx = min(len(sorted_values) - 1, int(round(q * (len(sorted_values) - 1))))
+    return sorted_values[idx]
+
+
+def run_benchmark(setup: Callable, ops: int, tx_data: bytes, rx_data: bytes,
+                  repeat: int = 3) -> Dict[str, float]:
+    """Best of repeat timed passes (like timeit), percentiles over all ops"""
+    op, per_op, unit = setup(tx_data, rx_data)
+    op()    # warm up
+
+    latencies = []
+    elapsed = None
+    for _ in range(repeat):
+        start = time.perf_counter()
+        for _ in range(ops):
+            t0 = time.perf_counter()
+            op()
+            latencies.append(time.perf_counter() - t0)
+        pass_s = time.perf_counter() - start
+        elapsed = pass_s if elapsed is None else min(elapsed, pass_s)
+    latencies.sort()
+
+    # Peak memory in a separate (slower) pass so tracing does not skew timing
+    op, _, _ = setup(tx_data, rx_data)
+    tracemalloc.start()
+    for _ in range(max(1, min(ops, 200))):
+        op()
+    _, peak = tracemalloc.get_traced_memory()
+    tracemalloc.stop()
+
+    return {
+        "ops": ops,
+        "repeat": repeat,
+        "ops_per_s": round(ops / elapsed, 1),
+        "items_per_s": round(ops * per_op / elapsed, 1),
+        "unit": unit,
+        "p50_us": round(_percentile(latencies, 0.50) * 1e6, 1),
+        "p90_us": round(_percentile(latencies, 0.90) * 1e6, 1),
+        "p99_us": round(_percentile(latencies, 0.99) * 1e6, 1),
+        "max_us": round(latencies[-1] * 1e6, 1),
+        "peak_kib": round(peak / 1024, 1),
+    }
+
+
+def compare(results: Dict[str, Dict], baseline: Dict[str, Dict], tolerance: float) -> List[str]:
+    """Regressions against a baseline: lower ops/s or higher peak memory"""
+    regressions = []
+    for name, current in results.items():
+        base = baseline.get(name)
+        if not base:
+            continue
+        if current["ops_per_s"] < base["ops_per_s"] * (1 - tolerance):
+            regressions.append(f"{name}: {current['ops_per_s']:.1f} ops/s vs baseline "
+                               f"{base['ops_per_s']:.1f} ({current['ops_per_s'] / base['ops_per_s'] - 1:+.0%})")
+        if current["peak_kib"] > base["peak_kib"] * (1 + tolerance) + 64:
+            regressions.append(f"{name}: peak {current['peak_kib']:.0f} KiB vs baseline "
+                               f"{base['peak_kib']:.0f} KiB")
+    return regressions
+
+
+def main():
+    parser = argparse.ArgumentParser(description='Harness hot path benchmarks')
+    parser.add_argument('--only', help='Comma-separated benchmarks to run (default: all)')
+    parser.add_argument('--quick', action='store_true', help='Run a tenth of the operations')
+    parser.add_argument('--repeat', type=int, default=3, help='Timed passes per benchmark, best counts (default: 3)')
+    parser.add_argument('--tx-capture', help='Raw TX ?printInputs json capture to replay')
+    parser.add_argument('--rx-capture', help='Raw RX ?printreceived json capture to replay')
+    parser.add_argument('--save', metavar='FILE', help='Write results as a JSON baseline')
+    parser.add_argument('--baseline', metavar='FILE', help='Compare against a saved baseline')
+    parser.add_argument('--tolerance', type=float, default=0.25,
+                        help='Allowed ops/s drop or memory growth vs baseline (default: 0.25)')
+    args = parser.parse_args()
+
+    tx_data = open(args.tx_capture, 'rb').read() if args.tx_capture else synthetic_tx(4000)
+    rx_data = open(args.rx_capture, 'rb').read() if args.rx_capture else synthetic_rx(4000)
+    names = args.only.split(',') if args.only else list(BENCHMARKS)
+    unknown = [n for n in names if n not in BENCHMARKS]
+    if unknown:
+        parser.error(f"unknown benchmark(s): {', '.join(unknown)} (choose from {', '.join(BENCHMARKS)})")
+
+    print(f"{'benchmark':18} {'ops/s':>10} {'items/s':>18} {'p50':>9} {'p90':>9} {'p99':>9} {'peak':>9}")
+    results = {}
+    for name in names:
+        setup, ops = BENCHMARKS[name]
+        r = run_benchmark(setup, max(5, ops // 10) if args.quick else ops, tx_data, rx_data,
+                          repeat=max(1, args.repeat))
+        results[name] = r
+        print(f"{name:18} {r['ops_per_s']:>10.1f} {r['items_per_s']:>10.0f} {r['unit']:>7} "
+              f"{r['p50_us']:>7.0f}us {r['p90_us']:>7.0f}us {r['p99_us']:>7.0f}us {r['peak_kib']:>6.0f}KiB")
+
+    if args.save:
+        with open(args.save, 'w') as f:
+            json.dump({"python": platform.python_version(), "machine": platform.machine(),
+                       "created": time.strftime("%Y-%m-%dT%H:%M:%S"), "benchmarks": results}, f, indent=2)
+        print(f"\nBaseline saved to {args.save}")
+
+    if args.baseline:
+        with open(args.baseline) as f:
+            baseline = json.load(f)
+        regressions = compare(results, baseline.get("benchmarks", {}), args.tolerance)
+        if regressions:
+            print(f"\nRegressions beyond {args.tolerance:.0%}:")
+            for line in regressions:
+                print(f"  {line}")
+            sys.exit(1)
+        print(f"\nNo regressions beyond {args.tolerance:.0%} vs {args.baseline}")
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,59 @@
+#!/usr/bin/env python3
+"""
+Benchmark: vectorized link quality scoring over millions of RX samples.
+
+Usage:
+    python benchmarks/bench_link_quality.py [--samples 5000000]
+"""
+
+import argparse
+import os
+import sys
+import time
+
+sys.path.insert(0, os.path.join(os.path.dirname(__file__), '..'))
+
+from bremote import link_quality as lq
+
+
+def main():
+    parser = argparse.ArgumentParser(description='Link quality scoring benchmark')
+    parser.add_argument('--samples', type=int, default=5_000_000, help='Number of RSSI/SNR samples')
+    args = parser.parse_args()
+
+    if not lq.NUMPY_AVAILABLE:
+        print("[SKIP] numpy not installed")
+        return
+
+    import numpy as np
+    rng = np.random.default_rng(0)
+    rssi = rng.uniform(-130.0, -30.0, args.samples)
+    snr = rng.uniform(-20.0, 15.0, args.samples)
+    timestamps = np.arange(args.samples) * 0.1
+
+    start = time.perf_counter()
+    scores = lq.link_quality_array(rssi, snr)
+    vector_s = time.perf_counter() - start
+
+    start = time.perf_counter()
+    summary = lq.summarize_link_quality(timestamps, rssi, snr)
+    summary_s = time.perf_counter() - start
+
+    n_scalar = min(args.samples, 200_000)
+    rssi_list = rssi[:n_scalar].tolist()
+    snr_list = snr[:n_scalar].tolist()
+    start = time.perf_counter()
+    scalar = [lq.link_quality(r, s) for r, s in zip(rssi_list, snr_list)]
+    scalar_s = time.perf_counter() - start
+
+    assert scalar == scores[:n_scalar].tolist()
+
+    print(f"samples:            {args.samples}")
+    print(f"vectorized:         {vector_s * 1000:.1f} ms ({args.samples / vector_s / 1e6:.1f} M samples/s)")
+    print(f"summary (hist+ts):  {summary_s * 1000:.1f} ms")
+    print(f"scalar reference:   {n_scalar / scalar_s / 1e6:.2f} M samples/s")
+    print(f"avg link quality:   {summary['avg_link_quality']}")
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,99 @@
+#!/usr/bin/env python3
+"""
+Benchmark: SQLite results store ingest and `bremote history` query latency.
+
+Fills a database with synthetic runs (one unit report with a full test
+list per run, a link result every tenth run) across a fleet of units,
+then times the history queries. Every query should return in
+milliseconds at 100k runs.
+
+Usage:
+    python benchmarks/bench_store.py [--runs 100000] [--units 500] [--db FILE]
+"""
+
+import argparse
+import os
+import random
+import sys
+import tempfile
+import time
+from datetime import datetime, timedelta
+
+sys.path.insert(0, os.path.join(os.path.dirname(__file__), '..'))
+
+from bremote.models import TestReport
+from bremote.store import ResultsStore
+
+TESTS = ("spiffs", "config_keys", "hall", "toggle", "radio", "state_json", "wifi_toggle", "save")
+
+
+def populate(store: ResultsStore, runs: int, units: int, seed: int = 1):
+    rng = random.Random(seed)
+    start = datetime(2026, 1, 1)
+    for run in range(runs):
+        unit = rng.randrange(units)
+        kind = "tx" if unit % 2 == 0 else "rx"
+        address = f"{unit >> 8:02X}:{unit & 0xFF:02X}:{0xA0 + unit % 16:02X}"
+        report = TestReport(device_type=kind, port=f"/dev/ttyUSB{unit % 16}",
+                            timestamp=(start + timedelta(minutes=run)).isoformat(),
+                            usb_serial=f"SN{unit:06d}", own_address=address,
+                            firmware_version=str(rng.choice((2, 3, 3, 3))))
+        for name in TESTS:
+            result = "FAIL" if rng.random() < 0.02 else "PASS"
+            report.tests[name] = {"result": result, "details": "",
+                                  "stats": {"wall_s": round(rng.uniform(0.05, 2.0), 3)}}
+        report.overall_result = "FAIL" if any(t["result"] == "FAIL" for t in report.tests.values()) else "PASS"
+        links = None
+        if run % 10 == 0:
+            links = {f"{report.port}->/dev/ttyACM0": {
+                "tx_port": report.port, "rx_port": "/dev/ttyACM0", "result": "PASS",
+                "packet_loss_percent": round(rng.uniform(0, 5), 2), "avg_rssi_dbm": rng.uniform(-90, -40),
+                "matched_pairs": rng.randrange(90, 100)}}
+        store.record_run({report.port: report}, links, started=report.timestamp)
+
+
+def timed(label: str, fn, repeat: int = 20):
+    fn()  # warm the page cache
+    samples = []
+    for _ in range(repeat):
+        start = time.perf_counter()
+        rows = fn()
+        samples.append((time.perf_counter() - start) * 1000.0)
+    samples.sort()
+    print(f"  {label:44} {len(rows):>5} rows  median {samples[len(samples) // 2]:7.2f} ms"
+          f"  max {samples[-1]:7.2f} ms")
+
+
+def main():
+    parser = argparse.ArgumentParser(description='Results store benchmark')
+    parser.add_argument('--runs', type=int, default=100000, help='Runs to insert')
+    parser.add_argument('--units', type=int, default=500, help='Distinct units in the fleet')
+    parser.add_argument('--db', help='Database file (default: temporary)')
+    args = parser.parse_args()
+
+    path = args.db or os.path.join(tempfile.mkdtemp(), "bench.db")
+    with ResultsStore(path) as store:
+        start = time.perf_counter()
+        populate(store, args.runs, args.units)
+        elapsed = time.perf_counter() - start
+        print(f"Inserted {args.runs} runs in {elapsed:.1f}s ({args.runs / elapsed:.0f} runs/s, "
+              f"{os.path.getsize(path) / 1e6:.0f} MB)")
+
+        print("Queries:")
+        timed("latest reports", lambda: store.query_reports())
+        timed("failed reports", lambda: store.query_reports(result="FAIL"))
+        timed("port + type", lambda: store.query_reports(port="/dev/ttyUSB3", device_type="tx"))
+        timed("firmware 2 failures", lambda: store.query_reports(firmware="2", result="FAIL"))
+        timed("unit by USB serial", lambda: store.query_reports(device="SN000042"))
+        timed("unit by own_address", lambda: store.query_reports(device="00:2A:AA"))
+        timed("hall failures", lambda: store.query_tests(name="hall", test_result="FAIL"))
+        timed("tests of one unit", lambda: store.query_tests(device="SN000042", limit=200))
+        timed("link history of one port", lambda: store.query_links(port="/dev/ttyUSB3"))
+        timed("link history since date", lambda: store.query_links(since="2026-02-15", limit=200))
+        timed("since date", lambda: store.query_reports(since="2026-02-15", limit=200))
+        timed("summary by firmware (full scan)", lambda: store.summary("firmware_version"), repeat=5)
+        timed("summary by type, failures only", lambda: store.summary("device_type", result="FAIL"))
+
+
+if __name__ == "__main__":
+    main()
@@ -8,11 +8,10 @@ Usage:
     tester = BREmoteTester()
     tester.scan_ports()
     tester.run_all_tests()
-"""
 
-from .models import DeviceType, TestResult, TestReport
-from .device import BREmoteDevice
-from .runner import BREmoteTester
+The public names are loaded on first access, so `python -m bremote`
+subcommands only import the modules they use.
+"""
 
 __version__ = "2.2.4"
 
@@ -23,3 +22,26 @@ __all__ = [
     'BREmoteDevice',
     'BREmoteTester',
 ]
+
+# Public name -> defining submodule
+_LAZY_IMPORTS = {
+    'DeviceType': 'models',
+    'TestResult': 'models',
+    'TestReport': 'models',
+    'BREmoteDevice': 'device',
+    'BREmoteTester': 'runner',
+}
+
+
+def __getattr__(name):
+    module = _LAZY_IMPORTS.get(name)
+    if module is None:
+        raise AttributeError(f"module {__name__!r} has no attribute {name!r}")
+    from importlib import import_module
+    value = getattr(import_module(f".{module}", __name__), name)
+    globals()[name] = value
+    return value
+
+
+def __dir__():
+    return sorted(list(globals()) + __all__)
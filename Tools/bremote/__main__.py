@@ -1,14 +1,15 @@
 """
 BREmote Test Suite - Main Entry Point
 Command-line interface for running tests.
+
+Subcommands and options import what they use only after the arguments
+are parsed: --help, --scan and --port never load the link analysis
+(numpy), the results store (sqlite3) or the other subcommands.
 """
 
 import sys
 import argparse
 import json
-from dataclasses import asdict
-
-from . import BREmoteTester, TestResult
 
 
 def _describe_link_quality(packet_loss: float) -> str:
@@ -30,66 +31,173 @@ def _describe_value_consistency(thr_diff: float, steer_diff: float) -> str:
     return "TX/RX values show significant mismatch"
 
 
+def _print_link_result(pair: str, link: dict):
+    status = link.get('result', 'N/A')
+    packet_loss = float(link.get('packet_loss_percent', 0) or 0)
+    matched_pairs = int(link.get('matched_pairs', 0) or 0)
+    tx_samples = int(link.get('tx_samples', 0) or 0)
+    avg_thr_diff = float(link.get('avg_throttle_diff', 0) or 0)
+    avg_steer_diff = float(link.get('avg_steering_diff', 0) or 0)
+    avg_rssi = link.get('avg_rssi_dbm')
+
+    from .models import TestResult
+
+    print(f"\n[LINK] Pair {pair}")
+    print(f"Result: {status}")
+    if status == TestResult.PASS.value:
+        print("Interpretation: Radio link test passed. TX->RX data path is healthy.")
+    elif status == TestResult.FAIL.value:
+        print("Interpretation: Radio link test failed. Review loss/mismatch details below.")
+
+    print(
+        f"Packet Loss: {packet_loss:.1f}% "
+        f"({_describe_link_quality(packet_loss)})"
+    )
+    print(f"Matched Pairs: {matched_pairs} of {tx_samples} TX samples")
+    print(
+        f"Value Consistency: throttle diff {avg_thr_diff:.2f}, "
+        f"steering diff {avg_steer_diff:.2f} "
+        f"({_describe_value_consistency(avg_thr_diff, avg_steer_diff)})"
+    )
+    if avg_rssi is not None:
+        print(f"Signal: average RSSI {avg_rssi:.1f} dBm")
+    avg_lq = link.get('avg_link_quality')
+    if avg_lq is not None:
+        print(f"Link Quality: average {avg_lq:.1f}/10, minimum {link.get('min_link_quality')}/10")
+        histogram = link.get('link_quality_histogram', [])
+        print("  Histogram: " + " ".join(f"{score}:{count}" for score, count in enumerate(histogram) if count))
+
+    details = link.get('details', '')
+    if details:
+        print(f"Details: {details}")
+
+
+def _list_tests(selector: str = None):
+    from .registry import SelectorError, select_tests
+
+    try:
+        for device_type in ("tx", "rx"):
+            print(f"\n{device_type.upper()}:")
+            for case in select_tests(device_type, selector):
+                print(f"  {case.name:18} {', '.join(case.tags)}")
+    except SelectorError as e:
+        print(f"[ERROR] {e}")
+
+
 def main():
-    parser = argparse.ArgumentParser(description='BREmote V2 Hardware Test Suite')
+    command = sys.argv[1] if len(sys.argv) > 1 else None
+    if command == 'station':
+        from .station import main as station_main
+        station_main(sys.argv[2:])
+        return
+    if command == 'worker':
+        from .farm import worker_main
+        worker_main(sys.argv[2:])
+        return
+    if command == 'farm':
+        from .farm import main as farm_main
+        farm_main(sys.argv[2:])
+        return
+    if command == 'diff':
+        from .diff import main as diff_main
+        diff_main(sys.argv[2:])
+        return
+    if command == 'provision':
+        from .provision import main as provision_main
+        provision_main(sys.argv[2:])
+        return
+    if command == 'history':
+        from .store import main as history_main
+        history_main(sys.argv[2:])
+        return
+
+    parser = argparse.ArgumentParser(description='BREmote V2 Hardware Test Suite',
+                                     epilog='Other modes: python -m bremote station|worker|farm|provision|history|diff --help')
     parser.add_argument('--port', help='Specific COM port to test')
-    parser.add_argument('--test', choices=['all', 'radio', 'display', 'hall', 'analog', 'vesc', 'pwm'],
-                       default='all', help='Test to run')
+    parser.add_argument('--test', metavar='SELECTOR',
+                       help='Tests to run: tag expression such as "hall", "radio and not wifi", '
+                            '"config and not destructive" (tags: tx, rx, radio, config, wifi, '
+                            'destructive, slow, or a test name)')
+    parser.add_argument('--list-tests', action='store_true', help='List registered tests and their tags')
     parser.add_argument('--scan', action='store_true', help='Only scan for devices')
     parser.add_argument('--interactive', '-i', action='store_true', help='Run interactive tests')
     parser.add_argument('--wifi', '-w', action='store_true', help='Run web config / WiFi tests')
     parser.add_argument('--link', '-l', action='store_true', help='Run radio link test (requires TX+RX)')
     parser.add_argument('--duration', '-d', type=float, default=10.0, help='Link test duration in seconds')
+    parser.add_argument('--samples-out', help='Stream raw link samples to file (.csv, .jsonl, .parquet, .arrow)')
+    parser.add_argument('--samples-format', choices=['csv', 'jsonl', 'parquet', 'arrow'],
+                       help='Sample file format (default: from file extension)')
+    parser.add_argument('--jobs', '-j', type=int, default=1,
+                       help='Number of devices to test in parallel (default: 1)')
+    parser.add_argument('--shuffle', action='store_true',
+                       help='Run tests in random order to check they do not depend on each other')
+    parser.add_argument('--seed', type=int, help='Seed for --shuffle (printed in the log and report)')
     parser.add_argument('--report', help='Save report to JSON file')
+    parser.add_argument('--report-stream', metavar='FILE.jsonl',
+                       help='Append each result to a JSON Lines file as soon as it completes')
+    parser.add_argument('--db', help='Append results to a SQLite history database (see "history")')
+    parser.add_argument('--profile', nargs='?', const='profile', metavar='DIR',
+                       help='Profile each phase (scan, suites, link, report); writes .pstats and '
+                            'collapsed-stack files to DIR (default: profile). On Python 3.12+ only '
+                            'phases that ran alone get .pstats (no --jobs); the stacks cover all')
+    parser.add_argument('--trace', metavar='FILE.json',
+                       help='Write a Chrome trace / Perfetto timeline of serial commands, streams and waits')
     parser.add_argument('--verbose', '-v', action='store_true', help='Verbose output')
     
     args = parser.parse_args()
     
-    tester = BREmoteTester()
+    if args.list_tests:
+        _list_tests(args.test)
+        return
+
+    if args.samples_out:
+        from .export import check_format
+        try:
+            check_format(args.samples_out, args.samples_format)
+        except (ValueError, RuntimeError) as e:
+            parser.error(str(e))
+
+    from datetime import datetime
+    from .profiling import get_profiler
+    from .registry import SelectorError
+    from .runner import BREmoteTester
+
+    try:
+        tester = BREmoteTester(jobs=args.jobs, shuffle=args.shuffle, seed=args.seed,
+                               selector=args.test, profiler=get_profiler(args.profile))
+    except SelectorError as e:
+        parser.error(str(e))
+    if args.report_stream:
+        from .reportstream import ReportStreamWriter
+        tester.report_stream = ReportStreamWriter(args.report_stream, selector=args.test)
     
+    if args.trace:
+        from .tracing import tracer
+        tracer.start(args.trace)
+
+    started = datetime.now().isoformat()
+    link_results = {}
     try:
         if args.wifi:
             print("\n[WIFI] Running Web Config / WiFi Tests...")
             tester.run_wifi_tests()
         elif args.link:
-            result = tester.run_integration_test(duration=args.duration)
-            link = result.get('radio_link_test', {})
-            if link:
-                status = link.get('result', 'N/A')
-                packet_loss = float(link.get('packet_loss_percent', 0) or 0)
-                matched_pairs = int(link.get('matched_pairs', 0) or 0)
-                tx_samples = int(link.get('tx_samples', 0) or 0)
-                avg_thr_diff = float(link.get('avg_throttle_diff', 0) or 0)
-                avg_steer_diff = float(link.get('avg_steering_diff', 0) or 0)
-                avg_rssi = link.get('avg_rssi_dbm')
-
-                print(f"Result: {status}")
-                if status == TestResult.PASS.value:
-                    print("Interpretation: Radio link test passed. TX->RX data path is healthy.")
-                elif status == TestResult.FAIL.value:
-                    print("Interpretation: Radio link test failed. Review loss/mismatch details below.")
-
-                print(
-                    f"Packet Loss: {packet_loss:.1f}% "
-                    f"({_describe_link_quality(packet_loss)})"
-                )
-                print(f"Matched Pairs: {matched_pairs} of {tx_samples} TX samples")
-                print(
-                    f"Value Consistency: throttle diff {avg_thr_diff:.2f}, "
-                    f"steering diff {avg_steer_diff:.2f} "
-                    f"({_describe_value_consistency(avg_thr_diff, avg_steer_diff)})"
-                )
-                if avg_rssi is not None:
-                    print(f"Signal: average RSSI {avg_rssi:.1f} dBm")
-
-                details = link.get('details', '')
-                if details:
-                    print(f"Details: {details}")
+            link_results = tester.run_integration_test(
+                duration=args.duration,
+                samples_out=args.samples_out,
+                samples_format=args.samples_format,
+            )
+            for pair, link in link_results.items():
+                _print_link_result(pair, link)
+            if args.report and link_results:
+                with tester.profiler.phase('report'), open(args.report, 'w') as f:
+                    json.dump(link_results, f, indent=2)
+                print(f"\n[SAVE] Report saved to: {args.report}")
         elif args.interactive:
             print("\n[INTERACTIVE] Running Interactive Tests...")
             tester.run_interactive()
         elif args.port:
-            from . import BREmoteDevice
+            from .device import BREmoteDevice
             device = BREmoteDevice(args.port)
             if device.connect():
                 device.identify()
@@ -102,16 +210,38 @@ def main():
         else:
             tester.run_all_tests()
         
-        if args.report and tester.test_results:
-            with open(args.report, 'w') as f:
-                reports = {port: asdict(report) for port, report in tester.test_results.items()}
-                json.dump(reports, f, indent=2)
-            print(f"\n[SAVE] Report saved to: {args.report}")
+        with tester.profiler.phase('report'):
+            if args.report and tester.test_results:
+                from dataclasses import asdict
+                with open(args.report, 'w') as f:
+                    reports = {port: asdict(report) for port, report in tester.test_results.items()}
+                    json.dump(reports, f, indent=2)
+                print(f"\n[SAVE] Report saved to: {args.report}")
+
+            if args.db and (tester.test_results or link_results):
+                from .store import ResultsStore
+                identities = {d.port: dict(d.identity(), device_type=d.device_type.value)
+                              for d in tester.devices}
+                mode = 'link' if args.link else 'wifi' if args.wifi else 'test'
+                with ResultsStore(args.db) as store:
+                    run_id = store.record_run(tester.test_results, link_results, identities,
+                                              mode=mode, selector=args.test, started=started)
+                print(f"[SAVE] Run {run_id} recorded in: {args.db}")
     
     except KeyboardInterrupt:
         print("\n\n[WARN] Interrupted by user")
     finally:
         tester.cleanup()
+        if tester.report_stream is not None:
+            tester.report_stream.close()
+            print(f"[SAVE] {tester.report_stream.records} record(s) streamed to: {args.report_stream}")
+        if args.trace:
+            print(f"[TRACE] {tracer.events} event(s) written to: {tracer.close()}")
+        if tester.profiler.enabled:
+            print(f"[PROFILE] Phase profiles written to: {tester.profiler.write()}")
+            for phase, stats in tester.profiler.summary().items():
+                note = "" if stats["pstats"] else "  (sampled stacks only)"
+                print(f"  {phase:18} {stats['runs']:>5} run(s) {stats['wall_s']:>9.2f}s{note}")
 
 
 if __name__ == "__main__":
@@ -0,0 +1,368 @@
+"""
+BREmote Test Suite - Config Sessions
+Minimal-diff configuration apply for one unit.
+
+    session = ConfigSession(device)
+    result = session.apply({"rf_power": 10, "failsafe_time": 500})
+
+apply() reads the whole config once, merges the desired values, runs the
+firmware's cross-field rules on the result (so clamped fields are known
+and a config the firmware would reject never reaches the unit) and sends
+only the fields that differ, over the cheapest available path:
+
+    blob    ?setconf <Base64> + ?applyconf in one serial round trip; the
+            blob is the stored copy, so no separate ?save is needed
+    batch   one POST /api/set_batch, then one POST /api/save (web API)
+    set     pipelined ?set commands in an order that keeps every step
+            valid, then one ?save
+
+One read-back verifies the running (and, over serial, the stored) config.
+Every phase is timed per path; the result records the path, the changes,
+round trips and timings.
+"""
+
+import json
+import time
+import urllib.error
+import urllib.request
+from dataclasses import asdict, dataclass, field
+from typing import Any, Dict, List, Mapping, Optional, Tuple
+from urllib.parse import urlencode
+
+from .confstruct import (RADIO_REINIT_KEYS, ConfigLayout, ConfStructError, check_value, decode_blob,
+                         find_blob, get_layout, validate_config, validate_cross_field)
+from .device import PIPELINE_WINDOW, BREmoteDevice
+from .tracing import tracer
+
+PATHS = ("auto", "blob", "batch", "set")
+
+# Header of the running values in ?conf output (printConfStruct)
+_VALUES_HEADER = "Configuration Struct Values:"
+
+
+class ConfigError(ValueError):
+    """Desired config that cannot be applied as given"""
+
+
+@dataclass
+class ConfigApplyResult:
+    """Outcome of ConfigSession.apply() for one unit"""
+    port: str
+    path: str = ""
+    ok: bool = False
+    # Fields sent to the unit (desired values plus cross-field clamps)
+    changes: Dict[str, Any] = field(default_factory=dict)
+    # Values of the changed fields before apply()
+    previous: Dict[str, Any] = field(default_factory=dict)
+    # Fields the firmware's cross-field rules changed beyond the request
+    clamped: Dict[str, Any] = field(default_factory=dict)
+    unchanged: int = 0
+    saved: bool = False
+    verified: bool = False
+    # key -> {"expected", "running", "stored"} after the read-back
+    mismatches: Dict[str, Dict[str, Any]] = field(default_factory=dict)
+    reboot_required: bool = False
+    round_trips: int = 0
+    timings_ms: Dict[str, float] = field(default_factory=dict)
+    error: Optional[str] = None
+
+    def to_dict(self) -> Dict[str, Any]:
+        return asdict(self)
+
+
+class ConfigSession:
+    """Snapshot, diff and apply the config of one unit.
+
+    device must be connected and identified. web_api is the base URL of
+    the unit's web config API (http://192.168.4.1 on its AP); without it
+    only the serial paths are used.
+    """
+
+    def __init__(self, device: BREmoteDevice, web_api: Optional[str] = None, timeout: float = 3.0):
+        self.device = device
+        self.web_api = web_api.rstrip("/") if web_api else None
+        self.timeout = timeout
+        self.layout: Optional[ConfigLayout] = None
+        self.values: Optional[Dict[str, Any]] = None
+        # Decoded SPIFFS blob of the last serial snapshot (None over HTTP)
+        self.stored: Optional[Dict[str, Any]] = None
+        self.round_trips = 0
+
+    @property
+    def device_type(self) -> str:
+        return self.device.device_type.value
+
+    # ----- read -----
+
+    def snapshot(self, via: str = "serial") -> Dict[str, Any]:
+        """Read the whole running config in one round trip ("serial" or "http")"""
+        if via == "http":
+            return self._snapshot_http()
+        return self._snapshot_serial()
+
+    def _snapshot_serial(self) -> Dict[str, Any]:
+        # ?conf prints the stored blob and the running values
+        response = self.device.send_command("?conf", wait_for_response=True, timeout=self.timeout)
+        self.round_trips += 1
+        blob = find_blob(response)
+        self.stored = None
+        layout = None
+        if blob:
+            try:
+                layout, self.stored = decode_blob(self.device_type, blob)
+            except ConfStructError:
+                pass
+        if layout is None or self.stored.get("version") != self._firmware_version(layout):
+            # No (usable) blob, or stored for another struct version
+            self.stored = None
+            layout = get_layout(self.device_type, self._firmware_version(layout))
+        running = _parse_values(response)
+        if not running and self.stored is None:
+            raise ConfigError(f"{self.device.port}: no config in ?conf output")
+        # Start from the exact stored values; take a running value where
+        # it differs at print precision (set but not saved)
+        values = dict(self.stored or layout.defaults)
+        for key, text in running.items():
+            if key in layout.by_key and not _same(layout, key, values[key], text):
+                values[key] = layout.parse_value(key, text)
+        self.layout, self.values = layout, values
+        return dict(values)
+
+    def _snapshot_http(self) -> Dict[str, Any]:
+        data = self._http("GET", "/api/config")["data"]
+        layout = get_layout(self.device_type, int(data.get("version", self._firmware_version(None))))
+        values = dict(layout.defaults)
+        values.update({key: layout.parse_value(key, value) for key, value in data.items()
+                       if key in layout.by_key})
+        self.layout, self.values, self.stored = layout, values, None
+        return dict(values)
+
+    def _firmware_version(self, layout: Optional[ConfigLayout]) -> int:
+        if self.device.firmware_version and self.device.firmware_version.isdigit():
+            return int(self.device.firmware_version)
+        if layout is not None:
+            return layout.version
+        raise ConfigError(f"{self.device.port}: unknown firmware version (identify() first)")
+
+    # ----- plan -----
+
+    def plan(self, desired: Mapping[str, Any]) -> Tuple[Dict[str, Any], Dict[str, Any]]:
+        """(changes, clamped) that turn the snapshot into desired.
+
+        Raises ConfigError for unknown or read-only keys, values that do
+        not parse or are outside the firmware's field ranges (kCfgFields),
+        and configs the firmware's cross-field rules reject.
+        """
+        layout = self.layout
+        merged = dict(self.values)
+        for key, value in desired.items():
+            if key not in layout.by_key:
+                raise ConfigError(f"unknown {self.device_type} v{layout.version} config key: {key}")
+            try:
+                merged[key] = layout.parse_value(key, value)
+            except ConfStructError as e:
+                raise ConfigError(str(e)) from None
+            if key == "version" and merged[key] != self.values[key]:
+                raise ConfigError("version is read-only")
+            err = check_value(layout, key, merged[key])
+            if err:
+                raise ConfigError(f"rejected by firmware field checks: {err}")
+        final, err = validate_cross_field(self.device_type, merged)
+        if err:
+            raise ConfigError(f"rejected by firmware cross-field rules: {err}")
+        changes = {key: final[key] for key in layout.keys if not _same(layout, key, final[key], self.values[key])}
+        clamped = {key: value for key, value in changes.items()
+                   if key not in desired or not _same(layout, key, value, merged[key])}
+        return changes, clamped
+
+    def set_order(self, changes: Mapping[str, Any]) -> List[str]:
+        """Order of ?set commands that keeps every intermediate config valid.
+
+        The firmware checks cross-field rules after each ?set (e.g. raising
+        pwm0_min above the current pwm0_max fails unless pwm0_max goes
+        first).
+        """
+        state = dict(self.values)
+        pending = list(changes)
+        order = []
+        while pending:
+            for key in pending:
+                staged, err = validate_cross_field(self.device_type, dict(state, **{key: changes[key]}))
+                if err is None:
+                    break
+            else:
+                raise ConfigError(f"no ?set order keeps {', '.join(pending)} valid; use the blob or batch path")
+            state = staged
+            pending.remove(key)
+            order.append(key)
+        return order
+
+    def choose_path(self, expected: Mapping[str, Any]) -> str:
+        """Cheapest path: blob if the stored struct matches the firmware and
+        the whole expected config passes validateConfig(), else batch, else set"""
+        if self.stored is not None and validate_config(self.layout, expected) is None:
+            return "blob"
+        if self.web_api:
+            return "batch"
+        return "set"
+
+    # ----- apply -----
+
+    def apply(self, desired: Mapping[str, Any], path: str = "auto", verify: bool = True) -> ConfigApplyResult:
+        """Apply desired with the minimal diff, save once and verify"""
+        if path not in PATHS:
+            raise ValueError(f"unknown path {path!r} (choose from {', '.join(PATHS)})")
+        result = ConfigApplyResult(port=self.device.port)
+        self.round_trips = 0
+        started = time.perf_counter()
+        with tracer.span("config apply", self.device.port, "config") as trace_args:
+            try:
+                self._apply(desired, path, verify, result)
+            except (ConfigError, ConfStructError, OSError) as e:
+                result.error = str(e)
+            result.ok = result.error is None and (result.verified or not verify)
+            result.round_trips = self.round_trips
+            result.timings_ms["total"] = _ms(started)
+            trace_args.update(path=result.path, changes=len(result.changes), ok=result.ok)
+        return result
+
+    def _apply(self, desired: Mapping[str, Any], path: str, verify: bool, result: ConfigApplyResult):
+        phase = time.perf_counter()
+        self.snapshot("http" if path == "batch" else "serial")
+        result.timings_ms["snapshot"] = _ms(phase)
+
+        changes, clamped = self.plan(desired)
+        result.changes, result.clamped = changes, clamped
+        result.previous = {key: self.values[key] for key in changes}
+        result.unchanged = len(self.layout.keys) - len(changes)
+        result.reboot_required = any(key in RADIO_REINIT_KEYS for key in changes)
+        expected = dict(self.values, **changes)
+        result.path = self.choose_path(expected) if path == "auto" else path
+        if not changes:
+            result.path = "none"
+            result.saved = result.verified = True
+            return
+        if result.path == "blob":
+            # ?applyconf copies the blob into the running config before it
+            # validates it, and ?setconf has already stored it
+            if self.stored is None:
+                raise ConfigError("blob path needs the stored config of the firmware's struct version")
+            err = validate_config(self.layout, expected)
+            if err:
+                raise ConfigError(f"blob path refused, config fails firmware validation: {err}")
+        phase = time.perf_counter()
+        getattr(self, f"_apply_{result.path}")(changes, expected, result)
+        result.timings_ms["apply"] = _ms(phase)
+        if "save" in result.timings_ms:
+            result.timings_ms["apply"] -= result.timings_ms["save"]
+
+        if verify:
+            phase = time.perf_counter()
+            self.snapshot("http" if result.path == "batch" else "serial")
+            result.timings_ms["verify"] = _ms(phase)
+            result.mismatches = self._mismatches(expected)
+            result.verified = not result.mismatches
+            if result.mismatches:
+                result.error = f"read-back mismatch: {', '.join(result.mismatches)}"
+
+    def _apply_blob(self, changes: Dict[str, Any], expected: Dict[str, Any], result: ConfigApplyResult):
+        # The blob is the saved copy: ?applyconf loads it into the running config
+        self.device.config_layout = self.layout
+        if not self.device.write_config(expected, apply=True, timeout=self.timeout):
+            raise ConfigError("?setconf / ?applyconf failed")
+        self.round_trips += 1
+        result.saved = True
+
+    def _apply_batch(self, changes: Dict[str, Any], expected: Dict[str, Any], result: ConfigApplyResult):
+        payload = {key: _json_value(self.layout, key, value) for key, value in changes.items()}
+        self._http("POST", "/api/set_batch", {"payload": json.dumps(payload, separators=(",", ":"))})
+        phase = time.perf_counter()
+        self._http("POST", "/api/save", {})
+        result.timings_ms["save"] = _ms(phase)
+        result.saved = True
+
+    def _apply_set(self, changes: Dict[str, Any], expected: Dict[str, Any], result: ConfigApplyResult):
+        order = self.set_order(changes)
+        commands = [f"?set {key} {self.layout.format_value(key, changes[key])}" for key in order]
+        replies = self.device.send_pipelined(commands, lambda line: line.startswith(("OK ", "ERR")),
+                                             timeout=self.timeout)
+        self.round_trips += -(-len(commands) // PIPELINE_WINDOW)
+        failed = [f"{key}: {reply or 'no reply'}" for key, reply in zip(order, replies)
+                  if not reply or not reply.startswith("OK ")]
+        if failed:
+            # Nothing is saved: the unit keeps its stored config after a reboot
+            raise ConfigError(f"?set failed ({'; '.join(failed)})")
+        phase = time.perf_counter()
+        response = self.device.send_command("?save", wait_for_response=True, timeout=self.timeout)
+        self.round_trips += 1
+        result.timings_ms["save"] = _ms(phase)
+        if "OK config saved" not in response:
+            raise ConfigError(f"?save failed: {response[:120]}")
+        result.saved = True
+
+    def _mismatches(self, expected: Dict[str, Any]) -> Dict[str, Dict[str, Any]]:
+        mismatches = {}
+        for key, value in expected.items():
+            running = self.values.get(key)
+            stored = self.stored.get(key) if self.stored is not None else running
+            if not (_same(self.layout, key, running, value) and _same(self.layout, key, stored, value)):
+                mismatches[key] = {"expected": value, "running": running, "stored": stored}
+        return mismatches
+
+    # ----- web API -----
+
+    def _http(self, method: str, path: str, params: Optional[Dict[str, str]] = None) -> Dict[str, Any]:
+        if not self.web_api:
+            raise ConfigError("no web API URL for this unit")
+        data = urlencode(params).encode("utf-8") if params is not None else None
+        request = urllib.request.Request(self.web_api + path, data=data, method=method)
+        with tracer.span(f"{method} {path}", self.device.port, "http") as trace_args:
+            try:
+                with urllib.request.urlopen(request, timeout=self.timeout) as response:
+                    status, body = response.status, response.read()
+            except urllib.error.HTTPError as e:
+                status, body = e.code, e.read()
+            trace_args["status"] = status
+        self.round_trips += 1
+        try:
+            payload = json.loads(body)
+        except ValueError:
+            payload = {}
+        if status != 200 or not payload.get("ok"):
+            raise ConfigError(f"{method} {path}: {payload.get('err') or f'HTTP {status}'}")
+        return payload
+
+
+def _parse_values(response: str) -> Dict[str, str]:
+    """key: value lines of printConfStruct in ?conf output"""
+    values = {}
+    lines = iter(response.splitlines())
+    for line in lines:
+        if line.strip() == _VALUES_HEADER:
+            break
+    for line in lines:
+        key, sep, value = line.strip().partition(": ")
+        if not sep:
+            break
+        values[key] = value
+    return values
+
+
+def _same(layout: ConfigLayout, key: str, a: Any, b: Any) -> bool:
+    """Equal as the firmware prints them (floats at ?get precision)"""
+    if a is None or b is None:
+        return a is b
+    try:
+        return layout.format_value(key, layout.parse_value(key, a)) == \
+            layout.format_value(key, layout.parse_value(key, b))
+    except ConfStructError:
+        return False
+
+
+def _json_value(layout: ConfigLayout, key: str, value: Any) -> Any:
+    text = layout.format_value(key, value)
+    return text if isinstance(value, str) else json.loads(text)
+
+
+def _ms(start: float) -> float:
+    return round((time.perf_counter() - start) * 1000.0, 1)
@@ -0,0 +1,457 @@
+"""
+BREmote Test Suite - Config Struct Codec
+Binary confStruct layouts for the ?conf / ?setconf Base64 blob.
+
+The firmware stores usrConf in SPIFFS as the Base64 of the raw struct
+(ESP32 GCC, little endian, natural alignment). ?conf prints it as
+"Encoded Data Read: <Base64>", ?setconf <Base64> writes it to SPIFFS and
+?applyconf loads it into the running config, so a whole configuration
+moves in one serial round trip instead of one ?get / ?set per field.
+
+Layouts follow Tools/config_converter.html (computeLayout) for TX and RX
+versions 1-3; each compiles to a struct.Struct once at import. Values are
+keyed by the ?get / ?set key names (RX PWM0_min is pwm0_min), addresses
+are "AA:BB:CC" strings and char[8] fields are str, as ?get prints them.
+
+    layout = get_layout("tx", 3)
+    values = layout.decode_b64(blob)
+    blob = layout.encode_b64(dict(values, rf_power=10))
+"""
+
+import base64
+import binascii
+import re
+import struct
+from dataclasses import dataclass
+from typing import Any, Dict, List, Mapping, Optional, Sequence, Tuple
+
+# Field types
+U16 = "u16"
+I16 = "i16"
+FLOAT = "float"
+ADDR3 = "u8_3"      # uint8_t[3]
+STR8 = "str8"       # char[8], no null terminator
+
+# type: (struct code, size, alignment)
+_TYPES = {
+    U16: ("H", 2, 2),
+    I16: ("h", 2, 2),
+    FLOAT: ("f", 4, 4),
+    ADDR3: ("3s", 3, 1),
+    STR8: ("8s", 8, 1),
+}
+
+# Stored blob in ?conf / ?applyconf ("Encoded Data Read: ...") and ?save
+# ("Encoded Data: ...") output; ?applyconf prints it mid-line
+_BLOB_RE = re.compile(r"Encoded Data(?: Read)?:\s*([A-Za-z0-9+/]+=*)")
+
+
+class ConfStructError(ValueError):
+    """Blob or value that does not fit a config layout"""
+
+
+@dataclass(frozen=True)
+class ConfField:
+    """One confStruct member; precision is the decimals ?get prints for floats"""
+    key: str
+    type: str
+    default: Any
+    precision: int = 0
+
+
+def _f(key: str, type_: str, default: Any, precision: int = 0) -> ConfField:
+    return ConfField(key, type_, default, precision)
+
+
+class ConfigLayout:
+    """Precompiled confStruct layout of one device type and version"""
+
+    def __init__(self, device_type: str, version: int, fields: Sequence[ConfField]):
+        self.device_type = device_type
+        self.version = version
+        self.fields: Tuple[ConfField, ...] = tuple(fields)
+        self.keys: Tuple[str, ...] = tuple(f.key for f in self.fields)
+        self.by_key: Dict[str, ConfField] = {f.key: f for f in self.fields}
+        self.defaults: Dict[str, Any] = {f.key: f.default for f in self.fields}
+        self.struct = struct.Struct(self._format())
+        self.size = self.struct.size
+        self._addresses = [i for i, f in enumerate(self.fields) if f.type == ADDR3]
+        self._strings = [i for i, f in enumerate(self.fields) if f.type == STR8]
+
+    def __repr__(self) -> str:
+        return f"<ConfigLayout {self.device_type} v{self.version}: {len(self.fields)} fields, {self.size} bytes>"
+
+    def _format(self) -> str:
+        # Explicit pad bytes ('x') reproduce the compiler's natural alignment
+        offset = 0
+        max_align = 1
+        codes = ["<"]
+        for f in self.fields:
+            code, size, align = _TYPES[f.type]
+            max_align = max(max_align, align)
+            pad = (align - offset % align) % align
+            codes.append("x" * pad + code)
+            offset += pad + size
+        codes.append("x" * ((max_align - offset % max_align) % max_align))
+        return "".join(codes)
+
+    # ----- binary -----
+
+    def decode(self, data: bytes) -> Dict[str, Any]:
+        """Field values from a raw struct (extra trailing bytes are ignored)"""
+        if len(data) < self.size:
+            raise ConfStructError(f"{self.device_type} v{self.version} config needs {self.size} bytes, "
+                                  f"got {len(data)}")
+        values = list(self.struct.unpack_from(data))
+        for i in self._addresses:
+            values[i] = "%02X:%02X:%02X" % tuple(values[i])
+        for i in self._strings:
+            values[i] = values[i].split(b"\0", 1)[0].decode("latin-1")
+        return dict(zip(self.keys, values))
+
+    def encode(self, values: Mapping[str, Any], base: Optional[Mapping[str, Any]] = None) -> bytes:
+        """Raw struct from values; missing keys come from base, then the defaults"""
+        fallback = self.defaults if base is None else base
+        packed: List[Any] = []
+        for f in self.fields:
+            value = values.get(f.key)
+            if value is None:
+                value = fallback.get(f.key, f.default)
+            packed.append(_to_struct(f, value))
+        try:
+            return self.struct.pack(*packed)
+        except struct.error as e:
+            raise ConfStructError(f"{self.device_type} v{self.version}: {e}") from None
+
+    # ----- Base64 -----
+
+    def decode_b64(self, text: str) -> Dict[str, Any]:
+        return self.decode(_b64decode(text))
+
+    def encode_b64(self, values: Mapping[str, Any], base: Optional[Mapping[str, Any]] = None) -> str:
+        return base64.b64encode(self.encode(values, base)).decode("ascii")
+
+    # ----- text values (?get / ?set) -----
+
+    def format_value(self, key: str, value: Any) -> str:
+        """Value as the firmware prints it for ?get key"""
+        f = self.by_key[key]
+        if f.type == FLOAT:
+            return f"{float(value):.{f.precision}f}"
+        return str(value)
+
+    def parse_value(self, key: str, text: str) -> Any:
+        """Typed value from a ?get / ?conf json string"""
+        f = self.by_key[key]
+        text = str(text).strip()
+        try:
+            if f.type in (U16, I16):
+                return int(float(text))
+            if f.type == FLOAT:
+                return float(text)
+        except ValueError:
+            raise ConfStructError(f"{key}: not a number: {text!r}") from None
+        if f.type == ADDR3:
+            return text.upper()
+        return text
+
+
+def _to_struct(f: ConfField, value: Any) -> Any:
+    try:
+        if f.type in (U16, I16):
+            return int(value)
+        if f.type == FLOAT:
+            return float(value)
+        if f.type == ADDR3:
+            raw = bytes.fromhex(value.replace(":", "")) if isinstance(value, str) else bytes(value)
+            if len(raw) != 3:
+                raise ValueError("expected 3 bytes")
+            return raw
+        return str(value).encode("latin-1")[:8]
+    except (TypeError, ValueError) as e:
+        raise ConfStructError(f"{f.key}: invalid value {value!r} ({e})") from None
+
+
+def _b64decode(text: str) -> bytes:
+    try:
+        return base64.b64decode(text.strip(), validate=True)
+    except (binascii.Error, ValueError) as e:
+        raise ConfStructError(f"invalid Base64 config: {e}") from None
+
+
+# ===== Layouts (see Tools/config_converter.html) =====
+
+_TX_V1 = [
+    _f("version", U16, 1),
+    _f("radio_preset", U16, 1),
+    _f("rf_power", I16, 0),
+    _f("cal_ok", U16, 0),
+    _f("cal_offset", U16, 100),
+    _f("thr_idle", U16, 0),
+    _f("thr_pull", U16, 0),
+    _f("tog_left", U16, 0),
+    _f("tog_mid", U16, 0),
+    _f("tog_right", U16, 0),
+    _f("tog_deadzone", U16, 500),
+    _f("tog_diff", U16, 30),
+    _f("tog_block_time", U16, 500),
+    _f("trig_unlock_timeout", U16, 5000),
+    _f("lock_waittime", U16, 2000),
+    _f("gear_change_waittime", U16, 100),
+    _f("gear_display_time", U16, 1000),
+    _f("menu_timeout", U16, 10),
+    _f("err_delete_time", U16, 2000),
+    _f("no_lock", U16, 0),
+    _f("no_gear", U16, 0),
+    _f("max_gears", U16, 10),
+    _f("startgear", U16, 0),
+    _f("steer_enabled", U16, 1),
+    _f("thr_expo", U16, 50),
+    _f("thr_expo1", U16, 50),
+    _f("steer_expo", U16, 50),
+    _f("steer_expo1", U16, 50),
+    _f("ubat_cal", FLOAT, 0.000185662, 9),
+    _f("paired", U16, 0),
+    _f("own_address", ADDR3, "00:00:00"),
+    _f("dest_address", ADDR3, "00:00:00"),
+]
+
+_RX_V1 = [
+    _f("version", U16, 1),
+    _f("radio_preset", U16, 1),
+    _f("rf_power", I16, -9),
+    _f("steering_type", U16, 0),
+    _f("steering_influence", U16, 50),
+    _f("steering_inverted", U16, 0),
+    _f("trim", I16, 0),
+    _f("pwm0_min", U16, 1500),
+    _f("pwm0_max", U16, 2000),
+    _f("pwm1_min", U16, 1500),
+    _f("pwm1_max", U16, 2000),
+    _f("failsafe_time", U16, 1000),
+    _f("foil_bat_low", FLOAT, 10.0, 1),
+    _f("foil_bat_high", FLOAT, 60.0, 1),
+    _f("bms_det_active", U16, 0),
+    _f("wet_det_active", U16, 1),
+    _f("data_src", U16, 0),
+    _f("gps_en", U16, 0),
+    _f("ubat_cal", FLOAT, 0.0095554, 9),
+    _f("paired", U16, 0),
+    _f("own_address", ADDR3, "00:00:00"),
+    _f("dest_address", ADDR3, "00:00:00"),
+]
+
+_RX_V2 = [
+    _f("version", U16, 2),
+    _f("radio_preset", U16, 1),
+    _f("rf_power", I16, 0),
+    _f("steering_type", U16, 0),
+    _f("steering_influence", U16, 50),
+    _f("steering_inverted", U16, 0),
+    _f("trim", I16, 0),
+    _f("pwm0_min", U16, 1500),
+    _f("pwm0_max", U16, 2000),
+    _f("pwm1_min", U16, 1500),
+    _f("pwm1_max", U16, 2000),
+    _f("failsafe_time", U16, 1000),
+    _f("foil_num_cells", U16, 10),
+    _f("bms_det_active", U16, 0),
+    _f("wet_det_active", U16, 1),
+    _f("dummy_delete_me", U16, 0),
+    _f("data_src", U16, 0),
+    _f("gps_en", U16, 0),
+    _f("followme_mode", U16, 0),
+    _f("kalman_en", U16, 0),
+    _f("boogie_vmax_in_followme_kmh", FLOAT, 25.0, 1),
+    _f("min_dist_m", FLOAT, 10.0, 1),
+    _f("followme_smoothing_band_m", FLOAT, 10.0, 1),
+    _f("foiler_low_speed_kmh", FLOAT, 5.0, 1),
+    _f("zone_angle_enter_deg", FLOAT, 35.0, 1),
+    _f("zone_angle_exit_deg", FLOAT, 45.0, 1),
+    _f("near_diag_offset_deg", FLOAT, 45.0, 1),
+    _f("ubat_cal", FLOAT, 0.0095554, 9),
+    _f("ubat_offset", FLOAT, 0.0, 4),
+    _f("tx_gps_stale_timeout_ms", U16, 1000),
+    _f("logger_en", U16, 1),
+    _f("paired", U16, 0),
+    _f("own_address", ADDR3, "00:00:00"),
+    _f("dest_address", ADDR3, "00:00:00"),
+]
+
+
+def _derive(base: Sequence[ConfField], version: int, defaults: Optional[Dict[str, Any]] = None,
+            renames: Optional[Dict[str, str]] = None, insert_before: Optional[str] = None,
+            inserted: Sequence[ConfField] = (), appended: Sequence[ConfField] = ()) -> List[ConfField]:
+    """Next struct version: changed defaults, renamed keys, new fields"""
+    defaults = dict(defaults or {}, version=version)
+    renames = renames or {}
+    fields = []
+    for f in base:
+        if f.key == insert_before:
+            fields.extend(inserted)
+        fields.append(ConfField(renames.get(f.key, f.key), f.type, defaults.get(f.key, f.default),
+                                f.precision))
+    return fields + list(appended)
+
+
+_TX_V2 = _derive(_TX_V1, 2, defaults={"thr_expo1": 0, "steer_expo1": 0}, insert_before="paired", inserted=[
+    _f("gps_en", U16, 0),
+    _f("followme_mode", U16, 0),
+    _f("kalman_en", U16, 0),
+    _f("speed_src", U16, 0),
+    _f("tx_gps_stale_timeout_ms", U16, 1000),
+])
+_TX_V3 = _derive(_TX_V2, 3, renames={"no_gear": "throttle_mode"}, appended=[
+    _f("wifi_password", STR8, "12345678"),
+    _f("dynamic_power_start", U16, 85),
+    _f("dynamic_power_step", U16, 5),
+])
+_RX_V3 = _derive(_RX_V2, 3, appended=[
+    _f("wifi_password", STR8, "12345678"),
+])
+
+LAYOUTS: Dict[Tuple[str, int], ConfigLayout] = {
+    (device_type, version): ConfigLayout(device_type, version, fields)
+    for (device_type, version), fields in {
+        ("tx", 1): _TX_V1, ("tx", 2): _TX_V2, ("tx", 3): _TX_V3,
+        ("rx", 1): _RX_V1, ("rx", 2): _RX_V2, ("rx", 3): _RX_V3,
+    }.items()
+}
+
+# Struct version of the firmware in Source/ (SW_VERSION)
+CURRENT_VERSION = 3
+
+
+def get_layout(device_type: str, version: int) -> ConfigLayout:
+    """Layout for "tx"/"rx" and a struct version"""
+    layout = LAYOUTS.get((device_type, int(version)))
+    if layout is None:
+        known = ", ".join(f"{d} v{v}" for d, v in LAYOUTS)
+        raise ConfStructError(f"no config layout for {device_type} v{version} (known: {known})")
+    return layout
+
+
+def blob_version(data: bytes) -> int:
+    """Struct version stored in the first field of a raw config"""
+    if len(data) < 2:
+        raise ConfStructError("config blob too short")
+    return struct.unpack_from("<H", data)[0]
+
+
+def decode_blob(device_type: str, text: str) -> Tuple[ConfigLayout, Dict[str, Any]]:
+    """Decode a Base64 blob with the layout of the version it carries"""
+    data = _b64decode(text)
+    layout = get_layout(device_type, blob_version(data))
+    return layout, layout.decode(data)
+
+
+# Keys that need a reboot to take effect (radioReinitRequired in kCfgFields)
+RADIO_REINIT_KEYS = ("radio_preset", "rf_power")
+
+# (min, max) of the fields with hasRange in kCfgFields (ConfigService.ino of
+# each side). version must equal SW_VERSION; addresses and wifi_password
+# have no range.
+_U16_FULL = (0, 65535)
+FIELD_RANGES: Dict[str, Dict[str, Tuple[float, float]]] = {
+    "tx": {
+        "radio_preset": (1, 3), "rf_power": (-9, 22), "max_gears": (1, 10), "startgear": (0, 9),
+        "no_lock": (0, 1), "throttle_mode": (0, 2), "steer_enabled": (0, 1),
+        "dynamic_power_start": (10, 100), "dynamic_power_step": (1, 25), "thr_expo": (0, 100),
+        "tog_deadzone": (100, 3000), "tog_diff": (1, 200), "tog_block_time": (0, 5000),
+        "menu_timeout": (0, 1000), "cal_ok": (0, 1), "cal_offset": _U16_FULL, "thr_idle": _U16_FULL,
+        "thr_pull": _U16_FULL, "tog_left": _U16_FULL, "tog_mid": _U16_FULL, "tog_right": _U16_FULL,
+        "trig_unlock_timeout": _U16_FULL, "lock_waittime": _U16_FULL,
+        "gear_change_waittime": _U16_FULL, "gear_display_time": _U16_FULL,
+        "err_delete_time": _U16_FULL, "thr_expo1": _U16_FULL, "steer_expo": _U16_FULL,
+        "steer_expo1": _U16_FULL, "ubat_cal": (0.000001, 1.0), "gps_en": (0, 1),
+        "followme_mode": (0, 3), "kalman_en": (0, 1), "speed_src": (0, 3),
+        "tx_gps_stale_timeout_ms": _U16_FULL, "paired": (0, 1),
+    },
+    "rx": {
+        "radio_preset": (1, 3), "rf_power": (-9, 22), "steering_type": (0, 2),
+        "steering_influence": (0, 100), "steering_inverted": (0, 1), "trim": (-500, 500),
+        "pwm0_min": (500, 2500), "pwm0_max": (500, 2500), "pwm1_min": (500, 2500),
+        "pwm1_max": (500, 2500), "failsafe_time": (100, 10000), "foil_num_cells": (1, 50),
+        "bms_det_active": (0, 1), "wet_det_active": (0, 1), "dummy_delete_me": _U16_FULL,
+        "data_src": (0, 2), "gps_en": (0, 1), "followme_mode": (0, 3), "kalman_en": (0, 1),
+        "boogie_vmax_in_followme_kmh": (0.0, 100.0), "min_dist_m": (0.0, 1000.0),
+        "followme_smoothing_band_m": (0.0, 1000.0), "foiler_low_speed_kmh": (0.0, 100.0),
+        "zone_angle_enter_deg": (0.0, 180.0), "zone_angle_exit_deg": (0.0, 180.0),
+        "near_diag_offset_deg": (0.0, 180.0), "ubat_cal": (0.000001, 1.0),
+        "ubat_offset": (-100.0, 100.0), "tx_gps_stale_timeout_ms": _U16_FULL,
+        "logger_en": (0, 1), "paired": (0, 1),
+    },
+}
+
+_TYPE_LIMITS = {U16: (0, 65535), I16: (-32768, 32767)}
+
+
+def check_value(layout: ConfigLayout, key: str, value: Any) -> Optional[str]:
+    """Firmware cfgApplyFieldValue() checks for ?set key value: error or None"""
+    f = layout.by_key[key]
+    if f.type == STR8:
+        text = str(value).strip()
+        if len(text) != 8 or any(not " " <= c <= "~" for c in text):
+            return f"ERR_BAD_VALUE:{key}"
+        return None
+    if f.type == ADDR3:
+        try:
+            _to_struct(f, value)
+        except ConfStructError:
+            return f"ERR_BAD_VALUE:{key}"
+        return None
+    if key == "version":
+        return None if value == layout.version else f"ERR_RANGE:{key}"
+    low, high = _TYPE_LIMITS.get(f.type, (float("-inf"), float("inf")))
+    if value != value or not low <= value <= high:
+        return f"ERR_RANGE:{key}"
+    low, high = FIELD_RANGES.get(layout.device_type, {}).get(key, (low, high))
+    if not low <= value <= high:
+        return f"ERR_RANGE:{key}"
+    return None
+
+
+def validate_config(layout: ConfigLayout, values: Mapping[str, Any]) -> Optional[str]:
+    """Firmware validateConfig() on a whole config (?save, ?applyconf): error or None"""
+    for key, (low, high) in FIELD_RANGES.get(layout.device_type, {}).items():
+        if key not in layout.by_key:
+            continue
+        value = values.get(key, layout.by_key[key].default)
+        if value != value or value in (float("inf"), float("-inf")):
+            return f"ERR_NAN:{key}"
+        if not low <= value <= high:
+            return f"ERR_RANGE:{key} ({layout.format_value(key, value)} not in {low}-{high})"
+    return None
+
+
+def validate_cross_field(device_type: str, values: Mapping[str, Any]) -> Tuple[Dict[str, Any], Optional[str]]:
+    """Firmware cfgValidateCrossField() on a config: (clamped values, error or None).
+
+    Mirrors ConfigService.ino of each side. ?set, /api/set_batch, ?save
+    and ?applyconf reject a config that fails it; the TX clamps some
+    fields instead, so the returned values are what the unit will hold.
+    """
+    values = dict(values)
+    if device_type == "tx":
+        max_gears = int(values.get("max_gears", 10))
+        if not 1 <= max_gears <= 10:
+            return values, "ERR_RANGE:max_gears"
+        if int(values.get("startgear", 0)) >= max_gears:
+            values["startgear"] = max_gears - 1
+        if values.get("throttle_mode") == 2 and int(values.get("dynamic_power_start", 85)) < 10:
+            values["dynamic_power_start"] = 10
+        if "dynamic_power_step" in values:
+            values["dynamic_power_step"] = min(25, max(1, int(values["dynamic_power_step"])))
+    elif device_type == "rx":
+        for pwm in ("pwm0", "pwm1"):
+            if int(values.get(f"{pwm}_max", 2000)) <= int(values.get(f"{pwm}_min", 1500)):
+                return values, f"ERR_CROSS:{pwm.upper()}_max must be > {pwm.upper()}_min"
+        if not 100 <= int(values.get("failsafe_time", 1000)) <= 10000:
+            return values, "ERR_CROSS:failsafe_time out of range (100-10000)"
+    return values, None
+
+
+def find_blob(response: str) -> Optional[str]:
+    """Last Base64 blob printed in a ?conf / ?applyconf / ?save response, if any"""
+    blobs = _BLOB_RE.findall(response)
+    return blobs[-1] if blobs else None
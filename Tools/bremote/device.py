@@ -8,15 +8,68 @@ import serial.tools.list_ports
 import time
 import json
 import logging
-from typing import Optional, Dict, Any, List
+import re
+from typing import Optional, Dict, Any, List, Callable, Tuple
 
+from .confstruct import ConfigLayout, ConfStructError, decode_blob, find_blob, get_layout
 from .models import DeviceType
+from .metrics import CommandMetrics
+from .tracing import tracer
 
 logger = logging.getLogger(__name__)
 
+# Commands that can change what ?state json reports. Sending any of them
+# drops the cached state snapshot (?set also covers ?setconf).
+STATE_MUTATING_COMMANDS = ("?set", "?radio", "?display", "?hall", "?all",
+                           "?save", "?reboot", "?applyconf", "?exitchg")
+STATE_MUTATING_EXACT = ("?wifi on", "?wifi off")
+
+# ?state json fields that mirror usrConf; get_config_value() answers these
+# from the cached snapshot, formatted like ?get prints them
+STATE_CONFIG_KEYS = ("paired", "throttle_mode", "max_gears")
+
+# Serial I/O counters kept per device (see io_snapshot)
+IO_COUNTERS = ("commands", "bytes_out", "bytes_in", "read_blocked_s", "sleep_s", "retries",
+               "wait_s", "sleep_avoided_s")
+
+# Commands written back to back by send_pipelined() before reading replies
+# (keeps a window well inside the 256-byte UART receive buffer)
+PIPELINE_WINDOW = 8
+
+# Output silence that marks a stopped ?print* loop (slowest loop is 10Hz)
+STREAM_QUIET_PERIOD = 0.2
+
+# Output silence that ends a command response in send_command()
+RESPONSE_QUIET_GAP = 0.1
+
+# Opening the port can reset the ESP32: boot output starts within
+# BOOT_OUTPUT_START (the old fixed settle time) and ends with this silence
+BOOT_OUTPUT_START = 0.5
+BOOT_QUIET_PERIOD = 0.1
+
+# Last line of ?setconf (serSetConf) and of ?applyconf (readConfFromSPIFFS),
+# success or failure; the SPIFFS write can outlast RESPONSE_QUIET_GAP
+SETCONF_END_MARKERS = ("Struct saved to SPIFFS", "Failed to open temp file")
+APPLYCONF_END_MARKERS = ("Struct successfully read from SPIFFS", "validation failed",
+                         "Failed to open file", "File does not exist", "Base64 decoding failed",
+                         "Config data too short")
+
+# Firmware version line and device label of the ?conf banner
+_SW_VERSION_RE = re.compile(r"SW Version:\s*([^\s*]+)")
+_DEVICE_LABEL_RE = re.compile(r"BREmote V2 (TX|RX)")
+
+
+def is_serial_url(port: str) -> bool:
+    """Whether port is a pyserial URL (rfc2217://host:port, socket://host:port, ...)"""
+    return "://" in port
+
 
 class BREmoteDevice:
-    """Represents a BREmote TX or RX device connected via serial"""
+    """Represents a BREmote TX or RX device connected via serial.
+
+    port is a local port name (COM3, /dev/ttyUSB0) or a pyserial URL such
+    as rfc2217://host:port or socket://host:port.
+    """
     
     def __init__(self, port: str, baudrate: int = 115200, timeout: float = 1.0):
         self.port = port
@@ -26,34 +79,54 @@ class BREmoteDevice:
         self.device_type = DeviceType.UNKNOWN
         self.identified = False
         self.response_buffer = ""
+        self._state_cache: Optional[Dict[str, Any]] = None
+        self.state_cache_hits = 0
+        self.state_cache_misses = 0
+        self.state_cache_invalidations = 0
+        self.io: Dict[str, float] = dict.fromkeys(IO_COUNTERS, 0)
+        self.command_metrics = CommandMetrics()
+        self.response_quiet_gap = RESPONSE_QUIET_GAP
+        # Unit identity (see identity())
+        self.firmware_version: Optional[str] = None
+        self.usb_serial: Optional[str] = None
+        self.own_address: Optional[str] = None
+        # confStruct layout of the last config blob read (see read_config())
+        self.config_layout: Optional[ConfigLayout] = None
+        # (command, trace clock) of a ?print* stream started while tracing
+        self._stream_trace: Optional[Tuple[str, float]] = None
         
     def __str__(self) -> str:
         return f"BREmoteDevice({self.port}, {self.device_type.value})"
     
+    def _open_serial(self):
+        settings = dict(
+            baudrate=self.baudrate,
+            timeout=self.timeout,
+            bytesize=serial.EIGHTBITS,
+            parity=serial.PARITY_NONE,
+            stopbits=serial.STOPBITS_ONE
+        )
+        if is_serial_url(self.port):
+            return serial.serial_for_url(self.port, **settings)
+        return serial.Serial(port=self.port, **settings)
+
     def connect(self) -> bool:
-        """Connect to device on serial port"""
+        """Connect to device on serial port or URL"""
         try:
-            self.serial = serial.Serial(
-                port=self.port,
-                baudrate=self.baudrate,
-                timeout=self.timeout,
-                bytesize=serial.EIGHTBITS,
-                parity=serial.PARITY_NONE,
-                stopbits=serial.STOPBITS_ONE
-            )
-            # Give device time to initialize
-            time.sleep(0.5)
+            self.serial = self._open_serial()
+            # Give device time to initialize (boot output has stopped)
+            self.settle()
             # Flush any stale data
-            if self.serial.in_waiting:
-                self.serial.read(self.serial.in_waiting)
+            self.flush()
             logger.info(f"Connected to {self.port}")
             return True
-        except serial.SerialException as e:
+        except (serial.SerialException, OSError, ValueError) as e:
             logger.error(f"Failed to connect to {self.port}: {e}")
             return False
     
     def disconnect(self):
         """Disconnect from device"""
+        self._state_cache = None
         if self.serial and self.serial.is_open:
             self.serial.close()
             logger.info(f"Disconnected from {self.port}")
@@ -69,23 +142,31 @@ class BREmoteDevice:
         
         # First, stop any continuous output and flush - do it twice for reliability
         self.stop_continuous_output()
-        time.sleep(0.5)
+        self.wait_until(self.quiet(), timeout=0.5, replaces=0.5)
         self.stop_continuous_output()
-        time.sleep(0.3)
+        self.wait_until(self.quiet(), timeout=0.3, replaces=0.3)
         self.flush()
         
         # Use ?conf - it returns "BREmote V2 RX" or "BREmote V2 TX" which is definitive
         # Try up to 2 times if we get garbled response
         for attempt in range(2):
+            if attempt:
+                self.io["retries"] += 1
             response = self.send_command("?conf", wait_for_response=True, timeout=2.0)
             
             if response and "BREmote V2" in response:
-                if "RX" in response:
+                version = _SW_VERSION_RE.search(response)
+                if version:
+                    self.firmware_version = version.group(1)
+                # Match the banner only: the config blob below it may contain "RX"
+                label = _DEVICE_LABEL_RE.search(response)
+                label = label.group(1) if label else response
+                if "RX" in label:
                     self.device_type = DeviceType.RECEIVER
                     logger.info(f"Identified {self.port} as RX")
                     self.identified = True
                     return self.device_type
-                elif "TX" in response:
+                elif "TX" in label:
                     self.device_type = DeviceType.TRANSMITTER
                     logger.info(f"Identified {self.port} as TX")
                     self.identified = True
@@ -93,7 +174,7 @@ class BREmoteDevice:
             
             if attempt == 0:
                 self.stop_continuous_output()
-                time.sleep(0.5)
+                self.wait_until(self.quiet(), timeout=0.5, replaces=0.5)
                 self.flush()
         
         self.identified = True
@@ -102,51 +183,221 @@ class BREmoteDevice:
     def send_command(self, command: str, wait_for_response: bool = True, 
                     timeout: float = 2.0) -> str:
         """Send command and optionally wait for response"""
+        if not tracer.enabled:
+            return self._send_command(command, wait_for_response, timeout)
+
+        name = command.strip() if command.startswith("?") else f"?{command.strip()}"
+        if name.lower().startswith("?print") and not wait_for_response:
+            # Stream start; the stream itself is traced when it is stopped
+            self._stream_trace = (name, tracer.clock())
+        with tracer.span(name, self.port, "serial") as args:
+            response = self._send_command(command, wait_for_response, timeout)
+            if wait_for_response:
+                args["response_bytes"] = len(response)
+        return response
+
+    def _send_command(self, command: str, wait_for_response: bool, timeout: float) -> str:
         if not self.is_connected():
             return ""
         
         # Send command
         full_command = f"?{command}\n" if not command.startswith("?") else f"{command}\n"
-        self.serial.write(full_command.encode('utf-8'))
+        if self._state_cache is not None and self._is_state_mutating(full_command):
+            self.invalidate_state()
+        self.io["commands"] += 1
+        self._write(full_command.encode('utf-8'))
         
         if not wait_for_response:
+            self.command_metrics.record(full_command)
             return ""
         
         # Wait for response
         start_time = time.time()
         response = ""
         last_data_time = time.time()
+        first_byte_time = None
+        timed_out = True
         
         while time.time() - start_time < timeout:
             if self.serial.in_waiting:
-                data = self.serial.read(self.serial.in_waiting)
+                data = self._read(self.serial.in_waiting)
                 response += data.decode('utf-8', errors='ignore')
                 last_data_time = time.time()
+                if first_byte_time is None:
+                    first_byte_time = last_data_time
             else:
                 # Wait a bit more after last data to allow response to complete
-                if response and (time.time() - last_data_time) > 0.1:
+                if response and (time.time() - last_data_time) > self.response_quiet_gap:
+                    timed_out = False
                     break
                 time.sleep(0.01)
         
-        return response.strip()
+        self.io["read_blocked_s"] += time.time() - start_time
+        response = response.strip()
+        latency_ms = (first_byte_time - start_time) * 1000.0 if first_byte_time else None
+        self.command_metrics.record(full_command, latency_ms, timed_out=timed_out, empty=not response)
+        return response
     
+    def send_pipelined(self, commands: List[str], is_reply: Callable[[str], bool],
+                       window: int = PIPELINE_WINDOW, timeout: float = 2.0) -> List[Optional[str]]:
+        """Send commands without waiting for each response.
+
+        Up to window commands go out in one write; then one reply line per
+        command is collected (is_reply picks them from other output, such
+        as NOTE lines). Returns the reply of each command in order, None
+        where none arrived within timeout.
+        """
+        replies: List[Optional[str]] = []
+        if not self.is_connected():
+            return [None] * len(commands)
+        with tracer.span("pipeline", self.port, "serial", commands=len(commands)):
+            for i in range(0, len(commands), max(1, window)):
+                chunk = [c if c.startswith("?") else f"?{c}" for c in commands[i:i + max(1, window)]]
+                if self._state_cache is not None and any(self._is_state_mutating(c) for c in chunk):
+                    self.invalidate_state()
+                self.io["commands"] += len(chunk)
+                self._write("".join(f"{c}\n" for c in chunk).encode('utf-8'))
+                for command in chunk:
+                    self.command_metrics.record(f"{command}\n")
+                got: List[str] = []
+                deadline = time.time() + timeout
+                while len(got) < len(chunk) and time.time() < deadline:
+                    line = self.read_line(timeout=deadline - time.time())
+                    if line and is_reply(line):
+                        got.append(line)
+                replies.extend(got + [None] * (len(chunk) - len(got)))
+        return replies
+
     def stop_continuous_output(self):
         """Stop any continuous output commands (like ?printInputs)"""
         if not self.is_connected():
             return
         
-        # Send quit command
-        self.serial.write(b"quit\n")
-        time.sleep(0.5)
-        
-        # Flush any remaining data in buffer
-        self.flush()
+        with tracer.span("quit", self.port, "stream"):
+            # Send quit command
+            self._write(b"quit\n")
+            self.wait_until(self.quiet(STREAM_QUIET_PERIOD), timeout=0.5, poll=0.01, replaces=0.5)
+            
+            # Flush any remaining data in buffer
+            self.flush()
+        if self._stream_trace is not None:
+            name, start = self._stream_trace
+            self._stream_trace = None
+            tracer.complete(name, f"{self.port} stream", start, "stream")
     
     def flush(self):
         """Flush serial input buffer"""
         if self.is_connected() and self.serial.in_waiting:
-            self.serial.read(self.serial.in_waiting)
+            self._read(self.serial.in_waiting)
     
+    def _write(self, data: bytes):
+        self.serial.write(data)
+        self.io["bytes_out"] += len(data)
+
+    def _read(self, size: int) -> bytes:
+        data = self.serial.read(size)
+        self.io["bytes_in"] += len(data)
+        return data
+
+    def sleep(self, seconds: float):
+        """Fixed delay, counted in the I/O stats as sleep time"""
+        with tracer.span("sleep", self.port, "sleep", seconds=seconds):
+            time.sleep(seconds)
+        self.io["sleep_s"] += seconds
+
+    def metrics(self) -> Dict[str, Any]:
+        """Per-command-verb call/timeout/empty counts and latency histograms"""
+        return self.command_metrics.to_dict()
+
+    def wait_until(self, predicate: Callable[[], bool], timeout: float,
+                   poll: float = 0.05, replaces: float = 0.0) -> bool:
+        """Poll predicate until it is true or timeout expires.
+
+        replaces is the fixed sleep this wait stands in for; the difference
+        to the time actually waited is counted as sleep avoided (never below 0,
+        a wait that runs past the old sleep avoided nothing).
+        Returns whether the predicate became true.
+        """
+        trace_start = tracer.clock() if tracer.enabled else None
+        start = time.time()
+        while True:
+            if predicate():
+                ok = True
+                break
+            remaining = timeout - (time.time() - start)
+            if remaining <= 0:
+                ok = False
+                break
+            time.sleep(min(poll, remaining))
+        elapsed = time.time() - start
+        if trace_start is not None:
+            tracer.complete("wait", self.port, trace_start, "wait",
+                            {"ok": ok, "timeout": timeout, "replaces": replaces})
+        self.io["wait_s"] += elapsed
+        if replaces:
+            self.io["sleep_avoided_s"] += max(0.0, replaces - elapsed)
+        return ok
+
+    def settle(self, timeout: float = 3.0):
+        """Wait out boot output after opening the port.
+
+        Waits up to BOOT_OUTPUT_START for output to start; if it does,
+        until it has been quiet for BOOT_QUIET_PERIOD (or timeout).
+        """
+        start = time.time()
+        if self.wait_until(lambda: self.is_connected() and self.serial.in_waiting > 0,
+                           timeout=BOOT_OUTPUT_START, poll=0.01):
+            self.wait_until(self.quiet(BOOT_QUIET_PERIOD), timeout=timeout, poll=0.01,
+                            replaces=max(0.0, BOOT_OUTPUT_START - (time.time() - start)))
+
+    def quiet(self, period: float = 0.05) -> Callable[[], bool]:
+        """Predicate: no serial output for period seconds (output is discarded)"""
+        last_data = [time.time()]
+
+        def check() -> bool:
+            if self.is_connected() and self.serial.in_waiting:
+                self._read(self.serial.in_waiting)
+                last_data[0] = time.time()
+                return False
+            return time.time() - last_data[0] >= period
+
+        return check
+
+    def wait_for_response(self, command: str, check: Callable[[str], bool], timeout: float,
+                          poll: float = 0.1, replaces: float = 0.0) -> str:
+        """Repeat command until check(response) is true; returns the last response.
+
+        Every send after the first counts as a retry. Only the pauses
+        between sends count as waiting (against replaces), not the
+        command round trips.
+        """
+        start = time.time()
+        paused = 0.0
+        while True:
+            response = self.send_command(command)
+            remaining = timeout - (time.time() - start)
+            if check(response) or remaining <= 0:
+                break
+            self.io["retries"] += 1
+            pause = min(poll, remaining)
+            time.sleep(pause)
+            paused += pause
+        self.io["wait_s"] += paused
+        if replaces:
+            self.io["sleep_avoided_s"] += max(0.0, replaces - paused)
+        return response
+
+    def wait_for_wifi(self, enabled: bool, timeout: float = 3.0, replaces: float = 0.0) -> bool:
+        """Wait until ?wifi reports ON (enabled) or OFF"""
+        expected = "wifi=on" if enabled else "wifi=off"
+        response = self.wait_for_response(
+            "?wifi", lambda r: expected in r.lower().replace(" ", ""), timeout, replaces=replaces)
+        return expected in response.lower().replace(" ", "")
+
+    def io_snapshot(self) -> Dict[str, float]:
+        """Copy of the serial I/O counters (diff two snapshots per test)"""
+        return dict(self.io)
+
     def prepare_for_test(self):
         """Prepare device for testing - stop continuous output and flush buffers"""
         self.stop_continuous_output()
@@ -169,7 +420,146 @@ class BREmoteDevice:
                     continue
         
         return None
-    
+
+    def get_config_value(self, key: str, timeout: float = 2.0) -> Optional[str]:
+        """Read a single config value via ?get (response format: key=value).
+
+        STATE_CONFIG_KEYS present in the cached state snapshot are answered
+        from the cache without a serial round trip.
+        """
+        if self._state_cache is not None and key in STATE_CONFIG_KEYS and key in self._state_cache:
+            self.state_cache_hits += 1
+            value = self._state_cache[key]
+            # ?state json prints paired as true/false, ?get as the U16 0/1
+            return str(int(value)) if isinstance(value, bool) else str(value)
+
+        response = self.send_command(f"?get {key}", wait_for_response=True, timeout=timeout)
+
+        for line in response.split('\n'):
+            line = line.strip()
+            if line.lower().startswith(f"{key.lower()}="):
+                return line.split("=", 1)[1].strip()
+
+        return None
+
+    def read_config(self, timeout: float = 2.0) -> Optional[Dict[str, Any]]:
+        """Whole stored config from the ?conf Base64 blob (one round trip).
+
+        The blob is decoded with the layout of the struct version it
+        carries, which is kept in config_layout. Returns None when the
+        unit has no stored config or the blob does not decode. The blob
+        is the SPIFFS copy: ?set changes not yet saved are not in it.
+        """
+        response = self.send_command("?conf", wait_for_response=True, timeout=timeout)
+        blob = find_blob(response)
+        if blob is None:
+            return None
+        device_type = self.device_type.value
+        if self.device_type == DeviceType.UNKNOWN:
+            label = _DEVICE_LABEL_RE.search(response)
+            if label is None:
+                return None
+            device_type = label.group(1).lower()
+        try:
+            self.config_layout, values = decode_blob(device_type, blob)
+        except ConfStructError as e:
+            logger.warning(f"{self.port}: cannot decode config blob: {e}")
+            return None
+        return values
+
+    def write_config(self, values: Dict[str, Any], base: Optional[Dict[str, Any]] = None,
+                     apply: bool = True, timeout: float = 3.0) -> bool:
+        """Write a whole config as one ?setconf blob (and ?applyconf it).
+
+        Keys missing from values come from base, then the layout defaults.
+        The layout is the one of the last read_config(), else the one of
+        the firmware version. ?setconf and ?applyconf are pipelined in a
+        single round trip, read up to the last line the firmware prints
+        for them (or timeout); True when it stored (and applied) the blob.
+        Raises ConfStructError for values that do not fit the layout.
+        """
+        layout = self.config_layout or get_layout(self.device_type.value, int(self.firmware_version or 0))
+        blob = layout.encode_b64(values, base)
+        if not self.is_connected():
+            return False
+        command = f"?setconf {blob}\n?applyconf" if apply else f"?setconf {blob}"
+        end_markers = APPLYCONF_END_MARKERS if apply else SETCONF_END_MARKERS
+        self.send_command(command, wait_for_response=False)
+        lines: List[str] = []
+        deadline = time.time() + timeout
+        while time.time() < deadline:
+            line = self.read_line(timeout=deadline - time.time())
+            if line:
+                lines.append(line)
+                if any(marker in line for marker in end_markers):
+                    break
+        response = "\n".join(lines)
+        if "Struct saved to SPIFFS" not in response:
+            return False
+        return not apply or "Struct successfully read from SPIFFS" in response
+
+    def identity(self) -> Dict[str, Optional[str]]:
+        """USB serial number, radio own_address and firmware version.
+
+        Looked up once per device; the firmware version comes from the
+        ?conf banner read by identify().
+        """
+        if self.usb_serial is None and not is_serial_url(self.port):
+            self.usb_serial = ""
+            for port_info in serial.tools.list_ports.comports():
+                if port_info.device == self.port:
+                    self.usb_serial = port_info.serial_number or ""
+                    break
+        if self.own_address is None and self.is_connected():
+            self.own_address = self.get_config_value("own_address")
+        return {
+            "usb_serial": self.usb_serial or None,
+            "own_address": self.own_address,
+            "firmware_version": self.firmware_version,
+        }
+
+    @staticmethod
+    def _is_state_mutating(command: str) -> bool:
+        cmd = " ".join(command.strip().lower().split())
+        return cmd in STATE_MUTATING_EXACT or cmd.startswith(STATE_MUTATING_COMMANDS)
+
+    def get_state(self, refresh: bool = False, timeout: float = 2.0) -> Optional[Dict[str, Any]]:
+        """TX state snapshot from ?state json, shared until invalidated.
+
+        The snapshot is reused by read-only tests and dropped whenever a
+        mutating command is sent. Use refresh=True for values that change
+        without a command (e.g. lock state). Failed reads are not cached.
+        """
+        if self._state_cache is not None and not refresh:
+            self.state_cache_hits += 1
+            return dict(self._state_cache)
+
+        self.state_cache_misses += 1
+        state = self.send_json_command("?state json", timeout=timeout)
+        self._state_cache = state
+        return dict(state) if state is not None else None
+
+    def invalidate_state(self):
+        """Drop the cached state snapshot"""
+        if self._state_cache is not None:
+            self.state_cache_invalidations += 1
+        self._state_cache = None
+
+    def reset_state_cache(self):
+        """Drop the snapshot and zero the hit/miss counters (start of a run)"""
+        self._state_cache = None
+        self.state_cache_hits = 0
+        self.state_cache_misses = 0
+        self.state_cache_invalidations = 0
+
+    def state_cache_stats(self) -> Dict[str, int]:
+        """State cache counters for reports"""
+        return {
+            "hits": self.state_cache_hits,
+            "misses": self.state_cache_misses,
+            "invalidations": self.state_cache_invalidations,
+        }
+
     @staticmethod
     def scan_ports() -> List[str]:
         """Scan for available COM ports with BREmote devices"""
@@ -193,13 +583,16 @@ class BREmoteDevice:
         start_time = time.time()
         line = ""
         
-        while time.time() - start_time < timeout:
-            if self.serial.in_waiting:
-                char = self.serial.read(1)
-                if char == b'\n':
-                    return line.strip()
-                line += char.decode('utf-8', errors='ignore')
-            else:
-                time.sleep(0.01)
+        try:
+            while time.time() - start_time < timeout:
+                if self.serial.in_waiting:
+                    char = self._read(1)
+                    if char == b'\n':
+                        return line.strip()
+                    line += char.decode('utf-8', errors='ignore')
+                else:
+                    time.sleep(0.01)
+        finally:
+            self.io["read_blocked_s"] += time.time() - start_time
         
         return line.strip() if line else None
@@ -0,0 +1,489 @@
+"""
+BREmote Test Suite - Report Diff
+Compares two report sets (e.g. before and after a firmware update).
+
+A report set is a --report JSON file, a --report-stream JSON Lines file,
+a station/farm output directory, or several of these. Each set is
+streamed into flat columns (one row per unit test) with a hash index of
+unit identities, so only the columns are kept in memory. Units are
+matched by USB serial number, then radio own_address, then port; test
+rows are joined on a (unit, test) integer key, vectorised with numpy
+when available.
+
+Usage:
+    python -m bremote diff old_results/ new_results.jsonl
+"""
+
+import argparse
+import glob
+import json
+import os
+import sys
+import time
+from collections import Counter
+from dataclasses import dataclass, field
+from typing import Any, Dict, Iterable, Iterator, List, Optional, Tuple
+
+from .models import TestReport, TestResult
+from .reportstream import iter_results
+
+# Optional vectorised join
+try:
+    import numpy as np
+    NUMPY_AVAILABLE = True
+except ImportError:
+    NUMPY_AVAILABLE = False
+
+# Result codes of the test columns
+RESULT_CODES = {TestResult.PASS.value: 0, TestResult.FAIL.value: 1, TestResult.SKIP.value: 2}
+OTHER_RESULT = 3
+RESULT_NAMES = {code: name for name, code in RESULT_CODES.items()}
+
+# Link metrics compared per pair, with their default thresholds
+LINK_METRICS = {
+    "packet_loss_percent": 2.0,    # percentage points
+    "avg_rssi_dbm": 3.0,           # dB
+    "avg_snr_db": 2.0,             # dB
+    "avg_link_quality": 1.0,       # score points (0-10)
+}
+
+# Per-test duration change flagged above this ratio and absolute change
+DEFAULT_DURATION_RATIO = 0.5
+DEFAULT_DURATION_MIN_S = 0.1
+
+
+@dataclass
+class ReportSet:
+    """One side of a diff in columnar form.
+
+    units holds one entry per distinct unit (latest report wins); the
+    test columns hold one row per test of every loaded report, tagged
+    with the report sequence number so superseded reports are dropped.
+    """
+    sources: List[str] = field(default_factory=list)
+    reports: int = 0
+    units: List[Dict[str, Any]] = field(default_factory=list)
+    unit_index: Dict[Tuple[str, str], int] = field(default_factory=dict)
+    port_units: Dict[str, int] = field(default_factory=dict)
+    test_unit: List[int] = field(default_factory=list)
+    test_seq: List[int] = field(default_factory=list)
+    test_id: List[int] = field(default_factory=list)
+    test_result: List[int] = field(default_factory=list)
+    test_wall_s: List[float] = field(default_factory=list)
+    links: Dict[str, Dict[str, Any]] = field(default_factory=dict)
+
+    @staticmethod
+    def _unit_key(report: TestReport) -> Tuple[str, str]:
+        if report.usb_serial:
+            return ("usb", report.usb_serial)
+        if report.own_address:
+            return ("addr", f"{report.device_type}:{report.own_address.upper()}")
+        return ("port", f"{report.device_type}:{report.port}")
+
+    def add_report(self, report: TestReport, test_names: Dict[str, int]):
+        seq = self.reports
+        self.reports += 1
+        key = self._unit_key(report)
+        idx = self.unit_index.get(key)
+        unit = {
+            "device_type": report.device_type, "port": report.port,
+            "usb_serial": report.usb_serial, "own_address": report.own_address,
+            "firmware_version": report.firmware_version, "result": report.overall_result,
+            "timestamp": report.timestamp or "", "seq": seq,
+        }
+        if idx is None:
+            idx = len(self.units)
+            self.unit_index[key] = idx
+            self.units.append(unit)
+        elif unit["timestamp"] >= self.units[idx]["timestamp"]:
+            self.units[idx] = unit
+        else:
+            return    # older than the report already loaded for this unit
+        self.port_units[report.port] = idx
+
+        for name, test in report.tests.items():
+            stats = test.get("stats") or {}
+            wall_s = stats.get("wall_s")
+            self.test_unit.append(idx)
+            self.test_seq.append(seq)
+            self.test_id.append(test_names.setdefault(name, len(test_names)))
+            self.test_result.append(RESULT_CODES.get(test.get("result"), OTHER_RESULT))
+            self.test_wall_s.append(float(wall_s) if wall_s is not None else float("nan"))
+
+    def add_link(self, pair: str, link: Dict[str, Any]):
+        self.links[pair] = link
+
+    def current_rows(self) -> List[int]:
+        """Row numbers of tests from each unit's latest report"""
+        latest = [unit["seq"] for unit in self.units]
+        return [row for row, (unit, seq) in enumerate(zip(self.test_unit, self.test_seq))
+                if latest[unit] == seq]
+
+
+def _iter_source(path: str) -> Iterator[Tuple[str, Any]]:
+    """("report", TestReport) / ("link", (pair, result)) from one file or directory"""
+    if os.path.isdir(path):
+        for name in sorted(glob.glob(os.path.join(path, "*.json")) + glob.glob(os.path.join(path, "*.jsonl"))):
+            if os.path.basename(name) != "station_metrics.json":
+                yield from _iter_source(name)
+        return
+    if path.endswith((".jsonl", ".ndjson")):
+        yield from iter_results(path)
+        return
+    with open(path, encoding="utf-8") as f:
+        data = json.load(f)
+    if isinstance(data, dict) and "tests" in data:
+        data = {data.get("port", path): data}     # single station report
+    for key, item in (data.items() if isinstance(data, dict) else ()):
+        if not isinstance(item, dict):
+            continue
+        if "tests" in item:
+            yield "report", TestReport.from_dict(item)
+        elif "tx_port" in item or "packet_loss_percent" in item:
+            yield "link", (key, item)
+
+
+def load_set(paths: Iterable[str], test_names: Dict[str, int]) -> ReportSet:
+    """Stream report sources into a ReportSet (test_names is shared by both sides)"""
+    report_set = ReportSet()
+    for path in paths:
+        report_set.sources.append(path)
+        for kind, item in _iter_source(path):
+            if kind == "report":
+                report_set.add_report(item, test_names)
+            else:
+                report_set.add_link(*item)
+    return report_set
+
+
+def match_units(old: ReportSet, new: ReportSet) -> List[Tuple[int, int]]:
+    """(old unit, new unit) pairs: by USB serial, then own_address, then port"""
+    matched: List[Tuple[int, int]] = []
+    used_old, used_new = set(), set()
+
+    def index(report_set: ReportSet, kind: str, used) -> Dict[str, int]:
+        out = {}
+        for idx, unit in enumerate(report_set.units):
+            if idx in used:
+                continue
+            if kind == "usb":
+                value = unit["usb_serial"]
+            elif kind == "addr":
+                value = unit["own_address"] and f"{unit['device_type']}:{unit['own_address'].upper()}"
+            else:
+                value = f"{unit['device_type']}:{unit['port']}"
+            if value:
+                out.setdefault(value, idx)
+        return out
+
+    for kind in ("usb", "addr", "port"):
+        old_index = index(old, kind, used_old)
+        for value, new_idx in index(new, kind, used_new).items():
+            old_idx = old_index.get(value)
+            if old_idx is not None:
+                matched.append((old_idx, new_idx))
+                used_old.add(old_idx)
+                used_new.add(new_idx)
+    return sorted(matched)
+
+
+def _join_tests(old: ReportSet, new: ReportSet, pairs: List[Tuple[int, int]], n_tests: int):
+    """Matched test rows as (pair, test, old result, new result, old s, new s) columns"""
+    old_pair = [-1] * len(old.units)
+    new_pair = [-1] * len(new.units)
+    for pair, (o, n) in enumerate(pairs):
+        old_pair[o] = pair
+        new_pair[n] = pair
+
+    if NUMPY_AVAILABLE:
+        def columns(report_set: ReportSet, unit_pair):
+            unit = np.asarray(report_set.test_unit, dtype=np.int64)
+            latest = np.asarray([u["seq"] for u in report_set.units], dtype=np.int64)
+            rows = np.nonzero(np.asarray(report_set.test_seq, dtype=np.int64) == latest[unit])[0] \
+                if len(unit) else unit
+            unit = unit[rows]
+            pair = np.asarray(unit_pair, dtype=np.int64)[unit] if len(unit) else unit
+            keep = pair >= 0
+            rows, pair = rows[keep], pair[keep]
+            test = np.asarray(report_set.test_id, dtype=np.int64)[rows]
+            return (pair * n_tests + test, np.asarray(report_set.test_result, dtype=np.int8)[rows],
+                    np.asarray(report_set.test_wall_s, dtype=np.float64)[rows])
+
+        old_key, old_res, old_s = columns(old, old_pair)
+        new_key, new_res, new_s = columns(new, new_pair)
+        key, oi, ni = np.intersect1d(old_key, new_key, assume_unique=True, return_indices=True)
+        missing = np.setdiff1d(old_key, new_key, assume_unique=True) % n_tests
+        added = np.setdiff1d(new_key, old_key, assume_unique=True) % n_tests
+        return (key // n_tests, key % n_tests, old_res[oi], new_res[ni], old_s[oi], new_s[ni],
+                np.bincount(missing, minlength=n_tests), np.bincount(added, minlength=n_tests))
+
+    # Hash join fallback
+    def keyed(report_set: ReportSet, unit_pair) -> Dict[int, int]:
+        out = {}
+        for row in report_set.current_rows():
+            pair = unit_pair[report_set.test_unit[row]]
+            if pair >= 0:
+                out[pair * n_tests + report_set.test_id[row]] = row
+        return out
+
+    old_rows, new_rows = keyed(old, old_pair), keyed(new, new_pair)
+    keys = sorted(old_rows.keys() & new_rows.keys())
+    missing = [0] * n_tests
+    added = [0] * n_tests
+    for k in old_rows.keys() - new_rows.keys():
+        missing[k % n_tests] += 1
+    for k in new_rows.keys() - old_rows.keys():
+        added[k % n_tests] += 1
+    return ([k // n_tests for k in keys], [k % n_tests for k in keys],
+            [old.test_result[old_rows[k]] for k in keys], [new.test_result[new_rows[k]] for k in keys],
+            [old.test_wall_s[old_rows[k]] for k in keys], [new.test_wall_s[new_rows[k]] for k in keys],
+            missing, added)
+
+
+def _median(values: List[float]) -> Optional[float]:
+    values = sorted(v for v in values if v == v)
+    if not values:
+        return None
+    mid = len(values) // 2
+    return values[mid] if len(values) % 2 else (values[mid - 1] + values[mid]) / 2
+
+
+_COUNTERS = ("compared", "regressions", "fixes", "changed", "slower", "faster")
+
+
+def _aggregate_tests(test_col, old_res, new_res, old_s, new_s, n_tests: int,
+                     duration_ratio: float, duration_min_s: float):
+    """Per-test counters, duration medians and the rows whose result changed"""
+    fail, ok = RESULT_CODES[TestResult.FAIL.value], RESULT_CODES[TestResult.PASS.value]
+    if NUMPY_AVAILABLE:
+        regressions = (new_res == fail) & (old_res != fail)
+        fixes = (old_res == fail) & (new_res == ok)
+        changed = (old_res != new_res) & ~regressions & ~fixes
+        timed = ~np.isnan(old_s) & ~np.isnan(new_s)
+        slower = timed & (new_s - old_s > duration_min_s) & (new_s > old_s * (1 + duration_ratio))
+        faster = timed & (old_s - new_s > duration_min_s) & (old_s > new_s * (1 + duration_ratio))
+        counts = {name: np.bincount(test_col[mask], minlength=n_tests).tolist()
+                  for name, mask in zip(_COUNTERS, (np.ones(len(test_col), bool), regressions, fixes,
+                                                    changed, slower, faster))}
+        # Medians per test over one sort instead of a mask per test
+        order = np.argsort(test_col, kind="stable")
+        bounds = np.searchsorted(test_col[order], np.arange(n_tests + 1))
+        medians = {}
+        for test in range(n_tests):
+            rows = order[bounds[test]:bounds[test + 1]]
+            rows = rows[timed[rows]]
+            if len(rows):
+                medians[test] = (float(np.median(old_s[rows])), float(np.median(new_s[rows])))
+        return counts, medians, np.nonzero(old_res != new_res)[0].tolist()
+
+    counts = {name: [0] * n_tests for name in _COUNTERS}
+    durations: Dict[int, Tuple[List[float], List[float]]] = {}
+    changed_rows = []
+    for row, test in enumerate(test_col):
+        o, n, so, sn = old_res[row], new_res[row], old_s[row], new_s[row]
+        counts["compared"][test] += 1
+        if o != n:
+            changed_rows.append(row)
+            kind = "regressions" if n == fail else "fixes" if o == fail and n == ok else "changed"
+            counts[kind][test] += 1
+        if so == so and sn == sn:
+            lists = durations.setdefault(test, ([], []))
+            lists[0].append(so)
+            lists[1].append(sn)
+            if sn - so > duration_min_s and sn > so * (1 + duration_ratio):
+                counts["slower"][test] += 1
+            elif so - sn > duration_min_s and so > sn * (1 + duration_ratio):
+                counts["faster"][test] += 1
+    medians = {test: (_median(a), _median(b)) for test, (a, b) in durations.items()}
+    return counts, medians, changed_rows
+
+
+def diff_sets(old: ReportSet, new: ReportSet, test_names: Dict[str, int],
+              duration_ratio: float = DEFAULT_DURATION_RATIO,
+              duration_min_s: float = DEFAULT_DURATION_MIN_S,
+              link_thresholds: Optional[Dict[str, float]] = None) -> Dict[str, Any]:
+    """Changed results, duration deltas and link metric deltas between two sets"""
+    link_thresholds = dict(LINK_METRICS, **(link_thresholds or {}))
+    pairs = match_units(old, new)
+    n_tests = max(1, len(test_names))
+    names = sorted(test_names, key=test_names.get)
+    pair_col, test_col, old_res, new_res, old_s, new_s, missing, added = \
+        _join_tests(old, new, pairs, n_tests)
+    counts, medians, changed_rows = _aggregate_tests(test_col, old_res, new_res, old_s, new_s,
+                                                      n_tests, duration_ratio, duration_min_s)
+
+    tests = []
+    for test, name in enumerate(names):
+        entry = {counter: counts[counter][test] for counter in _COUNTERS}
+        if not (entry["compared"] or missing[test] or added[test]):
+            continue
+        old_med, new_med = medians.get(test, (None, None))
+        entry.update(test=name, old_median_s=old_med, new_median_s=new_med,
+                     missing=int(missing[test]), added=int(added[test]))
+        tests.append(entry)
+    tests.sort(key=lambda e: (-e["regressions"], -e["slower"], e["test"]))
+
+    fail = RESULT_CODES[TestResult.FAIL.value]
+    changes = []
+    for row in changed_rows:
+        o, n = int(old_res[row]), int(new_res[row])
+        _, new_unit = pairs[int(pair_col[row])]
+        changes.append({"kind": "regression" if n == fail else
+                        "fix" if o == fail and n == RESULT_CODES[TestResult.PASS.value] else "changed",
+                        "test": names[int(test_col[row])], "unit": _describe_unit(new.units[new_unit]),
+                        "old": RESULT_NAMES.get(o, "?"), "new": RESULT_NAMES.get(n, "?")})
+
+    return {
+        "old": _set_summary(old),
+        "new": _set_summary(new),
+        "matched_units": len(pairs),
+        "only_old": len(old.units) - len(pairs),
+        "only_new": len(new.units) - len(pairs),
+        "unit_results": dict(Counter(f"{old.units[o]['result']}->{new.units[n]['result']}"
+                                     for o, n in pairs)),
+        "tests": tests,
+        "changes": changes,
+        "links": _diff_links(old, new, pairs, link_thresholds),
+    }
+
+
+def _describe_unit(unit: Dict[str, Any]) -> str:
+    ident = unit["usb_serial"] or unit["own_address"]
+    return f"{unit['device_type']} {ident} ({unit['port']})" if ident else f"{unit['device_type']} {unit['port']}"
+
+
+def _set_summary(report_set: ReportSet) -> Dict[str, Any]:
+    return {
+        "sources": report_set.sources,
+        "reports": report_set.reports,
+        "units": len(report_set.units),
+        "firmware": dict(Counter(u["firmware_version"] or "?" for u in report_set.units)),
+        "links": len(report_set.links),
+    }
+
+
+def _diff_links(old: ReportSet, new: ReportSet, pairs: List[Tuple[int, int]],
+                thresholds: Dict[str, float]) -> List[Dict[str, Any]]:
+    """Link metric deltas per TX/RX pair beyond thresholds"""
+    old_to_new = dict(pairs)
+
+    def endpoints(report_set: ReportSet, link: Dict[str, Any], translate) -> Tuple:
+        ends = []
+        for port in (link.get("tx_port"), link.get("rx_port")):
+            unit = report_set.port_units.get(port)
+            ends.append(("unit", translate(unit)) if unit is not None and translate(unit) is not None
+                        else ("port", port))
+        return tuple(ends)
+
+    new_links = {endpoints(new, link, lambda u: u): (pair, link) for pair, link in new.links.items()}
+    out = []
+    for pair, link in old.links.items():
+        match = new_links.get(endpoints(old, link, old_to_new.get))
+        if match is None:
+            continue
+        new_pair, new_link = match
+        deltas = {}
+        for metric, threshold in thresholds.items():
+            a, b = link.get(metric), new_link.get(metric)
+            if a is None or b is None:
+                continue
+            delta = float(b) - float(a)
+            deltas[metric] = {"old": a, "new": b, "delta": round(delta, 3), "flagged": abs(delta) > threshold}
+        out.append({"pair": new_pair, "old_result": link.get("result"), "new_result": new_link.get("result"),
+                    "metrics": deltas,
+                    "flagged": link.get("result") != new_link.get("result")
+                    or any(d["flagged"] for d in deltas.values())})
+    return out
+
+
+def _fmt_s(value: Optional[float]) -> str:
+    return f"{value:.2f}s" if value is not None else "-"
+
+
+def print_diff(result: Dict[str, Any], limit: int = 20):
+    old, new = result["old"], result["new"]
+    print(f"OLD: {old['reports']} reports, {old['units']} units, firmware "
+          + ", ".join(f"{v} x{n}" for v, n in sorted(old["firmware"].items())))
+    print(f"NEW: {new['reports']} reports, {new['units']} units, firmware "
+          + ", ".join(f"{v} x{n}" for v, n in sorted(new["firmware"].items())))
+    print(f"Matched units: {result['matched_units']} (only in OLD: {result['only_old']}, "
+          f"only in NEW: {result['only_new']})")
+    if result["unit_results"]:
+        print("Unit results: " + ", ".join(f"{k} x{n}" for k, n in sorted(result["unit_results"].items())))
+
+    print(f"\n{'test':20} {'units':>6} {'regr':>5} {'fixed':>5} {'slower':>6} {'faster':>6} "
+          f"{'old med':>8} {'new med':>8} {'gone':>5} {'new':>5}")
+    for t in result["tests"]:
+        flag = "  <<" if t["regressions"] or t["slower"] else ""
+        print(f"{t['test'][:20]:20} {t['compared']:>6} {t['regressions']:>5} {t['fixes']:>5} "
+              f"{t['slower']:>6} {t['faster']:>6} {_fmt_s(t['old_median_s']):>8} "
+              f"{_fmt_s(t['new_median_s']):>8} {t['missing']:>5} {t['added']:>5}{flag}")
+
+    changes = result["changes"]
+    if changes:
+        print(f"\nChanged results ({len(changes)}):")
+        for change in sorted(changes, key=lambda c: c["kind"] != "regression")[:limit]:
+            print(f"  [{change['kind'].upper():10}] {change['test']:20} {change['old']} -> {change['new']}  "
+                  f"{change['unit']}")
+        if len(changes) > limit:
+            print(f"  ... {len(changes) - limit} more (--limit)")
+
+    flagged = [link for link in result["links"] if link["flagged"]]
+    if result["links"]:
+        print(f"\nLinks: {len(result['links'])} matched pair(s), {len(flagged)} beyond thresholds")
+        for link in flagged[:limit]:
+            deltas = ", ".join(f"{m} {d['old']}->{d['new']} ({d['delta']:+g})"
+                               for m, d in link["metrics"].items() if d["flagged"])
+            print(f"  {link['pair']}: {link['old_result']} -> {link['new_result']}"
+                  + (f"  {deltas}" if deltas else ""))
+
+
+def main(argv: Optional[List[str]] = None):
+    parser = argparse.ArgumentParser(
+        prog="bremote diff",
+        description="Compare two report sets: changed results, per-test duration and link metric deltas")
+    parser.add_argument('old', help='OLD report set: --report JSON, --report-stream JSONL or directory '
+                                    '(use --old-extra for more sources)')
+    parser.add_argument('new', help='NEW report set (same formats)')
+    parser.add_argument('--old-extra', action='append', default=[], metavar='PATH',
+                        help='Additional OLD source (repeatable)')
+    parser.add_argument('--new-extra', action='append', default=[], metavar='PATH',
+                        help='Additional NEW source (repeatable)')
+    parser.add_argument('--duration-ratio', type=float, default=DEFAULT_DURATION_RATIO,
+                        help='Flag per-test durations changed by more than this ratio (default: 0.5)')
+    parser.add_argument('--duration-min', type=float, default=DEFAULT_DURATION_MIN_S,
+                        help='... and by more than this many seconds (default: 0.1)')
+    parser.add_argument('--loss-threshold', type=float, default=LINK_METRICS["packet_loss_percent"],
+                        help='Packet loss change in percentage points (default: 2)')
+    parser.add_argument('--rssi-threshold', type=float, default=LINK_METRICS["avg_rssi_dbm"],
+                        help='Average RSSI change in dB (default: 3)')
+    parser.add_argument('--limit', type=int, default=20, help='Changed results / links listed (default: 20)')
+    parser.add_argument('--json', action='store_true', help='Print the full diff as JSON')
+    parser.add_argument('--fail-on-regression', action='store_true',
+                        help='Exit with status 1 when any test went from PASS to FAIL')
+    args = parser.parse_args(argv)
+
+    for path in [args.old, args.new] + args.old_extra + args.new_extra:
+        if not os.path.exists(path):
+            parser.error(f"not found: {path}")
+
+    start = time.perf_counter()
+    test_names: Dict[str, int] = {}
+    old = load_set([args.old] + args.old_extra, test_names)
+    new = load_set([args.new] + args.new_extra, test_names)
+    loaded = time.perf_counter()
+    result = diff_sets(old, new, test_names, duration_ratio=args.duration_ratio,
+                       duration_min_s=args.duration_min,
+                       link_thresholds={"packet_loss_percent": args.loss_threshold,
+                                        "avg_rssi_dbm": args.rssi_threshold})
+    done = time.perf_counter()
+
+    if args.json:
+        print(json.dumps(result, indent=2))
+    else:
+        print_diff(result, limit=args.limit)
+        print(f"\nLoaded {old.reports + new.reports} reports in {loaded - start:.2f}s, "
+              f"diffed in {(done - loaded) * 1000:.0f} ms")
+
+    if args.fail_on_regression and any(t["regressions"] for t in result["tests"]):
+        sys.exit(1)
@@ -0,0 +1,541 @@
+"""
+BREmote Test Suite - Device Emulator
+In-process stand-in for a TX/RX unit on the serial console.
+
+EmulatedSerial answers the commands the suites use (?conf, ?keys, ?get,
+?set, ?state json, ?wifi, ?radio, ?print* loops until quit, ...) with the
+firmware's response formats. The config is a full confStruct, stored as
+a Base64 blob on ?save / ?setconf like the firmware's SPIFFS copy, and
+checked with the firmware's cross-field rules. It implements the part of
+the pyserial Serial API that BREmoteDevice uses, so EmulatedDevice runs
+every suite without hardware, e.g. for test farm workers on one Linux
+box. EmulatedWebApi serves the web config API of an emulated unit.
+"""
+
+import json
+import random
+import socket
+import threading
+import time
+from http.server import BaseHTTPRequestHandler, ThreadingHTTPServer
+from typing import Any, Dict, List, Optional, Tuple
+from urllib.parse import parse_qs, urlparse
+
+import serial.rfc2217
+
+from .confstruct import (RADIO_REINIT_KEYS, ConfStructError, check_value, get_layout, validate_config,
+                         validate_cross_field)
+from .device import BREmoteDevice
+
+# Config values that differ from the confStruct defaults
+TX_CONFIG = {
+    "radio_preset": 1, "rf_power": 22, "max_gears": 10, "startgear": 2,
+    "no_lock": 0, "throttle_mode": 0, "steer_enabled": 0, "thr_expo": 50,
+    "tog_deadzone": 500, "tog_diff": 30, "menu_timeout": 10, "paired": 1,
+}
+RX_CONFIG = {
+    "radio_preset": 1, "rf_power": 22, "steering_type": 0,
+    "pwm0_min": 1000, "pwm0_max": 2000, "pwm1_min": 1000, "pwm1_max": 2000,
+    "failsafe_time": 1000, "foil_num_cells": 12, "data_src": 0, "paired": 1,
+}
+
+# Firmware version reported in the ?conf banner
+SW_VERSION = 3
+
+# Web UI version bundled with the firmware (getTargetWebUiVersion())
+WEB_UI_VERSION = 4
+
+# __DATE__ / __TIME__ printed in the ?conf banner
+BUILD_DATE, BUILD_TIME = "Oct  1 2026", "12:00:00"
+
+# serSetConf() SPIFFS temp file write + rename, between its two lines
+SPIFFS_WRITE_DELAY = 0.15
+
+# ?print* loop periods in seconds (TX inputs ~20Hz, others 10Hz)
+STREAM_PERIODS = {"printinputs": 0.05}
+DEFAULT_STREAM_PERIOD = 0.1
+
+
+class EmulatedSerial:
+    """pyserial-like object backed by an emulated BREmote console.
+
+    latency delays every response (first byte) by that many seconds.
+    Output stays in order: a command's lines never come before the
+    previous command's, like the firmware's single serial loop.
+    With stream=False the ?print* commands print one frame instead of
+    looping until quit, which keeps emulated suites fast.
+    """
+
+    # Line settings and modem lines (set/read by the RFC 2217 PortManager)
+    baudrate = 115200
+    bytesize = 8
+    parity = "N"
+    stopbits = 1
+    rtscts = False
+    xonxoff = False
+    dtr = True
+    rts = True
+    break_condition = False
+    cts = True
+    dsr = True
+    ri = False
+    cd = True
+
+    def __init__(self, kind: str = "tx", latency: float = 0.0, stream: bool = True,
+                 seed: Optional[int] = None):
+        self.kind = kind
+        self.latency = latency
+        self.stream = stream
+        self.is_open = True
+        self.rng = random.Random(seed)
+        self.layout = get_layout(kind, SW_VERSION)
+        self.config: Dict[str, Any] = dict(self.layout.defaults, **(TX_CONFIG if kind == "tx" else RX_CONFIG))
+        self.config["own_address"] = ":".join(f"{self.rng.randrange(256):02X}" for _ in range(3))
+        self.mac = self.rng.getrandbits(48)
+        # Web UI version in SPIFFS (?wifiver ui_installed)
+        self.ui_installed = WEB_UI_VERSION
+        # SPIFFS copy (Base64), written at first boot like the firmware does
+        self.stored: Optional[str] = self.layout.encode_b64(self.config)
+        self.wifi = kind == "rx"    # RX boots with the AP on
+        self.radio = True
+        self.locked = False
+        self._buffer = bytearray()
+        self._pending: List[Tuple[float, bytes]] = []
+        self._line = bytearray()
+        self._stream_cmd: Optional[Tuple[str, bool]] = None
+        self._next_frame = 0.0
+        self._lock = threading.Lock()
+
+    # ----- pyserial API -----
+
+    @property
+    def in_waiting(self) -> int:
+        with self._lock:
+            self._pump()
+            return len(self._buffer)
+
+    def read(self, size: int = 1) -> bytes:
+        with self._lock:
+            self._pump()
+            data = bytes(self._buffer[:size])
+            del self._buffer[:size]
+            return data
+
+    def write(self, data: bytes) -> int:
+        with self._lock:
+            for byte in data:
+                if byte in (10, 13):
+                    if self._line:
+                        self._handle(self._line.decode("utf-8", errors="ignore").strip())
+                        self._line = bytearray()
+                else:
+                    self._line.append(byte)
+        return len(data)
+
+    def flush(self):
+        pass
+
+    def reset_input_buffer(self):
+        with self._lock:
+            self._buffer.clear()
+            self._pending.clear()
+
+    def reset_output_buffer(self):
+        pass
+
+    def close(self):
+        self.is_open = False
+
+    # ----- emulation -----
+
+    def _pump(self):
+        now = time.time()
+        while self._pending and self._pending[0][0] <= now:
+            self._buffer += self._pending.pop(0)[1]
+        if self._stream_cmd and now >= self._next_frame:
+            name, as_json = self._stream_cmd
+            self._buffer += self._frame(name, as_json).encode()
+            self._next_frame = now + STREAM_PERIODS.get(name, DEFAULT_STREAM_PERIOD)
+
+    def _out(self, *lines: str, delay: float = 0.0):
+        text = "".join(f"{line}\r\n" for line in lines)
+        due = time.time() + self.latency + delay
+        if self._pending:
+            due = max(due, self._pending[-1][0])
+        self._pending.append((due, text.encode()))
+
+    def _frame(self, name: str, as_json: bool) -> str:
+        thr = self.rng.randint(0, 3)
+        steer = 127 + self.rng.randint(-2, 2)
+        rssi = self.rng.randint(-75, -55)
+        snr = round(self.rng.uniform(6.0, 10.0), 1)
+        if name == "printinputs":
+            if as_json:
+                return json.dumps({"throttle": thr, "steering": steer, "thr_sent": thr,
+                                   "steer_sent": steer, "toggle": 0, "toggle_input": 0,
+                                   "locked": int(self.locked), "in_menu": 0,
+                                   "steer_enabled": self.config.get("steer_enabled", 0),
+                                   "hall_enabled": 1}, separators=(",", ":")) + "\r\n"
+            return f"Throttle: {thr}, Steering: {steer}, Toggle: 0, ToggleInput: 0, Locked: {int(self.locked)}\r\n"
+        if name == "printrssi":
+            if not self.radio:
+                return '{"error":"radio_disabled"}\r\n' if as_json else "Radio activity is disabled.\r\n"
+            if as_json:
+                return json.dumps({"rssi": rssi, "snr": snr}, separators=(",", ":")) + "\r\n"
+            return f"RSSI: {rssi}, SNR: {snr}\r\n"
+        if name == "printreceived":
+            return json.dumps({"throttle": thr, "steering": steer, "rssi": rssi, "snr": snr},
+                              separators=(",", ":")) + "\r\n"
+        if name == "printpackets":
+            return json.dumps({"sent": 100, "received": 98, "ratio": 98}, separators=(",", ":")) + "\r\n"
+        if name == "printbat":
+            return "Measured: 50.40V, offset: 0.00, data_src: 0\r\n"
+        if name == "printpwm":
+            return "PWM: 1500, 1500\r\n"
+        return "\r\n"
+
+    def _value(self, key: str) -> str:
+        return self.layout.format_value(key, self.config[key])
+
+    def config_json(self) -> Dict[str, Any]:
+        """Config as ?conf json / GET /api/config print it (floats at ?get precision)"""
+        return {key: float(self._value(key)) if isinstance(value, float) else value
+                for key, value in self.config.items()}
+
+    def set_batch(self, changes: Dict[str, Any]) -> Optional[str]:
+        """cfgSetBatch(): all changes or none; returns the error"""
+        with self._lock:
+            staged = dict(self.config)
+            for key, value in changes.items():
+                if key not in staged:
+                    return f"ERR_UNKNOWN_KEY:{key}"
+                try:
+                    staged[key] = self.layout.parse_value(key, value)
+                except ConfStructError:
+                    return f"ERR_BAD_VALUE:{key}"
+                err = check_value(self.layout, key, staged[key])
+                if err:
+                    return err
+            staged, err = validate_cross_field(self.kind, staged)
+            if err is None:
+                self.config = staged
+            return err
+
+    def save(self):
+        """saveConfToSPIFFS(usrConf)"""
+        with self._lock:
+            self.stored = self.layout.encode_b64(self.config)
+
+    def _applyconf(self):
+        prefix = "Reading conf from SPIFFS and applying to usrConf"
+        if not self.stored:
+            self._out(prefix + "File does not exist")
+            return
+        try:
+            values = self.layout.decode_b64(self.stored)
+        except ConfStructError:
+            self._out(prefix + f"Encoded Data Read: {self.stored}", "Config data too short, corrupted?")
+            return
+        # readConfFromSPIFFS() memcpys into usrConf before it validates, so
+        # a rejected blob stays in the running config
+        values, err = validate_cross_field(self.kind, values)
+        self.config.update(values)
+        if err:
+            self._out(prefix + f"Encoded Data Read: {self.stored}", f"Config cross-validation failed: {err}")
+            return
+        err = validate_config(self.layout, self.config)
+        if err:
+            self._out(prefix + f"Encoded Data Read: {self.stored}", f"Config validation failed: {err}")
+            return
+        self._out(prefix + f"Encoded Data Read: {self.stored}", "Struct successfully read from SPIFFS")
+
+    def _state(self) -> str:
+        on = lambda flag: "ON" if flag else "OFF"
+        return json.dumps({
+            "hall": "ON", "radio": on(self.radio), "display": "ON", "wifi": on(self.wifi),
+            "locked": self.locked, "paired": bool(self.config.get("paired")),
+            "throttle_mode": self.config.get("throttle_mode", 0), "gear": 0,
+            "max_gears": self.config.get("max_gears", 10), "max_power_cap": 100,
+            "error": 0, "last_pkt_ms": 40,
+        }, separators=(",", ":"))
+
+    def _handle(self, line: str):
+        if line == "quit":
+            self._stream_cmd = None
+            return
+        if not line.startswith("?"):
+            return
+        parts = line[1:].split(None, 1)
+        name = parts[0].lower() if parts else ""
+        args = parts[1].strip() if len(parts) > 1 else ""
+
+        if name.startswith("print"):
+            if self.kind == "rx" and name == "printinputs" or self.kind == "tx" and name in (
+                    "printbat", "printpwm", "printreceived"):
+                self._out(f"Unknown command: {name}")
+                return
+            self._out(self._frame(name, args == "json").rstrip("\r\n"))
+            if self.stream and name != "printpackets":
+                self._stream_cmd = (name, args == "json")
+                self._next_frame = time.time() + self.latency + STREAM_PERIODS.get(name, DEFAULT_STREAM_PERIOD)
+        elif name == "conf":
+            if args.lower() == "json":
+                self._out(json.dumps(self.config_json(), separators=(",", ":")))
+                return
+            self._out("*" * 38, f"**          BREmote V2 {self.kind.upper()}           **",
+                      f"**        MAC: {self.mac:012X}         **",
+                      f"**          SW Version: {SW_VERSION:<10d}  **",
+                      f"**  Compiled: {BUILD_DATE} {BUILD_TIME}  **", "*" * 38)
+            self._out(f"Encoded Data Read: {self.stored}" if self.stored else "Failed to open file for reading")
+            self._out("Configuration Struct Values:",
+                      *(f"{key}: {self._value(key)}" for key in self.config), "----------------------")
+        elif name == "keys":
+            self._out(*self.config)
+        elif name == "get":
+            if args in self.config:
+                self._out(f"{args}={self._value(args)}")
+            else:
+                self._out(f"ERR: ERR_UNKNOWN_KEY:{args}")
+        elif name == "set":
+            key, _, value = args.replace("=", " ", 1).partition(" ")
+            value = value.strip()
+            if key not in self.config:
+                self._out(f"ERR: ERR_UNKNOWN_KEY:{key}")
+            else:
+                try:
+                    staged = dict(self.config, **{key: self.layout.parse_value(key, value)})
+                except ConfStructError:
+                    self._out(f"ERR: ERR_BAD_VALUE:{key}")
+                    return
+                err = check_value(self.layout, key, staged[key])
+                if err:
+                    self._out(f"ERR: {err}")
+                    return
+                staged, err = validate_cross_field(self.kind, staged)
+                if err:
+                    self._out(f"ERR: {err}")
+                    return
+                self.config = staged
+                self._out(f"OK {key}={self._value(key)}")
+                if key in RADIO_REINIT_KEYS:
+                    self._out("NOTE: radio reinit required (?reboot)")
+        elif name == "save":
+            self.config, err = validate_cross_field(self.kind, self.config)
+            if err:
+                self._out(f"ERR: cross-validation failed: {err}")
+                return
+            err = validate_config(self.layout, self.config)
+            if err:
+                self._out(f"ERR: validation failed: {err}")
+                return
+            self.stored = self.layout.encode_b64(self.config)
+            self._out("Struct saved to SPIFFS as Base64", f"Encoded Data: {self.stored}",
+                      "OK config saved to SPIFFS")
+        elif name == "setconf":
+            self.stored = args
+            self._out(f"Setting configuration to: {args}")
+            self._out("Struct saved to SPIFFS as Base64", delay=SPIFFS_WRITE_DELAY)
+        elif name == "applyconf":
+            self._applyconf()
+        elif name == "state" and self.kind == "tx":
+            self._out(self._state())
+        elif name == "wifi":
+            if args == "on":
+                self.wifi = True
+                self._out("WiFi/AP config service enabled.")
+            elif args == "off":
+                self.wifi = False
+                self._out("WiFi/AP config service disabled.")
+            elif args == "":
+                self._out(f"wifi={'ON' if self.wifi else 'OFF'}")
+            else:
+                self._out("ERR: usage: ?wifi on|off")
+        elif name == "radio" and self.kind == "tx":
+            if args in ("on", "off"):
+                self.radio = args == "on"
+                self._out(f"Radio activity {'enabled' if self.radio else 'disabled'}.")
+            else:
+                self._out(f"radio={'ON' if self.radio else 'OFF'}")
+        elif name == "exitchg" and self.kind == "tx":
+            self._out(" Exit by user")
+        elif name == "wifiver":
+            self._out(f"ui_target={WEB_UI_VERSION}", f"ui_installed={self.ui_installed}")
+        elif name == "wifiupd":
+            self.ui_installed = WEB_UI_VERSION
+            self._out(f"UI updated to {WEB_UI_VERSION}")
+        else:
+            self._out(f"Unknown command: {name}")
+
+
+class EmulatedDevice(BREmoteDevice):
+    """BREmoteDevice connected to an EmulatedSerial instead of a port"""
+
+    def __init__(self, port: str, kind: str = "tx", latency: float = 0.0,
+                 stream: bool = True, **kwargs):
+        super().__init__(port, **kwargs)
+        self.kind = kind
+        self.latency = latency
+        self.stream = stream
+
+    def connect(self) -> bool:
+        self.serial = EmulatedSerial(self.kind, latency=self.latency, stream=self.stream)
+        return True
+
+
+class _SocketWriter:
+    """Thread-safe write() for the RFC 2217 PortManager"""
+
+    def __init__(self, sock: socket.socket):
+        self.sock = sock
+        self.lock = threading.Lock()
+
+    def write(self, data: bytes):
+        with self.lock:
+            self.sock.sendall(data)
+
+
+class EmulatedPortServer:
+    """Networked serial server stand-in serving one emulated unit.
+
+    With rfc2217=True it speaks RFC 2217 (connect with rfc2217://host:port),
+    otherwise it is a raw TCP bridge (socket://host:port). Clients are
+    served one at a time, like a serial port. connections counts the TCP
+    sessions accepted.
+    """
+
+    def __init__(self, kind: str = "tx", rfc2217: bool = True, host: str = "127.0.0.1",
+                 port: int = 0, latency: float = 0.0, stream: bool = True):
+        self.serial = EmulatedSerial(kind, latency=latency, stream=stream)
+        self.rfc2217 = rfc2217
+        self.connections = 0
+        self._listener = socket.create_server((host, port))
+        self._closed = threading.Event()
+        self._thread = threading.Thread(target=self._serve, daemon=True)
+        self._thread.start()
+
+    @property
+    def address(self) -> Tuple[str, int]:
+        return self._listener.getsockname()[:2]
+
+    @property
+    def url(self) -> str:
+        host, port = self.address
+        return f"{'rfc2217' if self.rfc2217 else 'socket'}://{host}:{port}"
+
+    def close(self):
+        self._closed.set()
+        self._listener.close()
+
+    def _serve(self):
+        while not self._closed.is_set():
+            try:
+                client, _ = self._listener.accept()
+            except OSError:
+                return
+            self.connections += 1
+            with client:
+                client.setsockopt(socket.IPPROTO_TCP, socket.TCP_NODELAY, 1)
+                self._bridge(client)
+
+    def _bridge(self, client: socket.socket):
+        writer = _SocketWriter(client)
+        manager = serial.rfc2217.PortManager(self.serial, writer) if self.rfc2217 else None
+        done = threading.Event()
+
+        def device_to_network():
+            while not done.is_set():
+                waiting = self.serial.in_waiting
+                if not waiting:
+                    time.sleep(0.002)
+                    continue
+                data = self.serial.read(waiting)
+                try:
+                    writer.write(b"".join(manager.escape(data)) if manager else data)
+                except OSError:
+                    return
+
+        pump = threading.Thread(target=device_to_network, daemon=True)
+        pump.start()
+        try:
+            while not self._closed.is_set():
+                data = client.recv(1024)
+                if not data:
+                    break
+                self.serial.write(b"".join(manager.filter(data)) if manager else data)
+        except OSError:
+            pass
+        finally:
+            done.set()
+            pump.join()
+
+
+class EmulatedWebApi:
+    """Web config API (WebConfigEngine.h) of an emulated unit.
+
+    Serves GET /api/config, POST /api/set_batch and POST /api/save for the
+    config of an EmulatedSerial on a local HTTP port, so web API paths run
+    without joining the unit's AP. requests counts the calls served.
+    """
+
+    def __init__(self, serial_port: EmulatedSerial, host: str = "127.0.0.1", port: int = 0):
+        self.serial = serial_port
+        self.requests = 0
+        self._server = ThreadingHTTPServer((host, port), self._handler())
+        self._server.daemon_threads = True
+        self._thread = threading.Thread(target=self._server.serve_forever, daemon=True)
+        self._thread.start()
+
+    @property
+    def url(self) -> str:
+        host, port = self._server.server_address[:2]
+        return f"http://{host}:{port}"
+
+    def close(self):
+        self._server.shutdown()
+        self._server.server_close()
+
+    def _handler(self):
+        api = self
+
+        class Handler(BaseHTTPRequestHandler):
+            def log_message(self, *args):
+                pass
+
+            def _send(self, status: int, body: Dict[str, Any]):
+                data = json.dumps(body, separators=(",", ":")).encode()
+                self.send_response(status)
+                self.send_header("Content-Type", "application/json")
+                self.send_header("Content-Length", str(len(data)))
+                self.end_headers()
+                self.wfile.write(data)
+
+            def do_GET(self):
+                api.requests += 1
+                if urlparse(self.path).path == "/api/config":
+                    self._send(200, {"ok": 1, "data": api.serial.config_json()})
+                else:
+                    self._send(404, {"ok": 0, "err": "ERR_NOT_FOUND"})
+
+            def do_POST(self):
+                api.requests += 1
+                path = urlparse(self.path).path
+                length = int(self.headers.get("Content-Length") or 0)
+                form = parse_qs(self.rfile.read(length).decode())
+                if path == "/api/set_batch":
+                    try:
+                        changes = json.loads(form.get("payload", [""])[0])
+                    except ValueError:
+                        self._send(400, {"ok": 0, "err": "ERR_BAD_VALUE:batch_json"})
+                        return
+                    err = api.serial.set_batch(changes)
+                    if err:
+                        self._send(400, {"ok": 0, "err": err})
+                    else:
+                        self._send(200, {"ok": 1, "pending_save": 1})
+                elif path == "/api/save":
+                    api.serial.save()
+                    self._send(200, {"ok": 1, "saved": 1})
+                else:
+                    self._send(404, {"ok": 0, "err": "ERR_NOT_FOUND"})
+
+        return Handler
@@ -0,0 +1,209 @@
+"""
+BREmote Test Suite - Sample Export
+Streams raw radio link samples to disk from a background writer thread.
+"""
+
+import csv
+import json
+import os
+import queue
+import threading
+import time
+import logging
+from typing import Optional, Dict, Any, List
+
+# Optional Parquet/Arrow support
+try:
+    import pyarrow as pa
+    import pyarrow.parquet as pq
+    ARROW_AVAILABLE = True
+except ImportError:
+    ARROW_AVAILABLE = False
+
+logger = logging.getLogger(__name__)
+
+SAMPLE_FIELDS = [
+    "pair",
+    "timestamp",
+    "tx_throttle",
+    "tx_steering",
+    "rx_throttle",
+    "rx_steering",
+    "rssi",
+    "snr",
+    "slot",
+]
+
+FORMAT_EXTENSIONS = {
+    ".csv": "csv",
+    ".jsonl": "jsonl",
+    ".ndjson": "jsonl",
+    ".parquet": "parquet",
+    ".arrow": "arrow",
+    ".feather": "arrow",
+}
+
+
+def detect_format(path: str) -> str:
+    """Pick an export format from the file extension (defaults to CSV)"""
+    ext = os.path.splitext(path)[1].lower()
+    return FORMAT_EXTENSIONS.get(ext, "csv")
+
+
+def check_format(path: str, fmt: Optional[str] = None) -> str:
+    """Export format for path; raises before any device is touched.
+
+    ValueError for an unknown format, RuntimeError when it needs pyarrow
+    and pyarrow is not installed.
+    """
+    fmt = fmt or detect_format(path)
+    if fmt not in ("csv", "jsonl", "parquet", "arrow"):
+        raise ValueError(f"Unsupported sample format: {fmt}")
+    if fmt in ("parquet", "arrow") and not ARROW_AVAILABLE:
+        raise RuntimeError(f"{fmt} export requires pyarrow (pip install pyarrow)")
+    return fmt
+
+
+class SampleWriter:
+    """Buffered sample writer running in its own thread.
+
+    write() never blocks the caller: rows go to a bounded queue and are
+    written in batches by the writer thread. If the queue is full the row
+    is dropped and counted, so the serial readers keep up with the device.
+    Parquet output writes one row group per batch.
+    """
+
+    _STOP = object()
+
+    def __init__(self, path: str, fmt: Optional[str] = None,
+                 batch_size: int = 1024, queue_size: int = 65536,
+                 flush_interval: float = 1.0):
+        self.path = path
+        self.format = check_format(path, fmt)
+
+        self.batch_size = batch_size
+        self.flush_interval = flush_interval
+        self.queue: "queue.Queue" = queue.Queue(maxsize=queue_size)
+        self.rows_written = 0
+        self.rows_dropped = 0
+        # write() is called from every pair's reader threads
+        self._drop_lock = threading.Lock()
+        self.thread: Optional[threading.Thread] = None
+        self._file = None
+        self._csv_writer = None
+        self._arrow_writer = None
+        self._arrow_schema = None
+
+    def __enter__(self):
+        self.start()
+        return self
+
+    def __exit__(self, exc_type, exc, tb):
+        self.close()
+
+    def start(self):
+        """Open the output file and start the writer thread"""
+        self._open()
+        self.thread = threading.Thread(target=self._run, name="sample-writer", daemon=True)
+        self.thread.start()
+
+    def write(self, row: Dict[str, Any]):
+        """Queue one sample row (non-blocking)"""
+        try:
+            self.queue.put_nowait(row)
+        except queue.Full:
+            with self._drop_lock:
+                self.rows_dropped += 1
+
+    def close(self):
+        """Flush remaining rows and close the file"""
+        if self.thread:
+            self.queue.put(self._STOP)
+            self.thread.join()
+            self.thread = None
+        self._close()
+
+    def stats(self) -> Dict[str, Any]:
+        """Export counters for reports"""
+        return {
+            "samples_file": self.path,
+            "samples_format": self.format,
+            "samples_written": self.rows_written,
+            "samples_dropped": self.rows_dropped,
+        }
+
+    def _run(self):
+        # Text formats flush every flush_interval; columnar formats only
+        # write full row groups (plus the remainder on close)
+        columnar = self.format in ("parquet", "arrow")
+        batch: List[Dict[str, Any]] = []
+        last_flush = time.time()
+        while True:
+            try:
+                row = self.queue.get(timeout=self.flush_interval)
+            except queue.Empty:
+                row = None
+            if row is self._STOP:
+                self._flush(batch)
+                return
+            if row is not None:
+                batch.append(row)
+            due = not columnar and time.time() - last_flush >= self.flush_interval
+            if len(batch) >= self.batch_size or (due and batch):
+                self._flush(batch)
+                batch = []
+                last_flush = time.time()
+
+    def _flush(self, batch: List[Dict[str, Any]]):
+        if not batch:
+            return
+        try:
+            self._write_batch(batch)
+            self.rows_written += len(batch)
+        except Exception as e:
+            logger.error(f"Sample export to {self.path} failed: {e}")
+
+    def _open(self):
+        if self.format == "csv":
+            self._file = open(self.path, "w", newline="", encoding="utf-8")
+            self._csv_writer = csv.DictWriter(self._file, fieldnames=SAMPLE_FIELDS, extrasaction="ignore")
+            self._csv_writer.writeheader()
+        elif self.format == "jsonl":
+            self._file = open(self.path, "w", encoding="utf-8")
+        else:
+            self._arrow_schema = pa.schema([
+                ("pair", pa.string()),
+                ("timestamp", pa.float64()),
+                ("tx_throttle", pa.int16()),
+                ("tx_steering", pa.int16()),
+                ("rx_throttle", pa.int16()),
+                ("rx_steering", pa.int16()),
+                ("rssi", pa.int16()),
+                ("snr", pa.float32()),
+                ("slot", pa.int64()),
+            ])
+            if self.format == "parquet":
+                self._arrow_writer = pq.ParquetWriter(self.path, self._arrow_schema)
+            else:
+                self._arrow_writer = pa.ipc.new_file(self.path, self._arrow_schema)
+
+    def _write_batch(self, batch: List[Dict[str, Any]]):
+        if self.format == "csv":
+            self._csv_writer.writerows(batch)
+            self._file.flush()
+        elif self.format == "jsonl":
+            self._file.write("".join(json.dumps(row) + "\n" for row in batch))
+            self._file.flush()
+        else:
+            columns = {name: [row.get(name) for row in batch] for name in SAMPLE_FIELDS}
+            # One Parquet row group / Arrow record batch per write batch
+            table = pa.Table.from_pydict(columns, schema=self._arrow_schema)
+            self._arrow_writer.write_table(table)
+
+    def _close(self):
+        if self._file:
+            self._file.close()
+            self._file = None
+        if self._arrow_writer:
+            self._arrow_writer.close()
+            self._arrow_writer = None
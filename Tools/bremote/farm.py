@@ -0,0 +1,424 @@
+"""
+BREmote Test Suite - Test Farm
+Coordinator/worker test farm over TCP.
+
+A worker owns the units on its USB ports and serves them over a compact
+RPC: each message is a 4-byte big-endian length followed by a UTF-8
+JSON object. Suites run on the worker next to the serial port, so one
+"run" request per unit crosses the network, not one per command. The
+coordinator discovers the units of every worker, runs them all in
+parallel and merges the TestReports.
+
+Requests:  {"id": n, "op": "hello" | "run" | "command" | "state", "args": {...}}
+Responses: {"id": n, "ok": true, "result": ...} or {"id": n, "ok": false, "error": "..."}
+"""
+
+import argparse
+import json
+import socket
+import socketserver
+import struct
+import threading
+import time
+from concurrent.futures import ThreadPoolExecutor
+from dataclasses import dataclass
+from typing import Any, Dict, List, Optional, Tuple
+
+from .models import DeviceType, TestResult, TestReport
+from .device import BREmoteDevice
+from .registry import SelectorError, parse_selector
+from .runner import BREmoteTester
+from .scheduler import TransitionCosts
+
+DEFAULT_FARM_PORT = 7700
+# Seconds to wait for a worker reply (hello/command/state), and for a whole
+# "run" of one unit's suites; a hung worker fails its units instead of
+# blocking the coordinator
+DEFAULT_RPC_TIMEOUT = 30.0
+DEFAULT_RUN_TIMEOUT = 900.0
+# Upper bound for one message; a full report is a few tens of kB
+MAX_MESSAGE_SIZE = 16 * 1024 * 1024
+_HEADER = struct.Struct(">I")
+
+
+class FarmError(Exception):
+    """RPC failure reported by a worker or a broken connection"""
+
+
+def send_message(sock: socket.socket, message: Dict[str, Any]):
+    """Send one length-prefixed JSON message"""
+    data = json.dumps(message, separators=(",", ":")).encode("utf-8")
+    sock.sendall(_HEADER.pack(len(data)) + data)
+
+
+def _recv_exact(sock: socket.socket, size: int) -> Optional[bytes]:
+    chunks = []
+    while size:
+        chunk = sock.recv(size)
+        if not chunk:
+            return None
+        chunks.append(chunk)
+        size -= len(chunk)
+    return b"".join(chunks)
+
+
+def recv_message(sock: socket.socket) -> Optional[Dict[str, Any]]:
+    """Receive one message; None when the peer closed the connection"""
+    header = _recv_exact(sock, _HEADER.size)
+    if header is None:
+        return None
+    (size,) = _HEADER.unpack(header)
+    if size > MAX_MESSAGE_SIZE:
+        raise FarmError(f"Message too large ({size} bytes)")
+    data = _recv_exact(sock, size)
+    if data is None:
+        raise FarmError("Connection closed mid-message")
+    return json.loads(data.decode("utf-8"))
+
+
+def parse_address(address: str, default_port: int = DEFAULT_FARM_PORT) -> Tuple[str, int]:
+    """"host:port" (or "host") -> (host, port)"""
+    host, _, port = address.rpartition(":")
+    if not host:
+        return port or "127.0.0.1", default_port
+    return host, int(port)
+
+
+# ========== Worker ==========
+
+class _WorkerHandler(socketserver.BaseRequestHandler):
+    def handle(self):
+        worker: "FarmWorker" = self.server.worker
+        sock = self.request
+        sock.setsockopt(socket.IPPROTO_TCP, socket.TCP_NODELAY, 1)
+        while True:
+            try:
+                request = recv_message(sock)
+            except (OSError, FarmError, ValueError):
+                return
+            if request is None:
+                return
+            response = {"id": request.get("id")}
+            try:
+                response["result"] = worker.dispatch(request.get("op", ""), request.get("args") or {})
+                response["ok"] = True
+            except Exception as e:
+                response["ok"] = False
+                response["error"] = str(e)
+            try:
+                send_message(sock, response)
+            except OSError:
+                return
+
+
+class _ThreadingServer(socketserver.ThreadingMixIn, socketserver.TCPServer):
+    daemon_threads = True
+    allow_reuse_address = True
+
+
+class FarmWorker:
+    """Serves local BREmoteDevices to a coordinator.
+
+    Devices must be connected; unidentified ones are identified on
+    start(). Requests for one device are serialized by a per-device lock;
+    different devices run concurrently.
+    """
+
+    def __init__(self, devices: List[BREmoteDevice], host: str = "127.0.0.1",
+                 port: int = DEFAULT_FARM_PORT, name: Optional[str] = None, log=None):
+        self.devices: Dict[str, BREmoteDevice] = {device.port: device for device in devices}
+        self._locks = {port: threading.Lock() for port in self.devices}
+        self.name = name or socket.gethostname()
+        self.log = log or (lambda message: None)
+        self.transition_costs = TransitionCosts()
+        self._server = _ThreadingServer((host, port), _WorkerHandler, bind_and_activate=True)
+        self._server.worker = self
+        self._thread: Optional[threading.Thread] = None
+
+    @property
+    def address(self) -> Tuple[str, int]:
+        return self._server.server_address[:2]
+
+    def start(self) -> "FarmWorker":
+        for device in self.devices.values():
+            if device.device_type == DeviceType.UNKNOWN:
+                device.identify()
+        self._thread = threading.Thread(target=self._server.serve_forever, daemon=True)
+        self._thread.start()
+        host, port = self.address
+        self.log(f"[WORKER] {self.name} serving {len(self.devices)} device(s) on {host}:{port}")
+        return self
+
+    def serve_forever(self):
+        self.start()
+        self._thread.join()
+
+    def close(self):
+        self._server.shutdown()
+        self._server.server_close()
+        for device in self.devices.values():
+            device.disconnect()
+
+    def _device(self, args: Dict[str, Any]) -> BREmoteDevice:
+        port = args.get("device")
+        if port not in self.devices:
+            raise FarmError(f"Unknown device {port!r}")
+        return self.devices[port]
+
+    def dispatch(self, op: str, args: Dict[str, Any]) -> Any:
+        if op == "hello":
+            return {
+                "worker": self.name,
+                "devices": [{"id": port, "type": device.device_type.value}
+                            for port, device in self.devices.items()],
+            }
+        device = self._device(args)
+        with self._locks[device.port]:
+            if op == "run":
+                return self._run(device, args)
+            if op == "command":
+                return device.send_command(args["command"], timeout=float(args.get("timeout", 2.0)))
+            if op == "state":
+                return device.get_state(refresh=True)
+        raise FarmError(f"Unknown op {op!r}")
+
+    def _run(self, device: BREmoteDevice, args: Dict[str, Any]) -> Dict[str, Any]:
+        tester = BREmoteTester(shuffle=bool(args.get("shuffle")), seed=args.get("seed"),
+                               selector=args.get("selector"))
+        # Transition latencies measured here plan the next run on this worker
+        tester.transition_costs = self.transition_costs
+        self.log(f"[WORKER] Running {device.port} ({device.device_type.value.upper()})")
+        start = time.time()
+        report = tester.run_device_tests(device, log=lambda message: None)
+        self.log(f"[WORKER] {device.port}: {report.overall_result} in {time.time() - start:.1f}s")
+        return report.to_dict()
+
+
+# ========== Coordinator ==========
+
+class FarmClient:
+    """One RPC connection to a worker"""
+
+    def __init__(self, address: Tuple[str, int], timeout: float = DEFAULT_RPC_TIMEOUT):
+        self.address = address
+        self._sock = socket.create_connection(address, timeout=10.0)
+        self._sock.settimeout(timeout)
+        self._sock.setsockopt(socket.IPPROTO_TCP, socket.TCP_NODELAY, 1)
+        self._next_id = 0
+
+    def call(self, op: str, **args) -> Any:
+        self._next_id += 1
+        send_message(self._sock, {"id": self._next_id, "op": op, "args": args})
+        response = recv_message(self._sock)
+        if response is None:
+            raise FarmError(f"Worker {self.address[0]}:{self.address[1]} closed the connection")
+        if not response.get("ok"):
+            raise FarmError(response.get("error", "unknown error"))
+        return response.get("result")
+
+    def close(self):
+        self._sock.close()
+
+    def __enter__(self) -> "FarmClient":
+        return self
+
+    def __exit__(self, *exc):
+        self.close()
+
+
+@dataclass
+class FarmDevice:
+    """A unit attached to a worker"""
+    worker: str
+    address: Tuple[str, int]
+    device_id: str
+    device_type: str
+
+    @property
+    def key(self) -> str:
+        return f"{self.worker}/{self.device_id}"
+
+
+class FarmCoordinator:
+    """Runs the selected suites on every unit of every worker.
+
+    Each unit gets its own connection and coordinator thread, so all
+    units of all workers run in parallel. Reports are keyed
+    "worker/port" in discovery order.
+    """
+
+    def __init__(self, workers: List[Tuple[str, int]], selector: Optional[str] = None,
+                 shuffle: bool = False, seed: Optional[int] = None, log=None,
+                 rpc_timeout: float = DEFAULT_RPC_TIMEOUT, run_timeout: float = DEFAULT_RUN_TIMEOUT):
+        if selector:
+            parse_selector(selector)
+        self.workers = workers
+        self.rpc_timeout = rpc_timeout
+        self.run_timeout = run_timeout
+        self.selector = selector
+        self.shuffle = shuffle
+        self.seed = seed
+        self.log = log or print
+        self.devices: List[FarmDevice] = []
+        self.stats: Dict[str, Any] = {}
+
+    def discover(self) -> List[FarmDevice]:
+        self.devices = []
+        for address in self.workers:
+            with FarmClient(address, timeout=self.rpc_timeout) as client:
+                hello = client.call("hello")
+            name = f"{hello['worker']}@{address[0]}:{address[1]}"
+            for entry in hello["devices"]:
+                if entry["type"] == DeviceType.UNKNOWN.value:
+                    continue
+                self.devices.append(FarmDevice(name, address, entry["id"], entry["type"]))
+            self.log(f"[FARM] {name}: {len(hello['devices'])} device(s)")
+        return self.devices
+
+    def _run_device(self, device: FarmDevice) -> Tuple[TestReport, float]:
+        start = time.time()
+        try:
+            with FarmClient(device.address, timeout=self.run_timeout) as client:
+                result = client.call("run", device=device.device_id, selector=self.selector,
+                                     shuffle=self.shuffle, seed=self.seed)
+            report = TestReport.from_dict(result)
+        except socket.timeout:
+            report = TestReport(device_type=device.device_type, port=device.device_id)
+            report.add_test("run", TestResult.FAIL, f"Error: no reply from worker within {self.run_timeout:g}s")
+            report.overall_result = TestResult.FAIL.value
+        except (OSError, FarmError, ValueError) as e:
+            report = TestReport(device_type=device.device_type, port=device.device_id)
+            report.add_test("run", TestResult.FAIL, f"Error: {str(e)}")
+            report.overall_result = TestResult.FAIL.value
+        elapsed = time.time() - start
+        self.log(f"[FARM] {device.key}: {report.overall_result} in {elapsed:.1f}s")
+        return report, elapsed
+
+    def run(self) -> Dict[str, TestReport]:
+        if not self.devices:
+            self.discover()
+        if not self.devices:
+            self.log("[FARM] No devices on any worker")
+            return {}
+
+        self.log(f"[FARM] Running {len(self.devices)} device(s) on {len(self.workers)} worker(s)")
+        start = time.time()
+        with ThreadPoolExecutor(max_workers=len(self.devices)) as pool:
+            outcomes = list(pool.map(self._run_device, self.devices))
+        elapsed = time.time() - start
+
+        reports = {device.key: report for device, (report, _) in zip(self.devices, outcomes)}
+        device_seconds = sum(seconds for _, seconds in outcomes)
+        per_worker: Dict[str, Dict[str, Any]] = {}
+        for device, (_, seconds) in zip(self.devices, outcomes):
+            entry = per_worker.setdefault(device.worker, {"devices": 0, "device_seconds": 0.0})
+            entry["devices"] += 1
+            entry["device_seconds"] = round(entry["device_seconds"] + seconds, 3)
+        self.stats = {
+            "workers": len(self.workers),
+            "devices": len(self.devices),
+            "elapsed_s": round(elapsed, 3),
+            "device_seconds": round(device_seconds, 3),
+            # device_seconds / elapsed: equals the device count at perfect scaling
+            "parallelism": round(device_seconds / elapsed, 2) if elapsed > 0 else None,
+            "per_worker": per_worker,
+        }
+        return reports
+
+
+# ========== CLI ==========
+
+def _emulated_devices(spec: str, latency: float) -> List[BREmoteDevice]:
+    from .emulator import EmulatedDevice
+    devices = []
+    for idx, kind in enumerate(k.strip().lower() for k in spec.split(",") if k.strip()):
+        if kind not in ("tx", "rx"):
+            raise ValueError(f"Unknown emulated device type {kind!r} (tx or rx)")
+        device = EmulatedDevice(f"emu{idx}-{kind}", kind, latency=latency)
+        device.connect()
+        devices.append(device)
+    return devices
+
+
+def worker_main(argv: Optional[List[str]] = None):
+    parser = argparse.ArgumentParser(prog="bremote worker",
+                                     description="Serve local BREmote units to a test farm coordinator")
+    parser.add_argument('--listen', default=f"127.0.0.1:{DEFAULT_FARM_PORT}",
+                        help=f'Address to listen on (default: 127.0.0.1:{DEFAULT_FARM_PORT})')
+    parser.add_argument('--port', action='append', default=[], help='Serial port to serve (repeatable)')
+    parser.add_argument('--scan', action='store_true', help='Serve every BREmote unit found')
+    parser.add_argument('--emulate', metavar='TYPES', help='Serve emulated units, e.g. "tx,rx,rx"')
+    parser.add_argument('--latency', type=float, default=0.0, help='Emulated response latency in seconds')
+    parser.add_argument('--name', help='Worker name in reports (default: host name)')
+    args = parser.parse_args(argv)
+
+    devices: List[BREmoteDevice] = []
+    if args.emulate:
+        try:
+            devices.extend(_emulated_devices(args.emulate, args.latency))
+        except ValueError as e:
+            parser.error(str(e))
+    ports = list(args.port) + (BREmoteDevice.scan_ports() if args.scan else [])
+    for port in ports:
+        device = BREmoteDevice(port)
+        if device.connect():
+            devices.append(device)
+        else:
+            print(f"[ERROR] Failed to connect to {port}")
+    if not devices:
+        parser.error("no devices to serve (use --port, --scan or --emulate)")
+
+    host, port = parse_address(args.listen)
+    worker = FarmWorker(devices, host, port, name=args.name, log=print)
+    try:
+        worker.serve_forever()
+    except KeyboardInterrupt:
+        print("\n[WORKER] Stopping")
+    finally:
+        worker.close()
+
+
+def main(argv: Optional[List[str]] = None):
+    parser = argparse.ArgumentParser(prog="bremote farm",
+                                     description="Run suites on all units of several farm workers")
+    parser.add_argument('--worker', action='append', required=True, metavar='HOST:PORT',
+                        help='Worker address (repeatable)')
+    parser.add_argument('--test', metavar='SELECTOR', help='Tests to run (same syntax as bremote --test)')
+    parser.add_argument('--shuffle', action='store_true', help='Run tests in random order')
+    parser.add_argument('--seed', type=int, help='Seed for --shuffle')
+    parser.add_argument('--report', help='Save merged reports to JSON file')
+    parser.add_argument('--rpc-timeout', type=float, default=DEFAULT_RPC_TIMEOUT,
+                        help=f'Seconds to wait for a worker reply (default: {DEFAULT_RPC_TIMEOUT:g})')
+    parser.add_argument('--run-timeout', type=float, default=DEFAULT_RUN_TIMEOUT,
+                        help=f'Seconds to wait for one unit\'s suites (default: {DEFAULT_RUN_TIMEOUT:g})')
+    args = parser.parse_args(argv)
+    if args.rpc_timeout <= 0 or args.run_timeout <= 0:
+        parser.error("--rpc-timeout and --run-timeout must be positive")
+
+    try:
+        coordinator = FarmCoordinator([parse_address(w) for w in args.worker], selector=args.test,
+                                      shuffle=args.shuffle, seed=args.seed,
+                                      rpc_timeout=args.rpc_timeout, run_timeout=args.run_timeout)
+    except SelectorError as e:
+        parser.error(str(e))
+
+    try:
+        reports = coordinator.run()
+    except (OSError, FarmError) as e:
+        parser.exit(1, f"[ERROR] Worker discovery failed: {e}\n")
+    if not reports:
+        return
+
+    # Same summary as a local run
+    tester = BREmoteTester()
+    tester.test_results = reports
+    tester._print_summary()
+    stats = coordinator.stats
+    print(f"\n[FARM] {stats['devices']} device(s) in {stats['elapsed_s']:.1f}s "
+          f"({stats['device_seconds']:.1f} device-seconds, parallelism {stats['parallelism']})")
+
+    if args.report:
+        with open(args.report, 'w') as f:
+            json.dump({"farm": stats, "reports": {key: report.to_dict() for key, report in reports.items()}},
+                      f, indent=2)
+        print(f"\n[SAVE] Report saved to: {args.report}")
@@ -0,0 +1,176 @@
+"""
+BREmote Test Suite - Link Quality
+Python port of the firmware's getLinkQuality() (Source/Common/RadioCommon.h).
+
+The firmware maps RSSI/SNR to the 0-10 link score shown on the TX display
+using Arduino map()/constrain() integer semantics. This module reproduces
+that arithmetic exactly, both per value and vectorized with NumPy.
+"""
+
+import math
+import struct
+from typing import List, Sequence, Optional, Dict, Any
+
+# Optional NumPy support for vectorized scoring
+try:
+    import numpy as np
+    NUMPY_AVAILABLE = True
+except ImportError:
+    NUMPY_AVAILABLE = False
+
+LINK_QUALITY_MAX = 10
+
+# Score ranges from getLinkQuality()
+RSSI_RANGE = (-100, -50)
+SNR_RANGE = (-10, 10)
+RSSI_WEIGHT = 0.7
+SNR_WEIGHT = 0.3
+
+
+def _c_div(a: int, b: int) -> int:
+    """Integer division truncating toward zero (C semantics)"""
+    q = abs(a) // abs(b)
+    return q if (a < 0) == (b < 0) else -q
+
+
+def arduino_map(x: float, in_min: int, in_max: int, out_min: int, out_max: int) -> int:
+    """Arduino map() as implemented in the ESP32 core (WMath.cpp).
+
+    Arguments are longs: a float x is truncated toward zero on the call,
+    and the division truncates toward zero.
+    """
+    x = int(x)
+    run = in_max - in_min
+    if run == 0:
+        return 0
+    rise = out_max - out_min
+    delta = x - in_min
+    return _c_div(delta * rise, run) + out_min
+
+
+def arduino_constrain(x, low, high):
+    """Arduino constrain() macro"""
+    return low if x < low else (high if x > high else x)
+
+
+def _float32(x: float) -> float:
+    """Round a double to float precision (float combinedScore)"""
+    return struct.unpack('<f', struct.pack('<f', x))[0]
+
+
+def _arduino_round(x: float) -> int:
+    """Arduino round(): half away from zero"""
+    return int(math.floor(x + 0.5)) if x >= 0 else int(math.ceil(x - 0.5))
+
+
+def link_quality(rssi: float, snr: float) -> int:
+    """Firmware link quality score (0-10) for one RSSI/SNR reading"""
+    rssi_score = arduino_constrain(arduino_map(rssi, RSSI_RANGE[0], RSSI_RANGE[1], 0, LINK_QUALITY_MAX), 0, LINK_QUALITY_MAX)
+    snr_score = arduino_constrain(arduino_map(snr, SNR_RANGE[0], SNR_RANGE[1], 0, LINK_QUALITY_MAX), 0, LINK_QUALITY_MAX)
+    combined = _float32((RSSI_WEIGHT * rssi_score) + (SNR_WEIGHT * snr_score))
+    return arduino_constrain(_arduino_round(combined), 0, LINK_QUALITY_MAX)
+
+
+def _map_array(x, in_min: int, in_max: int, out_min: int, out_max: int):
+    """Vectorized arduino_map() on an int64 array"""
+    run = in_max - in_min
+    if run == 0:
+        return np.zeros_like(x)
+    num = (x - in_min) * (out_max - out_min)
+    q = np.abs(num) // abs(run)
+    q = np.where((num < 0) != (run < 0), -q, q)
+    return q + out_min
+
+
+def link_quality_array(rssi: Sequence[float], snr: Sequence[float]):
+    """Vectorized link_quality() over equally sized RSSI/SNR sequences.
+
+    Returns a NumPy int8 array when NumPy is available, otherwise a list.
+    """
+    if not NUMPY_AVAILABLE:
+        return [link_quality(r, s) for r, s in zip(rssi, snr)]
+
+    r = np.trunc(np.asarray(rssi, dtype=np.float64)).astype(np.int64)
+    s = np.trunc(np.asarray(snr, dtype=np.float64)).astype(np.int64)
+    rssi_score = np.clip(_map_array(r, RSSI_RANGE[0], RSSI_RANGE[1], 0, LINK_QUALITY_MAX), 0, LINK_QUALITY_MAX)
+    snr_score = np.clip(_map_array(s, SNR_RANGE[0], SNR_RANGE[1], 0, LINK_QUALITY_MAX), 0, LINK_QUALITY_MAX)
+    combined = ((RSSI_WEIGHT * rssi_score) + (SNR_WEIGHT * snr_score)).astype(np.float32)
+    # Scores are never negative, so half-away-from-zero is floor(x + 0.5)
+    rounded = np.floor(combined.astype(np.float64) + 0.5)
+    return np.clip(rounded, 0, LINK_QUALITY_MAX).astype(np.int8)
+
+
+def link_quality_histogram(scores) -> List[int]:
+    """Count of samples per score 0..10"""
+    if NUMPY_AVAILABLE:
+        counts = np.bincount(np.asarray(scores, dtype=np.int64), minlength=LINK_QUALITY_MAX + 1)
+        return [int(c) for c in counts[:LINK_QUALITY_MAX + 1]]
+    counts = [0] * (LINK_QUALITY_MAX + 1)
+    for score in scores:
+        counts[int(score)] += 1
+    return counts
+
+
+def link_quality_series(timestamps: Sequence[float], scores,
+                        bucket_seconds: float = 1.0) -> List[List[float]]:
+    """Link quality time series as [seconds_from_start, mean, min] per bucket.
+
+    Timestamps must be in ascending order.
+    """
+    if len(timestamps) == 0:
+        return []
+
+    if NUMPY_AVAILABLE:
+        t = np.asarray(timestamps, dtype=np.float64)
+        values = np.asarray(scores, dtype=np.int64)
+        buckets = ((t - t[0]) // bucket_seconds).astype(np.int64)
+        starts = np.flatnonzero(np.r_[True, buckets[1:] != buckets[:-1]])
+        sums = np.add.reduceat(values, starts)
+        counts = np.diff(np.r_[starts, len(values)])
+        lows = np.minimum.reduceat(values, starts)
+        return [
+            [round(float(b) * bucket_seconds, 3), round(float(total) / float(n), 2), int(low)]
+            for b, total, n, low in zip(buckets[starts], sums, counts, lows)
+        ]
+
+    start = timestamps[0]
+    series: List[List[float]] = []
+    bucket: Optional[int] = None
+    total = 0
+    count = 0
+    low = LINK_QUALITY_MAX
+    for t, score in zip(timestamps, scores):
+        b = int((t - start) // bucket_seconds)
+        if bucket is not None and b != bucket:
+            series.append([round(bucket * bucket_seconds, 3), round(total / count, 2), low])
+            total, count, low = 0, 0, LINK_QUALITY_MAX
+        bucket = b
+        total += int(score)
+        count += 1
+        low = min(low, int(score))
+    series.append([round(bucket * bucket_seconds, 3), round(total / count, 2), low])
+    return series
+
+
+def summarize_link_quality(timestamps: Sequence[float], rssi: Sequence[float],
+                           snr: Sequence[float]) -> Dict[str, Any]:
+    """Per-sample link quality summary for the link report"""
+    if len(rssi) == 0:
+        return {
+            "avg_link_quality": None,
+            "min_link_quality": None,
+            "link_quality_histogram": [0] * (LINK_QUALITY_MAX + 1),
+            "link_quality_series": [],
+        }
+
+    scores = link_quality_array(rssi, snr)
+    if NUMPY_AVAILABLE:
+        total, low = int(scores.sum()), int(scores.min())
+    else:
+        total, low = sum(scores), min(scores)
+    return {
+        "avg_link_quality": round(total / len(scores), 2),
+        "min_link_quality": low,
+        "link_quality_histogram": link_quality_histogram(scores),
+        "link_quality_series": link_quality_series(timestamps, scores),
+    }
@@ -0,0 +1,115 @@
+"""
+BREmote Test Suite - Command Metrics
+Per-command-verb counters and fixed-bucket latency histograms.
+"""
+
+from bisect import bisect_left
+from typing import Dict, Any, Optional
+
+# Histogram bucket upper bounds in ms (1-2-5 log scale); one overflow bucket
+LATENCY_BUCKETS_MS = (1, 2, 5, 10, 20, 50, 100, 200, 500, 1000, 2000, 5000)
+
+
+def command_verb(command: str) -> str:
+    """Verb of a serial command: "?set max_gears 8" -> "set" """
+    parts = command.strip().lstrip("?").split(None, 1)
+    return parts[0].lower() if parts else ""
+
+
+def is_stream_command(command: str) -> bool:
+    """?print* commands keep printing until quit instead of replying once"""
+    return command_verb(command).startswith("print")
+
+
+class LatencyHistogram:
+    """Latency histogram with fixed log-scale buckets (constant memory)"""
+
+    def __init__(self):
+        self.counts = [0] * (len(LATENCY_BUCKETS_MS) + 1)
+        self.count = 0
+        self.total_ms = 0.0
+        self.min_ms: Optional[float] = None
+        self.max_ms: Optional[float] = None
+
+    def record(self, latency_ms: float):
+        self.counts[bisect_left(LATENCY_BUCKETS_MS, latency_ms)] += 1
+        self.count += 1
+        self.total_ms += latency_ms
+        self.min_ms = latency_ms if self.min_ms is None else min(self.min_ms, latency_ms)
+        self.max_ms = latency_ms if self.max_ms is None else max(self.max_ms, latency_ms)
+
+    def percentile(self, pct: float) -> Optional[float]:
+        """Upper bound of the bucket holding the pct-th percentile"""
+        if not self.count:
+            return None
+        rank = pct / 100.0 * self.count
+        seen = 0
+        for idx, n in enumerate(self.counts):
+            seen += n
+            if n and seen >= rank:
+                if idx < len(LATENCY_BUCKETS_MS):
+                    return float(min(LATENCY_BUCKETS_MS[idx], self.max_ms))
+                return self.max_ms
+        return self.max_ms
+
+    def to_dict(self) -> Dict[str, Any]:
+        p50, p95 = self.percentile(50), self.percentile(95)
+        buckets = {f"le_{bound}ms": n for bound, n in zip(LATENCY_BUCKETS_MS, self.counts)}
+        buckets[f"gt_{LATENCY_BUCKETS_MS[-1]}ms"] = self.counts[-1]
+        return {
+            "count": self.count,
+            "avg_ms": round(self.total_ms / self.count, 2) if self.count else None,
+            "min_ms": round(self.min_ms, 2) if self.min_ms is not None else None,
+            "max_ms": round(self.max_ms, 2) if self.max_ms is not None else None,
+            "p50_ms": round(p50, 2) if p50 is not None else None,
+            "p95_ms": round(p95, 2) if p95 is not None else None,
+            "buckets": buckets,
+        }
+
+
+class CommandMetrics:
+    """Counters and first-byte latency per command verb"""
+
+    def __init__(self):
+        self._verbs: Dict[str, Dict[str, Any]] = {}
+
+    def _entry(self, verb: str) -> Dict[str, Any]:
+        entry = self._verbs.get(verb)
+        if entry is None:
+            entry = {"calls": 0, "timeouts": 0, "empty": 0, "streams": 0, "latency": LatencyHistogram()}
+            self._verbs[verb] = entry
+        return entry
+
+    def record(self, command: str, latency_ms: Optional[float] = None,
+               timed_out: bool = False, empty: bool = False):
+        """Record one command. latency_ms is the time to the first response byte.
+
+        A ?print* stream start never goes quiet, so running into the timeout
+        with output is expected and not counted as a timeout.
+        """
+        entry = self._entry(command_verb(command))
+        entry["calls"] += 1
+        if is_stream_command(command):
+            entry["streams"] += 1
+            timed_out = timed_out and empty
+        if timed_out:
+            entry["timeouts"] += 1
+        if empty:
+            entry["empty"] += 1
+        if latency_ms is not None:
+            entry["latency"].record(latency_ms)
+
+    def reset(self):
+        self._verbs = {}
+
+    def to_dict(self) -> Dict[str, Any]:
+        return {
+            verb: {
+                "calls": entry["calls"],
+                "timeouts": entry["timeouts"],
+                "empty": entry["empty"],
+                "streams": entry["streams"],
+                "latency": entry["latency"].to_dict(),
+            }
+            for verb, entry in sorted(self._verbs.items())
+        }
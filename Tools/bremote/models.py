@@ -5,7 +5,7 @@ Data classes and enums used across the test suite.
 
 from dataclasses import dataclass, asdict, field
 from enum import Enum
-from typing import Optional, Dict, Any
+from typing import Optional, Dict, Any, List, Tuple
 from datetime import datetime
 
 
@@ -32,17 +32,38 @@ class TestReport:
     timestamp: str = field(default_factory=lambda: datetime.now().isoformat())
     tests: Dict[str, Dict[str, Any]] = field(default_factory=dict)
     overall_result: str = TestResult.PENDING.value
+    state_cache: Dict[str, int] = field(default_factory=dict)
+    schedule: Dict[str, Any] = field(default_factory=dict)
+    command_metrics: Dict[str, Any] = field(default_factory=dict)
+    # Unit identity: USB serial number, radio address, firmware version
+    usb_serial: Optional[str] = None
+    own_address: Optional[str] = None
+    firmware_version: Optional[str] = None
 
     def to_dict(self) -> Dict[str, Any]:
         """Convert to dictionary for JSON serialization"""
         return asdict(self)
 
-    def add_test(self, name: str, result: TestResult, details: str = ""):
-        """Add a test result"""
+    @classmethod
+    def from_dict(cls, data: Dict[str, Any]) -> "TestReport":
+        """Rebuild a report from to_dict() output (unknown keys are ignored)"""
+        known = {name: value for name, value in data.items() if name in cls.__dataclass_fields__}
+        return cls(**known)
+
+    def add_test(self, name: str, result: TestResult, details: str = "",
+                 stats: Optional[Dict[str, Any]] = None):
+        """Add a test result (stats: per-test timing/serial I/O)"""
         self.tests[name] = {
             "result": result.value,
             "details": details
         }
+        if stats is not None:
+            self.tests[name]["stats"] = stats
+
+    def slowest_tests(self, count: int = 5) -> List[Tuple[str, Dict[str, Any]]]:
+        """Tests with the longest wall time, slowest first"""
+        timed = [(name, test["stats"]) for name, test in self.tests.items() if "stats" in test]
+        return sorted(timed, key=lambda item: item[1].get("wall_s", 0), reverse=True)[:count]
 
     def get_summary(self) -> Dict[str, int]:
         """Get test summary counts"""
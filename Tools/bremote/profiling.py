@@ -0,0 +1,208 @@
+"""
+BREmote Test Suite - Profiling
+Per-phase cProfile sessions and sampled call stacks (--profile DIR).
+
+Code marks phases with `with profiler.phase("scan_ports"):` or the
+@profiled decorator. Every run of a phase gets its own cProfile session;
+sessions of the same phase (e.g. a suite on every unit of a station) are
+merged. One sampler thread records the call stack of every thread inside
+a phase, which gives true stacks for flame graphs.
+
+On Python 3.12+ cProfile is interpreter-wide: a session records the
+calls of every thread and a second one cannot start. There, a phase gets
+a .pstats only from runs that overlapped no other phase (e.g. without
+--jobs); concurrent phases rely on the sampled stacks alone.
+
+write() produces, per phase:
+    <phase>.pstats      python -m pstats / snakeviz
+    <phase>.collapsed   "frame;frame;frame count" (flamegraph.pl, speedscope)
+and summary.json with run counts and wall time per phase.
+
+Profiling is off by default: NULL_PROFILER.phase() returns a shared no-op
+context manager, so instrumented code costs one attribute lookup.
+"""
+
+import cProfile
+import functools
+import json
+import os
+import pstats
+import re
+import sys
+import threading
+import time
+from collections import Counter
+from contextlib import contextmanager, nullcontext
+from typing import Any, Callable, Dict, Iterator, Optional
+
+# Stack sampling period (seconds)
+DEFAULT_SAMPLE_INTERVAL = 0.005
+
+# cProfile runs on sys.monitoring (one interpreter-wide profiler) from 3.12
+EXCLUSIVE_CPROFILE = sys.version_info >= (3, 12)
+
+_NULL_CONTEXT = nullcontext()
+
+
+class NullProfiler:
+    """Disabled profiler: phases are no-ops"""
+    enabled = False
+
+    def phase(self, name: str):
+        return _NULL_CONTEXT
+
+    def write(self) -> Optional[str]:
+        return None
+
+
+NULL_PROFILER = NullProfiler()
+
+
+def profiled(phase: str):
+    """Method decorator: run the method as phase of self.profiler"""
+    def decorator(func: Callable) -> Callable:
+        @functools.wraps(func)
+        def wrapper(self, *args, **kwargs):
+            with self.profiler.phase(phase):
+                return func(self, *args, **kwargs)
+        return wrapper
+    return decorator
+
+
+def _frame_name(code) -> str:
+    return f"{os.path.basename(code.co_filename)}:{code.co_name}"
+
+
+class Profiler:
+    """Collects per-phase profiles (thread-safe).
+
+    Phases nest only across threads: a phase started inside another phase
+    on the same thread is counted in the outer one. With exclusive (the
+    3.12+ cProfile), runs of phases that overlap get no cProfile session.
+    """
+    enabled = True
+
+    def __init__(self, output_dir: str, sample_interval: float = DEFAULT_SAMPLE_INTERVAL,
+                 exclusive: bool = EXCLUSIVE_CPROFILE):
+        self.output_dir = output_dir
+        self.sample_interval = sample_interval
+        self.exclusive = exclusive
+        # exclusive: the session running, and whether another phase overlapped it
+        self._session: Optional[int] = None
+        self._session_overlapped = False
+        self._lock = threading.Lock()
+        self._local = threading.local()
+        self._stats: Dict[str, pstats.Stats] = {}
+        self._stacks: Dict[str, Counter] = {}
+        self._runs: Counter = Counter()
+        self._wall_s: Counter = Counter()
+        self._active: Dict[int, str] = {}
+        self._sampler: Optional[threading.Thread] = None
+        self._stop = threading.Event()
+
+    @contextmanager
+    def phase(self, name: str) -> Iterator[None]:
+        if getattr(self._local, "phase", None) is not None:
+            yield
+            return
+        ident = threading.get_ident()
+        profile: Optional[cProfile.Profile] = cProfile.Profile()
+        with self._lock:
+            if self.exclusive and self._active:
+                # The running session would record this phase's calls too
+                self._session_overlapped = True
+                profile = None
+            elif self.exclusive:
+                self._session, self._session_overlapped = ident, False
+            self._active[ident] = name
+            self._ensure_sampler()
+        if profile is not None:
+            try:
+                profile.enable()
+            except ValueError:
+                # Another profiler owns this interpreter (e.g. an outer
+                # cProfile run); the stack samples still cover the phase
+                profile = None
+        self._local.phase = name
+        start = time.perf_counter()
+        try:
+            yield
+        finally:
+            wall = time.perf_counter() - start
+            if profile is not None:
+                profile.disable()
+            self._local.phase = None
+            with self._lock:
+                self._active.pop(ident, None)
+                self._runs[name] += 1
+                self._wall_s[name] += wall
+                if self._session == ident:
+                    self._session = None
+                    if self._session_overlapped:
+                        profile = None
+                if profile is not None:
+                    if name in self._stats:
+                        self._stats[name].add(profile)
+                    else:
+                        self._stats[name] = pstats.Stats(profile)
+
+    def _ensure_sampler(self):
+        if self._sampler is None or not self._sampler.is_alive():
+            self._stop.clear()
+            self._sampler = threading.Thread(target=self._sample, name="profile-sampler", daemon=True)
+            self._sampler.start()
+
+    def _sample(self):
+        while not self._stop.wait(self.sample_interval):
+            with self._lock:
+                active = dict(self._active)
+            if not active:
+                continue
+            frames = sys._current_frames()
+            samples = []
+            for ident, name in active.items():
+                frame = frames.get(ident)
+                stack = []
+                while frame is not None:
+                    stack.append(_frame_name(frame.f_code))
+                    frame = frame.f_back
+                if stack:
+                    samples.append((name, ";".join(reversed(stack))))
+            with self._lock:
+                for name, stack in samples:
+                    self._stacks.setdefault(name, Counter())[stack] += 1
+
+    def summary(self) -> Dict[str, Dict[str, Any]]:
+        with self._lock:
+            return {name: {"runs": self._runs[name], "wall_s": round(self._wall_s[name], 3),
+                           "samples": sum(self._stacks.get(name, {}).values()),
+                           "pstats": name in self._stats}
+                    for name in sorted(self._runs, key=self._wall_s.get, reverse=True)}
+
+    def write(self) -> str:
+        """Write .pstats / .collapsed per phase and summary.json; returns the directory"""
+        self._stop.set()
+        if self._sampler is not None:
+            self._sampler.join(timeout=1.0)
+        os.makedirs(self.output_dir, exist_ok=True)
+        with self._lock:
+            stats = dict(self._stats)
+            stacks = {name: Counter(counter) for name, counter in self._stacks.items()}
+        for name, phase_stats in stats.items():
+            phase_stats.dump_stats(os.path.join(self.output_dir, f"{_file_name(name)}.pstats"))
+        for name, counter in stacks.items():
+            with open(os.path.join(self.output_dir, f"{_file_name(name)}.collapsed"), "w") as f:
+                for stack, count in counter.most_common():
+                    f.write(f"{stack} {count}\n")
+        with open(os.path.join(self.output_dir, "summary.json"), "w") as f:
+            json.dump(self.summary(), f, indent=2)
+        return self.output_dir
+
+
+def _file_name(phase: str) -> str:
+    return re.sub(r"[^A-Za-z0-9_.-]+", "_", phase).strip("_") or "phase"
+
+
+def get_profiler(output_dir: Optional[str]):
+    """Profiler writing to output_dir, or NULL_PROFILER when it is None"""
+    return Profiler(output_dir) if output_dir else NULL_PROFILER
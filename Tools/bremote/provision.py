@@ -0,0 +1,333 @@
+"""
+BREmote Test Suite - Fleet Provisioning
+Push a config template plus per-unit overrides to every connected unit.
+
+    python -m bremote provision --config fleet.json --scan
+
+fleet.json:
+
+    {
+      "common": {"radio_preset": 2},
+      "tx": {"rf_power": 10, "max_gears": 6},
+      "rx": {"rf_power": 10, "failsafe_time": 500,
+             "pwm0_min": 1000, "pwm0_max": 2000},
+      "units": {
+        "A1:B2:C3": {"rf_power": 5},
+        "FT8X1234": {"failsafe_time": 800},
+        "/dev/ttyUSB3": {"pwm1_max": 1900}
+      }
+    }
+
+"common" applies to TX and RX, then the "tx" / "rx" template, then the
+override of the unit, matched by USB serial number, own_address or
+port. Units are provisioned concurrently, each with a ConfigSession
+(one snapshot, the minimal diff, one save, one read-back), and every
+unit gets an audit record appended to <out>/<unit>.jsonl.
+"""
+
+import argparse
+import json
+import os
+import re
+import sys
+import time
+from concurrent.futures import ThreadPoolExecutor
+from dataclasses import dataclass, field
+from datetime import datetime
+from typing import Any, Callable, Dict, List, Optional
+
+from .configsession import ConfigApplyResult, ConfigSession
+from .confstruct import CURRENT_VERSION, ConfigLayout, ConfStructError, check_value, get_layout
+from .device import BREmoteDevice
+from .models import DeviceType
+from .tracing import tracer
+
+DEFAULT_OUTPUT_DIR = "provision_logs"
+DEFAULT_JOBS = 20
+
+# Web API paths need each unit's AP; a USB batch uses the serial paths
+SERIAL_PATHS = ("auto", "blob", "set")
+
+_FLEET_SECTIONS = ("common", "tx", "rx", "units")
+
+
+class FleetError(ValueError):
+    """Invalid fleet config file"""
+
+
+@dataclass
+class FleetConfig:
+    """Config template per device type plus per-unit overrides"""
+    common: Dict[str, Any] = field(default_factory=dict)
+    tx: Dict[str, Any] = field(default_factory=dict)
+    rx: Dict[str, Any] = field(default_factory=dict)
+    # USB serial, own_address or port -> override
+    units: Dict[str, Dict[str, Any]] = field(default_factory=dict)
+
+    @classmethod
+    def from_dict(cls, data: Dict[str, Any]) -> "FleetConfig":
+        if not isinstance(data, dict):
+            raise FleetError("fleet config must be a JSON object")
+        unknown = set(data) - set(_FLEET_SECTIONS)
+        if unknown:
+            raise FleetError(f"unknown fleet section(s): {', '.join(sorted(unknown))}")
+        for section in _FLEET_SECTIONS:
+            if not isinstance(data.get(section, {}), dict):
+                raise FleetError(f"'{section}' must be an object")
+        for unit, override in data.get("units", {}).items():
+            if not isinstance(override, dict):
+                raise FleetError(f"override of unit '{unit}' must be an object")
+        return cls(**{section: dict(data.get(section, {})) for section in _FLEET_SECTIONS})
+
+    @classmethod
+    def load(cls, path: str) -> "FleetConfig":
+        try:
+            with open(path, encoding="utf-8") as f:
+                return cls.from_dict(json.load(f))
+        except ValueError as e:
+            raise FleetError(f"{path}: {e}") from None
+
+    def match_unit(self, identity: Dict[str, Optional[str]], port: str) -> Optional[str]:
+        """Key of the unit override for a device, if any"""
+        candidates = [identity.get("usb_serial"), identity.get("own_address"), port]
+        wanted = {c.upper() for c in candidates if c}
+        for key in self.units:
+            if key.upper() in wanted:
+                return key
+        return None
+
+    def validate(self, version: int = CURRENT_VERSION) -> List[str]:
+        """Problems in the templates and overrides, checked against the
+        layouts and field ranges of a firmware struct version"""
+        layouts = {device_type: get_layout(device_type, version) for device_type in ("tx", "rx")}
+        problems = _check_values("common", self.common, list(layouts.values()))
+        problems += _check_values("tx", self.tx, [layouts["tx"]])
+        problems += _check_values("rx", self.rx, [layouts["rx"]])
+        for unit, override in self.units.items():
+            # The type of a unit is only known once it is connected: an
+            # override has to fit TX or RX
+            fits = [layout for layout in layouts.values() if set(override) <= set(layout.keys)]
+            if not fits:
+                problems.append(f"units.{unit}: keys fit neither the TX nor the RX config")
+                continue
+            checked = [_check_values(f"units.{unit}", override, [layout]) for layout in fits]
+            if all(checked):
+                problems += checked[0]
+        return problems
+
+    def desired(self, device_type: str, unit: Optional[str] = None) -> Dict[str, Any]:
+        """Config for one unit: common, then its type's template, then its override"""
+        values = dict(self.common)
+        values.update(self.tx if device_type == "tx" else self.rx)
+        if unit is not None:
+            values.update(self.units[unit])
+        return values
+
+
+@dataclass
+class UnitOutcome:
+    """Provisioning of one unit, as written to its audit log"""
+    port: str
+    device_type: str = "unknown"
+    usb_serial: Optional[str] = None
+    own_address: Optional[str] = None
+    firmware_version: Optional[str] = None
+    override: Optional[str] = None
+    desired: Dict[str, Any] = field(default_factory=dict)
+    result: Optional[ConfigApplyResult] = None
+    error: Optional[str] = None
+    # Port without a BREmote unit (no audit record)
+    skipped: bool = False
+    audit_log: Optional[str] = None
+
+    @property
+    def ok(self) -> bool:
+        return self.error is None and self.result is not None and self.result.ok
+
+    @property
+    def unit_id(self) -> str:
+        return self.usb_serial or self.own_address or self.port
+
+    def to_dict(self) -> Dict[str, Any]:
+        return {
+            "timestamp": datetime.now().isoformat(timespec="seconds"),
+            "port": self.port, "device_type": self.device_type,
+            "usb_serial": self.usb_serial, "own_address": self.own_address,
+            "firmware_version": self.firmware_version, "override": self.override,
+            "desired": self.desired, "ok": self.ok,
+            "error": self.error or (self.result.error if self.result else None),
+            "result": self.result.to_dict() if self.result else None,
+        }
+
+
+class Provisioner:
+    """Applies a FleetConfig to many units concurrently"""
+
+    def __init__(self, fleet: FleetConfig, output_dir: str = DEFAULT_OUTPUT_DIR,
+                 jobs: int = DEFAULT_JOBS, path: str = "auto",
+                 log: Callable[[str], None] = print):
+        if path not in SERIAL_PATHS:
+            raise ValueError(f"unknown path {path!r} (choose from {', '.join(SERIAL_PATHS)})")
+        self.fleet = fleet
+        self.output_dir = output_dir
+        self.jobs = max(1, jobs)
+        self.path = path
+        self.log = log
+
+    def run(self, devices: List[BREmoteDevice]) -> List[UnitOutcome]:
+        """Provision every device; outcomes in the order of devices"""
+        os.makedirs(self.output_dir, exist_ok=True)
+        with ThreadPoolExecutor(max_workers=min(self.jobs, max(1, len(devices))),
+                                thread_name_prefix="provision") as pool:
+            return list(pool.map(self.provision, devices))
+
+    def provision(self, device: BREmoteDevice) -> UnitOutcome:
+        """Identify, configure and verify one unit, then append its audit record"""
+        outcome = UnitOutcome(port=device.port)
+        with tracer.span("provision", device.port, "provision"):
+            try:
+                self._provision(device, outcome)
+            except (ValueError, OSError) as e:
+                outcome.error = str(e)
+        if not outcome.skipped:
+            outcome.audit_log = self._write_audit(outcome)
+        self.log(_summary_line(outcome))
+        return outcome
+
+    def _provision(self, device: BREmoteDevice, outcome: UnitOutcome):
+        if not device.is_connected() and not device.connect():
+            outcome.error = "failed to connect"
+            return
+        if device.device_type == DeviceType.UNKNOWN and device.identify() == DeviceType.UNKNOWN:
+            outcome.error = "not a BREmote unit"
+            outcome.skipped = True
+            return
+        outcome.device_type = device.device_type.value
+        identity = device.identity()
+        outcome.usb_serial = identity["usb_serial"]
+        outcome.own_address = identity["own_address"]
+        outcome.firmware_version = identity["firmware_version"]
+        outcome.override = self.fleet.match_unit(identity, device.port)
+        outcome.desired = self.fleet.desired(outcome.device_type, outcome.override)
+        outcome.result = ConfigSession(device).apply(outcome.desired, path=self.path)
+
+    def _write_audit(self, outcome: UnitOutcome) -> str:
+        name = re.sub(r"[^A-Za-z0-9_.-]+", "_", outcome.unit_id).strip("_") or "unit"
+        path = os.path.join(self.output_dir, f"{name}.jsonl")
+        with open(path, "a", encoding="utf-8") as f:
+            f.write(json.dumps(outcome.to_dict(), separators=(",", ":")) + "\n")
+        return path
+
+    def unmatched_overrides(self, outcomes: List[UnitOutcome]) -> List[str]:
+        """Unit overrides that matched no connected unit"""
+        used = {outcome.override for outcome in outcomes}
+        return [key for key in self.fleet.units if key not in used]
+
+
+def _check_values(section: str, values: Dict[str, Any], layouts: List[ConfigLayout]) -> List[str]:
+    """Unknown keys and values ?set would reject, for every layout given"""
+    problems = []
+    for key, value in values.items():
+        for layout in layouts:
+            where = f"{section}.{key}" + (f" ({layout.device_type.upper()})" if len(layouts) > 1 else "")
+            if key not in layout.by_key:
+                problems.append(f"{where}: not a {layout.device_type.upper()} config key")
+                continue
+            try:
+                err = check_value(layout, key, layout.parse_value(key, value))
+            except ConfStructError:
+                err = f"ERR_BAD_VALUE:{key}"
+            if err:
+                problems.append(f"{where}: {value!r} rejected ({err})")
+    return problems
+
+
+def _summary_line(outcome: UnitOutcome) -> str:
+    label = f"{outcome.port} {outcome.device_type.upper()} {outcome.own_address or ''}".rstrip()
+    result = outcome.result
+    if outcome.skipped:
+        return f"  [SKIP] {outcome.port}: {outcome.error}"
+    if result is None:
+        return f"  [FAIL] {label}: {outcome.error}"
+    status = "[OK]  " if outcome.ok else "[FAIL]"
+    line = (f"  {status} {label}: path={result.path} changes={len(result.changes)} "
+            f"round_trips={result.round_trips} {result.timings_ms.get('total', 0):.0f}ms")
+    if result.clamped:
+        line += f" clamped={','.join(result.clamped)}"
+    if result.reboot_required:
+        line += " (?reboot for radio changes)"
+    if result.error:
+        line += f" - {result.error}"
+    return line
+
+
+def _emulated_devices(spec: str) -> List[BREmoteDevice]:
+    from .emulator import EmulatedDevice
+    devices = []
+    for idx, kind in enumerate(k.strip().lower() for k in spec.split(",") if k.strip()):
+        if kind not in ("tx", "rx"):
+            raise ValueError(f"Unknown emulated device type {kind!r} (tx or rx)")
+        devices.append(EmulatedDevice(f"emu{idx}-{kind}", kind, stream=False))
+    return devices
+
+
+def main(argv: Optional[List[str]] = None):
+    parser = argparse.ArgumentParser(prog="bremote provision",
+                                     description="Push a fleet config to every connected TX/RX")
+    parser.add_argument('--config', required=True, metavar='FLEET.json',
+                        help='Templates ("common", "tx", "rx") and per-unit overrides ("units")')
+    parser.add_argument('--port', action='append', default=[], help='Serial port to provision (repeatable)')
+    parser.add_argument('--scan', action='store_true',
+                        help='Provision every port found (default when no --port is given)')
+    parser.add_argument('--emulate', metavar='TYPES', help='Provision emulated units, e.g. "tx,rx,rx"')
+    parser.add_argument('--jobs', '-j', type=int, default=DEFAULT_JOBS,
+                        help=f'Units provisioned in parallel (default: {DEFAULT_JOBS})')
+    parser.add_argument('--path', choices=SERIAL_PATHS, default='auto',
+                        help='Apply path: one ?setconf blob or pipelined ?set (default: auto)')
+    parser.add_argument('--out', default=DEFAULT_OUTPUT_DIR, help='Directory for per-unit audit logs')
+    parser.add_argument('--trace', metavar='FILE.json',
+                        help='Write a Chrome trace / Perfetto timeline of all units')
+    args = parser.parse_args(argv)
+
+    try:
+        fleet = FleetConfig.load(args.config)
+    except (FleetError, OSError) as e:
+        parser.error(str(e))
+    # Before any unit is touched: a typo must not become 20 unit failures
+    problems = fleet.validate()
+    if problems:
+        parser.error(f"{args.config}: invalid fleet config:\n  " + "\n  ".join(problems))
+    devices: List[BREmoteDevice] = []
+    if args.emulate:
+        try:
+            devices.extend(_emulated_devices(args.emulate))
+        except ValueError as e:
+            parser.error(str(e))
+    ports = list(args.port)
+    if args.scan or not (ports or args.emulate):
+        ports += [port for port in BREmoteDevice.scan_ports() if port not in ports]
+    devices.extend(BREmoteDevice(port) for port in ports)
+    if not devices:
+        parser.error("no units to provision (use --port, --scan or --emulate)")
+
+    provisioner = Provisioner(fleet, output_dir=args.out, jobs=args.jobs, path=args.path)
+    print(f"[PROVISION] {len(devices)} unit(s), {provisioner.jobs} in parallel")
+    if args.trace:
+        tracer.start(args.trace)
+    start = time.time()
+    try:
+        outcomes = provisioner.run(devices)
+    finally:
+        for device in devices:
+            device.disconnect()
+        if args.trace:
+            print(f"[TRACE] {tracer.events} event(s) written to {tracer.close()}")
+
+    units = [outcome for outcome in outcomes if not outcome.skipped]
+    failed = [outcome for outcome in units if not outcome.ok]
+    print(f"\n[PROVISION] {len(units) - len(failed)}/{len(units)} unit(s) provisioned and verified "
+          f"in {time.time() - start:.1f}s; audit logs in {args.out}")
+    for key in provisioner.unmatched_overrides(outcomes):
+        print(f"  [WARN] override '{key}' matched no connected unit")
+    if failed or not units:
+        sys.exit(1)
@@ -0,0 +1,159 @@
+"""
+BREmote Test Suite - Test Registry
+Tagged registry of suite tests and selector expressions for --test.
+"""
+
+import re
+from typing import Callable, Dict, List, Optional, Sequence, Set, Tuple
+
+from .scheduler import TestCase
+
+# Known tags besides device type, suite and test names
+TAGS = ("tx", "rx", "radio", "config", "wifi", "destructive", "slow")
+
+# Registered tests per device type ("tx"/"rx"), in registration order
+_REGISTRY: Dict[str, List[TestCase]] = {"tx": [], "rx": []}
+
+
+def register_test(name: str, suite: str, devices: Sequence[str] = ("tx",),
+                  tags: Sequence[str] = (), requires: Optional[Dict[str, bool]] = None,
+                  changes: Tuple[str, ...] = ()):
+    """Decorator registering a suite test function.
+
+    Every test is also tagged with its device type, its suite (lowercase)
+    and its own name, so `--test hall` and `--test config` work as
+    selectors. Apply below @staticmethod.
+    """
+    def decorator(func: Callable):
+        for device_type in devices:
+            all_tags = (device_type, suite.lower(), name) + tuple(tags)
+            _REGISTRY[device_type].append(TestCase(
+                name=name,
+                func=func,
+                suite=suite,
+                requires=dict(requires or {}),
+                changes=tuple(changes),
+                tags=tuple(dict.fromkeys(all_tags)),
+            ))
+        return func
+    return decorator
+
+
+def registered_tests(device_type: str, suite: Optional[str] = None) -> List[TestCase]:
+    """Registered tests for a device type, optionally limited to one suite"""
+    return [case for case in _REGISTRY.get(device_type, [])
+            if suite is None or case.suite == suite]
+
+
+def _load_suites():
+    # Suites register on import; make sure they are loaded
+    from . import tests  # noqa: F401
+
+
+def known_tags() -> Set[str]:
+    """Every tag usable in a selector"""
+    _load_suites()
+    tags = set(TAGS) | {"all"}
+    for cases in _REGISTRY.values():
+        for case in cases:
+            tags.update(case.tags)
+    return tags
+
+
+class SelectorError(ValueError):
+    """Invalid --test selector expression"""
+
+
+_TOKEN_RE = re.compile(r"\s*(\(|\)|[A-Za-z0-9_\-]+)")
+
+
+def _tokenize(expression: str) -> List[str]:
+    tokens = []
+    pos = 0
+    expression = expression.strip()
+    while pos < len(expression):
+        match = _TOKEN_RE.match(expression, pos)
+        if not match:
+            raise SelectorError(f"Unexpected character in selector at {pos}: {expression[pos:]!r}")
+        tokens.append(match.group(1))
+        pos = match.end()
+        while pos < len(expression) and expression[pos].isspace():
+            pos += 1
+    return tokens
+
+
+def parse_selector(expression: str) -> Callable[[Sequence[str]], bool]:
+    """Compile a selector such as "radio and not wifi" into a predicate.
+
+    Grammar: expr := term ("or" term)*, term := factor ("and" factor)*,
+    factor := "not" factor | "(" expr ")" | TAG. A comma is accepted as
+    "or". The tag "all" matches every test.
+    """
+    tokens = _tokenize(expression.replace(",", " or "))
+    if not tokens:
+        raise SelectorError("Empty selector")
+    tags = known_tags()
+    pos = 0
+
+    def peek() -> Optional[str]:
+        return tokens[pos].lower() if pos < len(tokens) else None
+
+    def take() -> str:
+        nonlocal pos
+        token = tokens[pos]
+        pos += 1
+        return token
+
+    def parse_or():
+        node = parse_and()
+        while peek() == "or":
+            take()
+            left, right = node, parse_and()
+            node = lambda t, l=left, r=right: l(t) or r(t)
+        return node
+
+    def parse_and():
+        node = parse_not()
+        while peek() == "and":
+            take()
+            left, right = node, parse_not()
+            node = lambda t, l=left, r=right: l(t) and r(t)
+        return node
+
+    def parse_not():
+        token = peek()
+        if token is None:
+            raise SelectorError(f"Incomplete selector: {expression!r}")
+        if token == "not":
+            take()
+            inner = parse_not()
+            return lambda t: not inner(t)
+        if token == "(":
+            take()
+            node = parse_or()
+            if peek() != ")":
+                raise SelectorError(f"Missing ')' in selector: {expression!r}")
+            take()
+            return node
+        if token in ("and", "or", ")"):
+            raise SelectorError(f"Unexpected '{token}' in selector: {expression!r}")
+        tag = take().lower()
+        if tag not in tags:
+            raise SelectorError(f"Unknown tag '{tag}'. Known tags: {', '.join(sorted(tags))}")
+        if tag == "all":
+            return lambda t: True
+        return lambda t: tag in t
+
+    predicate = parse_or()
+    if pos != len(tokens):
+        raise SelectorError(f"Unexpected '{tokens[pos]}' in selector: {expression!r}")
+    return lambda case_tags: predicate(set(case_tags))
+
+
+def select_tests(device_type: str, selector: Optional[str] = None,
+                 suites: Optional[Sequence[str]] = None) -> List[TestCase]:
+    """Registered tests for a device type matching a selector expression"""
+    _load_suites()
+    predicate = parse_selector(selector) if selector else (lambda tags: True)
+    return [case for case in _REGISTRY.get(device_type, [])
+            if (suites is None or case.suite in suites) and predicate(case.tags)]
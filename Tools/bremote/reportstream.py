@@ -0,0 +1,127 @@
+"""
+BREmote Test Suite - Report Streaming
+Appends results to a JSON Lines file as they complete (--report-stream).
+
+Each line is one record, flushed as soon as it is written, so a crash or
+Ctrl+C keeps everything finished so far:
+
+    {"type": "run", "run": ..., "started": ..., "selector": ...}
+    {"type": "test", "run": ..., "port": ..., "device_type": ..., "name": ..., "data": {...}}
+    {"type": "device", "run": ..., "report": {TestReport without tests}}
+    {"type": "link", "run": ..., "pair": ..., "data": {...}}
+
+Several runs can append to the same file; records are tied together by
+the run id. iter_reports() rebuilds TestReports one device at a time.
+"""
+
+import json
+import os
+import threading
+from datetime import datetime
+from typing import Any, Dict, Iterator, Optional, Tuple
+
+from .models import TestReport, TestResult
+
+
+class ReportStreamWriter:
+    """Thread-safe JSON Lines writer for test, device and link records"""
+
+    def __init__(self, path: str, selector: Optional[str] = None):
+        self.path = path
+        self.run = f"{datetime.now().isoformat()}-{os.getpid()}"
+        self._lock = threading.Lock()
+        self._file = open(path, "a", encoding="utf-8")
+        self.records = 0
+        self._write({"type": "run", "started": datetime.now().isoformat(), "selector": selector})
+
+    def _write(self, record: Dict[str, Any]):
+        line = json.dumps(dict(record, run=self.run), default=str) + "\n"
+        with self._lock:
+            if self._file.closed:
+                return
+            self._file.write(line)
+            self._file.flush()
+            self.records += 1
+
+    def write_test(self, port: str, device_type: str, name: str, data: Dict[str, Any]):
+        """One completed test of a device"""
+        self._write({"type": "test", "port": port, "device_type": device_type,
+                     "name": name, "data": data})
+
+    def write_report(self, report: TestReport):
+        """Device summary; its tests were already written by write_test"""
+        summary = report.to_dict()
+        summary.pop("tests")
+        self._write({"type": "device", "report": summary})
+
+    def write_link(self, pair: str, data: Dict[str, Any]):
+        """Radio link result of one TX/RX pair"""
+        self._write({"type": "link", "pair": pair, "data": data})
+
+    def close(self):
+        with self._lock:
+            self._file.close()
+
+    def __enter__(self):
+        return self
+
+    def __exit__(self, *exc):
+        self.close()
+
+
+def iter_records(path: str) -> Iterator[Dict[str, Any]]:
+    """Records of a stream file in order.
+
+    A line cut short by a crash is skipped.
+    """
+    with open(path, encoding="utf-8") as f:
+        for line in f:
+            try:
+                record = json.loads(line)
+            except json.JSONDecodeError:
+                continue
+            if isinstance(record, dict):
+                yield record
+
+
+def iter_results(path: str) -> Iterator[Tuple[str, Any]]:
+    """("report", TestReport) and ("link", (pair, result)) in one pass.
+
+    Reports are rebuilt lazily, each as soon as its device summary is
+    read, so only the tests of devices still in progress are held in
+    memory. Devices whose summary is missing (interrupted run) are
+    yielded at the end with the tests they finished and overall_result
+    PENDING.
+    """
+    pending: Dict[Tuple[str, str], Dict[str, Any]] = {}
+    for record in iter_records(path):
+        kind = record.get("type")
+        if kind == "test":
+            key = (record.get("run"), record.get("port"))
+            partial = pending.setdefault(key, {"device_type": record.get("device_type"),
+                                               "port": record.get("port"), "tests": {}})
+            partial["tests"][record.get("name")] = record.get("data", {})
+        elif kind == "device":
+            summary = record.get("report", {})
+            partial = pending.pop((record.get("run"), summary.get("port")), None)
+            summary["tests"] = partial["tests"] if partial else {}
+            yield "report", TestReport.from_dict(summary)
+        elif kind == "link":
+            yield "link", (record.get("pair"), record.get("data", {}))
+    for partial in pending.values():
+        yield "report", TestReport(device_type=partial["device_type"], port=partial["port"],
+                                   tests=partial["tests"], overall_result=TestResult.PENDING.value)
+
+
+def iter_reports(path: str) -> Iterator[TestReport]:
+    """Rebuild TestReports lazily (see iter_results)"""
+    for kind, item in iter_results(path):
+        if kind == "report":
+            yield item
+
+
+def iter_link_results(path: str) -> Iterator[Tuple[str, Dict[str, Any]]]:
+    """(pair, link result) for every link record"""
+    for kind, item in iter_results(path):
+        if kind == "link":
+            yield item
@@ -0,0 +1,143 @@
+"""
+BREmote Test Suite - Ring Buffer
+Fixed-capacity byte ring buffer for line-oriented serial streams.
+"""
+
+from typing import List, Dict, Any
+
+DROP_OLDEST = "drop_oldest"
+DROP_NEWEST = "drop_newest"
+
+
+class ByteRingBuffer:
+    """Fixed-capacity byte buffer that yields complete lines.
+
+    Memory is allocated once. When a write does not fit, the overflow
+    policy decides what is lost: DROP_OLDEST overwrites the oldest buffered
+    bytes, DROP_NEWEST discards the part of the write that does not fit.
+    Only complete lines are copied out; an incomplete trailing line stays
+    in place and is not rescanned on the next call.
+    """
+
+    def __init__(self, capacity: int = 64 * 1024, policy: str = DROP_OLDEST):
+        if capacity <= 0:
+            raise ValueError("capacity must be positive")
+        if policy not in (DROP_OLDEST, DROP_NEWEST):
+            raise ValueError(f"Unknown overflow policy: {policy}")
+        self.capacity = capacity
+        self.policy = policy
+        self._buf = bytearray(capacity)
+        self._head = 0      # Index of the oldest buffered byte
+        self._size = 0      # Number of buffered bytes
+        self._scanned = 0   # Buffered bytes already known to contain no newline
+        self.overflows = 0
+        self.bytes_dropped = 0
+        self.bytes_written = 0
+
+    def __len__(self) -> int:
+        return self._size
+
+    def free(self) -> int:
+        """Bytes that can be written without overflow"""
+        return self.capacity - self._size
+
+    def clear(self):
+        """Discard all buffered bytes"""
+        self._head = 0
+        self._size = 0
+        self._scanned = 0
+
+    def write(self, data: bytes) -> int:
+        """Append bytes, applying the overflow policy. Returns bytes stored."""
+        n = len(data)
+        if n == 0:
+            return 0
+        self.bytes_written += n
+
+        if n > self.free():
+            self.overflows += 1
+            if self.policy == DROP_NEWEST:
+                dropped = n - self.free()
+                self.bytes_dropped += dropped
+                data = data[:n - dropped]
+                n = len(data)
+            else:
+                if n >= self.capacity:
+                    # Only the newest capacity bytes survive
+                    self.bytes_dropped += self._size + n - self.capacity
+                    data = data[n - self.capacity:]
+                    n = len(data)
+                    self.clear()
+                else:
+                    dropped = n - self.free()
+                    self.bytes_dropped += dropped
+                    self._head = (self._head + dropped) % self.capacity
+                    self._size -= dropped
+                    self._scanned = max(0, self._scanned - dropped)
+
+        if n == 0:
+            return 0
+
+        tail = (self._head + self._size) % self.capacity
+        first = min(n, self.capacity - tail)
+        self._buf[tail:tail + first] = data[:first]
+        if first < n:
+            self._buf[0:n - first] = data[first:]
+        self._size += n
+        return n
+
+    def _find_newline(self) -> int:
+        """Offset (relative to head) of the first newline, or -1"""
+        start = self._head + self._scanned
+        end = self._head + self._size
+        if end <= self.capacity:
+            pos = self._buf.find(b'\n', start, end)
+            return pos - self._head if pos >= 0 else -1
+
+        # Buffered data wraps around the end of the storage
+        if start < self.capacity:
+            pos = self._buf.find(b'\n', start, self.capacity)
+            if pos >= 0:
+                return pos - self._head
+            start = self.capacity
+        pos = self._buf.find(b'\n', start - self.capacity, end - self.capacity)
+        return pos + self.capacity - self._head if pos >= 0 else -1
+
+    def _take(self, n: int) -> bytes:
+        """Remove and return the n oldest bytes"""
+        start = self._head
+        end = start + n
+        if end <= self.capacity:
+            chunk = bytes(self._buf[start:end])
+        else:
+            chunk = bytes(self._buf[start:]) + bytes(self._buf[:end - self.capacity])
+        self._head = end % self.capacity
+        self._size -= n
+        return chunk
+
+    def readlines(self) -> List[bytes]:
+        """Pop all complete lines (without the trailing newline)"""
+        lines = []
+        while self._size:
+            offset = self._find_newline()
+            if offset < 0:
+                self._scanned = self._size
+                if self._size == self.capacity:
+                    # A single line larger than the buffer can never complete
+                    self.overflows += 1
+                    self.bytes_dropped += self._size
+                    self.clear()
+                break
+            lines.append(self._take(offset + 1)[:-1])
+            self._scanned = 0
+        return lines
+
+    def stats(self) -> Dict[str, Any]:
+        """Overflow counters for reports"""
+        return {
+            "capacity": self.capacity,
+            "policy": self.policy,
+            "overflows": self.overflows,
+            "bytes_dropped": self.bytes_dropped,
+            "bytes_written": self.bytes_written,
+        }
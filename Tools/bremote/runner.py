@@ -3,32 +3,73 @@ BREmote Test Suite - Test Runner
 Orchestrates test execution across multiple devices.
 """
 
-import time
-from typing import List, Dict, Any, Optional
+import threading
+from concurrent.futures import ThreadPoolExecutor
+from typing import List, Dict, Any, Optional, Tuple
 from datetime import datetime
 
 from .models import DeviceType, TestResult, TestReport
 from .device import BREmoteDevice
-from .tests import (
-    TXTestSuite, RXTestSuite, WiFiTestSuite, 
-    ConfigTestSuite, RadioLinkMonitor
-)
+from .profiling import NULL_PROFILER, profiled
+from .scheduler import TestScheduler, TransitionCosts
+from .registry import parse_selector, select_tests
+
+# Number of slowest tests listed in the summary
+SLOWEST_TESTS_SHOWN = 5
+
+# Suites run by run_all_tests when no --test selector is given
+DEFAULT_SUITES = {
+    DeviceType.TRANSMITTER: ("TX", "CONFIG"),
+    DeviceType.RECEIVER: ("RX", "CONFIG"),
+}
 
 
 class BREmoteTester:
     """Test orchestrator for BREmote devices"""
     
-    def __init__(self):
+    def __init__(self, jobs: int = 1, shuffle: bool = False, seed: Optional[int] = None,
+                 selector: Optional[str] = None, report_stream=None, profiler=None):
+        if selector:
+            # Fail on a bad expression before touching any device
+            parse_selector(selector)
+        self.selector = selector
         self.devices: List[BREmoteDevice] = []
         self.test_results: Dict[str, TestReport] = {}
+        self.jobs = max(1, jobs)
+        self.shuffle = shuffle
+        self.seed = seed
+        # reportstream.ReportStreamWriter receiving results as they complete
+        self.report_stream = report_stream
+        # profiling.Profiler for --profile (phases: scan_ports, suite-*, link*, report)
+        self.profiler = profiler or NULL_PROFILER
+        # Shared so transition latencies measured on one device plan the next
+        self.transition_costs = TransitionCosts()
+        self._log_lock = threading.Lock()
         
     def log(self, message: str):
         """Log message to console"""
-        try:
-            print(message)
-        except UnicodeEncodeError:
-            print(message.encode('utf-8', errors='replace').decode('utf-8'))
+        with self._log_lock:
+            try:
+                print(message)
+            except UnicodeEncodeError:
+                print(message.encode('utf-8', errors='replace').decode('utf-8'))
+
+    def device_log(self, device: BREmoteDevice):
+        """Log callback that tags every line with the device port.
+
+        A multi-line message is emitted under one lock, so lines from
+        devices tested in parallel never interleave mid-message.
+        """
+        tag = f"[{device.port}]"
+
+        def log(message: str):
+            lines = [f"{tag} {line}" for line in message.split('\n') if line.strip()]
+            if lines:
+                self.log('\n'.join(lines))
+
+        return log
     
+    @profiled("scan_ports")
     def scan_ports(self) -> List[str]:
         """Scan for available COM ports with BREmote devices"""
         self.log("\n[SCAN] Scanning for BREmote devices...")
@@ -40,7 +81,7 @@ class BREmoteTester:
             device = BREmoteDevice(port)
             if device.connect():
                 # Give device time to settle after connect
-                time.sleep(0.5)
+                device.settle()
                 
                 device_type = device.identify()
                 if device_type != DeviceType.UNKNOWN:
@@ -60,30 +101,64 @@ class BREmoteTester:
         
         return bremote_ports
     
-    def run_device_tests(self, device: BREmoteDevice) -> TestReport:
+    def run_device_tests(self, device: BREmoteDevice, log=None) -> TestReport:
         """Run all tests for a single device"""
-        self.log(f"\n{'='*60}")
-        self.log(f"Testing: {device} ({device.device_type.value.upper()})")
-        self.log('='*60)
+        log = log or self.log
+        log(f"\n{'='*60}")
+        log(f"Testing: {device} ({device.device_type.value.upper()})")
+        log('='*60)
         
         report = TestReport(
             device_type=device.device_type.value,
             port=device.port
         )
-        
-        if device.device_type == DeviceType.TRANSMITTER:
-            report.tests.update(TXTestSuite.run_all(device, self.log))
-            report.tests.update(ConfigTestSuite.run_all_tx(device, self.log))
-        elif device.device_type == DeviceType.RECEIVER:
-            report.tests.update(RXTestSuite.run_all(device, self.log))
-            report.tests.update(ConfigTestSuite.run_all_rx(device, self.log))
-        
+        device.reset_state_cache()
+        device.command_metrics.reset()
+        for key, value in device.identity().items():
+            setattr(report, key, value)
+        
+        # Selected suites are scheduled together so tests sharing
+        # preconditions run back to back
+        if self.selector:
+            cases = select_tests(device.device_type.value, self.selector)
+        else:
+            cases = select_tests(device.device_type.value,
+                                 suites=DEFAULT_SUITES.get(device.device_type, ()))
+        
+        if not cases:
+            log("\n[SKIP] No tests selected for this device")
+            report.overall_result = TestResult.SKIP.value
+            return report
+        
+        suites = " + ".join(dict.fromkeys(case.suite for case in cases))
+        log(f"\n[{device.device_type.value.upper()}] Running {suites} tests ({len(cases)} selected)...")
+        scheduler = self._scheduler(device, log)
+        report.tests.update(scheduler.run(cases))
+        report.schedule = scheduler.stats()
+        report.state_cache = device.state_cache_stats()
+        report.command_metrics = device.metrics()
         failures = sum(1 for t in report.tests.values() 
                      if t.get("result") == TestResult.FAIL.value)
         report.overall_result = TestResult.FAIL.value if failures > 0 else TestResult.PASS.value
+        self._stream_report(report)
         
         return report
     
+    def _scheduler(self, device: BREmoteDevice, log) -> TestScheduler:
+        """Test scheduler for one device run"""
+        on_result = None
+        if self.report_stream is not None:
+            def stream_result(name: str, result: Dict[str, Any]):
+                self.report_stream.write_test(device.port, device.device_type.value, name, result)
+            on_result = stream_result
+        return TestScheduler(device, log, costs=self.transition_costs,
+                             shuffle=self.shuffle, seed=self.seed, on_result=on_result,
+                             profiler=self.profiler)
+
+    def _stream_report(self, report: TestReport):
+        if self.report_stream is not None:
+            self.report_stream.write_report(report)
+
     def run_all_tests(self) -> Dict[str, TestReport]:
         """Auto-detect and test all devices"""
         self.scan_ports()
@@ -94,12 +169,45 @@ class BREmoteTester:
         
         self.test_results = {}
         
-        for device in self.devices:
-            report = self.run_device_tests(device)
-            self.test_results[device.port] = report
+        if self.jobs == 1 or len(self.devices) == 1:
+            for device in self.devices:
+                report = self.run_device_tests(device)
+                self.test_results[device.port] = report
+        else:
+            self._run_device_tests_parallel()
         
         self._print_summary()
         return self.test_results
+
+    def _run_device_tests_parallel(self):
+        """Run each device's suites in a worker pool of self.jobs threads.
+
+        Every device has its own serial port, so suites on different
+        devices are independent. Results are stored in device order, not
+        completion order, so test_results is the same as a serial run.
+        """
+        workers = min(self.jobs, len(self.devices))
+        self.log(f"\n[RUN] Testing {len(self.devices)} device(s) with {workers} worker(s)")
+
+        def run(device: BREmoteDevice) -> TestReport:
+            log = self.device_log(device)
+            try:
+                return self.run_device_tests(device, log)
+            except Exception as e:
+                log(f"[ERROR] Test run aborted: {e}")
+                report = TestReport(device_type=device.device_type.value, port=device.port)
+                report.add_test("run", TestResult.FAIL, f"Error: {str(e)}")
+                report.overall_result = TestResult.FAIL.value
+                if self.report_stream is not None:
+                    self.report_stream.write_test(device.port, report.device_type, "run", report.tests["run"])
+                self._stream_report(report)
+                return report
+
+        with ThreadPoolExecutor(max_workers=workers, thread_name_prefix="device") as pool:
+            reports = list(pool.map(run, self.devices))
+
+        for device, report in zip(self.devices, reports):
+            self.test_results[device.port] = report
     
     def run_wifi_tests(self) -> Dict[str, TestReport]:
         """Run WiFi / Web config tests"""
@@ -112,84 +220,208 @@ class BREmoteTester:
         self.test_results = {}
         
         for device in self.devices:
-            if device.device_type == DeviceType.TRANSMITTER:
-                self.log(f"\n[WIFI] Running TX WiFi tests on {device.port}")
-                report = TestReport(device_type="tx", port=device.port)
-                report.tests.update(WiFiTestSuite.run_all_tx(device, self.log))
-                self.test_results[device.port] = report
-            elif device.device_type == DeviceType.RECEIVER:
-                self.log(f"\n[WIFI] Running RX WiFi tests on {device.port}")
-                report = TestReport(device_type="rx", port=device.port)
-                report.tests.update(WiFiTestSuite.run_all_rx(device, self.log))
-                self.test_results[device.port] = report
+            if device.device_type == DeviceType.UNKNOWN:
+                continue
+            cases = select_tests(device.device_type.value, self.selector, suites=("WIFI",))
+            if not cases:
+                continue
+            device_type = device.device_type.value
+            self.log(f"\n[WIFI] Running {device_type.upper()} WiFi tests on {device.port}")
+            report = TestReport(device_type=device_type, port=device.port)
+            device.reset_state_cache()
+            device.command_metrics.reset()
+            scheduler = self._scheduler(device, self.log)
+            report.tests.update(scheduler.run(cases))
+            report.schedule = scheduler.stats()
+            report.state_cache = device.state_cache_stats()
+            report.command_metrics = device.metrics()
+            self._stream_report(report)
+            self.test_results[device.port] = report
         
         self._print_summary()
         return self.test_results
     
-    def run_integration_test(self, duration: float = 10.0) -> Dict[str, Any]:
-        """Run TX↔RX radio link integration test"""
-        self.scan_ports()
-        
-        tx_device = None
-        rx_device = None
-        
+    def discover_pairs(self) -> List[Tuple[BREmoteDevice, BREmoteDevice]]:
+        """Match connected TX and RX units into radio pairs.
+
+        Reads own_address/dest_address from every unit via ?get. A TX and an
+        RX form a pair when either side's dest_address is the other's
+        own_address.
+        """
+        self.log("\n[PAIR] Reading radio addresses...")
+        addresses: Dict[str, Dict[str, Optional[str]]] = {}
+
         for device in self.devices:
-            if device.device_type == DeviceType.TRANSMITTER:
-                tx_device = device
-            elif device.device_type == DeviceType.RECEIVER:
-                rx_device = device
-        
-        if not tx_device or not rx_device:
+            if device.device_type == DeviceType.UNKNOWN:
+                continue
+            device.prepare_for_test()
+            own = device.get_config_value("own_address")
+            dest = device.get_config_value("dest_address")
+            addresses[device.port] = {"own": own, "dest": dest}
+            self.log(f"  {device.port} ({device.device_type.value.upper()}): own={own}, dest={dest}")
+
+        tx_devices = [d for d in self.devices if d.device_type == DeviceType.TRANSMITTER]
+        rx_devices = [d for d in self.devices if d.device_type == DeviceType.RECEIVER]
+
+        pairs = []
+        paired_rx = set()
+        for tx in tx_devices:
+            tx_addr = addresses.get(tx.port, {})
+            for rx in rx_devices:
+                if rx.port in paired_rx:
+                    continue
+                rx_addr = addresses.get(rx.port, {})
+                tx_to_rx = tx_addr.get("dest") and tx_addr.get("dest") == rx_addr.get("own")
+                rx_to_tx = rx_addr.get("dest") and rx_addr.get("dest") == tx_addr.get("own")
+                if tx_to_rx or rx_to_tx:
+                    pairs.append((tx, rx))
+                    paired_rx.add(rx.port)
+                    break
+
+        paired_ports = {tx.port for tx, _ in pairs} | paired_rx
+        for device in tx_devices + rx_devices:
+            if device.port not in paired_ports:
+                self.log(f"  [WARN] {device.port} has no paired partner")
+
+        if not pairs and tx_devices and rx_devices:
+            # Addresses unreadable (older firmware): fall back to a single pair
+            self.log("  [WARN] No pairing found via addresses, using last TX/RX")
+            pairs.append((tx_devices[-1], rx_devices[-1]))
+
+        self.log(f"\n[PAIR] Found {len(pairs)} pair(s)")
+        for tx, rx in pairs:
+            self.log(f"  {self._pair_key(tx, rx)}")
+
+        return pairs
+
+    @staticmethod
+    def _pair_key(tx_device: BREmoteDevice, rx_device: BREmoteDevice) -> str:
+        """Report key for a TX/RX pair"""
+        return f"{tx_device.port}->{rx_device.port}"
+
+    def _is_tx_locked(self, tx_device: BREmoteDevice) -> bool:
+        """Query TX lock state via ?state json"""
+        # Lock state changes without a command, so bypass the state cache
+        tx_state = tx_device.get_state(refresh=True)
+        return bool(tx_state.get("locked", 1)) if tx_state else True
+
+    def _ensure_tx_unlocked(self, tx_devices: List[BREmoteDevice]):
+        """Prompt the operator until every TX is unlocked"""
+        self.log("\n[INIT] Checking TX lock state...")
+        locked = [tx for tx in tx_devices if self._is_tx_locked(tx)]
+
+        if not locked:
+            self.log("  TX is already unlocked [OK]")
+            return
+
+        # Interactive unlock prompt with retry
+        while locked:
+            self.log("\n" + "="*60)
+            self.log("PRE-TEST SETUP REQUIRED")
+            self.log("="*60)
+            self.log(f"The following TX unit(s) are LOCKED: {', '.join(tx.port for tx in locked)}")
+            self.log("Please move the throttle trigger to unlock the TX.")
+            self.log("Once unlocked (display shows normal operation), press ENTER to continue...")
+            try:
+                input()
+            except EOFError:
+                self.log("  (Running in non-interactive mode, continuing...)")
+                break
+            self.log("="*60)
+
+            # Check again if unlocked
+            self.log("\n[INIT] Verifying TX is unlocked...")
+            locked = [tx for tx in locked if self._is_tx_locked(tx)]
+
+            if not locked:
+                self.log("  TX is now unlocked [OK]")
+            else:
+                self.log("  TX is still locked. Please try again.")
+
+    def run_integration_test(self, duration: float = 10.0,
+                             samples_out: Optional[str] = None,
+                             samples_format: Optional[str] = None) -> Dict[str, Dict[str, Any]]:
+        """Run TX↔RX radio link integration test on every discovered pair.
+
+        All pairs are monitored concurrently, so the wall-clock time for N
+        pairs is about the time for one. Returns results keyed by pair.
+        With samples_out, raw samples of all pairs are streamed to that file.
+        """
+        self.scan_ports()
+
+        pairs = self.discover_pairs()
+        if not pairs:
             self.log("\n[ERROR] Need both TX and RX for link test")
             return {}
-        
+
         self.log("\n[INIT] Exiting charging mode on TX...")
-        tx_device.send_command("?exitchg", wait_for_response=False)
-        time.sleep(0.5)
-        
+        for tx_device, _ in pairs:
+            tx_device.send_command("?exitchg", wait_for_response=False)
+        # One shared 0.5s sleep used to cover all pairs
+        for idx, (tx_device, _) in enumerate(pairs):
+            tx_device.wait_until(tx_device.quiet(0.1), timeout=0.5, replaces=0.5 if idx == 0 else 0.0)
+
         # Turn off WiFi on RX for radio link
         self.log("\n[INIT] Turning off WiFi on RX...")
-        rx_device.send_command("?wifi off")
-        time.sleep(0.5)
-        
-        # Check if TX is locked
-        self.log("\n[INIT] Checking TX lock state...")
-        tx_state = tx_device.send_json_command("?state json", timeout=2.0)
-        is_locked = tx_state.get("locked", 1) if tx_state else True
-        
-        if is_locked:
-            # Interactive unlock prompt with retry
-            while True:
-                self.log("\n" + "="*60)
-                self.log("PRE-TEST SETUP REQUIRED")
-                self.log("="*60)
-                self.log("The TX is currently LOCKED.")
-                self.log("Please move the throttle trigger to unlock the TX.")
-                self.log("Once unlocked (display shows normal operation), press ENTER to continue...")
-                try:
-                    input()
-                except EOFError:
-                    self.log("  (Running in non-interactive mode, continuing...)")
-                    break
-                self.log("="*60)
-                
-                # Check again if unlocked
-                self.log("\n[INIT] Verifying TX is unlocked...")
-                tx_state = tx_device.send_json_command("?state json", timeout=2.0)
-                is_locked = tx_state.get("locked", 1) if tx_state else True
-                
-                if not is_locked:
-                    self.log("  TX is now unlocked [OK]")
-                    break
-                else:
-                    self.log("  TX is still locked. Please try again.")
-        else:
-            self.log("  TX is already unlocked [OK]")
-        
-        monitor = RadioLinkMonitor(tx_device, rx_device, self.log)
-        result = monitor.start(duration)
-        
-        return {"radio_link_test": result}
+        for _, rx_device in pairs:
+            rx_device.send_command("?wifi off")
+        for idx, (_, rx_device) in enumerate(pairs):
+            rx_device.wait_for_wifi(False, timeout=1.0, replaces=0.5 if idx == 0 else 0.0)
+
+        self._ensure_tx_unlocked([tx for tx, _ in pairs])
+
+        sample_writer = None
+        if samples_out:
+            from .export import SampleWriter
+            sample_writer = SampleWriter(samples_out, fmt=samples_format)
+            sample_writer.start()
+            self.log(f"\n[LINK] Streaming samples to {samples_out} ({sample_writer.format})")
+
+        # Link analysis needs numpy; keep it out of scan/--port startup
+        from .tests.link_test import RadioLinkMonitor
+
+        results: Dict[str, Dict[str, Any]] = {}
+        threads = []
+
+        def run_pair(key: str, monitor: RadioLinkMonitor):
+            try:
+                results[key] = monitor.start(duration)
+            except Exception as e:
+                results[key] = {
+                    "test": "Radio Link Integration",
+                    "result": TestResult.FAIL.value,
+                    "details": f"Error: {str(e)}",
+                }
+            if self.report_stream is not None:
+                self.report_stream.write_link(key, results[key])
+
+        try:
+            for tx_device, rx_device in pairs:
+                key = self._pair_key(tx_device, rx_device)
+                monitor = RadioLinkMonitor(tx_device, rx_device, self.log, sample_writer=sample_writer,
+                                           profiler=self.profiler)
+                thread = threading.Thread(target=run_pair, args=(key, monitor), name=f"link-{key}")
+                threads.append(thread)
+                thread.start()
+
+            for thread in threads:
+                thread.join()
+        finally:
+            # Also on Ctrl+C: Parquet/Arrow files are only readable once closed
+            if sample_writer:
+                sample_writer.close()
+                self.log(f"[LINK] Wrote {sample_writer.rows_written} samples to {samples_out}")
+
+        if sample_writer:
+            export_stats = sample_writer.stats()
+            for result in results.values():
+                result.update(export_stats)
+
+        # Keep pair order stable regardless of completion order
+        return {
+            self._pair_key(tx, rx): results[self._pair_key(tx, rx)]
+            for tx, rx in pairs
+        }
     
     def run_interactive(self):
         """Run interactive tests with user prompts"""
@@ -214,10 +446,10 @@ class BREmoteTester:
         # Exit charging mode
         self.log("\n[INIT] Exiting charging mode...")
         device.send_command("?exitchg", wait_for_response=False)
-        time.sleep(0.5)
+        device.wait_until(device.quiet(0.1), timeout=0.5, replaces=0.5)
         
         # Check lock status
-        data = device.send_json_command("?state")
+        data = device.get_state(refresh=True)
         locked = False
         if data:
             locked = data.get("locked", False) or data.get("lock", False)
@@ -227,7 +459,8 @@ class BREmoteTester:
             self.log("Please unlock the device using your normal method,")
             self.log("then press Enter to continue...")
             input()
-            time.sleep(1)
+            device.wait_until(lambda: not self._is_tx_locked(device), timeout=1.0,
+                              poll=0.1, replaces=1.0)
         
         tests = {}
         
@@ -332,7 +565,37 @@ class BREmoteTester:
                     details = details[:37] + "..."
                 
                 self.log(f"  {status:8} {test_name:25} {details}")
-        
+
+            cache = report.state_cache
+            if cache.get("hits") or cache.get("misses"):
+                self.log(f"  State cache: {cache['hits']} hits, {cache['misses']} misses")
+        
+        slowest = [
+            (stats.get("wall_s", 0), port, name, stats)
+            for port, report in self.test_results.items()
+            for name, stats in report.slowest_tests(SLOWEST_TESTS_SHOWN)
+        ]
+        if slowest:
+            slowest.sort(key=lambda item: item[0], reverse=True)
+            total_wall = sum(
+                test["stats"].get("wall_s", 0) + test["stats"].get("setup_s", 0)
+                for report in self.test_results.values()
+                for test in report.tests.values() if "stats" in test
+            )
+            self.log(f"\nSLOWEST TESTS (total test time {total_wall:.1f}s)")
+            for wall, port, name, stats in slowest[:SLOWEST_TESTS_SHOWN]:
+                self.log(
+                    f"  {wall:6.2f}s  {port:10} {name:20} "
+                    f"read {stats.get('read_blocked_s', 0):.2f}s, sleep {stats.get('sleep_s', 0):.2f}s, "
+                    f"wait {stats.get('wait_s', 0):.2f}s, "
+                    f"{stats.get('commands', 0)} cmds, {stats.get('bytes_in', 0)}B in"
+                )
+
+        waited = sum(device.io["wait_s"] for device in self.devices)
+        avoided = sum(device.io["sleep_avoided_s"] for device in self.devices)
+        if waited or avoided:
+            self.log(f"\nCondition waits: {waited:.2f}s waited, {avoided:.2f}s of fixed sleeps avoided")
+
         self.log("\n" + "="*70)
         self.log(f"TOTAL: {total_tests} tests | {total_passed} PASSED | {total_failed} FAILED")
         
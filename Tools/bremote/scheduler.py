@@ -0,0 +1,269 @@
+"""
+BREmote Test Suite - Test Scheduler
+Orders tests by their device state preconditions to minimise mode transitions.
+"""
+
+import itertools
+import random
+import threading
+import time
+from dataclasses import dataclass, field
+from typing import Callable, Dict, Any, List, Optional, Tuple
+
+from .device import BREmoteDevice
+from .models import TestResult
+from .profiling import NULL_PROFILER
+from .tracing import tracer
+
+# Device state keys a test can require
+STREAMING = "streaming"   # A ?print* loop is running
+WIFI = "wifi"             # WiFi/AP config service enabled
+RADIO = "radio"           # Radio activity gateway enabled (TX)
+UNLOCKED = "unlocked"     # TX throttle lock released by the operator
+
+# Precondition of plain command/response tests
+IDLE = {STREAMING: False}
+
+# Initial transition latency estimates in seconds, replaced by measurements
+DEFAULT_TRANSITION_COSTS = {
+    (STREAMING, False): 0.5,
+    (WIFI, True): 1.0,
+    (WIFI, False): 0.5,
+    (RADIO, True): 0.2,
+    (RADIO, False): 0.2,
+    (UNLOCKED, True): 0.2,
+}
+
+# Above this many precondition groups, fall back to greedy ordering
+MAX_EXHAUSTIVE_GROUPS = 7
+
+
+@dataclass
+class TestCase:
+    """A test function with the device state it needs.
+
+    requires maps state keys to the value the device must be in before
+    the test runs. changes lists keys the test may leave in a different
+    state; the scheduler treats them as unknown afterwards. tags are used
+    by --test selectors (see registry.py).
+    """
+    name: str
+    func: Callable[[BREmoteDevice], Dict[str, Any]]
+    suite: str
+    requires: Dict[str, bool] = field(default_factory=dict)
+    changes: Tuple[str, ...] = ()
+    tags: Tuple[str, ...] = ()
+
+
+class TransitionCosts:
+    """Measured state transition latencies (exponential moving average).
+
+    One instance can be shared by several schedulers, so measurements on
+    one device improve the plan for the next.
+    """
+
+    def __init__(self, alpha: float = 0.5):
+        self.alpha = alpha
+        self._costs: Dict[Tuple[str, bool], float] = dict(DEFAULT_TRANSITION_COSTS)
+        self._lock = threading.Lock()
+
+    def estimate(self, key: str, value: bool) -> float:
+        return self._costs.get((key, value), 1.0)
+
+    def record(self, key: str, value: bool, seconds: float):
+        with self._lock:
+            old = self._costs.get((key, value))
+            self._costs[(key, value)] = seconds if old is None else old + self.alpha * (seconds - old)
+
+    def to_dict(self) -> Dict[str, float]:
+        return {f"{key}={'on' if value else 'off'}": round(cost, 3)
+                for (key, value), cost in sorted(self._costs.items())}
+
+
+def test_stats(wall_s: float, setup_s: float, before: Dict[str, float],
+               after: Dict[str, float]) -> Dict[str, Any]:
+    """Per-test timing and serial I/O from two device I/O snapshots"""
+    stats: Dict[str, Any] = {"wall_s": round(wall_s, 3), "setup_s": round(setup_s, 3)}
+    for key, value in after.items():
+        delta = value - before.get(key, 0)
+        stats[key] = round(delta, 3) if isinstance(delta, float) else delta
+    return stats
+
+
+class TestScheduler:
+    """Runs TestCases on one device in an order that minimises transitions.
+
+    Tests with identical preconditions are grouped, and groups are ordered
+    by the estimated cost of moving the device between them. Before every
+    test its preconditions are re-established if needed, so each test
+    still starts from the state it declared. With shuffle=True the order
+    is random (seeded) to check that no test depends on another.
+    """
+
+    def __init__(self, device: BREmoteDevice, log_callback=None,
+                 costs: Optional[TransitionCosts] = None,
+                 shuffle: bool = False, seed: Optional[int] = None,
+                 on_result: Optional[Callable[[str, Dict[str, Any]], None]] = None,
+                 profiler=None):
+        self.device = device
+        self.log = log_callback
+        # Called with (name, result) as soon as each test finishes
+        self.on_result = on_result
+        # Setup and body of every test run as profiling phase suite-<SUITE>
+        self.profiler = profiler or NULL_PROFILER
+        self.costs = costs or TransitionCosts()
+        self.shuffle = shuffle
+        self.seed = seed if seed is not None else random.randrange(2 ** 32)
+        self.state: Dict[str, Optional[bool]] = {}
+        self.order: List[str] = []
+        self.transitions = 0
+        self.transition_seconds = 0.0
+
+    def _cost(self, state: Dict[str, Optional[bool]], requires: Dict[str, bool]) -> float:
+        return sum(self.costs.estimate(key, value)
+                   for key, value in requires.items() if state.get(key) != value)
+
+    @staticmethod
+    def _apply(state: Dict[str, Optional[bool]], cases: List[TestCase]) -> Dict[str, Optional[bool]]:
+        state = dict(state)
+        for case in cases:
+            state.update(case.requires)
+            for key in case.changes:
+                state[key] = None
+        return state
+
+    def _group_cost(self, state, cases: List[TestCase]) -> Tuple[float, Dict[str, Optional[bool]]]:
+        total = 0.0
+        for case in cases:
+            total += self._cost(state, case.requires)
+            state = self._apply(state, [case])
+        return total, state
+
+    def plan(self, cases: List[TestCase]) -> List[TestCase]:
+        """Execution order for cases starting from the current device state"""
+        if self.shuffle:
+            order = list(cases)
+            random.Random(self.seed).shuffle(order)
+            return order
+
+        # Group by precondition signature (first-seen order); tests that
+        # disturb the state run last within their group
+        groups: Dict[Tuple, List[TestCase]] = {}
+        for case in cases:
+            groups.setdefault(tuple(sorted(case.requires.items())), []).append(case)
+        group_list = [sorted(g, key=lambda c: bool(c.changes)) for g in groups.values()]
+
+        if len(group_list) <= MAX_EXHAUSTIVE_GROUPS:
+            best_order, best_cost = None, None
+            for perm in itertools.permutations(range(len(group_list))):
+                state, total = self.state, 0.0
+                for idx in perm:
+                    cost, state = self._group_cost(state, group_list[idx])
+                    total += cost
+                if best_cost is None or total < best_cost - 1e-9:
+                    best_order, best_cost = perm, total
+            ordered = [group_list[idx] for idx in best_order]
+        else:
+            # Nearest neighbour: cheapest next group from the current state
+            remaining = list(group_list)
+            state = self.state
+            ordered = []
+            while remaining:
+                group = min(remaining, key=lambda g: self._group_cost(state, g)[0])
+                remaining.remove(group)
+                ordered.append(group)
+                state = self._group_cost(state, group)[1]
+
+        return [case for group in ordered for case in group]
+
+    def _transition(self, key: str, value: bool) -> Optional[str]:
+        """Move the device to key=value. Returns an error string on failure."""
+        device = self.device
+        if key == STREAMING and not value:
+            device.stop_continuous_output()
+        elif key == WIFI:
+            response = device.send_command(f"?wifi {'on' if value else 'off'}")
+            if response.startswith("ERR"):
+                return response
+        elif key == RADIO:
+            response = device.send_command(f"?radio {'on' if value else 'off'}")
+            if response.startswith("ERR"):
+                return response
+        elif key == UNLOCKED and value:
+            # Unlocking needs the operator; only verify it
+            state = device.get_state(refresh=True)
+            if not state or state.get("locked", True):
+                return "TX is locked"
+        else:
+            return f"Unsupported precondition {key}={value}"
+        return None
+
+    def ensure(self, requires: Dict[str, bool]) -> Optional[str]:
+        """Establish the preconditions, measuring each transition"""
+        # Stop streaming first so command responses are not mixed with it
+        for key, value in sorted(requires.items(), key=lambda kv: kv[0] != STREAMING):
+            if self.state.get(key) == value:
+                continue
+            start = time.time()
+            error = self._transition(key, value)
+            elapsed = time.time() - start
+            self.transitions += 1
+            self.transition_seconds += elapsed
+            if error:
+                self.state[key] = None
+                return f"{key}={value}: {error}"
+            self.costs.record(key, value, elapsed)
+            self.state[key] = value
+        return None
+
+    def run(self, cases: List[TestCase]) -> Dict[str, Any]:
+        """Run cases in planned order; results keep the declared order"""
+        planned = self.plan(cases)
+        if self.shuffle and self.log:
+            self.log(f"  Shuffled test order (seed {self.seed})")
+
+        results: Dict[str, Any] = {}
+        for case in planned:
+            if self.log:
+                self.log(f"\n[{case.suite}] Running {case.name}...")
+            self.order.append(case.name)
+
+            with self.profiler.phase(f"suite-{case.suite}"), \
+                    tracer.span(case.name, self.device.port, "test", suite=case.suite) as trace_args:
+                setup_start = time.time()
+                error = self.ensure(case.requires)
+                setup_s = time.time() - setup_start
+                before = self.device.io_snapshot()
+                start = time.time()
+                if error:
+                    results[case.name] = {
+                        "test": case.name,
+                        "result": TestResult.SKIP.value,
+                        "details": f"Precondition not met ({error})",
+                    }
+                else:
+                    results[case.name] = case.func(self.device)
+                    for key in case.changes:
+                        self.state[key] = None
+                trace_args["result"] = results[case.name].get("result")
+            results[case.name]["stats"] = test_stats(
+                time.time() - start, setup_s, before, self.device.io_snapshot())
+
+            if self.log:
+                self.log(f"  Result: {results[case.name]['result']}")
+            if self.on_result:
+                self.on_result(case.name, results[case.name])
+
+        return {case.name: results[case.name] for case in cases}
+
+    def stats(self) -> Dict[str, Any]:
+        """Schedule summary for reports"""
+        stats = {
+            "order": list(self.order),
+            "transitions": self.transitions,
+            "transition_seconds": round(self.transition_seconds, 3),
+            "transition_costs": self.costs.to_dict(),
+        }
+        if self.shuffle:
+            stats["shuffle_seed"] = self.seed
+        return stats
@@ -0,0 +1,349 @@
+"""
+BREmote Test Suite - Production Station
+Long-running mode that tests every unit plugged into the station.
+
+New serial ports are picked up as they appear, each unit is identified
+and queued to a worker pool, and its report is written to the output
+directory. Ports are independent, so a slow or hung unit never blocks
+the others. Unplugging a unit and plugging it back in tests it again.
+"""
+
+import argparse
+import json
+import os
+import re
+import threading
+import time
+from collections import deque
+from concurrent.futures import ThreadPoolExecutor
+from datetime import datetime
+from typing import Callable, Deque, Dict, Any, List, Optional, Set, TYPE_CHECKING
+
+from .models import DeviceType, TestResult, TestReport
+from .device import BREmoteDevice
+from .profiling import get_profiler, profiled
+from .registry import SelectorError
+from .runner import BREmoteTester
+from .tracing import tracer
+
+if TYPE_CHECKING:
+    from .store import ResultsStore
+
+# Linux hotplug: the entries of this directory change when a tty appears
+SYS_CLASS_TTY = "/sys/class/tty"
+
+DEFAULT_POLL_INTERVAL = 1.0
+DEFAULT_METRICS_INTERVAL = 60.0
+DEFAULT_OUTPUT_DIR = "station_results"
+METRICS_FILE = "station_metrics.json"
+
+# Completed units kept for the rolling units/hour rate
+THROUGHPUT_WINDOW = 3600.0
+
+
+class PortWatcher:
+    """Reports serial ports added and removed since the last poll.
+
+    On Linux the /sys/class/tty listing is compared first and the port
+    descriptions are only enumerated when it changed, so an idle station
+    polls one directory. Elsewhere serial.tools.list_ports is polled.
+    """
+
+    def __init__(self, scan: Callable[[], List[str]] = BREmoteDevice.scan_ports,
+                 sysfs: Optional[str] = SYS_CLASS_TTY):
+        self.scan = scan
+        self.sysfs = sysfs if sysfs and os.path.isdir(sysfs) else None
+        self.ports: Set[str] = set()
+        self._fingerprint: Optional[frozenset] = None
+
+    def _sysfs_fingerprint(self) -> Optional[frozenset]:
+        try:
+            return frozenset(os.listdir(self.sysfs))
+        except OSError:
+            return None
+
+    def poll(self):
+        """Returns (added, removed) port lists"""
+        if self.sysfs:
+            fingerprint = self._sysfs_fingerprint()
+            if fingerprint is not None and fingerprint == self._fingerprint:
+                return [], []
+            self._fingerprint = fingerprint
+
+        current = set(self.scan())
+        added = sorted(current - self.ports)
+        removed = sorted(self.ports - current)
+        self.ports = current
+        return added, removed
+
+
+class StationMetrics:
+    """Throughput counters for the station (thread-safe)"""
+
+    def __init__(self):
+        self._lock = threading.Lock()
+        self.started = time.time()
+        self.units = 0
+        self.passed = 0
+        self.failed = 0
+        self.unknown = 0
+        self.errors = 0
+        self.queued = 0
+        self.running = 0
+        self.max_queue_depth = 0
+        self.total_test_s = 0.0
+        self._completed: Deque[float] = deque()
+
+    def enqueue(self):
+        with self._lock:
+            self.queued += 1
+            self.max_queue_depth = max(self.max_queue_depth, self.queued)
+
+    def cancel(self):
+        """A queued unit that will not run"""
+        with self._lock:
+            self.queued -= 1
+
+    def start(self):
+        with self._lock:
+            self.queued -= 1
+            self.running += 1
+
+    def finish(self, outcome: str, test_s: float = 0.0):
+        """outcome: a TestResult value, "unknown" or "error" """
+        now = time.time()
+        with self._lock:
+            self.running -= 1
+            if outcome == "unknown":
+                self.unknown += 1
+                return
+            if outcome == "error":
+                self.errors += 1
+                return
+            self.units += 1
+            if outcome == TestResult.FAIL.value:
+                self.failed += 1
+            else:
+                self.passed += 1
+            self.total_test_s += test_s
+            self._completed.append(now)
+            while self._completed and now - self._completed[0] > THROUGHPUT_WINDOW:
+                self._completed.popleft()
+
+    def to_dict(self) -> Dict[str, Any]:
+        with self._lock:
+            uptime = time.time() - self.started
+            # Rate over the last hour, or since start if running for less
+            window = min(uptime, THROUGHPUT_WINDOW)
+            return {
+                "uptime_s": round(uptime, 1),
+                "units": self.units,
+                "passed": self.passed,
+                "failed": self.failed,
+                "unknown": self.unknown,
+                "errors": self.errors,
+                "units_per_hour": round(len(self._completed) * 3600.0 / window, 1) if window > 0 else 0.0,
+                "queue_depth": self.queued,
+                "max_queue_depth": self.max_queue_depth,
+                "running": self.running,
+                "avg_test_s": round(self.total_test_s / self.units, 2) if self.units else None,
+            }
+
+
+class Station:
+    """Hotplug-driven test station.
+
+    One BREmoteTester is shared by all workers, so the selector, shuffle
+    options and measured transition costs apply to every unit.
+    """
+
+    def __init__(self, tester: BREmoteTester, output_dir: str = DEFAULT_OUTPUT_DIR,
+                 workers: int = 4, poll_interval: float = DEFAULT_POLL_INTERVAL,
+                 metrics_interval: float = DEFAULT_METRICS_INTERVAL,
+                 watcher: Optional[PortWatcher] = None,
+                 device_factory: Callable[[str], BREmoteDevice] = BREmoteDevice,
+                 store: Optional["ResultsStore"] = None):
+        self.tester = tester
+        self.profiler = tester.profiler
+        self.store = store
+        self.output_dir = output_dir
+        self.workers = max(1, workers)
+        self.poll_interval = poll_interval
+        self.metrics_interval = metrics_interval
+        self.watcher = watcher or PortWatcher()
+        self.device_factory = device_factory
+        self.metrics = StationMetrics()
+        self._active: Set[str] = set()
+        # Ports plugged in again while their previous unit is still running
+        self._replugged: Set[str] = set()
+        self._active_lock = threading.Lock()
+        # Workers and the main loop all write METRICS_FILE
+        self._metrics_lock = threading.Lock()
+        self._stop = threading.Event()
+        self._pool: Optional[ThreadPoolExecutor] = None
+
+    def log(self, message: str):
+        self.tester.log(f"[{datetime.now().strftime('%H:%M:%S')}] {message}")
+
+    def stop(self):
+        self._stop.set()
+
+    def run(self, max_units: Optional[int] = None):
+        """Watch for units until stopped (or max_units have finished)"""
+        os.makedirs(self.output_dir, exist_ok=True)
+        self.log(f"[STATION] Watching for units ({self.workers} worker(s)), "
+                 f"results in {os.path.abspath(self.output_dir)}")
+        self._pool = ThreadPoolExecutor(max_workers=self.workers, thread_name_prefix="station")
+        last_metrics = time.time()
+        cancel = False
+        try:
+            while not self._stop.is_set():
+                self.poll_once()
+                if max_units is not None:
+                    m = self.metrics.to_dict()
+                    if m["units"] + m["unknown"] + m["errors"] >= max_units:
+                        break
+                if time.time() - last_metrics >= self.metrics_interval:
+                    self.log_metrics()
+                    last_metrics = time.time()
+                self._stop.wait(self.poll_interval)
+        except KeyboardInterrupt:
+            self.log("[STATION] Stopping, waiting for running units to finish...")
+            cancel = True
+        finally:
+            # Units still queued are dropped on interrupt; running ones finish
+            self._pool.shutdown(wait=True, cancel_futures=cancel)
+            self._pool = None
+            self.log_metrics()
+            self._write_metrics()
+
+    def poll_once(self):
+        """Check for hotplug events and queue new units"""
+        added, removed = self.watcher.poll()
+        for port in removed:
+            self.log(f"[UNPLUG] {port}")
+        for port in added:
+            with self._active_lock:
+                if port in self._active:
+                    # A swapped unit: test it once the old run has finished
+                    self._replugged.add(port)
+                    self.log(f"[PLUG] {port} queued after its running unit")
+                    continue
+                self._active.add(port)
+            self.log(f"[PLUG] {port} queued")
+            self._submit(port)
+
+    def _submit(self, port: str):
+        self.metrics.enqueue()
+        self._pool.submit(self._test_unit, port)
+
+    def _test_unit(self, port: str):
+        self.metrics.start()
+        outcome, test_s = "error", 0.0
+        device = self.device_factory(port)
+        log = self.tester.device_log(device)
+        try:
+            if not device.connect():
+                log("[ERROR] Could not open port")
+                return
+            if device.identify() == DeviceType.UNKNOWN:
+                log("[SKIP] Not a BREmote unit")
+                outcome = "unknown"
+                return
+            start = time.time()
+            report = self.tester.run_device_tests(device, log)
+            test_s = time.time() - start
+            outcome = report.overall_result
+            path = self._write_report(device, report)
+            if self.store is not None:
+                with self.profiler.phase("report"):
+                    self.store.record_run({device.port: report}, mode="station",
+                                          selector=self.tester.selector, started=report.timestamp)
+            log(f"[DONE] {outcome} in {test_s:.1f}s -> {path}")
+        except Exception as e:
+            log(f"[ERROR] Test run aborted: {e}")
+            outcome = "error"
+        finally:
+            device.disconnect()
+            self.metrics.finish(outcome, test_s)
+            with self._active_lock:
+                requeue = port in self._replugged and not self._stop.is_set()
+                self._replugged.discard(port)
+                if not requeue:
+                    self._active.discard(port)
+            if requeue:
+                try:
+                    self._submit(port)
+                except RuntimeError:
+                    # Pool shutting down (station stopping)
+                    self.metrics.cancel()
+                    with self._active_lock:
+                        self._active.discard(port)
+            self._write_metrics()
+
+    @profiled("report")
+    def _write_report(self, device: BREmoteDevice, report: TestReport) -> str:
+        port = re.sub(r"[^A-Za-z0-9]+", "_", device.port).strip("_")
+        stamp = datetime.now().strftime("%Y%m%d_%H%M%S_%f")
+        path = os.path.join(self.output_dir, f"{stamp}_{device.device_type.value}_{port}.json")
+        with open(path, "w") as f:
+            json.dump(report.to_dict(), f, indent=2)
+        return path
+
+    def _write_metrics(self):
+        path = os.path.join(self.output_dir, METRICS_FILE)
+        tmp = path + ".tmp"
+        with self._metrics_lock:
+            with open(tmp, "w") as f:
+                json.dump(self.metrics.to_dict(), f, indent=2)
+            os.replace(tmp, path)
+
+    def log_metrics(self):
+        m = self.metrics.to_dict()
+        avg = f"{m['avg_test_s']:.1f}s" if m["avg_test_s"] is not None else "-"
+        self.log(f"[METRICS] {m['units']} units ({m['passed']} pass, {m['failed']} fail), "
+                 f"{m['units_per_hour']:.1f} units/h, avg test {avg}, "
+                 f"queue {m['queue_depth']} (max {m['max_queue_depth']}), running {m['running']}")
+
+
+def main(argv: Optional[List[str]] = None):
+    parser = argparse.ArgumentParser(prog="bremote station",
+                                     description="Test BREmote units automatically as they are plugged in")
+    parser.add_argument('--out', default=DEFAULT_OUTPUT_DIR, help='Directory for per-unit reports')
+    parser.add_argument('--jobs', '-j', type=int, default=4, help='Units tested in parallel (default: 4)')
+    parser.add_argument('--test', metavar='SELECTOR', help='Tests to run (same syntax as bremote --test)')
+    parser.add_argument('--poll', type=float, default=DEFAULT_POLL_INTERVAL,
+                        help='Port poll interval in seconds (default: 1)')
+    parser.add_argument('--metrics-interval', type=float, default=DEFAULT_METRICS_INTERVAL,
+                        help='Seconds between throughput log lines (default: 60)')
+    parser.add_argument('--db', help='Also record every unit in a SQLite history database')
+    parser.add_argument('--profile', nargs='?', const='profile', metavar='DIR',
+                        help='Profile each phase; writes .pstats/.collapsed files to DIR (default: profile). '
+                             'On Python 3.12+ concurrent units get .collapsed stacks only')
+    parser.add_argument('--trace', metavar='FILE.json',
+                        help='Write a Chrome trace / Perfetto timeline of all units')
+    args = parser.parse_args(argv)
+
+    try:
+        tester = BREmoteTester(selector=args.test, profiler=get_profiler(args.profile))
+    except SelectorError as e:
+        parser.error(str(e))
+
+    store = None
+    if args.db:
+        from .store import ResultsStore
+        store = ResultsStore(args.db)
+    station = Station(tester, output_dir=args.out, workers=args.jobs,
+                      poll_interval=args.poll, metrics_interval=args.metrics_interval,
+                      store=store)
+    if args.trace:
+        tracer.start(args.trace)
+    try:
+        station.run()
+    finally:
+        if args.trace:
+            tester.log(f"[TRACE] {tracer.events} event(s) written to {tracer.close()}")
+        if station.store is not None:
+            station.store.close()
+        if tester.profiler.enabled:
+            tester.log(f"[PROFILE] Phase profiles written to {tester.profiler.write()}")
@@ -0,0 +1,397 @@
+"""
+BREmote Test Suite - Results Store
+Optional SQLite history of test runs, units, test results and link metrics.
+
+One record_run() call writes a whole run (all reports and link results)
+in a single transaction. The database runs in WAL mode so `bremote history`
+can query while a station keeps writing.
+
+Usage:
+    store = ResultsStore("results.db")
+    store.record_run(tester.test_results, link_results, identities)
+    rows = store.query_reports(result="FAIL", firmware="3", limit=20)
+"""
+
+import argparse
+import json
+import os
+import socket
+import sqlite3
+import threading
+import time
+from datetime import datetime
+from typing import Any, Dict, Iterable, List, Optional, Sequence
+
+from .models import TestReport
+
+SCHEMA_VERSION = 1
+
+_SCHEMA = """
+CREATE TABLE IF NOT EXISTS runs (
+    id INTEGER PRIMARY KEY,
+    started TEXT NOT NULL,
+    finished TEXT NOT NULL,
+    mode TEXT NOT NULL,
+    host TEXT,
+    selector TEXT
+);
+CREATE TABLE IF NOT EXISTS devices (
+    id INTEGER PRIMARY KEY,
+    usb_serial TEXT NOT NULL DEFAULT '',
+    own_address TEXT NOT NULL DEFAULT '',
+    device_type TEXT NOT NULL,
+    UNIQUE (usb_serial, own_address, device_type)
+);
+CREATE TABLE IF NOT EXISTS reports (
+    id INTEGER PRIMARY KEY,
+    run_id INTEGER NOT NULL REFERENCES runs(id),
+    device_id INTEGER NOT NULL REFERENCES devices(id),
+    port TEXT NOT NULL,
+    device_type TEXT NOT NULL,
+    firmware_version TEXT,
+    result TEXT NOT NULL,
+    timestamp TEXT NOT NULL,
+    wall_s REAL
+);
+CREATE TABLE IF NOT EXISTS tests (
+    id INTEGER PRIMARY KEY,
+    report_id INTEGER NOT NULL REFERENCES reports(id),
+    name TEXT NOT NULL,
+    result TEXT NOT NULL,
+    details TEXT,
+    wall_s REAL
+);
+CREATE TABLE IF NOT EXISTS link_metrics (
+    id INTEGER PRIMARY KEY,
+    run_id INTEGER NOT NULL REFERENCES runs(id),
+    pair TEXT NOT NULL,
+    tx_port TEXT,
+    rx_port TEXT,
+    tx_device_id INTEGER REFERENCES devices(id),
+    rx_device_id INTEGER REFERENCES devices(id),
+    result TEXT NOT NULL,
+    packet_loss_percent REAL,
+    avg_rssi_dbm REAL,
+    avg_snr_db REAL,
+    avg_link_quality REAL,
+    min_link_quality INTEGER,
+    matched_pairs INTEGER,
+    tx_samples INTEGER,
+    rx_samples INTEGER,
+    avg_throttle_diff REAL,
+    avg_steering_diff REAL,
+    details TEXT
+);
+CREATE INDEX IF NOT EXISTS idx_devices_own_address ON devices(own_address);
+CREATE INDEX IF NOT EXISTS idx_reports_port ON reports(port);
+CREATE INDEX IF NOT EXISTS idx_reports_device_type ON reports(device_type, result);
+CREATE INDEX IF NOT EXISTS idx_reports_firmware ON reports(firmware_version, result);
+CREATE INDEX IF NOT EXISTS idx_reports_result ON reports(result);
+CREATE INDEX IF NOT EXISTS idx_reports_device ON reports(device_id);
+CREATE INDEX IF NOT EXISTS idx_reports_run ON reports(run_id);
+CREATE INDEX IF NOT EXISTS idx_reports_timestamp ON reports(timestamp);
+CREATE INDEX IF NOT EXISTS idx_tests_report ON tests(report_id);
+CREATE INDEX IF NOT EXISTS idx_tests_name_result ON tests(name, result);
+CREATE INDEX IF NOT EXISTS idx_tests_result ON tests(result);
+CREATE INDEX IF NOT EXISTS idx_runs_started ON runs(started);
+CREATE INDEX IF NOT EXISTS idx_link_run ON link_metrics(run_id);
+CREATE INDEX IF NOT EXISTS idx_link_tx_port ON link_metrics(tx_port);
+CREATE INDEX IF NOT EXISTS idx_link_rx_port ON link_metrics(rx_port);
+CREATE INDEX IF NOT EXISTS idx_link_result ON link_metrics(result);
+"""
+
+_LINK_COLUMNS = (
+    "result", "packet_loss_percent", "avg_rssi_dbm", "avg_snr_db", "avg_link_quality",
+    "min_link_quality", "matched_pairs", "tx_samples", "rx_samples",
+    "avg_throttle_diff", "avg_steering_diff", "details",
+)
+
+
+class ResultsStore:
+    """SQLite results database (thread-safe; one connection per store)"""
+
+    def __init__(self, path: str):
+        self.path = path
+        self._lock = threading.Lock()
+        self._conn = sqlite3.connect(path, check_same_thread=False)
+        self._conn.row_factory = sqlite3.Row
+        self._conn.execute("PRAGMA journal_mode=WAL")
+        self._conn.execute("PRAGMA synchronous=NORMAL")
+        self._conn.executescript(_SCHEMA)
+        self._conn.execute(f"PRAGMA user_version={SCHEMA_VERSION}")
+        self._device_ids: Dict[tuple, int] = {}
+
+    def close(self):
+        with self._lock:
+            self._conn.close()
+
+    def __enter__(self):
+        return self
+
+    def __exit__(self, *exc):
+        self.close()
+
+    # ------------------------------------------------------------------
+    # Writing
+    # ------------------------------------------------------------------
+
+    def _device_id(self, cur: sqlite3.Cursor, device_type: str,
+                   usb_serial: Optional[str], own_address: Optional[str]) -> int:
+        key = (usb_serial or "", own_address or "", device_type)
+        device_id = self._device_ids.get(key)
+        if device_id is None:
+            cur.execute("INSERT OR IGNORE INTO devices (usb_serial, own_address, device_type) "
+                        "VALUES (?, ?, ?)", key)
+            cur.execute("SELECT id FROM devices WHERE usb_serial = ? AND own_address = ? "
+                        "AND device_type = ?", key)
+            device_id = cur.fetchone()[0]
+            self._device_ids[key] = device_id
+        return device_id
+
+    def record_run(self, reports: Dict[str, TestReport],
+                   link_results: Optional[Dict[str, Dict[str, Any]]] = None,
+                   identities: Optional[Dict[str, Dict[str, Any]]] = None,
+                   mode: str = "test", selector: Optional[str] = None,
+                   started: Optional[str] = None) -> int:
+        """Write one run in a single transaction; returns the run id.
+
+        reports are keyed by port (BREmoteTester.test_results). Link
+        results are matched to units through identities, which map a
+        port to BREmoteDevice.identity() (TX/RX ports without a report).
+        """
+        identities = dict(identities or {})
+        for port, report in reports.items():
+            identities.setdefault(port, {
+                "usb_serial": report.usb_serial,
+                "own_address": report.own_address,
+                "device_type": report.device_type,
+            })
+        finished = datetime.now().isoformat()
+
+        with self._lock, self._conn:
+            cur = self._conn.cursor()
+            cur.execute("INSERT INTO runs (started, finished, mode, host, selector) "
+                        "VALUES (?, ?, ?, ?, ?)",
+                        (started or finished, finished, mode, socket.gethostname(), selector))
+            run_id = cur.lastrowid
+
+            test_rows: List[Sequence[Any]] = []
+            for port, report in reports.items():
+                device_id = self._device_id(cur, report.device_type, report.usb_serial,
+                                            report.own_address)
+                wall_s = sum(t.get("stats", {}).get("wall_s", 0.0) for t in report.tests.values())
+                cur.execute("INSERT INTO reports (run_id, device_id, port, device_type, "
+                            "firmware_version, result, timestamp, wall_s) "
+                            "VALUES (?, ?, ?, ?, ?, ?, ?, ?)",
+                            (run_id, device_id, report.port, report.device_type,
+                             report.firmware_version, report.overall_result,
+                             report.timestamp, round(wall_s, 4)))
+                report_id = cur.lastrowid
+                for name, test in report.tests.items():
+                    test_rows.append((report_id, name, test.get("result", ""), test.get("details", ""),
+                                      test.get("stats", {}).get("wall_s")))
+            cur.executemany("INSERT INTO tests (report_id, name, result, details, wall_s) "
+                            "VALUES (?, ?, ?, ?, ?)", test_rows)
+
+            link_rows = []
+            for pair, link in (link_results or {}).items():
+                device_ids = []
+                for port, device_type in ((link.get("tx_port"), "tx"), (link.get("rx_port"), "rx")):
+                    identity = identities.get(port)
+                    device_ids.append(self._device_id(cur, device_type, identity.get("usb_serial"),
+                                                      identity.get("own_address"))
+                                      if identity else None)
+                link_rows.append((run_id, pair, link.get("tx_port"), link.get("rx_port"), *device_ids,
+                                  *(link.get(column) for column in _LINK_COLUMNS)))
+            cur.executemany(f"INSERT INTO link_metrics (run_id, pair, tx_port, rx_port, tx_device_id, "
+                            f"rx_device_id, {', '.join(_LINK_COLUMNS)}) "
+                            f"VALUES ({', '.join('?' * (6 + len(_LINK_COLUMNS)))})", link_rows)
+        return run_id
+
+    # ------------------------------------------------------------------
+    # Queries
+    # ------------------------------------------------------------------
+
+    def _query(self, sql: str, params: Iterable[Any]) -> List[Dict[str, Any]]:
+        with self._lock:
+            return [dict(row) for row in self._conn.execute(sql, list(params))]
+
+    @staticmethod
+    def _filters(port: Optional[str] = None, device_type: Optional[str] = None,
+                 firmware: Optional[str] = None, result: Optional[str] = None,
+                 device: Optional[str] = None, since: Optional[str] = None,
+                 until: Optional[str] = None):
+        where, params = [], []
+        for column, value in (("r.port", port), ("r.device_type", device_type),
+                              ("r.firmware_version", firmware), ("r.result", result)):
+            if value is not None:
+                where.append(f"{column} = ?")
+                params.append(value)
+        if device is not None:
+            where.append("(d.usb_serial = ? OR d.own_address = ?)")
+            params += [device, device.upper()]
+        if since is not None:
+            where.append("r.timestamp >= ?")
+            params.append(since)
+        if until is not None:
+            where.append("r.timestamp < ?")
+            params.append(until)
+        return where, params
+
+    def query_reports(self, limit: int = 50, **filters) -> List[Dict[str, Any]]:
+        """Most recent unit reports matching the filters (port, device_type,
+        firmware, result, device = USB serial or own_address, since, until)"""
+        where, params = self._filters(**filters)
+        sql = ("SELECT r.id, r.run_id, r.timestamp, r.port, r.device_type, r.firmware_version, "
+               "r.result, r.wall_s, d.usb_serial, d.own_address "
+               "FROM reports r JOIN devices d ON d.id = r.device_id"
+               + (" WHERE " + " AND ".join(where) if where else "")
+               + " ORDER BY r.id DESC LIMIT ?")
+        return self._query(sql, params + [limit])
+
+    def query_tests(self, name: Optional[str] = None, test_result: Optional[str] = None,
+                    limit: int = 50, **filters) -> List[Dict[str, Any]]:
+        """Most recent individual test results (name, test_result plus the
+        report filters of query_reports)"""
+        where, params = self._filters(**filters)
+        if name is not None:
+            where.append("t.name = ?")
+            params.append(name)
+        if test_result is not None:
+            where.append("t.result = ?")
+            params.append(test_result)
+        sql = ("SELECT t.report_id, r.timestamp, r.port, r.device_type, r.firmware_version, "
+               "d.usb_serial, d.own_address, t.name, t.result, t.wall_s, t.details "
+               "FROM tests t JOIN reports r ON r.id = t.report_id "
+               "JOIN devices d ON d.id = r.device_id"
+               + (" WHERE " + " AND ".join(where) if where else "")
+               + " ORDER BY t.id DESC LIMIT ?")
+        return self._query(sql, params + [limit])
+
+    def query_links(self, port: Optional[str] = None, result: Optional[str] = None,
+                    device: Optional[str] = None, since: Optional[str] = None,
+                    until: Optional[str] = None, limit: int = 50) -> List[Dict[str, Any]]:
+        """Most recent link metrics (port matches either end of the pair;
+        since/until bound the run start time)"""
+        where, params = [], []
+        if since is not None:
+            where.append("ru.started >= ?")
+            params.append(since)
+        if until is not None:
+            where.append("ru.started < ?")
+            params.append(until)
+        if port is not None:
+            where.append("(l.tx_port = ? OR l.rx_port = ?)")
+            params += [port, port]
+        if result is not None:
+            where.append("l.result = ?")
+            params.append(result)
+        if device is not None:
+            units = "SELECT id FROM devices WHERE usb_serial = ? OR own_address = ?"
+            where.append(f"(l.tx_device_id IN ({units}) OR l.rx_device_id IN ({units}))")
+            params += [device, device.upper()] * 2
+        sql = ("SELECT l.*, ru.started FROM link_metrics l JOIN runs ru ON ru.id = l.run_id"
+               + (" WHERE " + " AND ".join(where) if where else "")
+               + " ORDER BY l.id DESC LIMIT ?")
+        return self._query(sql, params + [limit])
+
+    def summary(self, group_by: str = "firmware_version", **filters) -> List[Dict[str, Any]]:
+        """Report counts and pass rate grouped by firmware_version,
+        device_type or port"""
+        if group_by not in ("firmware_version", "device_type", "port"):
+            raise ValueError(f"cannot group by {group_by}")
+        where, params = self._filters(**filters)
+        join = " JOIN devices d ON d.id = r.device_id" if filters.get("device") else ""
+        sql = (f"SELECT r.{group_by} AS grp, COUNT(*) AS reports, "
+               "SUM(r.result = 'PASS') AS passed, SUM(r.result = 'FAIL') AS failed "
+               f"FROM reports r{join}"
+               + (" WHERE " + " AND ".join(where) if where else "")
+               + f" GROUP BY r.{group_by} ORDER BY reports DESC")
+        return self._query(sql, params)
+
+    def query_runs(self, limit: int = 20) -> List[Dict[str, Any]]:
+        """Most recent runs with their unit counts"""
+        return self._query(
+            "SELECT ru.*, (SELECT COUNT(*) FROM reports r WHERE r.run_id = ru.id) AS units, "
+            "(SELECT COUNT(*) FROM reports r WHERE r.run_id = ru.id AND r.result = 'FAIL') AS failed "
+            "FROM runs ru ORDER BY ru.id DESC LIMIT ?", [limit])
+
+
+def _print_rows(rows: List[Dict[str, Any]], columns: Sequence[str]):
+    if not rows:
+        print("(no matching records)")
+        return
+    cells = [[("" if row.get(c) is None else str(row.get(c))) for c in columns] for row in rows]
+    widths = [max(len(c), *(len(r[i]) for r in cells)) for i, c in enumerate(columns)]
+    print("  ".join(c.ljust(w) for c, w in zip(columns, widths)).rstrip())
+    for r in cells:
+        print("  ".join(v.ljust(w) for v, w in zip(r, widths)).rstrip())
+
+
+def main(argv: Optional[List[str]] = None):
+    parser = argparse.ArgumentParser(prog="bremote history",
+                                     description="Query the SQLite results history (see --db)")
+    parser.add_argument('--db', required=True, help='Results database written with --db')
+    view = parser.add_mutually_exclusive_group()
+    view.add_argument('--tests', action='store_true', help='List individual test results')
+    view.add_argument('--link', action='store_true', help='List radio link metrics')
+    view.add_argument('--summary', choices=['firmware_version', 'device_type', 'port'],
+                      nargs='?', const='firmware_version', help='Pass rate per group (default: firmware)')
+    view.add_argument('--runs', action='store_true', help='List runs')
+    parser.add_argument('--test', metavar='NAME', help='Test name (implies --tests)')
+    parser.add_argument('--result', choices=['PASS', 'FAIL', 'SKIP', 'PENDING'], help='Result filter')
+    parser.add_argument('--type', choices=['tx', 'rx'], help='Device type filter')
+    parser.add_argument('--port', help='Port filter')
+    parser.add_argument('--firmware', help='Firmware version filter')
+    parser.add_argument('--device', help='Unit filter: USB serial number or own_address (AA:BB:CC)')
+    parser.add_argument('--since', help='Only records at or after this ISO date/time')
+    parser.add_argument('--until', help='Only records before this ISO date/time')
+    parser.add_argument('--limit', type=int, default=50, help='Maximum rows (default: 50)')
+    parser.add_argument('--json', action='store_true', help='Print rows as JSON')
+    args = parser.parse_args(argv)
+
+    if not os.path.exists(args.db):
+        parser.error(f"database not found: {args.db}")
+    # Filters a view cannot apply are rejected rather than silently ignored
+    unsupported = {
+        "link": ("test", "type", "firmware"),
+        "runs": ("test", "result", "type", "port", "firmware", "device", "since", "until"),
+    }
+    for view_name, options in unsupported.items():
+        if getattr(args, view_name):
+            given = [f"--{option}" for option in options if getattr(args, option) is not None]
+            if given:
+                parser.error(f"{', '.join(given)} cannot be used with --{view_name}")
+
+    filters = dict(port=args.port, device_type=args.type, firmware=args.firmware,
+                   device=args.device, since=args.since, until=args.until)
+    with ResultsStore(args.db) as store:
+        start = time.perf_counter()
+        if args.runs:
+            rows = store.query_runs(limit=args.limit)
+            columns = ("id", "started", "mode", "host", "selector", "units", "failed")
+        elif args.link:
+            rows = store.query_links(port=args.port, result=args.result, device=args.device,
+                                     since=args.since, until=args.until, limit=args.limit)
+            columns = ("started", "pair", "result", "packet_loss_percent", "avg_rssi_dbm",
+                       "avg_snr_db", "avg_link_quality", "matched_pairs")
+        elif args.summary:
+            rows = store.summary(args.summary, result=args.result, **filters)
+            for row in rows:
+                row["pass_rate"] = f"{row['passed'] / row['reports']:.1%}" if row["reports"] else "-"
+            columns = ("grp", "reports", "passed", "failed", "pass_rate")
+        elif args.tests or args.test:
+            rows = store.query_tests(name=args.test, test_result=args.result, limit=args.limit, **filters)
+            columns = ("timestamp", "port", "device_type", "firmware_version", "own_address",
+                       "name", "result", "wall_s", "details")
+        else:
+            rows = store.query_reports(result=args.result, limit=args.limit, **filters)
+            columns = ("timestamp", "port", "device_type", "firmware_version", "usb_serial",
+                       "own_address", "result", "wall_s")
+        elapsed_ms = (time.perf_counter() - start) * 1000.0
+
+    if args.json:
+        print(json.dumps(rows, indent=2))
+    else:
+        _print_rows(rows, columns)
+        print(f"\n{len(rows)} row(s) in {elapsed_ms:.1f} ms")
@@ -1,13 +1,16 @@
 """
 BREmote Test Suite - Tests Package
 Test suites for TX, RX, WiFi, Config, and Link functionality.
+
+The suites are imported eagerly because they register their tests on
+import. RadioLinkMonitor pulls in numpy, so it is only loaded when a
+link test asks for it.
 """
 
 from .tx_tests import TXTestSuite
 from .rx_tests import RXTestSuite
 from .wifi_tests import WiFiTestSuite
 from .config_tests import ConfigTestSuite
-from .link_test import RadioLinkMonitor
 
 __all__ = [
     'TXTestSuite',
@@ -16,3 +19,10 @@ __all__ = [
     'ConfigTestSuite',
     'RadioLinkMonitor',
 ]
+
+
+def __getattr__(name):
+    if name == 'RadioLinkMonitor':
+        from .link_test import RadioLinkMonitor
+        return RadioLinkMonitor
+    raise AttributeError(f"module {__name__!r} has no attribute {name!r}")
@@ -3,11 +3,12 @@ BREmote Test Suite - Config Tests
 Test functions for configuration get/set functionality (TX and RX).
 """
 
-import time
-from typing import Dict, Any
+from typing import Dict, Any, List
 
 from ..device import BREmoteDevice
 from ..models import TestResult
+from ..registry import register_test, registered_tests
+from ..scheduler import TestCase, TestScheduler, IDLE
 
 
 class ConfigTestSuite:
@@ -16,14 +17,12 @@ class ConfigTestSuite:
     # ========== TX Config Tests ==========
     
     @staticmethod
+    @register_test("config_keys", "CONFIG", requires=IDLE)
     def test_tx_config_keys(device: BREmoteDevice) -> Dict[str, Any]:
         """Test TX config keys listing via ?keys"""
         result = {"test": "TX Config Keys", "result": TestResult.PENDING.value, "details": ""}
 
         try:
-            device.prepare_for_test()
-            time.sleep(0.3)
-            
             response = device.send_command("?keys", timeout=5.0)
             
             lines = response.split('\n')
@@ -45,23 +44,29 @@ class ConfigTestSuite:
         return result
     
     @staticmethod
+    @register_test("config_get_set", "CONFIG", tags=("destructive",), requires=IDLE)
     def test_tx_config_get_set(device: BREmoteDevice) -> Dict[str, Any]:
         """Test TX config get/set via ?get and ?set"""
         result = {"test": "TX Config Get/Set", "result": TestResult.PENDING.value, "details": ""}
 
         try:
-            device.prepare_for_test()
-            time.sleep(0.3)
-            
             get_resp = device.send_command("?get max_gears")
-            if "max_gears" not in get_resp.lower() and "=" not in get_resp:
+            if not get_resp.startswith("max_gears="):
                 result["details"] = f"GET failed: {get_resp[:80]}"
                 result["result"] = TestResult.FAIL.value
                 return result
 
+            # max_gears is part of ?state json, so this is usually a cache hit;
+            # it must read the same as ?get
+            cached = device.get_config_value("max_gears")
+            if cached != get_resp.split("=", 1)[1].strip():
+                result["details"] = f"Cached max_gears {cached!r} differs from {get_resp[:80]!r}"
+                result["result"] = TestResult.FAIL.value
+                return result
+
             set_resp = device.send_command("?set max_gears 8")
-            time.sleep(0.2)
-            verify = device.send_command("?get max_gears")
+            verify = device.wait_for_response("?get max_gears", lambda r: "8" in r,
+                                              timeout=1.0, replaces=0.2)
             
             if "8" in verify:
                 device.send_command("?set max_gears 10")
@@ -80,16 +85,12 @@ class ConfigTestSuite:
     # ========== RX Config Tests ==========
     
     @staticmethod
+    @register_test("config_keys", "CONFIG", devices=("rx",), requires=IDLE)
     def test_rx_config_keys(device: BREmoteDevice) -> Dict[str, Any]:
         """Test RX config keys listing via ?keys"""
         result = {"test": "RX Config Keys", "result": TestResult.PENDING.value, "details": ""}
 
         try:
-            device.stop_continuous_output()
-            time.sleep(1.0)
-            device.flush()
-            time.sleep(0.5)
-            
             response = device.send_command("?keys", timeout=5.0)
             
             lines = response.split('\n')
@@ -110,14 +111,12 @@ class ConfigTestSuite:
         return result
     
     @staticmethod
+    @register_test("config_get_set", "CONFIG", devices=("rx",), tags=("destructive",), requires=IDLE)
     def test_rx_config_get_set(device: BREmoteDevice) -> Dict[str, Any]:
         """Test RX config get/set via ?get and ?set"""
         result = {"test": "RX Config Get/Set", "result": TestResult.PENDING.value, "details": ""}
 
         try:
-            device.prepare_for_test()
-            time.sleep(0.5)
-            
             get_resp = device.send_command("?get failsafe_time")
             if "failsafe_time" not in get_resp.lower() and "=" not in get_resp:
                 result["details"] = f"GET failed: {get_resp[:80]}"
@@ -125,8 +124,8 @@ class ConfigTestSuite:
                 return result
 
             set_resp = device.send_command("?set failsafe_time 2000")
-            time.sleep(0.3)
-            verify = device.send_command("?get failsafe_time")
+            verify = device.wait_for_response("?get failsafe_time", lambda r: "2000" in r,
+                                              timeout=1.0, replaces=0.3)
             
             if "2000" in verify:
                 device.send_command("?set failsafe_time 1000")
@@ -145,14 +144,12 @@ class ConfigTestSuite:
     # ========== SPIFFS Tests ==========
     
     @staticmethod
+    @register_test("spiffs", "CONFIG", devices=("tx", "rx"), requires=IDLE)
     def test_spiffs(device: BREmoteDevice) -> Dict[str, Any]:
         """Test SPIFFS config storage via ?conf"""
         result = {"test": "SPIFFS Config", "result": TestResult.PENDING.value, "details": ""}
 
         try:
-            device.prepare_for_test()
-            time.sleep(0.5)
-            
             response = device.send_command("?conf")
             
             if "BREmote V2" in response:
@@ -171,47 +168,29 @@ class ConfigTestSuite:
     # ========== Run All ==========
     
     @staticmethod
-    def run_all_tx(device: BREmoteDevice, log_callback=None) -> Dict[str, Any]:
+    def test_cases_tx() -> List[TestCase]:
+        """TX config tests with their device state preconditions"""
+        return registered_tests("tx", "CONFIG")
+
+    @staticmethod
+    def test_cases_rx() -> List[TestCase]:
+        """RX config tests with their device state preconditions"""
+        return registered_tests("rx", "CONFIG")
+
+    @staticmethod
+    def run_all_tx(device: BREmoteDevice, log_callback=None, **scheduler_args) -> Dict[str, Any]:
         """Run all TX config tests"""
         if log_callback:
             log_callback("\n[CONFIG] Running TX Config Test Suite...")
         
-        results = {}
-        
-        tests = [
-            ("config_keys", ConfigTestSuite.test_tx_config_keys),
-            ("config_get_set", ConfigTestSuite.test_tx_config_get_set),
-            ("spiffs", ConfigTestSuite.test_spiffs),
-        ]
-        
-        for test_name, test_func in tests:
-            if log_callback:
-                log_callback(f"\n[CONFIG] Running {test_name}...")
-            results[test_name] = test_func(device)
-            if log_callback:
-                log_callback(f"  Result: {results[test_name]['result']}")
-        
-        return results
+        scheduler = TestScheduler(device, log_callback, **scheduler_args)
+        return scheduler.run(ConfigTestSuite.test_cases_tx())
     
     @staticmethod
-    def run_all_rx(device: BREmoteDevice, log_callback=None) -> Dict[str, Any]:
+    def run_all_rx(device: BREmoteDevice, log_callback=None, **scheduler_args) -> Dict[str, Any]:
         """Run all RX config tests"""
         if log_callback:
             log_callback("\n[CONFIG] Running RX Config Test Suite...")
         
-        results = {}
-        
-        tests = [
-            ("config_keys", ConfigTestSuite.test_rx_config_keys),
-            ("config_get_set", ConfigTestSuite.test_rx_config_get_set),
-            ("spiffs", ConfigTestSuite.test_spiffs),
-        ]
-        
-        for test_name, test_func in tests:
-            if log_callback:
-                log_callback(f"\n[CONFIG] Running {test_name}...")
-            results[test_name] = test_func(device)
-            if log_callback:
-                log_callback(f"  Result: {results[test_name]['result']}")
-        
-        return results
+        scheduler = TestScheduler(device, log_callback, **scheduler_args)
+        return scheduler.run(ConfigTestSuite.test_cases_rx())
@@ -6,11 +6,20 @@ Monitors and correlates TX output with RX input over radio link.
 import time
 import json
 import threading
-from typing import Optional, Dict, Any, List
-from dataclasses import dataclass
+from collections import deque
+from typing import Optional, Dict, Any, TYPE_CHECKING
+from dataclasses import dataclass, asdict
 
 from ..device import BREmoteDevice
 from ..models import TestResult
+from ..ringbuffer import ByteRingBuffer, DROP_OLDEST
+from ..link_quality import summarize_link_quality
+from ..profiling import NULL_PROFILER, profiled
+from ..tracing import tracer
+from ..tx_sampler import TxSampler
+
+if TYPE_CHECKING:
+    from ..export import SampleWriter
 
 
 @dataclass
@@ -23,24 +32,46 @@ class RadioLinkSample:
     rx_steering: Optional[int] = None
     rssi: Optional[int] = None
     snr: Optional[float] = None
+    slot: Optional[int] = None
 
 
 class RadioLinkMonitor:
-    """Monitors and correlates TX output with RX input over radio link"""
+    """Monitors and correlates TX output with RX input over radio link.
+
+    Serial data is collected in fixed-capacity ring buffers and the sample
+    history is bounded, so a flooding device cannot grow memory or CPU use
+    without limit. Overflows are counted and reported in the result.
+    """
+
+    BUFFER_CAPACITY = 64 * 1024
+    MAX_SAMPLES = 100000     # ~2.7h of RX samples at 10Hz
+    MAX_TX_FRAMES = 200000   # ~2.7h of TX frames at 20Hz
     
     def __init__(self, tx_device: BREmoteDevice, rx_device: BREmoteDevice, 
-                 gui_callback: Optional[callable] = None):
+                 gui_callback: Optional[callable] = None,
+                 sample_writer: Optional["SampleWriter"] = None,
+                 buffer_capacity: int = BUFFER_CAPACITY,
+                 overflow_policy: str = DROP_OLDEST,
+                 max_samples: int = MAX_SAMPLES,
+                 profiler=None):
         self.tx_device = tx_device
         self.rx_device = rx_device
         self.gui_callback = gui_callback
+        self.sample_writer = sample_writer
+        self.pair = f"{tx_device.port}->{rx_device.port}"
         self.running = False
-        self.samples: List[RadioLinkSample] = []
+        self.buffer_capacity = buffer_capacity
+        self.overflow_policy = overflow_policy
+        self.max_samples = max_samples
+        self.samples: deque = deque(maxlen=max_samples)
+        self.samples_dropped = 0
         self.tx_thread: Optional[threading.Thread] = None
         self.rx_thread: Optional[threading.Thread] = None
         self.lock = threading.Lock()
-        self.tx_buffer = ""
-        self.rx_buffer = ""
-        self._last_tx_sample_time = 0.0  # Rate-limit TX samples to ~10Hz
+        self.tx_buffer = ByteRingBuffer(buffer_capacity, overflow_policy)
+        self.rx_buffer = ByteRingBuffer(buffer_capacity, overflow_policy)
+        self.tx_sampler = TxSampler(capacity=self.MAX_TX_FRAMES)
+        self.profiler = profiler or NULL_PROFILER
         
     def log(self, message: str):
         """Log message - callback handles printing"""
@@ -51,17 +82,35 @@ class RadioLinkMonitor:
     
     def start(self, duration: float = 10.0) -> Dict[str, Any]:
         """Start monitoring radio link for specified duration"""
+        with self.profiler.phase("link"):
+            self._run(duration)
+        
+        # Analyze results
+        with tracer.span("analyze", self.pair, "link") as trace_args:
+            result = self._analyze_results()
+            trace_args["result"] = result.get("result")
+        return result
+
+    def _run(self, duration: float):
+        """Stream from both units for duration seconds"""
         self.log(f"\n[LINK] Starting Radio Link Test ({duration}s)...")
         self.log(f"   TX: {self.tx_device.port}")
         self.log(f"   RX: {self.rx_device.port}")
 
         # Enable continuous JSON output on both devices
         self.tx_device.send_command("?printInputs json", wait_for_response=False)
-        time.sleep(0.2)
+        # Start RX once TX is streaming
+        tx = self.tx_device
+        tx.wait_until(lambda: tx.is_connected() and tx.serial.in_waiting > 0,
+                      timeout=0.5, poll=0.01, replaces=0.2)
         self.rx_device.send_command("?printreceived json", wait_for_response=False)
         
         self.running = True
-        self.samples = []
+        self.samples = deque(maxlen=self.max_samples)
+        self.samples_dropped = 0
+        self.tx_buffer = ByteRingBuffer(self.buffer_capacity, self.overflow_policy)
+        self.rx_buffer = ByteRingBuffer(self.buffer_capacity, self.overflow_policy)
+        self.tx_sampler = TxSampler(capacity=self.MAX_TX_FRAMES)
         
         # Start monitoring threads
         self.tx_thread = threading.Thread(target=self._monitor_tx)
@@ -70,13 +119,11 @@ class RadioLinkMonitor:
         self.rx_thread.start()
         
         # Wait for test duration
-        time.sleep(duration)
+        with tracer.span("link monitor", self.pair, "sleep", duration=duration):
+            time.sleep(duration)
         
         # Stop monitoring
         self.stop()
-        
-        # Analyze results
-        return self._analyze_results()
     
     def stop(self):
         """Stop monitoring"""
@@ -92,13 +139,16 @@ class RadioLinkMonitor:
         if self.rx_thread:
             self.rx_thread.join(timeout=1.0)
     
+    @profiled("link-tx-reader")
     def _monitor_tx(self):
         """Monitor TX serial output in background"""
         while self.running:
             try:
                 if self.tx_device.serial and self.tx_device.serial.in_waiting:
-                    data = self.tx_device.serial.read(self.tx_device.serial.in_waiting)
-                    self.tx_buffer += data.decode('utf-8', errors='ignore')
+                    # Never read more than the ring buffer can hold at once
+                    waiting = self.tx_device.serial.in_waiting
+                    data = self.tx_device.serial.read(min(waiting, self.buffer_capacity))
+                    self.tx_buffer.write(data)
                     # Process all complete JSON objects
                     self._parse_tx_buffer()
                 else:
@@ -107,13 +157,16 @@ class RadioLinkMonitor:
                 if self.running:
                     self.log(f"  TX Monitor Error: {e}")
 
+    @profiled("link-rx-reader")
     def _monitor_rx(self):
         """Monitor RX serial output in background"""
         while self.running:
             try:
                 if self.rx_device.serial and self.rx_device.serial.in_waiting:
-                    data = self.rx_device.serial.read(self.rx_device.serial.in_waiting)
-                    self.rx_buffer += data.decode('utf-8', errors='ignore')
+                    # Never read more than the ring buffer can hold at once
+                    waiting = self.rx_device.serial.in_waiting
+                    data = self.rx_device.serial.read(min(waiting, self.buffer_capacity))
+                    self.rx_buffer.write(data)
                     # Process all complete JSON objects
                     self._parse_rx_buffer()
                 else:
@@ -125,14 +178,12 @@ class RadioLinkMonitor:
     def _parse_tx_buffer(self):
         """Parse TX JSON output for throttle/steering values.
 
-        TX inputs are reported faster than the 10Hz radio send rate, so we
-        rate-limit to one sample per 100ms window to match actual TX packets.
+        TX inputs are reported faster than the 10Hz radio send rate. Every
+        frame is kept in the TX sampler, which later picks the frame that
+        was current at each radio send slot.
         """
-        lines = self.tx_buffer.split('\n')
-        self.tx_buffer = lines[-1] if lines else ""
-
-        for line in lines[:-1]:
-            line = line.strip()
+        for raw in self.tx_buffer.readlines():
+            line = raw.decode('utf-8', errors='ignore').strip()
             if not line.startswith('{'):
                 continue
             try:
@@ -140,35 +191,27 @@ class RadioLinkMonitor:
             except json.JSONDecodeError:
                 continue
 
-            now = time.time()
-            # Only record one TX sample per 100ms to match 10Hz radio rate
-            if now - self._last_tx_sample_time < 0.09:
-                continue
-            self._last_tx_sample_time = now
-
-            sample = RadioLinkSample(timestamp=now)
             # Prefer thr_sent/steer_sent (actual values sent over radio,
             # post expo+gear) over raw input values for accurate comparison
+            throttle = None
+            steering = None
             if "thr_sent" in data:
-                sample.tx_throttle = int(data["thr_sent"])
+                throttle = int(data["thr_sent"])
             elif "throttle" in data:
-                sample.tx_throttle = int(data["throttle"])
+                throttle = int(data["throttle"])
             if "steer_sent" in data:
-                sample.tx_steering = int(data["steer_sent"])
+                steering = int(data["steer_sent"])
             elif "steering" in data:
-                sample.tx_steering = int(data["steering"])
+                steering = int(data["steering"])
 
-            if sample.tx_throttle is not None or sample.tx_steering is not None:
+            if throttle is not None or steering is not None:
                 with self.lock:
-                    self.samples.append(sample)
+                    self.tx_sampler.add_frame(time.time(), throttle, steering)
     
     def _parse_rx_buffer(self):
         """Parse RX JSON output for received throttle/steering/RSSI values"""
-        lines = self.rx_buffer.split('\n')
-        self.rx_buffer = lines[-1] if lines else ""
-
-        for line in lines[:-1]:
-            line = line.strip()
+        for raw in self.rx_buffer.readlines():
+            line = raw.decode('utf-8', errors='ignore').strip()
             if not line.startswith('{'):
                 continue
             try:
@@ -188,28 +231,42 @@ class RadioLinkMonitor:
 
             if sample.rx_throttle is not None or sample.rx_steering is not None:
                 with self.lock:
-                    # Match with recent TX sample (within 200ms)
-                    matched = False
-                    for s in reversed(self.samples[-50:]):
-                        if abs(s.timestamp - sample.timestamp) < 0.2:
-                            if sample.rx_throttle is not None:
-                                s.rx_throttle = sample.rx_throttle
-                            if sample.rx_steering is not None:
-                                s.rx_steering = sample.rx_steering
-                            if sample.rssi is not None:
-                                s.rssi = sample.rssi
-                            if sample.snr is not None:
-                                s.snr = sample.snr
-                            matched = True
-                            break
+                    # Match with the TX frame radioed in the latest send slot
+                    self.tx_sampler.observe_rx(sample.timestamp, sample.rx_throttle, sample.rx_steering)
+                    idx = self.tx_sampler.match(sample.timestamp, sample.rx_throttle, sample.rx_steering)
+                    if idx is not None:
+                        sample.tx_throttle = self.tx_sampler.throttle[idx]
+                        sample.tx_steering = self.tx_sampler.steering[idx]
+                        sample.slot = self.tx_sampler.slot_index(self.tx_sampler.slot_time(sample.timestamp))
+                    if len(self.samples) == self.max_samples:
+                        self.samples_dropped += 1
+                    self.samples.append(sample)
 
-                    if not matched:
-                        self.samples.append(sample)
+                if self.sample_writer:
+                    row = asdict(sample)
+                    row["pair"] = self.pair
+                    self.sample_writer.write(row)
     
+    @profiled("link-analyze")
     def _analyze_results(self) -> Dict[str, Any]:
         """Analyze collected samples and return results"""
         with self.lock:
-            samples = self.samples.copy()
+            samples = list(self.samples)
+            tx_frames = len(self.tx_sampler)
+            tx_slots = self.tx_sampler.slot_count()
+            rx_slots = self.tx_sampler.matched_slots(
+                s.timestamp for s in samples
+                if s.tx_throttle is not None and s.rx_throttle is not None)
+            tx_throttles, tx_steerings = self.tx_sampler.slot_values()
+            slot_phase = self.tx_sampler.phase()
+            overflow = {
+                "tx_buffer_overflows": self.tx_buffer.overflows,
+                "tx_bytes_dropped": self.tx_buffer.bytes_dropped,
+                "rx_buffer_overflows": self.rx_buffer.overflows,
+                "rx_bytes_dropped": self.rx_buffer.bytes_dropped,
+                "samples_dropped": self.samples_dropped,
+                "tx_frames_dropped": self.tx_sampler.frames_dropped,
+            }
         
         if not samples:
             return {
@@ -219,23 +276,23 @@ class RadioLinkMonitor:
                 "matched_pairs": 0,
                 "avg_latency_ms": None,
                 "avg_rssi": None,
-                "packet_loss_percent": 100.0
+                "packet_loss_percent": 100.0,
+                **overflow
             }
         
-        # Count matched pairs and TX samples
+        # Count matched send slots against radio slots covered by TX frames
         matched = [s for s in samples if s.tx_throttle is not None and s.rx_throttle is not None]
         total_rx = len([s for s in samples if s.rx_throttle is not None])
-        total_tx = len([s for s in samples if s.tx_throttle is not None])
-        matched_count = len(matched)
+        total_tx = tx_slots
+        matched_count = rx_slots
         
-        # Calculate packet loss from captured TX samples.
+        # Calculate packet loss from radio send slots.
         packet_loss = ((total_tx - matched_count) / total_tx * 100) if total_tx > 0 else 100.0
         
-        # Compare aggregate TX vs RX means. Per-pair comparisons are noisy
-        # because TX/RX serial streams are asynchronous.
-        tx_throttles = [s.tx_throttle for s in samples if s.tx_throttle is not None]
+        # Compare aggregate TX vs RX means. TX uses the value current at each
+        # send slot; per-pair comparisons are noisy because TX/RX serial
+        # streams are asynchronous.
         rx_throttles = [s.rx_throttle for s in samples if s.rx_throttle is not None]
-        tx_steerings = [s.tx_steering for s in samples if s.tx_steering is not None]
         rx_steerings = [s.rx_steering for s in samples if s.rx_steering is not None]
 
         avg_tx_thr = sum(tx_throttles) / len(tx_throttles) if tx_throttles else 0
@@ -256,6 +313,14 @@ class RadioLinkMonitor:
         snr_values = [s.snr for s in matched if s.snr is not None]
         avg_snr = sum(snr_values) / len(snr_values) if snr_values else None
         
+        # Firmware link quality score (0-10, as shown on the TX display) per RX sample
+        scored = [s for s in samples if s.rssi is not None and s.snr is not None]
+        link_quality = summarize_link_quality(
+            [s.timestamp for s in scored],
+            [s.rssi for s in scored],
+            [s.snr for s in scored],
+        )
+        
         # Determine pass/fail
         passed = True
         reasons = []
@@ -277,14 +342,18 @@ class RadioLinkMonitor:
             reasons.append(f"Insufficient samples: {matched_count} pairs")
         
         # Debug info
-        debug_info = f"samples={len(samples)}, matched={matched_count}, tx={total_tx}"
+        debug_info = f"samples={len(samples)}, matched={matched_count}, tx={total_tx}, tx_frames={tx_frames}"
         
         result = {
             "test": "Radio Link Integration",
+            "tx_port": self.tx_device.port,
+            "rx_port": self.rx_device.port,
             "result": TestResult.PASS.value if passed else TestResult.FAIL.value,
             "details": "; ".join(reasons) if reasons else f"Radio link working correctly ({debug_info})",
             "samples_collected": len(samples),
             "tx_samples": total_tx,
+            "tx_frames": tx_frames,
+            "slot_phase_ms": round(slot_phase * 1000, 1) if slot_phase is not None else None,
             "rx_samples": total_rx,
             "matched_pairs": matched_count,
             "packet_loss_percent": round(packet_loss, 2),
@@ -293,7 +362,9 @@ class RadioLinkMonitor:
             "max_throttle_diff": max_throttle_diff,
             "max_steering_diff": max_steering_diff,
             "avg_rssi_dbm": avg_rssi,
-            "avg_snr_db": avg_snr
+            "avg_snr_db": avg_snr,
+            **link_quality,
+            **overflow
         }
         
         return result
@@ -4,24 +4,24 @@ Test functions specific to Receiver (RX) unit.
 """
 
 import time
-from typing import Dict, Any
+from typing import Dict, Any, List
 
 from ..device import BREmoteDevice
 from ..models import TestResult
+from ..registry import register_test, registered_tests
+from ..scheduler import TestCase, TestScheduler, IDLE, STREAMING
 
 
 class RXTestSuite:
     """Test suite for RX-specific functionality"""
     
     @staticmethod
+    @register_test("radio", "RX", devices=("rx",), tags=("radio",), requires=IDLE)
     def test_radio(device: BREmoteDevice) -> Dict[str, Any]:
         """Test RX radio functionality using ?printrssi"""
         result = {"test": "Radio RX", "result": TestResult.PENDING.value, "details": ""}
 
         try:
-            # Stop any previous continuous output
-            device.stop_continuous_output()
-            
             # Use ?printrssi to check radio link status
             response = device.send_command("?printrssi")
             
@@ -46,7 +46,9 @@ class RXTestSuite:
 
         return result
     
+    # ?printbat / ?printpwm keep printing until quit
     @staticmethod
+    @register_test("vesc", "RX", devices=("rx",), requires=IDLE, changes=(STREAMING,))
     def test_vesc(device: BREmoteDevice) -> Dict[str, Any]:
         """Test RX VESC/battery interface using ?printbat"""
         result = {"test": "VESC/Battery Interface", "result": TestResult.PENDING.value, "details": ""}
@@ -69,6 +71,7 @@ class RXTestSuite:
         return result
     
     @staticmethod
+    @register_test("pwm", "RX", devices=("rx",), requires=IDLE, changes=(STREAMING,))
     def test_pwm(device: BREmoteDevice) -> Dict[str, Any]:
         """Test RX PWM output using ?printpwm"""
         result = {"test": "PWM Output", "result": TestResult.PENDING.value, "details": ""}
@@ -90,24 +93,15 @@ class RXTestSuite:
         return result
     
     @staticmethod
-    def run_all(device: BREmoteDevice, log_callback=None) -> Dict[str, Any]:
+    def test_cases() -> List[TestCase]:
+        """RX tests with their device state preconditions"""
+        return registered_tests("rx", "RX")
+
+    @staticmethod
+    def run_all(device: BREmoteDevice, log_callback=None, **scheduler_args) -> Dict[str, Any]:
         """Run all RX tests"""
         if log_callback:
             log_callback("\n[RX] Running RX Test Suite...")
         
-        results = {}
-        
-        tests = [
-            ("radio", RXTestSuite.test_radio),
-            ("vesc", RXTestSuite.test_vesc),
-            ("pwm", RXTestSuite.test_pwm),
-        ]
-        
-        for test_name, test_func in tests:
-            if log_callback:
-                log_callback(f"\n[RX] Running {test_name} test...")
-            results[test_name] = test_func(device)
-            if log_callback:
-                log_callback(f"  Result: {results[test_name]['result']}")
-        
-        return results
+        scheduler = TestScheduler(device, log_callback, **scheduler_args)
+        return scheduler.run(RXTestSuite.test_cases())
@@ -4,23 +4,26 @@ Test functions specific to Transmitter (TX) unit.
 """
 
 import time
-from typing import Dict, Any
+from typing import Dict, Any, List
 
 from ..device import BREmoteDevice
 from ..models import TestResult
+from ..registry import register_test, registered_tests
+from ..scheduler import TestCase, TestScheduler, IDLE, STREAMING, RADIO
 
 
 class TXTestSuite:
     """Test suite for TX-specific functionality"""
     
     @staticmethod
+    @register_test("radio", "TX", tags=("radio",), requires=IDLE)
     def test_radio(device: BREmoteDevice) -> Dict[str, Any]:
         """Test TX radio functionality using ?state json and ?printPackets json"""
         result = {"test": "Radio TX", "result": TestResult.PENDING.value, "details": ""}
 
         try:
             # Use ?state json for structured status
-            data = device.send_json_command("?state")
+            data = device.get_state()
             if data:
                 radio_on = data.get("radio", "OFF")
                 last_pkt = data.get("last_pkt_ms")
@@ -43,12 +46,13 @@ class TXTestSuite:
         return result
     
     @staticmethod
+    @register_test("display", "TX", requires=IDLE)
     def test_display(device: BREmoteDevice) -> Dict[str, Any]:
         """Test TX display functionality using ?state json"""
         result = {"test": "Display TX", "result": TestResult.PENDING.value, "details": ""}
 
         try:
-            data = device.send_json_command("?state")
+            data = device.get_state()
             if data:
                 display_on = data.get("display", "UNKNOWN")
                 result["details"] = f"Display: {display_on}"
@@ -64,14 +68,12 @@ class TXTestSuite:
         return result
     
     @staticmethod
+    @register_test("hall", "TX", requires=IDLE)
     def test_hall(device: BREmoteDevice) -> Dict[str, Any]:
         """Test TX hall sensor (throttle and toggles) using ?printInputs json"""
         result = {"test": "Hall Sensors", "result": TestResult.PENDING.value, "details": ""}
 
         try:
-            # Stop any previous continuous output
-            device.stop_continuous_output()
-            
             data = device.send_json_command("?printInputs")
             
             # Stop the continuous print loop
@@ -100,13 +102,14 @@ class TXTestSuite:
         return result
     
     @staticmethod
+    @register_test("analog", "TX", requires=IDLE)
     def test_analog(device: BREmoteDevice) -> Dict[str, Any]:
         """Test TX analog inputs (battery monitoring) using ?state json"""
         result = {"test": "Analog Inputs", "result": TestResult.PENDING.value, "details": ""}
 
         try:
             # ?state json includes hall status which implies ADC is working
-            data = device.send_json_command("?state")
+            data = device.get_state()
             if data:
                 hall_on = data.get("hall", "UNKNOWN")
                 result["details"] = f"Hall/ADC subsystem: {hall_on}"
@@ -122,14 +125,12 @@ class TXTestSuite:
         return result
     
     @staticmethod
+    @register_test("rssi", "TX", tags=("radio",), requires={STREAMING: False, RADIO: True})
     def test_rssi(device: BREmoteDevice) -> Dict[str, Any]:
         """Test TX RSSI monitoring using ?printRSSI json"""
         result = {"test": "RSSI Monitoring", "result": TestResult.PENDING.value, "details": ""}
 
         try:
-            # Stop any previous continuous output
-            device.stop_continuous_output()
-            
             data = device.send_json_command("?printRSSI")
             
             # Stop the continuous print loop
@@ -164,26 +165,15 @@ class TXTestSuite:
         return result
     
     @staticmethod
-    def run_all(device: BREmoteDevice, log_callback=None) -> Dict[str, Any]:
+    def test_cases() -> List[TestCase]:
+        """TX tests with their device state preconditions"""
+        return registered_tests("tx", "TX")
+
+    @staticmethod
+    def run_all(device: BREmoteDevice, log_callback=None, **scheduler_args) -> Dict[str, Any]:
         """Run all TX tests"""
         if log_callback:
             log_callback("\n[TX] Running TX Test Suite...")
         
-        results = {}
-        
-        tests = [
-            ("radio", TXTestSuite.test_radio),
-            ("display", TXTestSuite.test_display),
-            ("hall", TXTestSuite.test_hall),
-            ("analog", TXTestSuite.test_analog),
-            ("rssi", TXTestSuite.test_rssi),
-        ]
-        
-        for test_name, test_func in tests:
-            if log_callback:
-                log_callback(f"\n[TX] Running {test_name} test...")
-            results[test_name] = test_func(device)
-            if log_callback:
-                log_callback(f"  Result: {results[test_name]['result']}")
-        
-        return results
+        scheduler = TestScheduler(device, log_callback, **scheduler_args)
+        return scheduler.run(TXTestSuite.test_cases())
@@ -3,19 +3,28 @@ BREmote Test Suite - WiFi Tests
 Test functions for WiFi / Web Config functionality (TX and RX).
 """
 
-import time
-from typing import Dict, Any, Optional
+from typing import Dict, Any, Optional, List
 
 from ..device import BREmoteDevice
 from ..models import TestResult
+from ..registry import register_test, registered_tests
+from ..scheduler import TestCase, TestScheduler, IDLE, WIFI
 
 
 class WiFiTestSuite:
     """Test suite for WiFi / Web Config functionality"""
-    
+
+    @staticmethod
+    def _ui_version_current(response: str) -> bool:
+        """True when ?wifiver reports ui_installed equal to ui_target"""
+        fields = dict(line.strip().split("=", 1) for line in response.splitlines()
+                      if line.strip().startswith(("ui_target=", "ui_installed=")))
+        return "ui_target" in fields and fields.get("ui_installed") == fields["ui_target"]
+
     # ========== TX WiFi Tests ==========
     
     @staticmethod
+    @register_test("wifi_state", "WIFI", requires=IDLE)
     def test_tx_wifi_state(device: BREmoteDevice) -> Dict[str, Any]:
         """Test WiFi status query via ?wifi and ?wifistate"""
         result = {"test": "WiFi State", "result": TestResult.PENDING.value, "details": ""}
@@ -65,6 +74,7 @@ class WiFiTestSuite:
         return result
     
     @staticmethod
+    @register_test("wifi_debug", "WIFI", tags=("destructive",), requires=IDLE)
     def test_tx_wifi_debug_mode(device: BREmoteDevice) -> Dict[str, Any]:
         """Test WiFi debug mode get/set via ?wifidbg"""
         result = {"test": "WiFi Debug Mode", "result": TestResult.PENDING.value, "details": ""}
@@ -100,6 +110,7 @@ class WiFiTestSuite:
         return result
     
     @staticmethod
+    @register_test("wifi_timeout", "WIFI", tags=("destructive",), requires=IDLE)
     def test_tx_wifi_startup_timeout(device: BREmoteDevice) -> Dict[str, Any]:
         """Test AP startup timeout get/set via ?wifips"""
         result = {"test": "WiFi Startup Timeout", "result": TestResult.PENDING.value, "details": ""}
@@ -155,6 +166,7 @@ class WiFiTestSuite:
         return result
     
     @staticmethod
+    @register_test("wifi_version", "WIFI", requires=IDLE)
     def test_tx_wifi_version(device: BREmoteDevice) -> Dict[str, Any]:
         """Test web UI version info via ?wifiver"""
         result = {"test": "WiFi Version", "result": TestResult.PENDING.value, "details": ""}
@@ -175,6 +187,7 @@ class WiFiTestSuite:
         return result
     
     @staticmethod
+    @register_test("wifi_error", "WIFI", requires=IDLE)
     def test_tx_wifi_error(device: BREmoteDevice) -> Dict[str, Any]:
         """Test error reporting via ?wifierr"""
         result = {"test": "WiFi Error", "result": TestResult.PENDING.value, "details": ""}
@@ -192,6 +205,7 @@ class WiFiTestSuite:
         return result
     
     @staticmethod
+    @register_test("wifi_onoff", "WIFI", tags=("destructive", "slow"), requires=IDLE, changes=(WIFI,))
     def test_tx_wifi_onoff(device: BREmoteDevice) -> Dict[str, Any]:
         """Test WiFi AP enable/disable cycle via ?wifi on/off"""
         result = {"test": "WiFi On/Off", "result": TestResult.PENDING.value, "details": ""}
@@ -210,10 +224,10 @@ class WiFiTestSuite:
                     result["result"] = TestResult.FAIL.value
                     return result
                 
-                # Check ?state json includes wifi status
-                data = device.send_json_command("?state")
+                # Check ?state json includes wifi status ("ON"/"OFF")
+                data = device.get_state()
                 if data and "wifi" in data:
-                    if data["wifi"] != 0:
+                    if str(data["wifi"]).upper() != "OFF":
                         result["details"] = f"WiFi should be off but state shows: {data.get('wifi')}"
                         result["result"] = TestResult.FAIL.value
                         return result
@@ -253,6 +267,7 @@ class WiFiTestSuite:
         return result
     
     @staticmethod
+    @register_test("wifi_ui_update", "WIFI", tags=("destructive", "slow"), requires=IDLE)
     def test_tx_wifi_ui_update(device: BREmoteDevice) -> Dict[str, Any]:
         """Test forced web UI update to SPIFFS via ?wifiupd"""
         result = {"test": "WiFi UI Update", "result": TestResult.PENDING.value, "details": ""}
@@ -260,15 +275,19 @@ class WiFiTestSuite:
         try:
             # Note: This test may take a while as it writes to SPIFFS
             response = device.send_command("?wifiupd", wait_for_response=True)
-            time.sleep(2)  # Give it time to complete
-            
-            # Check version after update
-            ver_resp = device.send_command("?wifiver")
-            if "version" in ver_resp.lower() or "ui" in ver_resp.lower():
-                result["details"] = f"UI update completed: {ver_resp[:120]}"
+            if "UI updated to" not in response:
+                result["details"] = f"UI update failed: {response[:80]}"
+                result["result"] = TestResult.FAIL.value
+                return result
+            # Check version once the SPIFFS write has completed
+            ver_resp = device.wait_for_response(
+                "?wifiver", WiFiTestSuite._ui_version_current,
+                timeout=5.0, poll=0.25, replaces=2.0)
+            if WiFiTestSuite._ui_version_current(ver_resp):
+                result["details"] = f"UI update completed: {response.strip()[:120]}"
                 result["result"] = TestResult.PASS.value
             else:
-                result["details"] = f"UI update may have failed: {response[:80]}"
+                result["details"] = f"Installed UI does not match target: {ver_resp[:120]}"
                 result["result"] = TestResult.FAIL.value
 
         except Exception as e:
@@ -280,6 +299,7 @@ class WiFiTestSuite:
     # ========== RX WiFi Tests ==========
     
     @staticmethod
+    @register_test("wifi_state", "WIFI", devices=("rx",), requires=IDLE)
     def test_rx_wifi_state(device: BREmoteDevice) -> Dict[str, Any]:
         """Test RX WiFi status"""
         result = {"test": "WiFi State (RX)", "result": TestResult.PENDING.value, "details": ""}
@@ -302,49 +322,29 @@ class WiFiTestSuite:
     # ========== Run All ==========
     
     @staticmethod
-    def run_all_tx(device: BREmoteDevice, log_callback=None) -> Dict[str, Any]:
+    def test_cases_tx() -> List[TestCase]:
+        """TX WiFi tests with their device state preconditions"""
+        return registered_tests("tx", "WIFI")
+
+    @staticmethod
+    def test_cases_rx() -> List[TestCase]:
+        """RX WiFi tests with their device state preconditions"""
+        return registered_tests("rx", "WIFI")
+
+    @staticmethod
+    def run_all_tx(device: BREmoteDevice, log_callback=None, **scheduler_args) -> Dict[str, Any]:
         """Run all TX WiFi tests"""
         if log_callback:
             log_callback("\n[WIFI] Running TX WiFi Test Suite...")
         
-        results = {}
-        
-        tests = [
-            ("wifi_state", WiFiTestSuite.test_tx_wifi_state),
-            ("wifi_debug", WiFiTestSuite.test_tx_wifi_debug_mode),
-            ("wifi_timeout", WiFiTestSuite.test_tx_wifi_startup_timeout),
-            ("wifi_version", WiFiTestSuite.test_tx_wifi_version),
-            ("wifi_error", WiFiTestSuite.test_tx_wifi_error),
-            ("wifi_onoff", WiFiTestSuite.test_tx_wifi_onoff),
-            ("wifi_ui_update", WiFiTestSuite.test_tx_wifi_ui_update),
-        ]
-        
-        for test_name, test_func in tests:
-            if log_callback:
-                log_callback(f"\n[WIFI] Running {test_name}...")
-            results[test_name] = test_func(device)
-            if log_callback:
-                log_callback(f"  Result: {results[test_name]['result']}")
-        
-        return results
+        scheduler = TestScheduler(device, log_callback, **scheduler_args)
+        return scheduler.run(WiFiTestSuite.test_cases_tx())
     
     @staticmethod
-    def run_all_rx(device: BREmoteDevice, log_callback=None) -> Dict[str, Any]:
+    def run_all_rx(device: BREmoteDevice, log_callback=None, **scheduler_args) -> Dict[str, Any]:
         """Run all RX WiFi tests"""
         if log_callback:
             log_callback("\n[WIFI] Running RX WiFi Test Suite...")
         
-        results = {}
-        
-        tests = [
-            ("wifi_state", WiFiTestSuite.test_rx_wifi_state),
-        ]
-        
-        for test_name, test_func in tests:
-            if log_callback:
-                log_callback(f"\n[WIFI] Running {test_name}...")
-            results[test_name] = test_func(device)
-            if log_callback:
-                log_callback(f"  Result: {results[test_name]['result']}")
-        
-        return results
+        scheduler = TestScheduler(device, log_callback, **scheduler_args)
+        return scheduler.run(WiFiTestSuite.test_cases_rx())
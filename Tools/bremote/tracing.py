@@ -0,0 +1,127 @@
+"""
+BREmote Test Suite - Timeline Tracing
+Chrome trace event export of serial commands, streams, waits and HTTP calls.
+
+With --trace FILE every send_command, ?print* stream start/stop, sleep,
+condition wait, test and HTTP call becomes a complete ("X") event on the
+track of its device port. Load the file in chrome://tracing or
+https://ui.perfetto.dev to see where units sit idle, which waits dominate
+and how well parallel runs overlap.
+
+Events are streamed to the file as they finish (JSON array format), so a
+crashed run still leaves a readable trace. When tracing is off, span()
+returns a no-op context manager around a fresh args dict, so callers can
+write into it from any thread.
+"""
+
+import json
+import os
+import threading
+import time
+from contextlib import contextmanager, nullcontext
+from typing import Any, Dict, Iterator, Optional
+
+class Tracer:
+    """Thread-safe Chrome trace writer; one track (tid) per name"""
+
+    def __init__(self):
+        self.enabled = False
+        self.path: Optional[str] = None
+        self.events = 0
+        self._file = None
+        self._lock = threading.Lock()
+        self._tracks: Dict[str, int] = {}
+        self._origin = time.perf_counter()
+        self._pid = os.getpid()
+
+    def start(self, path: str):
+        """Start writing events to path (replaces an existing file)"""
+        with self._lock:
+            self._file = open(path, "w", encoding="utf-8")
+            self._file.write("[\n")
+            self.path = path
+            self.events = 0
+            self._tracks = {}
+            self._origin = time.perf_counter()
+            self._write({"ph": "M", "name": "process_name", "pid": self._pid, "tid": 0,
+                         "args": {"name": "bremote"}})
+            self.enabled = True
+
+    def close(self) -> Optional[str]:
+        """Finish the JSON array; returns the trace path"""
+        with self._lock:
+            if self._file is None:
+                return None
+            self.enabled = False
+            self._file.write("\n]\n")
+            self._file.close()
+            self._file = None
+            return self.path
+
+    def clock(self) -> float:
+        """Trace timestamp in microseconds"""
+        return (time.perf_counter() - self._origin) * 1e6
+
+    def _write(self, event: Dict[str, Any]):
+        # Caller holds the lock
+        if self._file is None:
+            return
+        if self.events:
+            self._file.write(",\n")
+        self._file.write(json.dumps(event, default=str))
+        self.events += 1
+
+    def _tid(self, track: str) -> int:
+        # Caller holds the lock
+        tid = self._tracks.get(track)
+        if tid is None:
+            tid = self._tracks[track] = len(self._tracks) + 1
+            self._write({"ph": "M", "name": "thread_name", "pid": self._pid, "tid": tid,
+                         "args": {"name": track}})
+            self._write({"ph": "M", "name": "thread_sort_index", "pid": self._pid, "tid": tid,
+                         "args": {"sort_index": tid}})
+        return tid
+
+    def complete(self, name: str, track: str, start_us: float, cat: str = "serial",
+                 args: Optional[Dict[str, Any]] = None):
+        """Event from start_us (see clock()) until now"""
+        if not self.enabled:
+            return
+        end_us = self.clock()
+        event = {"ph": "X", "name": name, "cat": cat, "ts": round(start_us, 1),
+                 "dur": round(end_us - start_us, 1), "pid": self._pid}
+        if args:
+            event["args"] = args
+        with self._lock:
+            event["tid"] = self._tid(track)
+            self._write(event)
+
+    def instant(self, name: str, track: str, cat: str = "mark", args: Optional[Dict[str, Any]] = None):
+        if not self.enabled:
+            return
+        event = {"ph": "i", "s": "t", "name": name, "cat": cat, "ts": round(self.clock(), 1),
+                 "pid": self._pid}
+        if args:
+            event["args"] = args
+        with self._lock:
+            event["tid"] = self._tid(track)
+            self._write(event)
+
+    def span(self, name: str, track: str, cat: str = "serial", **args):
+        """Context manager recording a complete event; yields a dict for extra args"""
+        if not self.enabled:
+            # A fresh dict per span: callers store results in it concurrently
+            return nullcontext({})
+        return self._span(name, track, cat, args)
+
+    @contextmanager
+    def _span(self, name: str, track: str, cat: str, args: Dict[str, Any]) -> Iterator[Dict[str, Any]]:
+        start = self.clock()
+        try:
+            yield args
+        finally:
+            self.complete(name, track, start, cat, args)
+
+
+# Shared by all devices, tests and runners
+tracer = Tracer()
@@ -0,0 +1,229 @@
+"""
+BREmote Test Suite - TX Sampler
+Keeps every TX input frame and aligns it to the 10Hz radio send schedule.
+"""
+
+import math
+from array import array
+from bisect import bisect_left, bisect_right
+from collections import deque
+from typing import Iterable, Optional, Tuple, List
+
+# TX sendData task runs every 100ms (xFrequency in Radio.ino)
+RADIO_SEND_PERIOD = 0.1
+
+
+class TxSampler:
+    """Compact TX frame store with send-slot alignment.
+
+    ?printInputs json reports thr_sent/steer_sent every ~50ms, twice the
+    radio rate. Instead of dropping frames, every frame is kept and the
+    frame that was actually radioed is looked up per send slot.
+
+    The slot phase is inferred from value changes: when RX first shows a
+    new value at time t_rx and that value first appeared on TX at t_c, a
+    send slot must lie within [t_c, t_rx]. The phase consistent with most
+    of these intervals is used.
+    """
+
+    PHASE_STEPS = 50
+    MAX_CHANGE_INTERVALS = 256
+
+    def __init__(self, period: float = RADIO_SEND_PERIOD, capacity: Optional[int] = None):
+        self.period = period
+        self.capacity = capacity
+        self.frames_dropped = 0
+        self.timestamps = array('d')
+        self.throttle = array('h')
+        self.steering = array('h')
+        self._change_intervals = deque(maxlen=self.MAX_CHANGE_INTERVALS)
+        self._last_rx_values: Optional[Tuple[int, int]] = None
+        self._phase: Optional[float] = None
+        self._phase_dirty = False
+
+    def __len__(self) -> int:
+        return len(self.timestamps)
+
+    def add_frame(self, timestamp: float, throttle: Optional[int], steering: Optional[int]):
+        """Record one TX frame (missing values repeat the previous frame)"""
+        if throttle is None:
+            throttle = self.throttle[-1] if self.throttle else 0
+        if steering is None:
+            steering = self.steering[-1] if self.steering else 0
+        self.timestamps.append(timestamp)
+        self.throttle.append(throttle)
+        self.steering.append(steering)
+
+        if self.capacity and len(self.timestamps) > self.capacity:
+            # Drop the oldest quarter at once to keep trimming amortized
+            drop = max(1, self.capacity // 4)
+            del self.timestamps[:drop]
+            del self.throttle[:drop]
+            del self.steering[:drop]
+            self.frames_dropped += drop
+
+    def _values(self, idx: int) -> Tuple[int, int]:
+        return self.throttle[idx], self.steering[idx]
+
+    def _run_start(self, idx: int, lower: int) -> Optional[int]:
+        """Index of the first frame of the constant-value run ending at idx.
+
+        Returns None if the run started before lower (change too old to
+        constrain the slot phase).
+        """
+        values = self._values(idx)
+        while idx > lower and self._values(idx - 1) == values:
+            idx -= 1
+        if idx == lower and idx > 0 and self._values(idx - 1) == values:
+            return None
+        return idx
+
+    def observe_rx(self, timestamp: float, throttle: Optional[int], steering: Optional[int]):
+        """Feed RX cadence; value changes constrain the send slot phase"""
+        values = (throttle, steering)
+        changed = self._last_rx_values is not None and values != self._last_rx_values
+        self._last_rx_values = values
+        if not changed or not self.timestamps:
+            return
+
+        # Find the most recent TX run carrying the new RX value
+        idx = bisect_right(self.timestamps, timestamp) - 1
+        lower = bisect_left(self.timestamps, timestamp - 2 * self.period)
+        while idx >= lower and self._values(idx) != values:
+            idx -= 1
+        if idx < lower:
+            return
+
+        start = self._run_start(idx, lower)
+        if start is None:
+            return
+        self._change_intervals.append((self.timestamps[start], timestamp))
+        self._phase_dirty = True
+
+    def phase(self) -> Optional[float]:
+        """Send slot phase in seconds (mod period), None if not yet inferable"""
+        if self._phase_dirty:
+            self._phase = self._estimate_phase()
+            self._phase_dirty = False
+        return self._phase
+
+    def _estimate_phase(self) -> Optional[float]:
+        if not self._change_intervals:
+            return None
+
+        period = self.period
+        step = period / self.PHASE_STEPS
+        scores = []
+        for i in range(self.PHASE_STEPS):
+            phase = i * step
+            hits = 0
+            for start, end in self._change_intervals:
+                # First slot at or after the change
+                slot_time = phase + math.ceil((start - phase) / period) * period
+                if slot_time <= end:
+                    hits += 1
+            scores.append(hits)
+
+        # Centre of the longest run of best-scoring phases (circular)
+        best = max(scores)
+        flags = [s == best for s in scores]
+        best_start, best_len = 0, 0
+        for i in range(self.PHASE_STEPS):
+            if not flags[i] or flags[i - 1]:
+                continue
+            length = 0
+            while length < self.PHASE_STEPS and flags[(i + length) % self.PHASE_STEPS]:
+                length += 1
+            if length > best_len:
+                best_start, best_len = i, length
+        if best_len == 0:
+            # Every phase scores the same
+            return None
+        return ((best_start + (best_len - 1) / 2) * step) % period
+
+    def slot_time(self, timestamp: float) -> float:
+        """Time of the latest send slot at or before timestamp"""
+        phase = self.phase()
+        if phase is None:
+            return timestamp
+        return phase + math.floor((timestamp - phase) / self.period) * self.period
+
+    def slot_index(self, timestamp: float) -> int:
+        """Send slot number containing timestamp"""
+        phase = self.phase() or 0.0
+        return int(math.floor((timestamp - phase) / self.period))
+
+    def match(self, rx_time: float, rx_throttle: Optional[int],
+              rx_steering: Optional[int]) -> Optional[int]:
+        """Index of the TX frame radioed for an RX sample received at rx_time.
+
+        Starts from the frame current at the latest send slot and prefers a
+        nearby frame whose values equal the RX values.
+        """
+        if not self.timestamps:
+            return None
+
+        slot_time = self.slot_time(rx_time)
+        idx = bisect_right(self.timestamps, slot_time) - 1
+        if idx < 0:
+            idx = 0
+
+        rx_values = (rx_throttle, rx_steering)
+        if self._values(idx) == rx_values:
+            return idx
+
+        lo = bisect_left(self.timestamps, slot_time - self.period)
+        hi = bisect_right(self.timestamps, rx_time)
+        best = None
+        for i in range(lo, hi):
+            if self._values(i) == rx_values:
+                if best is None or abs(self.timestamps[i] - slot_time) < abs(self.timestamps[best] - slot_time):
+                    best = i
+        return best if best is not None else idx
+
+    def _slot_range(self) -> Tuple[int, int, float]:
+        """First/last send slot covered by the captured frames, and the phase.
+
+        The first slot is the first one at or after the oldest frame: an
+        earlier slot radioed a frame that was never captured. The phase is
+        read once so every slot of one analysis uses the same schedule.
+        """
+        phase = self.phase() or 0.0
+        first_t, last_t = self.timestamps[0], self.timestamps[-1]
+        first = int(math.ceil((first_t - phase) / self.period))
+        last = int(math.floor((last_t - phase) / self.period))
+        return first, last, phase
+
+    def slot_count(self) -> int:
+        """Number of radio send slots covered by the captured TX frames"""
+        if not self.timestamps:
+            return 0
+        first, last, _ = self._slot_range()
+        return max(last - first + 1, 0)
+
+    def matched_slots(self, rx_times: Iterable[float]) -> int:
+        """Number of covered send slots that at least one RX sample landed in.
+
+        Uses the same (final) phase as slot_count(), so slot assignments
+        made while the phase was still being inferred do not skew loss.
+        """
+        if not self.timestamps:
+            return 0
+        first, last, phase = self._slot_range()
+        slots = {int(math.floor((t - phase) / self.period)) for t in rx_times}
+        return sum(1 for slot in slots if first <= slot <= last)
+
+    def slot_values(self) -> Tuple[List[int], List[int]]:
+        """Throttle/steering values that were current at each send slot"""
+        thr: List[int] = []
+        steer: List[int] = []
+        if not self.timestamps:
+            return thr, steer
+
+        first, last, phase = self._slot_range()
+        for slot in range(first, last + 1):
+            slot_time = phase + slot * self.period
+            idx = max(bisect_right(self.timestamps, slot_time) - 1, 0)
+            thr.append(self.throttle[idx])
+            steer.append(self.steering[idx])
+        return thr, steer
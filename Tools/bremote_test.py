@@ -16,7 +16,6 @@ Usage:
 import sys
 import time
 import serial
-import serial.tools.list_ports
 import threading
 import json
 import argparse
@@ -25,19 +24,24 @@ from dataclasses import dataclass, asdict
 from typing import Optional, List, Dict, Tuple, Callable
 from enum import Enum
 import logging
-import subprocess
-import urllib.request
-import urllib.parse
-import urllib.error
 import re
 
-# Optional GUI support
-try:
-    import tkinter as tk
-    from tkinter import ttk, scrolledtext, messagebox
-    GUI_AVAILABLE = True
-except ImportError:
-    GUI_AVAILABLE = False
+# Optional GUI support, loaded by _load_gui() only for --gui so that the
+# CLI modes start without importing tkinter. subprocess (netsh) and
+# urllib (web API) are likewise imported by the methods that use them.
+GUI_AVAILABLE = False
+
+
+def _load_gui() -> bool:
+    """Import tkinter into the module namespace; returns GUI_AVAILABLE"""
+    global tk, ttk, scrolledtext, messagebox, GUI_AVAILABLE
+    try:
+        import tkinter as tk
+        from tkinter import ttk, scrolledtext, messagebox
+        GUI_AVAILABLE = True
+    except ImportError:
+        GUI_AVAILABLE = False
+    return GUI_AVAILABLE
 
 
 class DeviceType(Enum):
@@ -65,12 +69,26 @@ class TestReport:
         return json.dumps(asdict(self), indent=2)
 
 
+def wait_until(predicate: Callable[[], bool], timeout: float, poll: float = 0.05) -> Tuple[bool, float]:
+    """Poll predicate until true or timeout; returns (satisfied, seconds waited)"""
+    start = time.time()
+    while not predicate():
+        remaining = timeout - (time.time() - start)
+        if remaining <= 0:
+            return False, time.time() - start
+        time.sleep(min(poll, remaining))
+    return True, time.time() - start
+
+
 class BREmoteDevice:
     """Represents a connected BREmote device (TX or RX)"""
     
     BAUD_RATE = 115200
     TIMEOUT = 2.0
     COMMAND_DELAY = 0.1
+    # Boot output after a port-open reset starts within BOOT_OUTPUT_START
+    BOOT_OUTPUT_START = 0.5
+    BOOT_QUIET_PERIOD = 0.1
     
     def __init__(self, port: str):
         self.port = port
@@ -78,6 +96,9 @@ class BREmoteDevice:
         self.serial: Optional[serial.Serial] = None
         self.lock = threading.Lock()
         self.last_response = ""
+        # Condition waits: time spent and fixed sleep time saved
+        self.wait_time = 0.0
+        self.sleep_avoided = 0.0
         
     def connect(self) -> bool:
         """Establish serial connection"""
@@ -88,12 +109,73 @@ class BREmoteDevice:
                 timeout=self.TIMEOUT,
                 write_timeout=1.0
             )
-            time.sleep(0.5)  # Allow device to initialize
+            # Allow device to initialize (boot output has stopped)
+            self.settle()
             self._flush_buffers()
             return True
         except Exception as e:
             logging.error(f"Failed to connect to {self.port}: {e}")
             return False
+
+    def wait_until(self, predicate: Callable[[], bool], timeout: float,
+                   poll: float = 0.05, replaces: float = 0.0) -> bool:
+        """Bounded condition wait standing in for a fixed sleep of `replaces` seconds"""
+        ok, elapsed = wait_until(predicate, timeout, poll)
+        self._count_wait(elapsed, replaces)
+        return ok
+
+    def _count_wait(self, elapsed: float, replaces: float):
+        """Add a wait; one that ran past the old sleep avoided nothing"""
+        self.wait_time += elapsed
+        if replaces:
+            self.sleep_avoided += max(0.0, replaces - elapsed)
+
+    def settle(self, timeout: float = 3.0):
+        """Wait for boot output to start (opening the port can reset the ESP32), then stop"""
+        start = time.time()
+        if self.wait_until(self.has_output, self.BOOT_OUTPUT_START, poll=0.01):
+            self.wait_until(self.quiet(self.BOOT_QUIET_PERIOD), timeout, poll=0.01,
+                            replaces=max(0.0, self.BOOT_OUTPUT_START - (time.time() - start)))
+
+    def has_output(self) -> bool:
+        """Whether the device has unread output"""
+        return bool(self.serial and self.serial.is_open and self.serial.in_waiting)
+
+    def quiet(self, period: float = 0.05) -> Callable[[], bool]:
+        """Predicate: no output for `period` seconds (output is discarded)"""
+        last_data = [time.time()]
+
+        def check() -> bool:
+            if self.has_output():
+                try:
+                    self.serial.read(self.serial.in_waiting)
+                except Exception:
+                    pass
+                last_data[0] = time.time()
+                return False
+            return time.time() - last_data[0] >= period
+
+        return check
+
+    def wait_for_response(self, command: str, check: Callable[[str], bool], timeout: float,
+                          poll: float = 0.1, replaces: float = 0.0) -> str:
+        """Repeat command until check(response) is true; returns the last response.
+
+        Only the pauses between sends count against `replaces`; each
+        send_command() accounts for its own reply wait.
+        """
+        start = time.time()
+        paused = 0.0
+        while True:
+            response = self.send_command(command)
+            remaining = timeout - (time.time() - start)
+            if check(response) or remaining <= 0:
+                break
+            pause = min(poll, remaining)
+            time.sleep(pause)
+            paused += pause
+        self._count_wait(paused, replaces)
+        return response
     
     def disconnect(self):
         """Close serial connection"""
@@ -119,7 +201,9 @@ class BREmoteDevice:
                 self.serial.flush()
                 
                 if wait_for_response:
-                    time.sleep(self.COMMAND_DELAY)
+                    # Reply usually starts well within COMMAND_DELAY
+                    self.wait_until(self.has_output, self.COMMAND_DELAY, poll=0.01,
+                                    replaces=self.COMMAND_DELAY)
                     response = self._read_response()
                     self.last_response = response
                     return response
@@ -240,7 +324,8 @@ class RadioLinkMonitor:
 
         # Enable continuous JSON output on both devices
         self.tx_device.send_command("?printInputs json", wait_for_response=False)
-        time.sleep(0.2)
+        # Start RX once TX is streaming
+        self.tx_device.wait_until(self.tx_device.has_output, timeout=0.5, poll=0.01, replaces=0.2)
         self.rx_device.send_command("?printreceived json", wait_for_response=False)
         
         self.running = True
@@ -495,6 +580,8 @@ class BREmoteTester:
         self.gui_callback = gui_callback
         self.devices: List[BREmoteDevice] = []
         self.test_results: Dict[str, TestReport] = {}
+        # Fixed sleep time saved by host-side condition waits
+        self.host_sleep_avoided = 0.0
         
     def log(self, message: str):
         """Log message to console and optionally GUI"""
@@ -509,6 +596,7 @@ class BREmoteTester:
     def scan_ports(self) -> List[str]:
         """Scan for available COM ports with BREmote devices"""
         self.log("\n[SCAN] Scanning for BREmote devices...")
+        import serial.tools.list_ports
         ports = serial.tools.list_ports.comports()
         bre_ports = []
         
@@ -595,7 +683,7 @@ class BREmoteTester:
         try:
             data = device.send_json_command("?printInputs")
             # Stop the continuous print loop
-            time.sleep(0.1)
+            device.wait_until(device.has_output, timeout=0.1, poll=0.01, replaces=0.1)
             device.send_command("quit", wait_for_response=False)
 
             if data and "throttle" in data:
@@ -645,7 +733,7 @@ class BREmoteTester:
 
         try:
             data = device.send_json_command("?printRSSI")
-            time.sleep(0.1)
+            device.wait_until(device.has_output, timeout=0.1, poll=0.01, replaces=0.1)
             device.send_command("quit", wait_for_response=False)
 
             if data:
@@ -680,7 +768,7 @@ class BREmoteTester:
         try:
             # Use ?printrssi to check radio link status
             response = device.send_command("?printrssi")
-            time.sleep(0.2)
+            device.wait_until(device.has_output, timeout=0.2, poll=0.01, replaces=0.2)
             device.send_command("quit", wait_for_response=False)
             
             if "rssi" in response.lower() or "link" in response.lower() or "rx" in response.lower():
@@ -706,7 +794,7 @@ class BREmoteTester:
             # Use ?printbat to check VESC/telemetry status
             # ?printbat enters a loop — send quit to exit it
             response = device.send_command("?printbat")
-            time.sleep(1.5)
+            device.wait_until(device.has_output, timeout=1.5, poll=0.01, replaces=1.5)
             device.send_command("quit")
 
             if "vesc" in response.lower() or "volt" in response.lower() or "bat" in response.lower() or "measured" in response.lower() or "data_src" in response.lower():
@@ -731,7 +819,7 @@ class BREmoteTester:
         try:
             # ?printpwm enters a loop — send quit to exit it
             response = device.send_command("?printpwm")
-            time.sleep(1.5)
+            device.wait_until(device.has_output, timeout=1.5, poll=0.01, replaces=1.5)
             device.send_command("quit")
 
             if "pwm" in response.lower():
@@ -1159,8 +1247,9 @@ class BREmoteTester:
 
             # Turn on
             on_resp = device.send_command("?wifi on")
-            time.sleep(0.5)  # Allow AP to start
-            verify_on = device.send_command("?wifi")
+            # Allow AP to start
+            verify_on = device.wait_for_response("?wifi", lambda r: "ON" in r.upper(),
+                                                 timeout=3.0, replaces=0.5)
             if "ON" in verify_on.upper():
                 checks.append("on:OK")
             else:
@@ -1181,8 +1270,8 @@ class BREmoteTester:
 
             # Turn off
             off_resp = device.send_command("?wifi off")
-            time.sleep(0.3)
-            verify_off = device.send_command("?wifi")
+            verify_off = device.wait_for_response("?wifi", lambda r: "OFF" in r.upper(),
+                                                  timeout=3.0, replaces=0.3)
             if "OFF" in verify_off.upper():
                 checks.append("off:OK")
             else:
@@ -1192,7 +1281,7 @@ class BREmoteTester:
             # Restore original state
             if was_on:
                 device.send_command("?wifi on")
-                time.sleep(0.3)
+                device.wait_until(device.quiet(0.1), timeout=0.3, replaces=0.3)
 
             result["details"] = f"{', '.join(checks)} (restored={'ON' if was_on else 'OFF'})"
             result["result"] = TestResult.PASS.value if all_ok else TestResult.FAIL.value
@@ -1212,7 +1301,7 @@ class BREmoteTester:
         try:
             response = device.send_command("?wifiupd", wait_for_response=True)
             # Allow extra time for SPIFFS write
-            time.sleep(0.5)
+            device.wait_until(lambda: bool(response) or device.has_output(), timeout=0.5, replaces=0.5)
             if not response:
                 response = device._read_response()
 
@@ -1263,6 +1352,7 @@ class BREmoteTester:
 
         Parses the active interface block and prefers SSID only when state is connected.
         """
+        import subprocess
         try:
             out = subprocess.check_output(
                 ["netsh", "wlan", "show", "interfaces"],
@@ -1315,7 +1405,7 @@ class BREmoteTester:
         """Connect the host PC to a WiFi network (Windows only).
         Retries the connect command if the AP isn't visible yet."""
         self.log(f"  Connecting to WiFi '{ssid}'...")
-        import tempfile, os
+        import subprocess, tempfile, os
 
         # Create a temporary profile XML
         profile_xml = f"""<?xml version="1.0"?>
@@ -1387,6 +1477,7 @@ class BREmoteTester:
 
     def _wifi_restore(self, previous_ssid: Optional[str], test_ssid: Optional[str] = None):
         """Reconnect to the previous WiFi network and clean up the temp profile"""
+        import subprocess
         try:
             profiles_to_delete = [test_ssid] if test_ssid else [self.WEB_API_TX_SSID, self.WEB_API_RX_SSID]
             for profile in profiles_to_delete:
@@ -1405,12 +1496,15 @@ class BREmoteTester:
                     ["netsh", "wlan", "connect", f"name={previous_ssid}"],
                     text=True, timeout=5, capture_output=True, creationflags=subprocess.CREATE_NO_WINDOW
                 )
-                time.sleep(3)
+                _, elapsed = wait_until(lambda: self._wifi_get_current_ssid() == previous_ssid,
+                                        timeout=5.0, poll=0.5)
+                self.host_sleep_avoided += max(0.0, 3.0 - elapsed)
             except Exception:
                 self.log(f"  [WARN] Could not restore WiFi to '{previous_ssid}'")
 
     def _http_get(self, path: str, timeout: float = 5.0) -> Tuple[int, str, str]:
         """HTTP GET, returns (status_code, content_type, body)"""
+        import urllib.request, urllib.error
         url = self.WEB_API_BASE + path
         req = urllib.request.Request(url)
         try:
@@ -1425,6 +1519,7 @@ class BREmoteTester:
 
     def _http_post(self, path: str, params: Dict[str, str], timeout: float = 5.0) -> Tuple[int, str, str]:
         """HTTP POST with form-encoded params, returns (status_code, content_type, body)"""
+        import urllib.request, urllib.parse, urllib.error
         url = self.WEB_API_BASE + path
         data = urllib.parse.urlencode(params).encode("utf-8")
         req = urllib.request.Request(url, data=data, method="POST")
@@ -1462,8 +1557,8 @@ class BREmoteTester:
 
             # Ensure AP is on — give it time to start broadcasting
             device.send_command("?wifi on")
-            time.sleep(3)
-            verify = device.send_command("?wifi")
+            verify = device.wait_for_response("?wifi", lambda r: "ON" in r.upper(),
+                                              timeout=5.0, replaces=3.0)
             if "ON" not in verify.upper():
                 result["details"] = "Failed to enable WiFi AP"
                 result["result"] = TestResult.FAIL.value
@@ -1809,7 +1904,7 @@ class BREmoteTester:
         if device.device_type == DeviceType.TRANSMITTER:
             self.log("\n[INIT] Exiting charging mode...")
             device.send_command("?exitchg", wait_for_response=False)
-            time.sleep(0.5)
+            device.wait_until(device.quiet(0.1), timeout=0.5, replaces=0.5)
             # Flush any charging mode messages
             if device.serial and device.serial.in_waiting:
                 try:
@@ -1822,7 +1917,7 @@ class BREmoteTester:
             # WiFi is active. Turn it off so the radio link can establish.
             self.log("\n[INIT] Turning off WiFi AP for radio link...")
             device.send_command("?wifi off")
-            time.sleep(0.3)
+            device.wait_until(device.quiet(0.1), timeout=0.3, replaces=0.3)
             self.log("   [OK] WiFi AP disabled")
     
     def _interactive_tx_test(self, device: BREmoteDevice, gui_root=None) -> TestReport:
@@ -1853,7 +1948,7 @@ class BREmoteTester:
             )
             
             # Re-check after user attempts unlock
-            time.sleep(1.0)
+            device.wait_until(device.quiet(0.2), timeout=1.0, replaces=1.0)
             ok, message, config = self._check_device_state(device, gui_root)
             
             if not ok and "LOCKED" in message.upper():
@@ -2029,7 +2124,7 @@ class BREmoteTester:
         user_input = self._show_prompt(test_name, prompt, gui_root)
         
         # Wait a moment for user to complete action
-        time.sleep(0.5)
+        device.wait_until(device.quiet(0.1), timeout=0.5, replaces=0.5)
         
         # Verify response
         result = verify_fn(device)
@@ -2104,7 +2199,7 @@ class BREmoteTester:
         locked, in_menu, steer_enabled, hall_enabled.  Returns None on failure.
         """
         data = device.send_json_command("?printInputs")
-        time.sleep(0.1)
+        device.wait_until(device.has_output, timeout=0.1, poll=0.01, replaces=0.1)
         device.send_command("quit", wait_for_response=False)
         if data and "throttle" in data:
             self.log(f"   [DEBUG] Inputs JSON: {data}")
@@ -2201,9 +2296,15 @@ class BREmoteTester:
         """Verify radio is receiving data using ?printPackets json"""
         # Clear counters first
         device.send_command("?clearPackets", wait_for_response=False)
-        time.sleep(2.0)  # Wait for reception
+        # Poll until packets arrive; replaces a 2s sleep plus one read
+        polled = [None]
+
+        def received() -> bool:
+            polled[0] = device.send_json_command("?printPackets")
+            return bool(polled[0] and polled[0].get("received", 0) > 0)
 
-        data = device.send_json_command("?printPackets")
+        device.wait_until(received, timeout=5.0, poll=0.1, replaces=2.0 + device.TIMEOUT)
+        data = polled[0]
         if data and "received" in data:
             count = data.get("received", 0)
             if count > 0:
@@ -2335,7 +2436,14 @@ class BREmoteTester:
             except Exception as e:
                 self.log(f"\n[ERROR] Tests for {device.port} aborted: {e}")
 
+        self._log_sleep_avoided()
         return self.test_results
+
+    def _log_sleep_avoided(self):
+        """Report time saved by condition waits over the former fixed sleeps"""
+        waited = sum(device.wait_time for device in self.devices)
+        avoided = self.host_sleep_avoided + sum(device.sleep_avoided for device in self.devices)
+        self.log(f"\n[WAIT] Condition waits: {waited:.2f}s waited, {avoided:.2f}s of fixed sleeps avoided")
     
     def test_radio_link(self, duration: float = 10.0) -> Optional[Dict]:
         """Test radio link between TX and RX"""
@@ -2415,6 +2523,7 @@ class BREmoteTester:
             except Exception as e:
                 self.log(f"\n[ERROR] Tests for {device.port} aborted: {e}")
         
+        self._log_sleep_avoided()
         return results
     
     def cleanup(self):
@@ -2635,7 +2744,7 @@ def main():
     
     # GUI mode
     if args.gui:
-        if not GUI_AVAILABLE:
+        if not _load_gui():
             print("[ERROR] GUI not available. Install tkinter or use CLI mode.")
             sys.exit(1)
         
@@ -0,0 +1,109 @@
+"""
+Config sessions: one snapshot, the minimal diff over the cheapest path,
+one save and one read-back; firmware cross-field rules are respected
+before anything is sent.
+"""
+
+import pytest
+
+from bremote.configsession import ConfigError, ConfigSession
+from bremote.emulator import EmulatedDevice, EmulatedWebApi
+
+
+def _device(kind):
+    device = EmulatedDevice(f"emu-{kind}", kind, stream=False)
+    device.connect()
+    device.identify()
+    return device
+
+
+def test_blob_path_single_round_trip_and_clamps():
+    device = _device("tx")
+    commands = device.io["commands"]
+    result = ConfigSession(device).apply({"max_gears": 4, "startgear": 7, "rf_power": 10})
+
+    assert result.ok and result.path == "blob" and result.saved and result.verified, result.error
+    assert result.changes == {"max_gears": 4, "startgear": 3, "rf_power": 10}
+    assert result.clamped == {"startgear": 3}
+    assert result.reboot_required
+    # snapshot, ?setconf + ?applyconf, read-back
+    assert result.round_trips == 3 and device.io["commands"] == commands + 3
+    assert set(result.timings_ms) >= {"snapshot", "apply", "verify", "total"}
+    assert device.get_config_value("startgear") == "3"
+
+
+def test_pipelined_set_keeps_every_step_valid():
+    device = _device("rx")
+    device.serial.stored = "not-a-blob"
+    session = ConfigSession(device)
+    desired = {"pwm0_min": 2100, "pwm0_max": 2400, "failsafe_time": 500}
+    session.snapshot()
+    # pwm0_min above the current pwm0_max: pwm0_max has to go first
+    assert session.set_order(session.plan(desired)[0]) == ["pwm0_max", "pwm0_min", "failsafe_time"]
+
+    commands = device.io["commands"]
+    result = session.apply(desired)
+    assert result.ok and result.path == "set" and result.saved, result.error
+    # snapshot, one pipelined window of ?set, ?save, read-back
+    assert result.round_trips == 4 and device.io["commands"] == commands + 6
+    assert device.get_config_value("pwm0_max") == "2400"
+    assert device.read_config()["pwm0_min"] == 2100
+
+
+def test_batch_path_over_web_api():
+    device = _device("rx")
+    api = EmulatedWebApi(device.serial)
+    try:
+        result = ConfigSession(device, web_api=api.url).apply({"ubat_offset": 0.25, "failsafe_time": 800},
+                                                               path="batch")
+    finally:
+        api.close()
+    assert result.ok and result.verified, result.error
+    # GET config, set_batch, save, GET config
+    assert api.requests == 4 and result.round_trips == 4
+    assert device.read_config()["failsafe_time"] == 800
+
+
+def test_rejected_config_sends_nothing():
+    device = _device("rx")
+    session = ConfigSession(device)
+    session.snapshot()
+    with pytest.raises(ConfigError):
+        session.plan({"failsafe_time": 50})
+    with pytest.raises(ConfigError):
+        session.plan({"no_such_key": 1})
+    # kCfgFields ranges, as ?set checks them
+    with pytest.raises(ConfigError, match="ERR_RANGE:rf_power"):
+        session.plan({"rf_power": 99})
+    with pytest.raises(ConfigError, match="ERR_BAD_VALUE:wifi_password"):
+        session.plan({"wifi_password": "short"})
+
+    commands = device.io["commands"]
+    result = session.apply({"pwm1_max": 1000})
+    assert not result.ok and "PWM1_max" in result.error and not result.changes
+    assert device.io["commands"] == commands + 1
+
+
+def test_out_of_range_never_reaches_the_blob_path():
+    device = _device("tx")
+    commands = device.io["commands"]
+    result = ConfigSession(device).apply({"rf_power": 99, "thr_expo": 5000}, path="blob")
+    assert not result.ok and "ERR_RANGE:rf_power" in result.error
+    assert device.io["commands"] == commands + 1 and device.get_config_value("rf_power") == "22"
+
+    # A unit already holding an out-of-range value: no blob, and ?save refuses it
+    device.serial.config["thr_expo"] = 5000
+    result = ConfigSession(device).apply({"rf_power": 10})
+    assert not result.ok and result.path == "set" and "ERR_RANGE:thr_expo" in result.error
+    with_blob = ConfigSession(device).apply({"rf_power": 12}, path="blob")
+    assert not with_blob.ok and "blob path refused" in with_blob.error
+
+    # The emulator mirrors the firmware: ?set range-checks, ?applyconf
+    # overwrites the running config before it validates
+    assert device.send_command("?set rf_power 99") == "ERR: ERR_RANGE:rf_power"
+    layout = device.serial.layout
+    blob = layout.encode_b64(dict(device.serial.config, thr_expo=5000, rf_power=99))
+    device.send_command(f"?setconf {blob}\n?applyconf", wait_for_response=False)
+    lines = [device.read_line() for _ in range(4)]
+    assert lines[-1].startswith("Config validation failed: ERR_RANGE:rf_power")
+    assert device.get_config_value("rf_power") == "99"
@@ -0,0 +1,91 @@
+"""
+Config struct codec: layouts match the firmware structs, blobs round-trip,
+and an emulated unit reads / writes its whole config in one round trip.
+"""
+
+import base64
+import struct
+
+import pytest
+
+from bremote.confstruct import ConfStructError, LAYOUTS, decode_blob, find_blob, get_layout
+from bremote.device import STATE_CONFIG_KEYS
+from bremote.emulator import EmulatedDevice
+from bremote.models import DeviceType, TestResult
+from bremote.tests.config_tests import ConfigTestSuite
+
+# sizeof(confStruct) as computed by config_converter.html
+SIZES = {("tx", 1): 68, ("tx", 2): 80, ("tx", 3): 92, ("rx", 1): 52, ("rx", 2): 88, ("rx", 3): 96}
+
+
+def test_layout_sizes_and_offsets():
+    assert {key: layout.size for key, layout in LAYOUTS.items()} == SIZES
+    layout = get_layout("tx", 3)
+    raw = layout.encode(dict(layout.defaults, ubat_cal=0.5, own_address="A1:B2:C3"))
+    # 28 uint16 fields, then the float at its natural alignment
+    assert struct.unpack_from("<f", raw, 56)[0] == 0.5
+    # 5 GPS fields and paired, then the uint8_t/char arrays unaligned
+    assert raw[72:75] == bytes.fromhex("A1B2C3") and raw[78:86] == b"12345678"
+    assert struct.unpack_from("<HH", raw, 86) == (85, 5)
+    assert "throttle_mode" in layout.keys and "no_gear" in get_layout("tx", 2).keys
+
+
+def test_round_trip_and_version_detection():
+    layout = get_layout("rx", 2)
+    values = dict(layout.defaults, rf_power=-9, trim=-120, pwm0_min=1100, ubat_cal=0.5,
+                  ubat_offset=0.25, dest_address="0a:0b:0c")
+    blob = layout.encode_b64(values)
+    found, decoded = decode_blob("rx", blob)
+    assert found is layout
+    assert decoded == dict(values, dest_address="0A:0B:0C")
+    assert find_blob(f"Reading conf from SPIFFS and applying to usrConfEncoded Data Read: {blob}\r\n") == blob
+
+    with pytest.raises(ConfStructError):
+        layout.decode_b64(base64.b64encode(b"\x02\x00short").decode())
+    with pytest.raises(ConfStructError):
+        layout.encode({"own_address": "01:02"})
+    with pytest.raises(ConfStructError):
+        get_layout("tx", 9)
+
+
+def test_emulated_read_write_one_round_trip():
+    device = EmulatedDevice("emu-tx", "tx", stream=False)
+    device.connect()
+    assert device.identify() == DeviceType.TRANSMITTER
+
+    commands = device.io["commands"]
+    config = device.read_config()
+    assert device.io["commands"] == commands + 1
+    assert device.config_layout is get_layout("tx", 3)
+    assert config["own_address"] == device.get_config_value("own_address")
+
+    commands = device.io["commands"]
+    assert device.write_config({"max_gears": 6, "rf_power": -2}, base=config)
+    assert device.io["commands"] == commands + 1
+    assert device.get_config_value("max_gears") == "6"
+    assert device.read_config() == dict(config, max_gears=6, rf_power=-2)
+
+
+def test_cached_config_values_read_like_get():
+    device = EmulatedDevice("emu-tx", "tx", stream=False)
+    device.connect()
+    assert device.get_state() is not None
+    for key in STATE_CONFIG_KEYS:
+        hits = device.state_cache_hits
+        cached = device.get_config_value(key)
+        assert device.state_cache_hits == hits + 1
+        assert device.send_command(f"?get {key}") == f"{key}={cached}"
+    # State fields that are not config keys still go to ?get
+    assert device.get_config_value("locked") is None
+
+
+def test_config_get_set_still_sends_get():
+    device = EmulatedDevice("emu-tx", "tx", stream=False)
+    device.connect()
+    device.get_state()
+    sent = []
+    send = device.send_command
+    device.send_command = lambda command, *args, **kwargs: sent.append(command) or send(command, *args, **kwargs)
+    result = ConfigTestSuite.test_tx_config_get_set(device)
+    assert result["result"] == TestResult.PASS.value, result["details"]
+    assert sent[0] == "?get max_gears"
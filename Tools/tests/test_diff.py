@@ -0,0 +1,105 @@
+"""
+Report diff: unit matching by identity, result changes, duration and
+link metric deltas, with and without numpy.
+"""
+
+import json
+
+import pytest
+
+from bremote import diff
+from bremote.models import TestReport as Report
+from bremote.reportstream import ReportStreamWriter
+
+
+@pytest.fixture(params=["numpy", "python"])
+def backend(request, monkeypatch):
+    if request.param == "numpy":
+        pytest.importorskip("numpy")
+    else:
+        monkeypatch.setattr(diff, "NUMPY_AVAILABLE", False)
+    return request.param
+
+
+def _report(port, serial, address, firmware, results, wall_s=0.5, timestamp="2026-10-01T10:00:00"):
+    report = Report(device_type="tx", port=port, usb_serial=serial, own_address=address,
+                    firmware_version=firmware, timestamp=timestamp)
+    for name, result in results.items():
+        report.tests[name] = {"result": result, "details": "", "stats": {"wall_s": wall_s}}
+    report.overall_result = "FAIL" if "FAIL" in results.values() else "PASS"
+    return report
+
+
+def _write_json(path, reports, links=None):
+    data = {r.port: r.to_dict() for r in reports}
+    data.update(links or {})
+    path.write_text(json.dumps(data))
+    return str(path)
+
+
+def test_diff_matches_units_and_flags_changes(tmp_path, backend):
+    old = _write_json(tmp_path / "old.json", [
+        _report("COM3", "SN1", "AA:00:01", "2", {"hall": "PASS", "radio": "PASS"}),
+        _report("COM4", "SN2", "AA:00:02", "2", {"hall": "FAIL", "radio": "PASS"}),
+        _report("COM5", "", "AA:00:03", "2", {"hall": "PASS", "radio": "PASS"}),
+        _report("COM6", "SN9", "AA:00:09", "2", {"hall": "PASS"}),
+    ], {"COM3->COM7": {"tx_port": "COM3", "rx_port": "COM7", "result": "PASS",
+                       "packet_loss_percent": 1.0, "avg_rssi_dbm": -60.0}})
+
+    new_path = str(tmp_path / "new.jsonl")
+    with ReportStreamWriter(new_path) as stream:
+        for report in [
+            # Units moved ports: matched by USB serial / own_address
+            _report("COM8", "SN1", "AA:00:01", "3", {"hall": "FAIL", "radio": "PASS"}, wall_s=0.5),
+            _report("COM3", "SN2", "AA:00:02", "3", {"hall": "PASS", "radio": "PASS"}, wall_s=2.0),
+            _report("COM9", "", "aa:00:03", "3", {"hall": "PASS", "radio": "PASS", "wifi": "PASS"}),
+        ]:
+            for name, data in report.tests.items():
+                stream.write_test(report.port, "tx", name, data)
+            stream.write_report(report)
+        stream.write_link("COM8->COM7", {"tx_port": "COM8", "rx_port": "COM7", "result": "PASS",
+                                         "packet_loss_percent": 6.5, "avg_rssi_dbm": -61.0})
+
+    names = {}
+    result = diff.diff_sets(diff.load_set([old], names), diff.load_set([new_path], names), names)
+
+    assert result["matched_units"] == 3
+    assert (result["only_old"], result["only_new"]) == (1, 0)
+    assert result["new"]["firmware"] == {"3": 3}
+    tests = {t["test"]: t for t in result["tests"]}
+    assert tests["hall"]["regressions"] == 1 and tests["hall"]["fixes"] == 1
+    assert tests["hall"]["slower"] == 1 and tests["radio"]["slower"] == 1
+    assert tests["wifi"]["added"] == 1 and tests["wifi"]["compared"] == 0
+    assert tests["radio"]["old_median_s"] == 0.5
+    (regression,) = [c for c in result["changes"] if c["kind"] == "regression"]
+    assert regression["test"] == "hall" and "SN1" in regression["unit"]
+
+    (link,) = result["links"]
+    assert link["flagged"]
+    assert link["metrics"]["packet_loss_percent"]["flagged"]
+    assert not link["metrics"]["avg_rssi_dbm"]["flagged"]
+
+
+def test_latest_report_per_unit_wins(tmp_path, backend):
+    first = _report("COM3", "SN1", "", "2", {"hall": "FAIL"}, timestamp="2026-10-01T10:00:00")
+    retest = _report("COM3", "SN1", "", "2", {"hall": "PASS"}, timestamp="2026-10-01T11:00:00")
+    (tmp_path / "old").mkdir()
+    _write_json(tmp_path / "old" / "b.json", [retest])
+    _write_json(tmp_path / "old" / "a.json", [first])
+    new = _write_json(tmp_path / "new.json", [_report("COM3", "SN1", "", "3", {"hall": "PASS"})])
+
+    names = {}
+    old_set = diff.load_set([str(tmp_path / "old")], names)
+    assert old_set.reports == 2 and len(old_set.units) == 1
+    result = diff.diff_sets(old_set, diff.load_set([new], names), names)
+    assert result["changes"] == []
+
+
+def test_cli_fail_on_regression(tmp_path, capsys):
+    old = _write_json(tmp_path / "old.json", [_report("COM3", "SN1", "", "2", {"hall": "PASS"})])
+    new = _write_json(tmp_path / "new.json", [_report("COM3", "SN1", "", "3", {"hall": "FAIL"})])
+    diff.main([old, new])
+    assert "[REGRESSION] hall" in capsys.readouterr().out
+    with pytest.raises(SystemExit) as exit_info:
+        diff.main([old, new, "--fail-on-regression"])
+    assert exit_info.value.code == 1
@@ -0,0 +1,76 @@
+"""
+Sample export: CSV / JSON Lines writers, format detection and the
+pyarrow check that runs before any device is touched.
+"""
+
+import csv
+import json
+import threading
+
+import pytest
+
+from bremote import export
+from bremote.export import SampleWriter, check_format, detect_format
+
+
+def _row(i):
+    return {"pair": "TX:COM3<->RX:COM4", "timestamp": 1000.0 + i * 0.05, "tx_throttle": i,
+            "tx_steering": 0, "rx_throttle": i, "rx_steering": 0, "rssi": -40, "snr": 9.5, "slot": i}
+
+
+@pytest.mark.parametrize("name", ["samples.csv", "samples.jsonl"])
+def test_text_writers(tmp_path, name):
+    path = str(tmp_path / name)
+    with SampleWriter(path, batch_size=7, flush_interval=0.05) as writer:
+        for i in range(100):
+            writer.write(_row(i))
+    assert writer.stats()["samples_written"] == 100 and writer.rows_dropped == 0
+
+    with open(path, newline="") as f:
+        if name.endswith(".csv"):
+            rows = list(csv.DictReader(f))
+            assert list(rows[0]) == export.SAMPLE_FIELDS
+            assert [int(row["slot"]) for row in rows] == list(range(100))
+        else:
+            rows = [json.loads(line) for line in f]
+            assert rows == [_row(i) for i in range(100)]
+
+
+def test_full_queue_drops_are_counted_across_threads(tmp_path):
+    writer = SampleWriter(str(tmp_path / "s.jsonl"), queue_size=10)
+    # Not started: the queue fills up and every further row is dropped
+
+    def produce():
+        for i in range(1000):
+            writer.write(_row(i))
+
+    threads = [threading.Thread(target=produce) for _ in range(4)]
+    for thread in threads:
+        thread.start()
+    for thread in threads:
+        thread.join()
+    assert writer.rows_dropped == 4000 - 10
+
+
+def test_format_checked_up_front(monkeypatch):
+    assert detect_format("a.ndjson") == "jsonl" and detect_format("a.feather") == "arrow"
+    assert detect_format("a.txt") == "csv"
+    assert check_format("a.bin", "jsonl") == "jsonl"
+    with pytest.raises(ValueError):
+        check_format("a.csv", "xlsx")
+    monkeypatch.setattr(export, "ARROW_AVAILABLE", False)
+    with pytest.raises(RuntimeError, match="pyarrow"):
+        check_format("a.parquet")
+    with pytest.raises(RuntimeError):
+        SampleWriter("a.csv", fmt="arrow")
+
+
+def test_cli_rejects_parquet_without_pyarrow_before_scanning(monkeypatch, capsys):
+    from bremote import __main__ as cli
+    monkeypatch.setattr(export, "ARROW_AVAILABLE", False)
+    monkeypatch.setattr("sys.argv", ["bremote", "--link", "--samples-out", "s.parquet"])
+    with pytest.raises(SystemExit) as exc:
+        cli.main()
+    assert exc.value.code == 2
+    err = capsys.readouterr()
+    assert "requires pyarrow" in err.err and "[SCAN]" not in err.out
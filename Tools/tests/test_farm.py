@@ -0,0 +1,107 @@
+"""
+Test farm: length-prefixed JSON RPC and coordinator/worker runs on
+emulated units over localhost.
+"""
+
+import socket
+
+import pytest
+
+from bremote.emulator import EmulatedDevice
+from bremote.farm import (FarmClient, FarmCoordinator, FarmError, FarmWorker,
+                          parse_address, recv_message, send_message)
+from bremote.models import TestResult as Result
+
+
+def _worker(kinds, name):
+    devices = []
+    for idx, kind in enumerate(kinds):
+        device = EmulatedDevice(f"{name}-{idx}-{kind}", kind, stream=False)
+        device.connect()
+        devices.append(device)
+    return FarmWorker(devices, port=0, name=name).start()
+
+
+@pytest.fixture
+def workers():
+    started = [_worker(("tx", "rx"), "w1"), _worker(("rx",), "w2")]
+    yield started
+    for worker in started:
+        worker.close()
+
+
+def test_message_roundtrip():
+    a, b = socket.socketpair()
+    try:
+        message = {"id": 1, "op": "run", "args": {"device": "COM3", "selector": "hall"}}
+        send_message(a, message)
+        send_message(a, {"id": 2, "text": "ü" * 5000})
+        assert recv_message(b) == message
+        assert recv_message(b)["text"] == "ü" * 5000
+        a.close()
+        assert recv_message(b) is None
+    finally:
+        b.close()
+
+
+def test_parse_address():
+    assert parse_address("10.0.0.5:7800") == ("10.0.0.5", 7800)
+    assert parse_address("farm-pc") == ("farm-pc", 7700)
+
+
+def test_worker_hello_and_command(workers):
+    with FarmClient(workers[0].address) as client:
+        hello = client.call("hello")
+        assert hello["worker"] == "w1"
+        assert [d["type"] for d in hello["devices"]] == ["tx", "rx"]
+        assert client.call("command", device="w1-0-tx", command="?get max_gears") == "max_gears=10"
+        assert client.call("state", device="w1-0-tx")["radio"] == "ON"
+        with pytest.raises(FarmError):
+            client.call("command", device="nope", command="?keys")
+
+
+def test_coordinator_merges_reports(workers):
+    coordinator = FarmCoordinator([w.address for w in workers], selector="spiffs or config_keys",
+                                  log=lambda message: None)
+    reports = coordinator.run()
+
+    assert len(reports) == 3
+    assert list(reports) == [d.key for d in coordinator.devices]
+    for report in reports.values():
+        assert report.overall_result == Result.PASS.value
+        assert set(report.tests) == {"spiffs", "config_keys"}
+    assert {r.device_type for r in reports.values()} == {"tx", "rx"}
+    assert coordinator.stats["devices"] == 3
+    assert coordinator.stats["per_worker"][coordinator.devices[0].worker]["devices"] == 2
+
+
+def test_unreachable_worker_is_reported_as_failure(workers):
+    coordinator = FarmCoordinator([workers[1].address], selector="spiffs", log=lambda message: None)
+    coordinator.discover()
+    workers[1].close()
+    reports = coordinator.run()
+    (report,) = reports.values()
+    assert report.overall_result == Result.FAIL.value
+    assert "run" in report.tests
+
+
+@pytest.fixture
+def silent_worker():
+    """Accepts connections but never replies (a hung worker)"""
+    server = socket.create_server(("127.0.0.1", 0))
+    yield server.getsockname()[:2]
+    server.close()
+
+
+def test_hung_worker_times_out(workers, silent_worker):
+    with FarmClient(silent_worker, timeout=0.2) as client:
+        with pytest.raises(socket.timeout):
+            client.call("hello")
+
+    coordinator = FarmCoordinator([workers[1].address], selector="spiffs", log=lambda message: None,
+                                  run_timeout=0.3)
+    (device,) = coordinator.discover()
+    device.address = silent_worker
+    (report,) = coordinator.run().values()
+    assert report.overall_result == Result.FAIL.value
+    assert "no reply from worker within 0.3s" in report.tests["run"]["details"]
@@ -0,0 +1,86 @@
+"""
+Link quality port vs. firmware getLinkQuality() (Source/Common/RadioCommon.h).
+
+Expected values are worked out by hand from the firmware arithmetic:
+map() truncates float arguments to long and divides with C truncation,
+combinedScore is a float, round() is half away from zero.
+"""
+
+import random
+
+import pytest
+
+from bremote import link_quality as lq
+
+# (rssi, snr, rssiScore, snrScore, getLinkQuality)
+FIRMWARE_TABLE = [
+    (-50.0, 10.0, 10, 10, 10),
+    (-100.0, -10.0, 0, 0, 0),
+    (-120.0, -20.0, 0, 0, 0),
+    (-75.0, 0.0, 5, 5, 5),
+    (-95.0, 0.0, 1, 5, 2),
+    (-96.0, -10.0, 0, 0, 0),
+    (-94.9, 5.9, 1, 7, 3),      # -94.9 -> -94, 5.9 -> 5
+    (-80.0, -9.5, 4, 0, 3),     # -9.5 -> -9: 10/20 = 0
+    (-55.0, 10.0, 9, 10, 9),
+    (-85.0, 10.0, 3, 10, 5),
+    (-75.0, -10.0, 5, 0, 4),    # 3.5 rounds half away from zero
+    (-65.0, -10.0, 7, 0, 5),
+    (-105.7, 12.0, 0, 10, 3),
+    (-30.0, 15.25, 10, 10, 10),
+    (-99.0, -9.0, 0, 0, 0),     # (1*10)/50 = 0
+    (-90.0, 2.0, 2, 6, 3),      # 1.4 + 1.8 = 3.2
+]
+
+
+def test_arduino_map_truncates_toward_zero():
+    assert lq.arduino_map(-101, -100, -50, 0, 10) == 0   # -10/50 -> 0, not -1
+    assert lq.arduino_map(-110, -100, -50, 0, 10) == -2
+    assert lq.arduino_map(-94.9, -100, -50, 0, 10) == 1
+    assert lq.arduino_map(5, 0, 0, 0, 10) == 0           # zero run guarded in ESP32 core
+
+
+def test_arduino_constrain():
+    assert lq.arduino_constrain(-3, 0, 10) == 0
+    assert lq.arduino_constrain(12, 0, 10) == 10
+    assert lq.arduino_constrain(7, 0, 10) == 7
+
+
+@pytest.mark.parametrize("rssi,snr,rssi_score,snr_score,expected", FIRMWARE_TABLE)
+def test_link_quality_matches_firmware_table(rssi, snr, rssi_score, snr_score, expected):
+    assert lq.arduino_constrain(lq.arduino_map(rssi, -100, -50, 0, 10), 0, 10) == rssi_score
+    assert lq.arduino_constrain(lq.arduino_map(snr, -10, 10, 0, 10), 0, 10) == snr_score
+    assert lq.link_quality(rssi, snr) == expected
+
+
+def test_vectorized_matches_table():
+    pytest.importorskip("numpy")
+    rssi = [row[0] for row in FIRMWARE_TABLE]
+    snr = [row[1] for row in FIRMWARE_TABLE]
+    expected = [row[4] for row in FIRMWARE_TABLE]
+    assert list(lq.link_quality_array(rssi, snr)) == expected
+
+
+def test_vectorized_matches_scalar():
+    pytest.importorskip("numpy")
+    rng = random.Random(1234)
+    rssi = [rng.uniform(-140.0, -20.0) for _ in range(20000)]
+    snr = [rng.uniform(-25.0, 20.0) for _ in range(20000)]
+    # Integer grid hits every rounding tie exactly
+    rssi += [float(r) for r in range(-130, -39) for _ in range(-20, 16)]
+    snr += [float(s) for _ in range(-130, -39) for s in range(-20, 16)]
+    scalar = [lq.link_quality(r, s) for r, s in zip(rssi, snr)]
+    assert list(lq.link_quality_array(rssi, snr)) == scalar
+
+
+def test_histogram_and_series():
+    scores = [0, 5, 5, 10, 3]
+    assert lq.link_quality_histogram(scores) == [1, 0, 0, 1, 0, 2, 0, 0, 0, 0, 1]
+    series = lq.link_quality_series([0.0, 0.5, 1.2, 1.9, 3.0], scores)
+    assert series == [[0.0, 2.5, 0], [1.0, 7.5, 5], [3.0, 3.0, 3]]
+
+
+def test_summary_empty():
+    summary = lq.summarize_link_quality([], [], [])
+    assert summary["avg_link_quality"] is None
+    assert summary["link_quality_histogram"] == [0] * 11
@@ -0,0 +1,98 @@
+"""
+Command metrics: verb parsing, latency histogram buckets/percentiles and
+per-verb counters, including ?print* stream starts on an emulated TX.
+"""
+
+import pytest
+
+from bremote.emulator import EmulatedDevice
+from bremote.metrics import (LATENCY_BUCKETS_MS, CommandMetrics, LatencyHistogram,
+                             command_verb, is_stream_command)
+
+
+@pytest.mark.parametrize("command, verb", [
+    ("?set max_gears 8\n", "set"),
+    ("get max_gears", "get"),
+    ("?printInputs json", "printinputs"),
+    ("  ?STATE   json ", "state"),
+    ("?", ""),
+    ("", ""),
+])
+def test_command_verb(command, verb):
+    assert command_verb(command) == verb
+
+
+def test_is_stream_command():
+    assert is_stream_command("?printInputs json\n")
+    assert is_stream_command("?printbat")
+    assert not is_stream_command("?get max_gears")
+    assert not is_stream_command("?state json")
+
+
+def test_histogram_buckets_and_percentiles():
+    hist = LatencyHistogram()
+    for latency in (0.5, 1.0, 3.0, 3.0, 40.0, 7000.0):
+        hist.record(latency)
+    data = hist.to_dict()
+    assert data["count"] == 6
+    assert data["min_ms"] == 0.5 and data["max_ms"] == 7000.0
+    buckets = data["buckets"]
+    # Bucket bounds are inclusive upper bounds
+    assert buckets["le_1ms"] == 2
+    assert buckets["le_5ms"] == 2
+    assert buckets["le_50ms"] == 1
+    assert buckets[f"gt_{LATENCY_BUCKETS_MS[-1]}ms"] == 1
+    assert sum(buckets.values()) == 6
+    assert data["p50_ms"] == 5.0
+    # Percentile in the overflow bucket reports the observed maximum
+    assert data["p95_ms"] == 7000.0
+
+
+def test_percentile_never_exceeds_max():
+    hist = LatencyHistogram()
+    hist.record(12.0)
+    assert hist.percentile(50) == 12.0
+
+
+def test_empty_histogram():
+    data = LatencyHistogram().to_dict()
+    assert data["count"] == 0
+    assert data["avg_ms"] is None and data["p50_ms"] is None and data["p95_ms"] is None
+
+
+def test_counters_per_verb():
+    metrics = CommandMetrics()
+    metrics.record("?get a\n", 2.0)
+    metrics.record("?get b\n", timed_out=True, empty=True)
+    metrics.record("?set a 1\n", 1.0)
+    data = metrics.to_dict()
+    assert list(data) == ["get", "set"]
+    assert data["get"]["calls"] == 2
+    assert data["get"]["timeouts"] == 1
+    assert data["get"]["empty"] == 1
+    assert data["get"]["latency"]["count"] == 1
+    metrics.reset()
+    assert metrics.to_dict() == {}
+
+
+def test_stream_start_is_not_a_timeout():
+    metrics = CommandMetrics()
+    metrics.record("?printInputs\n", 1.0, timed_out=True)
+    metrics.record("?printInputs\n", timed_out=True, empty=True)
+    entry = metrics.to_dict()["printinputs"]
+    assert entry["streams"] == 2
+    # Only the start that produced no output at all counts as a timeout
+    assert entry["timeouts"] == 1
+
+
+def test_streaming_json_command_on_device():
+    device = EmulatedDevice("emu-tx", "tx")
+    device.connect()
+    device.send_json_command("?printInputs", timeout=0.3)
+    device.stop_continuous_output()
+    device.send_command("?get max_gears")
+    data = device.metrics()
+    assert data["printinputs"]["streams"] == 1
+    assert data["printinputs"]["timeouts"] == 0
+    assert data["get"]["timeouts"] == 0
+    assert data["get"]["streams"] == 0
@@ -0,0 +1,138 @@
+"""
+Link test pairing: TX/RX units matched by own_address/dest_address (both
+ways, one-sided, unmatched, fallback) and the TX unlock prompt, on
+emulated units.
+"""
+
+import pytest
+
+from bremote.emulator import EmulatedDevice
+from bremote.models import DeviceType
+from bremote.runner import BREmoteTester
+
+
+def _unit(port, kind, own, dest):
+    device = EmulatedDevice(port, kind, stream=False)
+    device.connect()
+    device.serial.config["own_address"] = own
+    device.serial.config["dest_address"] = dest
+    # Skip identify(): its settle waits only slow the tests down
+    device.device_type = DeviceType.TRANSMITTER if kind == "tx" else DeviceType.RECEIVER
+    return device
+
+
+@pytest.fixture
+def tester():
+    tester = BREmoteTester()
+    yield tester
+    for device in tester.devices:
+        device.disconnect()
+
+
+def _pairs(tester, *units):
+    tester.devices = list(units)
+    return [(tx.port, rx.port) for tx, rx in tester.discover_pairs()]
+
+
+def test_pairs_matched_by_address_regardless_of_port_order(tester):
+    pairs = _pairs(tester,
+                   _unit("COM1", "tx", "0A:00:01", "0B:00:02"),
+                   _unit("COM2", "tx", "0A:00:02", "0B:00:01"),
+                   _unit("COM3", "rx", "0B:00:01", "0A:00:02"),
+                   _unit("COM4", "rx", "0B:00:02", "0A:00:01"))
+    assert pairs == [("COM1", "COM4"), ("COM2", "COM3")]
+
+
+@pytest.mark.parametrize("tx_dest, rx_dest", [
+    ("0B:00:01", "FF:FF:FF"),    # only the TX points at the RX
+    ("FF:FF:FF", "0A:00:01"),    # only the RX points at the TX
+])
+def test_one_sided_dest_address_pairs(tester, tx_dest, rx_dest):
+    pairs = _pairs(tester,
+                   _unit("COM1", "tx", "0A:00:01", tx_dest),
+                   _unit("COM2", "rx", "0B:00:01", rx_dest))
+    assert pairs == [("COM1", "COM2")]
+
+
+def test_unmatched_units_are_left_out(tester, capsys):
+    pairs = _pairs(tester,
+                   _unit("COM1", "tx", "0A:00:01", "0B:00:01"),
+                   _unit("COM2", "tx", "0A:00:02", "0B:00:09"),
+                   _unit("COM3", "rx", "0B:00:01", "0A:00:01"),
+                   _unit("COM4", "rx", "0B:00:02", "0A:00:08"))
+    assert pairs == [("COM1", "COM3")]
+    out = capsys.readouterr().out
+    assert "COM2 has no paired partner" in out
+    assert "COM4 has no paired partner" in out
+    assert "using last TX/RX" not in out
+
+
+def test_rx_is_paired_once(tester):
+    # Both TX point at the same RX; the second TX stays unpaired
+    pairs = _pairs(tester,
+                   _unit("COM1", "tx", "0A:00:01", "0B:00:01"),
+                   _unit("COM2", "tx", "0A:00:02", "0B:00:01"),
+                   _unit("COM3", "rx", "0B:00:01", "0A:00:02"))
+    assert pairs == [("COM1", "COM3")]
+
+
+def test_no_address_match_falls_back_to_last_pair(tester, capsys):
+    pairs = _pairs(tester,
+                   _unit("COM1", "tx", "0A:00:01", "0B:00:07"),
+                   _unit("COM2", "tx", "0A:00:02", "0B:00:08"),
+                   _unit("COM3", "rx", "0B:00:01", "0A:00:07"))
+    assert pairs == [("COM2", "COM3")]
+    assert "using last TX/RX" in capsys.readouterr().out
+
+
+def test_one_type_only_gives_no_pairs(tester):
+    assert _pairs(tester, _unit("COM1", "tx", "0A:00:01", "0B:00:01")) == []
+
+
+def test_pair_key():
+    tx, rx = EmulatedDevice("COM1", "tx"), EmulatedDevice("COM2", "rx")
+    assert BREmoteTester._pair_key(tx, rx) == "COM1->COM2"
+
+
+def test_unlock_prompt_waits_for_every_locked_tx(tester, monkeypatch, capsys):
+    unlocked = _unit("COM1", "tx", "0A:00:01", "0B:00:01")
+    locked = _unit("COM2", "tx", "0A:00:02", "0B:00:02")
+    locked.serial.locked = True
+    tester.devices = [unlocked, locked]
+    prompts = []
+
+    def operator():
+        # Unlock on the second prompt
+        prompts.append(1)
+        if len(prompts) == 2:
+            locked.serial.locked = False
+        return ""
+
+    monkeypatch.setattr("builtins.input", operator)
+    tester._ensure_tx_unlocked([unlocked, locked])
+    out = capsys.readouterr().out
+    assert len(prompts) == 2
+    assert "LOCKED: COM2" in out
+    assert "TX is still locked" in out
+    assert "TX is now unlocked [OK]" in out
+
+
+def test_unlock_prompt_gives_up_without_a_terminal(tester, monkeypatch, capsys):
+    locked = _unit("COM1", "tx", "0A:00:01", "0B:00:01")
+    locked.serial.locked = True
+    tester.devices = [locked]
+
+    def no_terminal():
+        raise EOFError
+
+    monkeypatch.setattr("builtins.input", no_terminal)
+    tester._ensure_tx_unlocked([locked])
+    assert "non-interactive mode" in capsys.readouterr().out
+
+
+def test_unlocked_tx_skips_the_prompt(tester, monkeypatch, capsys):
+    tx = _unit("COM1", "tx", "0A:00:01", "0B:00:01")
+    tester.devices = [tx]
+    monkeypatch.setattr("builtins.input", lambda: pytest.fail("prompted for an unlocked TX"))
+    tester._ensure_tx_unlocked([tx])
+    assert "already unlocked" in capsys.readouterr().out
@@ -0,0 +1,97 @@
+"""
+Profiling: per-phase .pstats / collapsed stacks from an emulated run,
+and the no-op profiler used when --profile is off.
+"""
+
+import os
+import pstats
+import threading
+import time
+
+from bremote.emulator import EmulatedDevice
+from bremote.profiling import NULL_PROFILER, Profiler
+from bremote.runner import BREmoteTester
+
+
+def _busy(seconds):
+    end = time.perf_counter() + seconds
+    while time.perf_counter() < end:
+        sum(range(200))
+
+
+def test_suite_phases_written(tmp_path):
+    profiler = Profiler(str(tmp_path), sample_interval=0.001)
+    device = EmulatedDevice("emu-tx", "tx", stream=False)
+    device.connect()
+    device.identify()
+    BREmoteTester(selector="spiffs or config_keys", profiler=profiler).run_device_tests(
+        device, log=lambda message: None)
+    with profiler.phase("report"):
+        _busy(0.05)
+    profiler.write()
+
+    files = set(os.listdir(tmp_path))
+    assert {"suite-CONFIG.pstats", "suite-CONFIG.collapsed", "report.pstats", "summary.json"} <= files
+    assert profiler.summary()["suite-CONFIG"]["runs"] == 2
+    stats = pstats.Stats(str(tmp_path / "suite-CONFIG.pstats"))
+    assert any(func[2] == "send_command" for func in stats.stats)
+
+    with open(tmp_path / "report.collapsed") as f:
+        stack, count = f.readline().rsplit(" ", 1)
+    assert "test_profiling.py:_busy" in stack and int(count) > 0
+
+
+def test_phases_merge_across_threads_and_ignore_nesting(tmp_path):
+    profiler = Profiler(str(tmp_path))
+
+    def work():
+        with profiler.phase("worker"):
+            with profiler.phase("inner"):
+                _busy(0.02)
+
+    threads = [threading.Thread(target=work) for _ in range(3)]
+    for thread in threads:
+        thread.start()
+    for thread in threads:
+        thread.join()
+
+    summary = profiler.summary()
+    assert summary["worker"]["runs"] == 3
+    assert "inner" not in summary
+
+
+def test_null_profiler_is_cheap():
+    assert not NULL_PROFILER.enabled
+    start = time.perf_counter()
+    for _ in range(100000):
+        with NULL_PROFILER.phase("scan_ports"):
+            pass
+    assert time.perf_counter() - start < 0.5
+
+
+def test_exclusive_cprofile_skips_overlapping_phases(tmp_path):
+    # Python 3.12+ behaviour: one interpreter-wide cProfile session
+    profiler = Profiler(str(tmp_path), sample_interval=0.001, exclusive=True)
+    with profiler.phase("alone"):
+        _busy(0.02)
+
+    started = threading.Barrier(2)
+
+    def work(name):
+        with profiler.phase(name):
+            started.wait()
+            _busy(0.05)
+
+    threads = [threading.Thread(target=work, args=(name,)) for name in ("unit-a", "unit-b")]
+    for thread in threads:
+        thread.start()
+    for thread in threads:
+        thread.join()
+    profiler.write()
+
+    summary = profiler.summary()
+    assert summary["alone"]["pstats"]
+    assert not summary["unit-a"]["pstats"] and not summary["unit-b"]["pstats"]
+    assert summary["unit-a"]["samples"] > 0 and summary["unit-b"]["samples"] > 0
+    files = set(os.listdir(tmp_path))
+    assert "alone.pstats" in files and "unit-a.pstats" not in files and "unit-a.collapsed" in files
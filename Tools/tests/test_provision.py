@@ -0,0 +1,89 @@
+"""
+Fleet provisioning: templates plus per-unit overrides pushed to emulated
+units concurrently, verified by read-back, with a per-unit audit log.
+"""
+
+import json
+
+import pytest
+
+from bremote.emulator import EmulatedDevice
+from bremote.provision import FleetConfig, FleetError, Provisioner, main
+
+FLEET = {
+    "common": {"radio_preset": 2},
+    "tx": {"rf_power": 10, "max_gears": 6},
+    "rx": {"rf_power": 10, "failsafe_time": 500, "pwm0_min": 1100, "pwm0_max": 1900},
+    "units": {"emu-rx-1": {"failsafe_time": 800}},
+}
+
+
+def test_fleet_config_merge_and_match():
+    fleet = FleetConfig.from_dict(dict(FLEET, units={"a1:b2:c3": {"rf_power": 5}}))
+    unit = fleet.match_unit({"usb_serial": None, "own_address": "A1:B2:C3"}, "COM7")
+    assert unit == "a1:b2:c3"
+    assert fleet.desired("tx", unit) == {"radio_preset": 2, "rf_power": 5, "max_gears": 6}
+    assert fleet.match_unit({"usb_serial": "FT1", "own_address": "00:00:01"}, "COM8") is None
+    with pytest.raises(FleetError):
+        FleetConfig.from_dict({"tx": {}, "rxx": {}})
+    with pytest.raises(FleetError):
+        FleetConfig.from_dict({"units": {"COM3": 5}})
+
+
+def test_fleet_config_checked_before_any_unit(tmp_path, capsys):
+    assert FleetConfig.from_dict(FLEET).validate() == []
+    fleet = FleetConfig.from_dict({
+        "common": {"failsafe_time": 500},                   # RX only
+        "tx": {"rf_power": 99, "max_gaers": 6},
+        "rx": {"wifi_password": "short"},
+        "units": {"COM3": {"pwm0_min": 1000, "max_gears": 4}, "COM4": {"trim": 900}},
+    })
+    problems = fleet.validate()
+    assert problems == [
+        "common.failsafe_time (TX): not a TX config key",
+        "tx.rf_power: 99 rejected (ERR_RANGE:rf_power)",
+        "tx.max_gaers: not a TX config key",
+        "rx.wifi_password: 'short' rejected (ERR_BAD_VALUE:wifi_password)",
+        "units.COM3: keys fit neither the TX nor the RX config",
+        "units.COM4.trim: 900 rejected (ERR_RANGE:trim)",
+    ]
+
+    config = tmp_path / "fleet.json"
+    config.write_text(json.dumps({"tx": {"rf_power": 99}}))
+    with pytest.raises(SystemExit) as exc:
+        main(["--config", str(config), "--emulate", "tx", "--out", str(tmp_path / "logs")])
+    assert exc.value.code == 2 and "ERR_RANGE:rf_power" in capsys.readouterr().err
+    assert not (tmp_path / "logs").exists()
+
+
+def test_provision_units_concurrently(tmp_path):
+    devices = [EmulatedDevice(port, kind, stream=False)
+               for port, kind in (("emu-tx-0", "tx"), ("emu-rx-1", "rx"), ("emu-rx-2", "rx"))]
+    outcomes = Provisioner(FleetConfig.from_dict(FLEET), output_dir=str(tmp_path), log=lambda _: None).run(devices)
+
+    assert all(outcome.ok for outcome in outcomes), [outcome.to_dict() for outcome in outcomes]
+    assert [outcome.override for outcome in outcomes] == [None, "emu-rx-1", None]
+    assert devices[0].serial.config["max_gears"] == 6
+    assert [d.serial.config["failsafe_time"] for d in devices[1:]] == [800, 500]
+    for device, outcome in zip(devices, outcomes):
+        assert outcome.result.saved and outcome.result.verified and outcome.result.reboot_required
+        # The stored copy holds the new config as well
+        assert device.read_config()["radio_preset"] == 2
+        record = json.loads(open(outcome.audit_log).read().splitlines()[-1])
+        assert record["ok"] and record["own_address"] == device.serial.config["own_address"]
+        assert record["result"]["previous"]["rf_power"] == 22
+
+
+def test_cli_exit_status(tmp_path, capsys):
+    config = tmp_path / "fleet.json"
+    config.write_text(json.dumps(FLEET))
+    main(["--config", str(config), "--emulate", "tx,rx", "--out", str(tmp_path / "logs")])
+    assert "2/2 unit(s) provisioned" in capsys.readouterr().out
+    assert len(list((tmp_path / "logs").iterdir())) == 2
+
+    # Rejected by the RX cross-field rules: nothing sent, exit status 1
+    config.write_text(json.dumps(dict(FLEET, rx={"pwm1_min": 2100})))
+    with pytest.raises(SystemExit) as exc:
+        main(["--config", str(config), "--emulate", "rx", "--out", str(tmp_path / "logs")])
+    assert exc.value.code == 1
+    assert "PWM1_max" in capsys.readouterr().out
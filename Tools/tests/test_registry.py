@@ -0,0 +1,74 @@
+"""
+Registry: --test selector expressions (and/or/not, parentheses, commas,
+unknown tags) and selection of the registered suite tests.
+"""
+
+import pytest
+
+from bremote.registry import SelectorError, parse_selector, select_tests
+
+RADIO_TX = ("tx", "tx", "radio")
+WIFI_SLOW = ("tx", "wifi", "wifi_onoff", "destructive", "slow")
+CONFIG_RX = ("rx", "config", "config_get_set", "destructive")
+
+
+@pytest.mark.parametrize("expression, tags, expected", [
+    ("all", RADIO_TX, True),
+    ("radio", RADIO_TX, True),
+    ("RADIO", RADIO_TX, True),
+    ("radio", WIFI_SLOW, False),
+    ("not destructive", RADIO_TX, True),
+    ("not destructive", WIFI_SLOW, False),
+    ("not not destructive", WIFI_SLOW, True),
+    ("wifi and slow", WIFI_SLOW, True),
+    ("wifi and not slow", WIFI_SLOW, False),
+    ("radio or config", CONFIG_RX, True),
+    ("radio, config", CONFIG_RX, True),
+    ("radio,wifi", CONFIG_RX, False),
+    # and binds tighter than or
+    ("radio or wifi and rx", WIFI_SLOW, False),
+    ("radio or wifi and rx", RADIO_TX, True),
+    ("(radio or wifi) and tx", WIFI_SLOW, True),
+    ("(radio or wifi) and rx", WIFI_SLOW, False),
+    ("not (wifi or config)", RADIO_TX, True),
+    ("not (wifi or config)", CONFIG_RX, False),
+    ("((rx))and(config)", CONFIG_RX, True),
+    ("tx and not (slow or destructive)", RADIO_TX, True),
+    ("tx and not (slow or destructive)", WIFI_SLOW, False),
+])
+def test_selector_matches(expression, tags, expected):
+    assert parse_selector(expression)(tags) is expected
+
+
+@pytest.mark.parametrize("expression, message", [
+    ("", "Empty selector"),
+    ("   ", "Empty selector"),
+    ("bogus", "Unknown tag 'bogus'"),
+    ("radio and bogus", "Unknown tag 'bogus'"),
+    ("radio and", "Incomplete selector"),
+    ("not", "Incomplete selector"),
+    ("(radio or wifi", "Missing ')'"),
+    ("radio)", "Unexpected ')'"),
+    ("and radio", "Unexpected 'and'"),
+    ("radio wifi", "Unexpected 'wifi'"),
+    ("radio & wifi", "Unexpected character"),
+])
+def test_selector_errors(expression, message):
+    with pytest.raises(SelectorError, match=message.replace("(", r"\(").replace(")", r"\)")):
+        parse_selector(expression)
+
+
+@pytest.mark.parametrize("device_type, selector, names", [
+    ("rx", "config", ["config_keys", "config_get_set", "spiffs"]),
+    ("rx", "config and not destructive", ["config_keys", "spiffs"]),
+    ("tx", "wifi and slow", ["wifi_onoff", "wifi_ui_update"]),
+    ("tx", "hall, analog", ["hall", "analog"]),
+    ("rx", "pwm or display", ["pwm"]),
+])
+def test_select_tests_keeps_registration_order(device_type, selector, names):
+    assert [case.name for case in select_tests(device_type, selector)] == names
+
+
+def test_select_tests_by_suite():
+    names = [case.name for case in select_tests("tx", "not destructive", suites=["WIFI"])]
+    assert names == ["wifi_state", "wifi_version", "wifi_error"]
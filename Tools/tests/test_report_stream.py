@@ -0,0 +1,63 @@
+"""
+Report streaming: one flushed JSON line per test / device / link result
+and lazy TestReport reconstruction, including interrupted runs.
+"""
+
+import json
+
+from bremote.emulator import EmulatedDevice
+from bremote.models import TestReport as Report, TestResult as Result
+from bremote.reportstream import ReportStreamWriter, iter_link_results, iter_records, iter_reports
+from bremote.runner import BREmoteTester
+
+
+def test_tester_streams_tests_before_report(tmp_path):
+    path = str(tmp_path / "run.jsonl")
+    device = EmulatedDevice("emu-rx", "rx", stream=False)
+    device.connect()
+    device.identify()
+
+    with ReportStreamWriter(path, selector="config") as stream:
+        tester = BREmoteTester(selector="config", report_stream=stream)
+        seen = []
+        # Each test line is on disk before the next test starts
+        tester.log = lambda message: seen.append(len(list(iter_records(path))))
+        report = tester.run_device_tests(device, log=tester.log)
+
+    kinds = [r["type"] for r in iter_records(path)]
+    assert kinds == ["run"] + ["test"] * len(report.tests) + ["device"]
+    assert max(seen) >= len(report.tests)
+
+    (rebuilt,) = iter_reports(path)
+    assert rebuilt.tests == json.loads(json.dumps(report.tests))
+    assert rebuilt.overall_result == report.overall_result
+    assert rebuilt.firmware_version == "3"
+
+
+def test_interrupted_run_keeps_finished_tests(tmp_path):
+    path = str(tmp_path / "run.jsonl")
+    stream = ReportStreamWriter(path)
+    done = Report(device_type="tx", port="COM3", overall_result="PASS")
+    done.add_test("spiffs", Result.PASS)
+    stream.write_test("COM3", "tx", "spiffs", done.tests["spiffs"])
+    stream.write_report(done)
+    stream.write_test("COM4", "rx", "config_keys", {"result": "FAIL", "details": "no keys"})
+    stream.close()
+    with open(path, "a") as f:
+        f.write('{"type": "test", "run": "x", "por')      # killed mid-write
+
+    reports = list(iter_reports(path))
+    assert [(r.port, r.overall_result) for r in reports] == [("COM3", "PASS"), ("COM4", "PENDING")]
+    assert reports[1].tests["config_keys"]["details"] == "no keys"
+
+
+def test_runs_appended_to_one_file_stay_separate(tmp_path):
+    path = str(tmp_path / "run.jsonl")
+    for result in ("PASS", "FAIL"):
+        with ReportStreamWriter(path) as stream:
+            stream.write_test("COM3", "tx", "hall", {"result": result})
+            stream.write_report(Report(device_type="tx", port="COM3", overall_result=result))
+            stream.write_link("COM3->COM4", {"result": result, "packet_loss_percent": 1.0})
+
+    assert [r.tests["hall"]["result"] for r in iter_reports(path)] == ["PASS", "FAIL"]
+    assert [data["result"] for _, data in iter_link_results(path)] == ["PASS", "FAIL"]
@@ -0,0 +1,130 @@
+"""
+ByteRingBuffer: wrap-around, both overflow policies and partial lines,
+plus a randomized comparison against a plain bytearray model.
+"""
+
+import random
+
+import pytest
+
+from bremote.ringbuffer import ByteRingBuffer, DROP_OLDEST, DROP_NEWEST
+
+
+def test_lines_across_the_wrap_point():
+    buf = ByteRingBuffer(16)
+    buf.write(b"0123456789\n")
+    assert buf.readlines() == [b"0123456789"]
+    # Head is now at 11; this line wraps around the end of the storage
+    assert buf.write(b"abcdefgh\n") == 9
+    assert buf.readlines() == [b"abcdefgh"]
+    assert len(buf) == 0
+    assert buf.overflows == 0
+
+
+def test_partial_line_stays_until_completed():
+    buf = ByteRingBuffer(32)
+    buf.write(b"first\nsec")
+    assert buf.readlines() == [b"first"]
+    assert len(buf) == 3
+    buf.write(b"ond")
+    assert buf.readlines() == []
+    buf.write(b"\nthird\n")
+    assert buf.readlines() == [b"second", b"third"]
+
+
+def test_partial_line_wrapping_is_rescanned_correctly():
+    buf = ByteRingBuffer(8)
+    buf.write(b"abcde\n")
+    assert buf.readlines() == [b"abcde"]
+    buf.write(b"xyz")          # Partial line at offset 6..8, scanned
+    assert buf.readlines() == []
+    buf.write(b"w\n")          # Completes after wrapping to offset 0
+    assert buf.readlines() == [b"xyzw"]
+
+
+def test_drop_oldest_keeps_newest_bytes():
+    buf = ByteRingBuffer(10, DROP_OLDEST)
+    buf.write(b"aaaa\nbbbb\n")
+    assert buf.write(b"cc\n") == 3
+    assert buf.overflows == 1
+    assert buf.bytes_dropped == 3
+    # The first line lost its head; the newer lines are intact
+    assert buf.readlines() == [b"a", b"bbbb", b"cc"]
+
+
+def test_drop_oldest_write_larger_than_capacity():
+    buf = ByteRingBuffer(8, DROP_OLDEST)
+    buf.write(b"xx")
+    assert buf.write(b"0123456789\n") == 8
+    assert buf.bytes_dropped == 2 + 11 - 8
+    assert buf.readlines() == [b"3456789"]
+
+
+def test_drop_newest_discards_what_does_not_fit():
+    buf = ByteRingBuffer(10, DROP_NEWEST)
+    buf.write(b"aaaa\n")
+    assert buf.write(b"bbbb\ncccc\n") == 5
+    assert buf.overflows == 1
+    assert buf.bytes_dropped == 5
+    assert buf.readlines() == [b"aaaa", b"bbbb"]
+    assert buf.write(b"dd\n") == 3
+
+
+def test_line_longer_than_capacity_is_dropped():
+    buf = ByteRingBuffer(8, DROP_NEWEST)
+    buf.write(b"0123456789")
+    assert buf.readlines() == []
+    assert len(buf) == 0
+    assert buf.bytes_dropped == 10
+    buf.write(b"ok\n")
+    assert buf.readlines() == [b"ok"]
+
+
+def test_invalid_arguments():
+    with pytest.raises(ValueError):
+        ByteRingBuffer(0)
+    with pytest.raises(ValueError):
+        ByteRingBuffer(8, "drop_random")
+
+
+class _Model:
+    """Reference semantics on an unbounded bytearray"""
+
+    def __init__(self, capacity, policy):
+        self.capacity = capacity
+        self.policy = policy
+        self.data = bytearray()
+
+    def write(self, chunk):
+        free = self.capacity - len(self.data)
+        if len(chunk) > free:
+            if self.policy == DROP_NEWEST:
+                chunk = chunk[:free]
+            else:
+                self.data = (self.data + chunk)[-self.capacity:]
+                return
+        self.data += chunk
+
+    def readlines(self):
+        *lines, rest = bytes(self.data).split(b"\n")
+        self.data = bytearray(rest)
+        if len(self.data) == self.capacity:
+            self.data = bytearray()
+        return lines
+
+
+@pytest.mark.parametrize("policy", [DROP_OLDEST, DROP_NEWEST])
+def test_matches_reference_model(policy):
+    rng = random.Random(1234)
+    for capacity in (1, 7, 16, 61):
+        buf = ByteRingBuffer(capacity, policy)
+        model = _Model(capacity, policy)
+        for _ in range(2000):
+            if rng.random() < 0.6:
+                chunk = bytes(rng.choice(b"ab\n") for _ in range(rng.randint(0, capacity + 5)))
+                buf.write(chunk)
+                model.write(chunk)
+                assert len(buf) == len(model.data)
+            else:
+                assert buf.readlines() == model.readlines()
+        assert buf.readlines() == model.readlines()
@@ -0,0 +1,156 @@
+"""
+TestScheduler: precondition grouping, exhaustive and greedy planning,
+shuffle reproducibility and device state tracking (emulated TX).
+"""
+
+import pytest
+
+from bremote.emulator import EmulatedDevice
+from bremote.models import TestResult
+from bremote.scheduler import (TestCase, TestScheduler, TransitionCosts, MAX_EXHAUSTIVE_GROUPS,
+                               STREAMING, WIFI, RADIO, UNLOCKED, IDLE)
+
+
+def _case(name, requires=None, changes=()):
+    return TestCase(name, lambda device: {"test": name, "result": TestResult.PASS.value},
+                    "T", requires or {}, changes)
+
+
+@pytest.fixture
+def device():
+    device = EmulatedDevice("emu-tx", "tx", stream=False)
+    device.connect()
+    yield device
+    device.disconnect()
+
+
+def _contiguous(order, key):
+    """True if cases with the same key(case) appear in one block"""
+    seen, last = set(), object()
+    for case in order:
+        k = key(case)
+        if k != last:
+            if k in seen:
+                return False
+            seen.add(k)
+            last = k
+    return True
+
+
+def _plan_cost(scheduler, order):
+    return scheduler._group_cost(scheduler.state, order)[0]
+
+
+def test_groups_are_contiguous_and_disturbing_tests_run_last(device):
+    cases = [
+        _case("wifi_a", {WIFI: True}),
+        _case("idle_stream", IDLE, changes=(STREAMING,)),
+        _case("wifi_off", {WIFI: False}),
+        _case("idle_a", IDLE),
+        _case("wifi_b", {WIFI: True}),
+        _case("idle_b", IDLE),
+    ]
+    order = TestScheduler(device).plan(cases)
+    assert sorted(c.name for c in order) == sorted(c.name for c in cases)
+    assert _contiguous(order, lambda c: tuple(sorted(c.requires.items())))
+    idle = [c.name for c in order if c.requires == IDLE]
+    assert idle == ["idle_a", "idle_b", "idle_stream"]
+
+
+def test_exhaustive_plan_starts_from_the_current_state(device):
+    cases = [_case("off", {WIFI: False}), _case("on", {WIFI: True})]
+    scheduler = TestScheduler(device)
+    scheduler.state = {WIFI: True}
+    assert [c.name for c in scheduler.plan(cases)] == ["on", "off"]
+    scheduler.state = {WIFI: False}
+    assert [c.name for c in scheduler.plan(cases)] == ["off", "on"]
+
+
+def test_exhaustive_plan_uses_measured_costs(device):
+    # From wifi=off/radio=off: either turn radio on first or wifi on first
+    costs = TransitionCosts(alpha=1.0)
+    costs.record(WIFI, True, 5.0)
+    costs.record(RADIO, True, 0.1)
+    cases = [_case("both", {WIFI: True, RADIO: True}), _case("radio", {WIFI: False, RADIO: True}),
+             _case("wifi", {WIFI: True, RADIO: False})]
+    scheduler = TestScheduler(device, costs=costs)
+    scheduler.state = {WIFI: False, RADIO: False}
+    order = scheduler.plan(cases)
+    # Expensive wifi=on happens once: radio-only group first
+    assert order[0].name == "radio"
+    assert _plan_cost(scheduler, order) == pytest.approx(min(
+        _plan_cost(scheduler, [cases[i] for i in perm])
+        for perm in [(0, 1, 2), (0, 2, 1), (1, 0, 2), (1, 2, 0), (2, 0, 1), (2, 1, 0)]))
+
+
+def test_greedy_plan_above_exhaustive_limit(device):
+    keys = [STREAMING, WIFI, RADIO, UNLOCKED]
+    cases = []
+    for n in range(MAX_EXHAUSTIVE_GROUPS + 3):
+        requires = {key: bool(n >> bit & 1) for bit, key in enumerate(keys)}
+        cases += [_case(f"g{n}a", requires), _case(f"g{n}b", requires)]
+    scheduler = TestScheduler(device)
+    scheduler.state = dict(cases[6].requires)
+    order = scheduler.plan(cases)
+    assert sorted(c.name for c in order) == sorted(c.name for c in cases)
+    assert _contiguous(order, lambda c: tuple(sorted(c.requires.items())))
+    # Nearest neighbour: the group matching the current state costs nothing
+    assert order[0].requires == cases[6].requires
+
+
+def test_shuffle_is_reproducible_per_seed(device):
+    cases = [_case(f"t{n}", IDLE) for n in range(12)]
+    first = [c.name for c in TestScheduler(device, shuffle=True, seed=7).plan(cases)]
+    again = [c.name for c in TestScheduler(device, shuffle=True, seed=7).plan(cases)]
+    other = [c.name for c in TestScheduler(device, shuffle=True, seed=8).plan(cases)]
+    assert first == again
+    assert first != other
+    assert sorted(first) == sorted(c.name for c in cases)
+    assert TestScheduler(device, shuffle=True, seed=7).stats()["shuffle_seed"] == 7
+
+
+def test_ensure_tracks_state_and_skips_known_values(device):
+    scheduler = TestScheduler(device)
+    assert scheduler.ensure({WIFI: True, STREAMING: False}) is None
+    assert scheduler.state == {WIFI: True, STREAMING: False}
+    assert device.serial.wifi
+    transitions = scheduler.transitions
+    assert scheduler.ensure({WIFI: True}) is None
+    assert scheduler.transitions == transitions
+
+
+def test_failed_transition_marks_state_unknown(device):
+    device.serial.locked = True
+    scheduler = TestScheduler(device)
+    error = scheduler.ensure({UNLOCKED: True})
+    assert error.startswith("unlocked=True")
+    assert scheduler.state[UNLOCKED] is None
+
+
+def test_run_keeps_declared_order_and_tracks_changes(device):
+    cases = [
+        _case("locked", {UNLOCKED: True}),
+        _case("stream", IDLE, changes=(STREAMING,)),
+        _case("wifi", {WIFI: True}),
+    ]
+    device.serial.locked = True
+    scheduler = TestScheduler(device)
+    results = scheduler.run(cases)
+    assert list(results) == ["locked", "stream", "wifi"]
+    assert results["locked"]["result"] == TestResult.SKIP.value
+    assert results["stream"]["result"] == TestResult.PASS.value
+    assert scheduler.state[STREAMING] is None
+    assert sorted(scheduler.stats()["order"]) == sorted(results)
+    assert "wall_s" in results["wifi"]["stats"]
+
+
+def test_stats_count_resent_commands_as_retries(device):
+    def polls_three_times(dev):
+        calls = []
+        dev.wait_for_response("?get max_gears", lambda r: calls.append(r) or len(calls) == 3,
+                              timeout=2.0, poll=0.01)
+        return {"test": "poll", "result": TestResult.PASS.value}
+
+    results = TestScheduler(device).run([TestCase("poll", polls_three_times, "T")])
+    assert results["poll"]["stats"]["retries"] == 2
+    assert results["poll"]["stats"]["commands"] == 3
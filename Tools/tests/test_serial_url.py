@@ -0,0 +1,67 @@
+"""
+Network serial endpoints: BREmoteDevice on rfc2217:// and socket:// URLs
+against a local RFC 2217 server stand-in.
+"""
+
+import pytest
+
+from bremote.device import BOOT_OUTPUT_START, BREmoteDevice, is_serial_url
+from bremote.emulator import EmulatedPortServer, EmulatedSerial
+from bremote.models import DeviceType
+
+
+@pytest.fixture(params=[True, False], ids=["rfc2217", "socket"])
+def server(request):
+    srv = EmulatedPortServer("tx", rfc2217=request.param, stream=False)
+    yield srv
+    srv.close()
+
+
+def test_is_serial_url():
+    assert is_serial_url("rfc2217://10.0.0.2:4001")
+    assert is_serial_url("socket://localhost:7000")
+    assert not is_serial_url("COM3")
+    assert not is_serial_url("/dev/ttyUSB0")
+
+
+def test_url_device_identifies_and_runs_commands(server):
+    device = BREmoteDevice(server.url)
+    assert device.connect()
+    assert device.identify() == DeviceType.TRANSMITTER
+    assert device.send_command("?set max_gears 7") == "OK max_gears=7"
+    assert device.get_config_value("max_gears") == "7"
+    device.disconnect()
+    assert not device.is_connected()
+
+
+def test_reconnect_opens_a_new_session(server):
+    device = BREmoteDevice(server.url)
+    assert device.connect()
+    device.disconnect()
+    assert device.connect()
+    assert device.send_command("?get max_gears") == "max_gears=10"
+    device.disconnect()
+    assert server.connections == 2
+
+
+def test_unreachable_url_fails_cleanly():
+    device = BREmoteDevice("socket://127.0.0.1:9")
+    assert not device.connect()
+    assert not device.is_connected()
+
+
+@pytest.mark.parametrize("boot_after", [0.2, None])
+def test_settle_waits_out_reset_boot_output(boot_after):
+    device = BREmoteDevice("COM9")
+    device.serial = EmulatedSerial("tx", stream=False)
+    if boot_after is not None:
+        # Opening the port reset the ESP32: boot log arrives after a pause
+        device.serial._out("rst:0x1 (POWERON_RESET)", delay=boot_after)
+        device.serial._out("BREmote V2 TX", delay=boot_after + 0.05)
+    device.settle()
+    assert not device.serial.in_waiting
+    if boot_after is None:
+        assert device.io["wait_s"] >= BOOT_OUTPUT_START
+        assert device.io["sleep_avoided_s"] == 0.0
+    else:
+        assert device.io["wait_s"] >= boot_after + 0.05
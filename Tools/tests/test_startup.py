@@ -0,0 +1,56 @@
+"""
+Startup: the modules behind --scan / --port import within a time budget
+and without the heavy optional dependencies (numpy, sqlite3, tkinter,
+urllib). Measured with `python -X importtime` in a fresh interpreter.
+
+The budget defaults to STARTUP_BUDGET_MS and can be raised on slow
+machines with BREMOTE_IMPORT_BUDGET_MS.
+"""
+
+import os
+import subprocess
+import sys
+
+TOOLS_DIR = os.path.dirname(os.path.dirname(os.path.abspath(__file__)))
+
+# Cumulative import time of the CLI scan/--port path (about 80ms on a dev box)
+STARTUP_BUDGET_MS = 300
+
+# Imported only by the modes that need them
+LAZY_MODULES = ("numpy", "sqlite3", "tkinter", "urllib.request", "bremote.tests.link_test",
+                "bremote.store", "bremote.diff", "bremote.farm")
+
+
+def _import_times(statement):
+    """Cumulative import time in microseconds per module (nested names keep their indent)"""
+    result = subprocess.run([sys.executable, "-X", "importtime", "-c", statement],
+                            cwd=TOOLS_DIR, capture_output=True, text=True, timeout=60)
+    assert result.returncode == 0, result.stderr
+    times = {}
+    for line in result.stderr.splitlines():
+        if not line.startswith("import time:") or "|" not in line:
+            continue
+        _, cumulative, name = line.split("|")
+        if cumulative.strip().isdigit():
+            times[name[1:].rstrip()] = int(cumulative)
+    return times
+
+
+def _budget_ms():
+    return float(os.environ.get("BREMOTE_IMPORT_BUDGET_MS", STARTUP_BUDGET_MS))
+
+
+def test_scan_path_imports_within_budget():
+    statement = "import bremote.__main__, bremote.runner, bremote.device"
+    # Best of three cold starts; the first may pay for writing .pyc files
+    runs = [_import_times(statement) for _ in range(3)]
+    top_level = min(sum(t for name, t in times.items() if not name.startswith(" "))
+                    for times in runs)
+    modules = {name.strip() for name in runs[0]}
+    assert not modules & set(LAZY_MODULES), sorted(modules & set(LAZY_MODULES))
+    assert top_level / 1000 <= _budget_ms(), f"cold start {top_level / 1000:.0f}ms > {_budget_ms():.0f}ms"
+
+
+def test_legacy_script_defers_gui_and_network_imports():
+    modules = {name.strip() for name in _import_times("import bremote_test")}
+    assert not modules & {"tkinter", "urllib.request", "subprocess"}
@@ -0,0 +1,89 @@
+"""
+Production station: hotplug events queue emulated units, metrics are
+written safely from every worker, and a unit swapped on a busy port is
+tested after the running one.
+"""
+
+import json
+import os
+import threading
+from concurrent.futures import ThreadPoolExecutor
+
+from bremote.emulator import EmulatedDevice
+from bremote.runner import BREmoteTester
+from bremote.station import METRICS_FILE, Station
+
+
+# Polls (10ms apart) after which a test station gives up
+MAX_POLLS = 1000
+
+
+class ScriptedWatcher:
+    """Replays (added, removed) poll results, then reports no changes"""
+
+    def __init__(self, events, on_poll=None):
+        self.events = list(events)
+        self.on_poll = on_poll
+        self.polls = 0
+        self.station = None
+
+    def poll(self):
+        self.polls += 1
+        if self.on_poll:
+            self.on_poll(self.polls)
+        if self.polls > MAX_POLLS:
+            self.station.stop()
+        return self.events.pop(0) if self.events else ([], [])
+
+
+def _station(tmp_path, watcher, factory=None):
+    tester = BREmoteTester(selector="spiffs")
+    tester.log = lambda message: None
+    watcher.station = Station(tester, output_dir=str(tmp_path), workers=4, poll_interval=0.01,
+                              metrics_interval=3600, watcher=watcher,
+                              device_factory=factory or (lambda port: EmulatedDevice(port, "rx", stream=False)))
+    return watcher.station
+
+
+def test_units_tested_as_plugged_in(tmp_path):
+    station = _station(tmp_path, ScriptedWatcher([(["emu-a", "emu-b"], []), (["emu-c"], [])]))
+    station.run(max_units=3)
+
+    metrics = json.load(open(tmp_path / METRICS_FILE))
+    assert metrics["units"] == 3 and metrics["errors"] == 0 and metrics["queue_depth"] == 0
+    reports = [name for name in os.listdir(tmp_path) if name.endswith(".json") and name != METRICS_FILE]
+    assert sorted(name.rsplit("_", 1)[-1] for name in reports) == ["a.json", "b.json", "c.json"]
+
+
+def test_metrics_written_concurrently(tmp_path):
+    station = _station(tmp_path, ScriptedWatcher([]))
+
+    def write_many(_):
+        for _ in range(300):
+            station._write_metrics()
+
+    with ThreadPoolExecutor(max_workers=4) as pool:
+        list(pool.map(write_many, range(4)))
+    assert json.load(open(tmp_path / METRICS_FILE))["units"] == 0
+    assert not os.path.exists(tmp_path / (METRICS_FILE + ".tmp"))
+
+
+def test_replugged_port_tested_after_running_unit(tmp_path):
+    release = threading.Event()
+    connects = []
+
+    class SlowDevice(EmulatedDevice):
+        def connect(self):
+            connects.append(self.port)
+            if len(connects) == 1:
+                release.wait(5)
+            return super().connect()
+
+    # Unplug and plug in another unit while the first is still being tested
+    watcher = ScriptedWatcher([(["emu-a"], []), ([], ["emu-a"]), (["emu-a"], [])],
+                              on_poll=lambda polls: polls == 4 and release.set())
+    station = _station(tmp_path, watcher, lambda port: SlowDevice(port, "rx", stream=False))
+    station.run(max_units=2)
+
+    assert connects == ["emu-a", "emu-a"]
+    assert json.load(open(tmp_path / METRICS_FILE))["units"] == 2
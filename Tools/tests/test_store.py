@@ -0,0 +1,123 @@
+"""
+Results store: one transaction per run, unit identity and history queries.
+"""
+
+import sqlite3
+
+import pytest
+
+from bremote.emulator import EmulatedDevice
+from bremote.models import TestReport as Report
+from bremote.runner import BREmoteTester
+from bremote.store import ResultsStore, main
+
+
+def _report(port, device_type="tx", result="PASS", firmware="3", address="AA:BB:01", serial="S1"):
+    report = Report(device_type=device_type, port=port, usb_serial=serial,
+                        own_address=address, firmware_version=firmware, overall_result=result)
+    report.tests = {
+        "spiffs": {"result": "PASS", "details": "", "stats": {"wall_s": 0.1}},
+        "hall": {"result": result, "details": "throttle stuck" if result == "FAIL" else ""},
+    }
+    return report
+
+
+@pytest.fixture
+def store(tmp_path):
+    with ResultsStore(str(tmp_path / "results.db")) as s:
+        yield s
+
+
+def test_wal_mode_and_indexes(store):
+    conn = sqlite3.connect(store.path)
+    assert conn.execute("PRAGMA journal_mode").fetchone()[0] == "wal"
+    plan = " ".join(row[3] for row in conn.execute(
+        "EXPLAIN QUERY PLAN SELECT id FROM reports WHERE firmware_version = '3' AND result = 'FAIL'"))
+    assert "idx_reports_firmware" in plan
+    conn.close()
+
+
+def test_record_and_query(store):
+    store.record_run({"COM3": _report("COM3"), "COM4": _report("COM4", "rx", "FAIL", address="AA:BB:02",
+                                                                serial="S2")})
+    store.record_run({"COM3": _report("COM3", firmware="4")})
+
+    assert len(store.query_reports()) == 3
+    assert [r["port"] for r in store.query_reports(result="FAIL")] == ["COM4"]
+    assert [r["firmware_version"] for r in store.query_reports(device="S1")] == ["4", "3"]
+    assert len(store.query_reports(device="aa:bb:02")) == 1
+
+    failed = store.query_tests(name="hall", test_result="FAIL")
+    assert [(t["port"], t["details"]) for t in failed] == [("COM4", "throttle stuck")]
+
+    by_firmware = {row["grp"]: row for row in store.summary("firmware_version")}
+    assert by_firmware["3"]["reports"] == 2 and by_firmware["3"]["failed"] == 1
+    assert [r["units"] for r in store.query_runs()] == [1, 2]
+
+
+def test_devices_keyed_by_identity(store):
+    store.record_run({"COM3": _report("COM3")})
+    store.record_run({"COM9": _report("COM9")})       # same unit, other port
+    store.record_run({"COM3": _report("COM3", address="AA:BB:03", serial="S3")})
+    (count,) = store._conn.execute("SELECT COUNT(*) FROM devices").fetchone()
+    assert count == 2
+
+
+def test_link_metrics_matched_to_units(store):
+    link = {"test": "Radio Link Integration", "tx_port": "COM3", "rx_port": "COM4", "result": "PASS",
+            "packet_loss_percent": 1.5, "avg_rssi_dbm": -60.0, "matched_pairs": 97}
+    identities = {"COM3": {"usb_serial": "S1", "own_address": "AA:BB:01"},
+                  "COM4": {"usb_serial": "S2", "own_address": "AA:BB:02"}}
+    store.record_run({}, {"COM3->COM4": link}, identities, mode="link")
+
+    (row,) = store.query_links(device="AA:BB:02")
+    assert row["packet_loss_percent"] == 1.5 and row["pair"] == "COM3->COM4"
+    assert store.query_links(port="COM5") == []
+
+
+def test_emulated_run_records_identity(store):
+    device = EmulatedDevice("emu-tx", "tx", stream=False)
+    device.connect()
+    device.identify()
+    report = BREmoteTester(selector="spiffs").run_device_tests(device, log=lambda message: None)
+    store.record_run({device.port: report}, selector="spiffs")
+
+    (row,) = store.query_reports()
+    assert row["firmware_version"] == "3"
+    assert row["own_address"] == device.get_config_value("own_address")
+
+
+def test_history_cli(store, capsys):
+    store.record_run({"COM3": _report("COM3", result="FAIL")})
+    main(["--db", store.path, "--result", "FAIL"])
+    out = capsys.readouterr().out
+    assert "COM3" in out and "1 row(s)" in out
+    main(["--db", store.path, "--summary", "device_type"])
+    assert "0.0%" in capsys.readouterr().out
+
+
+def test_link_time_filters_and_rejected_options(store, capsys):
+    link = {"tx_port": "COM3", "rx_port": "COM4", "result": "PASS", "packet_loss_percent": 2.0}
+    store.record_run({}, {"COM3->COM4": link}, mode="link", started="2026-09-01T10:00:00")
+    store.record_run({}, {"COM3->COM4": dict(link, packet_loss_percent=4.0)}, mode="link",
+                     started="2026-10-05T10:00:00")
+
+    assert [r["packet_loss_percent"] for r in store.query_links(since="2026-10-01")] == [4.0]
+    assert [r["packet_loss_percent"] for r in store.query_links(until="2026-10-01")] == [2.0]
+    assert store.query_links(since="2026-09-02", until="2026-10-01") == []
+
+    conn = sqlite3.connect(store.path)
+    plan = " ".join(row[3] for row in conn.execute(
+        "EXPLAIN QUERY PLAN SELECT id FROM runs WHERE started >= '2026-10-01'"))
+    assert "idx_runs_started" in plan
+    conn.close()
+
+    main(["--db", store.path, "--link", "--since", "2026-10-01"])
+    assert "1 row(s)" in capsys.readouterr().out
+    for option in (["--type", "tx"], ["--firmware", "3"], ["--test", "hall"]):
+        with pytest.raises(SystemExit) as exc:
+            main(["--db", store.path, "--link", *option])
+        assert exc.value.code == 2
+        assert f"{option[0]} cannot be used with --link" in capsys.readouterr().err
+    with pytest.raises(SystemExit):
+        main(["--db", store.path, "--runs", "--result", "FAIL"])
@@ -0,0 +1,75 @@
+"""
+Timeline tracing: Chrome trace events for commands, streams, waits and
+tests on per-port tracks of an emulated run.
+"""
+
+import json
+
+import pytest
+
+from bremote.emulator import EmulatedDevice
+from bremote.runner import BREmoteTester
+from bremote.tracing import tracer
+
+
+@pytest.fixture
+def trace_file(tmp_path):
+    path = str(tmp_path / "trace.json")
+    tracer.start(path)
+    yield path
+    tracer.close()
+
+
+def _load(path):
+    tracer.close()
+    with open(path) as f:
+        events = json.load(f)
+    tracks = {e["tid"]: e["args"]["name"] for e in events if e.get("name") == "thread_name"}
+    spans = [dict(e, track=tracks[e["tid"]]) for e in events if e["ph"] == "X"]
+    return spans, tracks
+
+
+def test_commands_and_tests_on_port_track(trace_file):
+    device = EmulatedDevice("emu-tx", "tx", stream=False)
+    device.connect()
+    device.identify()
+    BREmoteTester(selector="config_keys").run_device_tests(device, log=lambda message: None)
+
+    spans, tracks = _load(trace_file)
+    assert set(tracks.values()) == {"emu-tx"}
+    (test,) = [s for s in spans if s["cat"] == "test"]
+    assert test["name"] == "config_keys" and test["args"]["result"] == "PASS"
+    keys = [s for s in spans if s["name"] == "?keys"]
+    assert keys and keys[0]["args"]["response_bytes"] > 0
+    # Commands of the test lie inside the test span
+    assert test["ts"] <= keys[-1]["ts"] and keys[-1]["ts"] + keys[-1]["dur"] <= test["ts"] + test["dur"] + 1
+
+
+def test_stream_start_stop_and_waits(trace_file):
+    device = EmulatedDevice("emu-rx", "rx")
+    device.connect()
+    device.send_command("?printreceived json", wait_for_response=False)
+    device.wait_until(lambda: device.serial.in_waiting > 0, timeout=1.0)
+    device.stop_continuous_output()
+    device.sleep(0.01)
+
+    spans, tracks = _load(trace_file)
+    (stream,) = [s for s in spans if s["track"] == "emu-rx stream"]
+    assert stream["name"] == "?printreceived json" and stream["cat"] == "stream"
+    assert {"quit", "wait", "sleep"} <= {s["name"] for s in spans if s["track"] == "emu-rx"}
+
+
+def test_disabled_tracer_records_nothing():
+    assert not tracer.enabled
+    with tracer.span("?keys", "COM3") as args:
+        args["response_bytes"] = 1
+    assert tracer.close() is None
+
+
+def test_disabled_spans_do_not_share_args():
+    assert not tracer.enabled
+    with tracer.span("hall", "COM3", "test") as first:
+        first["result"] = "FAIL"
+    with tracer.span("radio", "COM4", "test") as second:
+        assert second == {}
+        assert second is not first
@@ -0,0 +1,113 @@
+"""
+TxSampler: send slot phase inference, frame matching and per-slot packet
+loss on synthetic streams (TX frames every 50ms, radio slots every 100ms).
+"""
+
+import pytest
+
+from bremote.tx_sampler import TxSampler, RADIO_SEND_PERIOD
+
+T0 = 1000.0
+TX_FRAME_PERIOD = 0.05
+TX_FRAME_OFFSET = 0.013      # TX frames at T0 + 0.013 + k * 50ms
+TRUE_PHASE = 0.03            # Radio slots at T0 + 0.03 + k * 100ms
+LATENCY = 0.005              # Slot to RX serial output
+SLOTS = 200
+
+
+def _frame_value(k):
+    """Throttle/steering of TX frame k (changes every frame)"""
+    return (k % 100) - 50, 50 - (k % 90)
+
+
+def _run(lost_per_10=0):
+    """Feed a synthetic session like RadioLinkMonitor does.
+
+    Returns the sampler, the RX sample times and (matched frame index,
+    frame the radio actually carried) per RX sample.
+    """
+    sampler = TxSampler()
+    frames = [T0 + TX_FRAME_OFFSET + k * TX_FRAME_PERIOD for k in range(2 * SLOTS)]
+    slots = [T0 + TRUE_PHASE + n * RADIO_SEND_PERIOD for n in range(SLOTS)]
+
+    events = [(t, "tx", k) for k, t in enumerate(frames)]
+    for n, slot in enumerate(slots):
+        if n % 10 < lost_per_10:
+            continue
+        # Frame current when the slot fired is what the radio carried
+        k = max(k for k, t in enumerate(frames) if t <= slot)
+        events.append((slot + LATENCY, "rx", k))
+    events.sort()
+
+    rx_times, matches = [], []
+    for t, kind, k in events:
+        thr, steer = _frame_value(k)
+        if kind == "tx":
+            sampler.add_frame(t, thr, steer)
+        else:
+            sampler.observe_rx(t, thr, steer)
+            matches.append((sampler.match(t, thr, steer), k))
+            rx_times.append(t)
+    return sampler, rx_times, matches
+
+
+def _loss_percent(sampler, rx_times):
+    total = sampler.slot_count()
+    return (total - sampler.matched_slots(rx_times)) / total * 100
+
+
+def test_phase_inferred_within_the_frame_interval():
+    sampler, _, _ = _run()
+    phase = sampler.phase()
+    assert phase is not None
+    # Changes only bound the slot to [last frame before it, RX time]
+    assert TX_FRAME_OFFSET <= phase <= TRUE_PHASE + LATENCY
+
+
+@pytest.mark.parametrize("lost_per_10, expected", [(0, 0.0), (1, 10.0), (3, 30.0)])
+def test_packet_loss_from_send_slots(lost_per_10, expected):
+    sampler, rx_times, matches = _run(lost_per_10=lost_per_10)
+    assert _loss_percent(sampler, rx_times) == pytest.approx(expected, abs=1.0)
+    # Every RX sample is matched to the frame the radio carried
+    assert all(idx == k for idx, k in matches[5:])
+
+
+def test_slot_count_covers_capture():
+    sampler, _, _ = _run()
+    span = sampler.timestamps[-1] - sampler.timestamps[0]
+    assert sampler.slot_count() == pytest.approx(span / RADIO_SEND_PERIOD, abs=1)
+    thr, steer = sampler.slot_values()
+    assert len(thr) == len(steer) == sampler.slot_count()
+
+
+def test_matched_slots_use_the_final_phase():
+    sampler, rx_times, _ = _run()
+    # Early samples were matched before any phase was known; the count
+    # still agrees with slot_count() because both use the same phase.
+    assert sampler.matched_slots(rx_times) == sampler.slot_count()
+    assert sampler.matched_slots(t + 1000.0 for t in rx_times) == 0
+
+
+def test_missing_values_repeat_previous_frame():
+    sampler = TxSampler()
+    sampler.add_frame(1.0, 10, None)
+    sampler.add_frame(1.05, None, -3)
+    assert list(sampler.throttle) == [10, 10]
+    assert list(sampler.steering) == [0, -3]
+
+
+def test_capacity_drops_oldest_quarter():
+    sampler = TxSampler(capacity=8)
+    for k in range(9):
+        sampler.add_frame(k * 0.05, k, k)
+    assert sampler.frames_dropped == 2
+    assert list(sampler.throttle) == list(range(2, 9))
+
+
+def test_empty_sampler():
+    sampler = TxSampler()
+    assert sampler.phase() is None
+    assert sampler.match(1.0, 0, 0) is None
+    assert sampler.slot_count() == 0
+    assert sampler.matched_slots([1.0]) == 0
+    assert sampler.slot_values() == ([], [])
@@ -0,0 +1,79 @@
+"""
+WiFi suite: the forced web UI update passes only when the firmware reports
+"UI updated to N" and ?wifiver shows ui_installed equal to ui_target.
+"""
+
+import pytest
+
+from bremote.emulator import WEB_UI_VERSION, EmulatedDevice
+from bremote.models import TestResult
+from bremote.tests.wifi_tests import WiFiTestSuite
+
+
+class _UiUpdateDevice(EmulatedDevice):
+    """Emulated TX answering ?wifiupd / ?wifiver with scripted firmware text"""
+
+    def __init__(self, update_reply, installed):
+        super().__init__("emu-tx", "tx", stream=False)
+        self.update_reply = update_reply
+        self.installed = installed
+
+    def send_command(self, command, wait_for_response=True, timeout=2.0):
+        if command == "?wifiupd":
+            return self.update_reply
+        if command == "?wifiver":
+            return f"ui_target=3\nui_installed={self.installed}\n"
+        return super().send_command(command, wait_for_response, timeout)
+
+
+@pytest.mark.parametrize("update_reply, installed, expected", [
+    ("UI updated to 3\n", 3, TestResult.PASS),
+    ("ERR_UI_UPDATE\n", 3, TestResult.FAIL),
+    ("UI updated to 3\n", 2, TestResult.FAIL),
+    ("ERR: WiFi disabled at compile time\n", 3, TestResult.FAIL),
+])
+def test_ui_update_checks_the_installed_version(update_reply, installed, expected):
+    device = _UiUpdateDevice(update_reply, installed)
+    device.wait_for_response = lambda command, check, timeout, poll=0.1, replaces=0.0: \
+        device.send_command(command)
+    result = WiFiTestSuite.test_tx_wifi_ui_update(device)
+    assert result["result"] == expected.value, result["details"]
+
+
+def test_sleep_avoided_never_negative():
+    device = EmulatedDevice("emu-rx", "rx", stream=False)
+    assert not device.wait_until(lambda: False, timeout=0.1, poll=0.02, replaces=0.05)
+    assert device.io["sleep_avoided_s"] == 0.0
+
+
+def test_wait_for_response_counts_only_the_pauses():
+    device = EmulatedDevice("emu-rx", "rx", stream=False)
+    device.connect()
+    wait_s = device.io["wait_s"]
+    calls = []
+    device.wait_for_response("?wifi", lambda r: calls.append(r) or len(calls) == 3,
+                             timeout=2.0, poll=0.05, replaces=1.0)
+    # Two pauses between three sends; the round trips are not waiting
+    assert device.io["wait_s"] - wait_s == pytest.approx(0.1)
+    assert device.io["retries"] == 2
+
+
+def test_ui_update_on_emulated_unit():
+    device = EmulatedDevice("emu-tx", "tx", stream=False)
+    device.connect()
+    device.serial.ui_installed = WEB_UI_VERSION - 1
+    assert f"ui_installed={WEB_UI_VERSION - 1}" in device.send_command("?wifiver")
+    result = WiFiTestSuite.test_tx_wifi_ui_update(device)
+    assert result["result"] == TestResult.PASS.value, result["details"]
+    assert device.serial.ui_installed == WEB_UI_VERSION
+
+
+
+def test_wifi_onoff_on_emulated_unit():
+    device = EmulatedDevice("emu-tx", "tx", stream=False)
+    device.connect()
+    # TX boots with WiFi off; start with it on to reach the ?state json check
+    device.serial.wifi = True
+    result = WiFiTestSuite.test_tx_wifi_onoff(device)
+    assert result["result"] == TestResult.PASS.value, result["details"]
+    assert result["details"] == "WiFi on/off cycle works"